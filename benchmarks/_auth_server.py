@@ -0,0 +1,247 @@
+"""Stand-in realm (auth) server for the benchmarks.
+
+Speaks just enough of the auth protocol to walk a RealmConnector from the
+logon challenge to the realm list, and can split everything it sends into
+chunks as small as one byte, each pushed to the socket on its own. The
+server side of SRP6 is written out here from the verifier equations, apart
+from wowchat.realm.srp_client, so a login only succeeds if the client's
+proof really matches.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import socket
+import struct
+from secrets import randbits, token_bytes
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from wowchat.common.config import WowExpansion
+from wowchat.realm.packets import RealmPackets
+
+# The 32-byte safe prime every auth server uses, big-endian
+N_BYTES = bytes.fromhex("894B645E89E1535BBDAD5B8B290650530801B18EBFBF5E8FAB3C82872A3E9BB7")
+G_BYTES = b"\x07"
+
+N = int.from_bytes(N_BYTES, "big")
+G = G_BYTES[0]
+
+# (name, "host:port", realm id)
+Realm = Tuple[str, str, int]
+
+# Client packets: cmd, error, size, then size bytes
+_CHALLENGE_HEAD = struct.Struct('<BBH')
+# cmd, A[32], M1[20], CRC hash[20], number of keys, security flags
+_PROOF_LENGTH = 1 + 32 + 20 + 20 + 1 + 1
+# Account name in the challenge body: length byte, then the name
+_ACCOUNT_AT = 4 + 3 + 2 + 4 + 4 + 4 + 4 + 4 + 1
+# cmd, R1[16], R2[20], R3[20], number of keys
+_RECONNECT_PROOF_LENGTH = 1 + 16 + 20 + 20 + 1
+# cmd, unused u32
+_REALM_LIST_REQUEST_LENGTH = 5
+
+
+def build_logon_challenge(result: int = RealmPackets.AuthResult.WOW_SUCCESS, B: bytes = bytes(range(1, 33)),
+		salt: bytes = bytes(range(32, 64)), security_flags: int = 0, security: bytes = b"") -> bytes:
+	"""Server logon challenge; B and salt little-endian as on the wire"""
+	out = bytearray((RealmPackets.CMD_AUTH_LOGON_CHALLENGE, 0, result))
+	if not RealmPackets.AuthResult.is_success(result):
+		return bytes(out)
+	out += B
+	out += bytes((len(G_BYTES),)) + G_BYTES[::-1]
+	out += bytes((len(N_BYTES),)) + N_BYTES[::-1]
+	out += salt
+	out += bytes(range(16))  # CRC salt
+	out.append(security_flags)
+	out += security
+	return bytes(out)
+
+
+def build_logon_proof(expansion: str, result: int = RealmPackets.AuthResult.WOW_SUCCESS,
+		m2: bytes = bytes(20), short_failure: bool = False) -> bytes:
+	"""Server logon proof in the size the expansion uses.
+
+	short_failure sends the bare result byte some servers answer a failed
+	proof with, whatever the expansion.
+	"""
+	vanilla = expansion == WowExpansion.Vanilla
+	out = bytearray((RealmPackets.CMD_AUTH_LOGON_PROOF, result))
+	if not RealmPackets.AuthResult.is_success(result):
+		if not vanilla and not short_failure:
+			out += bytes(2)
+		return bytes(out)
+	out += m2
+	if vanilla:
+		out += struct.pack('<I', 0)  # survey id
+	else:
+		out += struct.pack('<IIH', 0x00800000, 0, 0)  # account flags, survey id, login flags
+	return bytes(out)
+
+
+def build_realm_list(realms: Sequence[Realm]) -> bytes:
+	"""CMD_REALM_LIST in the layout RealmConnector reads"""
+	body = bytearray(4) + bytes((len(realms),))
+	for name, address, realm_id in realms:
+		body += bytes(3) + b"\x00" + name.encode() + b"\x00" + address.encode() + b"\x00"
+		body += struct.pack('<fBBB', 1.0, 0, 1, realm_id)
+	body += b"\x10\x00"
+	return bytes((RealmPackets.CMD_REALM_LIST,)) + struct.pack('<H', len(body)) + bytes(body)
+
+
+def _sha1(data: bytes) -> bytes:
+	return hashlib.sha1(data).digest()
+
+
+class SRPServerSession:
+	"""Server half of one SRP6 logon"""
+
+	def __init__(self, account: bytes, password: str, salt: bytes, b: Optional[int] = None) -> None:
+		self.account = account
+		self.salt = salt
+		x = int.from_bytes(_sha1(salt + _sha1(account + b":" + password.upper().encode())), "little")
+		self._v = pow(G, x, N)
+		self._b = b if b is not None else randbits(19 * 8)
+		self.B = ((3 * self._v + pow(G, self._b, N)) % N).to_bytes(32, "little")
+
+	def verify(self, A: bytes, M1: bytes) -> Optional[Tuple[bytes, bytes]]:
+		"""(M2, session key) if the client's proof M1 holds, else None"""
+		a_int = int.from_bytes(A, "little")
+		if a_int % N == 0:
+			return None
+		u = int.from_bytes(_sha1(A + self.B), "little")
+		S = pow(a_int * pow(self._v, u, N), self._b, N).to_bytes(32, "little")
+		even, odd = _sha1(S[0::2]), _sha1(S[1::2])
+		K = bytes(b for pair in zip(even, odd) for b in pair)
+		group = bytes(n ^ g for n, g in zip(_sha1(N.to_bytes(32, "little")), _sha1(G_BYTES)))
+		expected = _sha1(group + _sha1(self.account) + self.salt + A + self.B + K)
+		if expected != M1:
+			return None
+		return _sha1(A + M1 + K), K
+
+
+class StandInAuthServer:
+	"""Checks every logon against one password and answers with a realm list.
+
+	chunk_size 0 sends each packet in one write; otherwise packets go out in
+	chunk_size pieces with TCP_NODELAY, yielding to the loop after each one.
+	A wrong proof is answered with WOW_FAIL_INCORRECT_PASSWORD; proof_result
+	forces a failure whatever the proof, and can be changed between logons.
+	Session keys are kept per account,
+	as an auth database would, for the reconnect handshake and the stand-in
+	world server.
+	"""
+
+	def __init__(self, expansion: str, realms: Sequence[Realm], chunk_size: int = 0,
+			challenge_result: int = RealmPackets.AuthResult.WOW_SUCCESS,
+			proof_result: int = RealmPackets.AuthResult.WOW_SUCCESS,
+			short_proof_failure: bool = False, password: str = "password") -> None:
+		self.expansion = expansion
+		self.chunk_size = chunk_size
+		self.password = password
+		# One salt per server, like a stored account: repeated logins share it
+		self.salt = token_bytes(32)
+		self._challenge_result = challenge_result
+		self.proof_result = proof_result
+		self._short_proof_failure = short_proof_failure
+		self._realm_list = build_realm_list(realms)
+		self._server: Optional[asyncio.AbstractServer] = None
+		self.connections = 0
+		self.writes = 0
+		self.logins = 0
+		# Logon proofs checked, whether they were accepted or not
+		self.proofs = 0
+		self.reconnects = 0
+		self.received: List[int] = []
+		# Session key of every successful logon, in order
+		self.session_keys: List[bytes] = []
+		# account -> session key of its last logon
+		self.sessions: Dict[bytes, bytes] = {}
+
+	def set_realms(self, realms: Sequence[Realm]) -> None:
+		self._realm_list = build_realm_list(realms)
+
+	def forget_sessions(self) -> None:
+		"""Drop every stored session key, like an auth server restart"""
+		self.sessions.clear()
+
+	async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+		self._server = await asyncio.start_server(self._handle, host, port)
+		return self._server.sockets[0].getsockname()[1]
+
+	async def close(self) -> None:
+		if self._server is not None:
+			self._server.close()
+			await self._server.wait_closed()
+			self._server = None
+
+	async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+		self.connections += 1
+		sock = writer.get_extra_info("socket")
+		if sock is not None:
+			sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+		session: Optional[SRPServerSession] = None
+		account = b""
+		server_data = b""
+		try:
+			while True:
+				cmd = (await reader.readexactly(1))[0]
+				self.received.append(cmd)
+				if cmd in (RealmPackets.CMD_AUTH_LOGON_CHALLENGE, RealmPackets.CMD_AUTH_RECONNECT_CHALLENGE):
+					head = await reader.readexactly(_CHALLENGE_HEAD.size - 1)
+					body = await reader.readexactly(_CHALLENGE_HEAD.unpack(bytes((cmd,)) + head)[2])
+					account = body[_ACCOUNT_AT:_ACCOUNT_AT + body[_ACCOUNT_AT - 1]]
+					if cmd == RealmPackets.CMD_AUTH_RECONNECT_CHALLENGE:
+						if account not in self.sessions:
+							await self._send(writer, bytes((cmd, RealmPackets.AuthResult.WOW_FAIL_UNKNOWN_ACCOUNT)))
+							return
+						server_data = token_bytes(16)
+						await self._send(writer, bytes((cmd, RealmPackets.AuthResult.WOW_SUCCESS)) + server_data + bytes(16))
+						continue
+					if not RealmPackets.AuthResult.is_success(self._challenge_result):
+						await self._send(writer, build_logon_challenge(self._challenge_result))
+						return
+					session = SRPServerSession(account, self.password, self.salt)
+					await self._send(writer, build_logon_challenge(B=session.B, salt=self.salt))
+				elif cmd == RealmPackets.CMD_AUTH_LOGON_PROOF:
+					proof = await reader.readexactly(_PROOF_LENGTH - 1)
+					self.proofs += 1
+					verified = session.verify(proof[:32], proof[32:52]) if session is not None else None
+					result = self.proof_result
+					if verified is None and RealmPackets.AuthResult.is_success(result):
+						result = RealmPackets.AuthResult.WOW_FAIL_INCORRECT_PASSWORD
+					if not RealmPackets.AuthResult.is_success(result):
+						await self._send(writer, build_logon_proof(self.expansion, result, short_failure=self._short_proof_failure))
+						return
+					m2, key = verified  # type: ignore[misc]
+					self.logins += 1
+					self.session_keys.append(key)
+					self.sessions[account] = key
+					await self._send(writer, build_logon_proof(self.expansion, result, m2))
+				elif cmd == RealmPackets.CMD_AUTH_RECONNECT_PROOF:
+					proof = await reader.readexactly(_RECONNECT_PROOF_LENGTH - 1)
+					key = self.sessions.get(account)
+					accepted = key is not None and _sha1(account + proof[:16] + server_data + key) == proof[16:36]
+					result = RealmPackets.AuthResult.WOW_SUCCESS if accepted else RealmPackets.AuthResult.WOW_FAIL_UNKNOWN_ACCOUNT
+					flags = b"" if self.expansion == WowExpansion.Vanilla else bytes(2)
+					await self._send(writer, bytes((cmd, result)) + flags)
+					if not accepted:
+						return
+					self.reconnects += 1
+				elif cmd == RealmPackets.CMD_REALM_LIST:
+					await reader.readexactly(_REALM_LIST_REQUEST_LENGTH - 1)
+					await self._send(writer, self._realm_list)
+				else:
+					return
+		except (asyncio.IncompleteReadError, ConnectionError):
+			pass
+		finally:
+			writer.close()
+
+	async def _send(self, writer: asyncio.StreamWriter, data: bytes) -> None:
+		step = self.chunk_size or len(data)
+		for i in range(0, len(data), step):
+			writer.write(data[i:i + step])
+			self.writes += 1
+			await writer.drain()
+			if self.chunk_size:
+				await asyncio.sleep(0)
@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+import time
+from typing import Callable
+
+
+def measure(fn: Callable[[], object], repeat: int = 3) -> float:
+	"""Best wall-clock time of `repeat` runs of fn, in seconds."""
+	best = float("inf")
+	for _ in range(repeat):
+		start = time.perf_counter()
+		fn()
+		best = min(best, time.perf_counter() - start)
+	return best
+
+
+def report(name: str, count: int, seconds: float, unit: str = "ops") -> None:
+	rate = count / seconds if seconds > 0 else float("inf")
+	print(f"{name:<48} {rate:>14,.0f} {unit}/s  ({seconds * 1000:.1f} ms)")
@@ -0,0 +1,299 @@
+"""Stand-in world server for the benchmarks.
+
+Takes a GameConnector from SMSG_AUTH_CHALLENGE to SMSG_LOGIN_VERIFY_WORLD for
+Vanilla, TBC and WotLK. CMSG_AUTH_SESSION is checked against the session key
+the stand-in auth server stored for the account, as a real world server does
+against the auth database; a wrong digest gets the connection closed.
+CMSG_PLAYER_LOGIN with a GUID that is not the character's is answered with
+SMSG_CHARACTER_LOGIN_FAILED. With require_char_enum the server closes a
+session that logs in before asking for the character list, as TrinityCore
+and AzerothCore do. In the world it answers CMSG_JOIN_CHANNEL, and with a
+guild CMSG_GUILD_QUERY and CMSG_GUILD_ROSTER. CMSG_NAME_QUERY and CMSG_WHO
+are answered from `players`, and CMSG_MESSAGECHAT is kept in `chat`;
+push() sends server packets such as chat to the client in the world.
+
+Latency delays every answer without holding up the packets behind it, like
+a round trip on the wire: requests sent together are answered together.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import struct
+from secrets import randbits
+from types import ModuleType
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from benchmarks._auth_server import StandInAuthServer
+from wowchat.common.config import WowExpansion
+from wowchat.game.dispatch import load_expansion
+from wowchat.game.header_crypt_wotlk import GameHeaderCryptWotLK
+from wowchat.game.packets import AuthResponseCodes, ChatNotify
+
+_SIZE = struct.Struct('>H')
+# Client header: size big-endian, opcode little-endian
+_CLIENT_HEADER_LENGTH = 6
+_SERVER_OPCODE = struct.Struct('<H')
+
+
+class StandInWorldServer:
+	def __init__(self, expansion: str, auth: StandInAuthServer, character: str = "Bob", guid: int = 9,
+			require_char_enum: bool = False, other_characters: int = 0, latency: float = 0.0,
+			guild: Optional[str] = None, guild_members: int = 0) -> None:
+		self.expansion = expansion
+		self._auth = auth
+		self._handler_class, _ = load_expansion(expansion)
+		self._character = character
+		self.guid = guid
+		self.require_char_enum = require_char_enum
+		# Characters listed before ours in SMSG_CHAR_ENUM
+		self.other_characters = other_characters
+		# Seconds each client packet takes to be answered, a stand-in for the
+		# round trip to a real server
+		self.latency = latency
+		# The character's guild, its id and how many members the roster lists
+		self.guild = guild
+		self.guild_id = 7 if guild else 0
+		self.guild_members = guild_members
+		# Indices of the members the roster lists as online: Member<i>, GUID 100 + i
+		self.guild_online: Set[int] = set(range(0, guild_members, 4))
+		self._server: Optional[asyncio.AbstractServer] = None
+		self._clients: Set[asyncio.StreamWriter] = set()
+		self.sessions = 0
+		# Sessions that got as far as CMSG_AUTH_SESSION, unlike bare connects
+		self.auth_sessions = 0
+		self.rejected = 0
+		self.in_world = 0
+		self.char_enums = 0
+		self.login_failures = 0
+		self.joined_channels: List[str] = []
+		self.guild_queries = 0
+		self.roster_requests = 0
+		# Names CMSG_NAME_QUERY knows, by GUID
+		self.players: Dict[int, str] = {}
+		self.name_queries = 0
+		# Leave this many CMSG_NAME_QUERY unanswered, as if the reply was lost
+		self.drop_name_queries = 0
+		# CMSG_WHO arriving within who_throttle seconds of the last one
+		# answered is dropped without a reply, as servers throttle /who
+		self.who_throttle = 0.0
+		self.who_queries = 0
+		self.who_throttled = 0
+		# CMSG_MESSAGECHAT as (type, language, channel or whisper target, text)
+		self.chat: List[Tuple[int, int, Optional[str], str]] = []
+		self._last_who = float("-inf")
+		self._push: Optional[Callable[[int, bytes], None]] = None
+		# Set whenever a character enters the world
+		self.entered = asyncio.Event()
+		# Reject this many sessions whatever their digest, like a world
+		# server that lost track of the auth database
+		self.reject_next = 0
+		# Leave this many CMSG_AUTH_SESSION unanswered, the connection open
+		self.silent_next = 0
+		self.silenced = 0
+
+	async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+		self._server = await asyncio.start_server(self._handle, host, port)
+		return self._server.sockets[0].getsockname()[1]
+
+	async def close(self) -> None:
+		self.drop()
+		if self._server is not None:
+			self._server.close()
+			await self._server.wait_closed()
+			self._server = None
+
+	def push(self, opcode: int, payload: bytes) -> None:
+		"""Send a packet to the client in the world, without the latency"""
+		assert self._push is not None, "no client in the world"
+		self._push(opcode, payload)
+
+	def drop(self) -> None:
+		"""Cut every client off, like a world server blip"""
+		for writer in list(self._clients):
+			writer.close()
+
+	async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+		self._clients.add(writer)
+		self.sessions += 1
+		try:
+			await self._serve(reader, writer)
+		except (asyncio.IncompleteReadError, ConnectionError):
+			pass
+		finally:
+			self._clients.discard(writer)
+			writer.close()
+
+	async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+		p = self._handler_class.packets
+		wotlk = self.expansion == WowExpansion.WotLK
+		server_seed = randbits(32)
+		body = (bytes(4) + struct.pack('>I', server_seed) + bytes(32)) if wotlk else struct.pack('>I', server_seed)
+		writer.write(_SIZE.pack(len(body) + 2) + _SERVER_OPCODE.pack(p.SMSG_AUTH_CHALLENGE) + body)
+
+		# CMSG_AUTH_SESSION: unencrypted 4-byte header, the opcode's high half opens the body
+		size = _SIZE.unpack((await reader.readexactly(4))[:2])[0]
+		session = await reader.readexactly(size - 2)
+		self.auth_sessions += 1
+		if self.silent_next:
+			self.silent_next -= 1
+			self.silenced += 1
+			# Until the client gives up
+			await reader.read()
+			return
+		offset = 2 + 4 + 4
+		end = session.index(b"\x00", offset)
+		account = session[offset:end]
+		offset = end + 1 + (4 if wotlk else 0)
+		client_seed = session[offset:offset + 4]
+		offset += 4 + (4 + 4 + 4 + 8 if wotlk else 0)
+		digest = session[offset:offset + 20]
+		key = self._auth.sessions.get(account)
+		expected = key is not None and hashlib.sha1(account + bytes(4) + client_seed + struct.pack('>I', server_seed) + key).digest()
+		if digest != expected or self.reject_next:
+			self.reject_next = max(0, self.reject_next - 1)
+			self.rejected += 1
+			return
+
+		crypt = self._handler_class.header_crypt_class()
+		crypt.init(key)
+		# RC4 streams run per direction: the server encrypts with the client's
+		# decrypt stream and the other way round
+		send_crypt, recv_crypt = (crypt.decrypt, crypt.encrypt) if isinstance(crypt, GameHeaderCryptWotLK) else (crypt.encrypt, crypt.decrypt)
+
+		def send(opcode: int, payload: bytes) -> None:
+			writer.write(send_crypt(_SIZE.pack(len(payload) + 2) + _SERVER_OPCODE.pack(opcode)) + payload)
+
+		async def receive() -> Tuple[int, bytes]:
+			header = recv_crypt(await reader.readexactly(_CLIENT_HEADER_LENGTH))
+			body = await reader.readexactly(_SIZE.unpack(header[:2])[0] - 4)
+			return int.from_bytes(header[2:], "little"), body
+
+		loop = asyncio.get_running_loop()
+		outbox: asyncio.Queue[Tuple[float, int, bytes]] = asyncio.Queue()
+
+		async def deliver() -> None:
+			while True:
+				due, opcode, payload = await outbox.get()
+				if due > loop.time():
+					await asyncio.sleep(due - loop.time())
+				send(opcode, payload)
+				if opcode == p.SMSG_LOGIN_VERIFY_WORLD:
+					self._push = send
+					self.in_world += 1
+					self.entered.set()
+
+		def answer(opcode: int, payload: bytes) -> None:
+			outbox.put_nowait((loop.time() + self.latency, opcode, payload))
+
+		delivery = loop.create_task(deliver())
+		try:
+			await self._play(p, receive, answer)
+		finally:
+			delivery.cancel()
+			if self._push is send:
+				self._push = None
+
+	async def _play(self, p: ModuleType, receive: Callable[[], Awaitable[Tuple[int, bytes]]],
+			send: Callable[[int, bytes], None]) -> None:
+		"""From SMSG_AUTH_RESPONSE on; send() answers after the latency"""
+		send(p.SMSG_AUTH_RESPONSE, bytes((AuthResponseCodes.AUTH_OK,)) + bytes(9))
+		enumerated = False
+		while True:
+			opcode, body = await receive()
+			if opcode == p.CMSG_CHAR_ENUM:
+				enumerated = True
+				self.char_enums += 1
+				entries = [self._char_enum_entry(self.guid + 1 + i, f"Alt{i}") for i in range(self.other_characters)]
+				entries.append(self._char_enum_entry(self.guid, self._character))
+				send(p.SMSG_CHAR_ENUM, bytes((len(entries),)) + b"".join(entries))
+			elif opcode == p.CMSG_PLAYER_LOGIN:
+				if self.require_char_enum and not enumerated:
+					self.login_failures += 1
+					return
+				if struct.unpack('<Q', body[:8])[0] != self.guid:
+					self.login_failures += 1
+					send(p.SMSG_CHARACTER_LOGIN_FAILED, bytes((1,)))
+					continue
+				send(p.SMSG_LOGIN_VERIFY_WORLD, bytes(20))
+			elif opcode == p.CMSG_JOIN_CHANNEL:
+				# Before TBC the body starts with the name, after it with the
+				# channel id and two flags
+				offset = 0 if self.expansion == WowExpansion.Vanilla else 6
+				name = body[offset:body.index(b"\x00", offset)].decode()
+				self.joined_channels.append(name)
+				send(p.SMSG_CHANNEL_NOTIFY, bytes((ChatNotify.CHAT_YOU_JOINED_NOTICE,)) + name.encode() + b"\x00")
+			elif opcode == p.CMSG_NAME_QUERY:
+				self.name_queries += 1
+				if self.drop_name_queries:
+					self.drop_name_queries -= 1
+					continue
+				send(p.SMSG_NAME_QUERY, self._name_query(struct.unpack('<Q', body[:8])[0]))
+			elif opcode == p.CMSG_GUILD_QUERY and self.guild:
+				self.guild_queries += 1
+				ranks = b"".join(rank.encode() + b"\x00" for rank in ("Guild Master", "Officer", "Member"))
+				send(p.SMSG_GUILD_QUERY, struct.pack('<I', self.guild_id) + self.guild.encode() + b"\x00" + ranks + bytes(7) + bytes(20))
+			elif opcode == p.CMSG_GUILD_ROSTER and self.guild:
+				self.roster_requests += 1
+				send(p.SMSG_GUILD_ROSTER, self.guild_roster())
+			elif opcode == p.CMSG_MESSAGECHAT:
+				tp, language = struct.unpack_from('<II', body)
+				fields = body[8:].split(b"\x00")
+				target = fields.pop(0).decode() if tp in (p.ChatEvents.CHAT_MSG_WHISPER, p.ChatEvents.CHAT_MSG_CHANNEL) else None
+				self.chat.append((tp, language, target, fields[0].decode()))
+			elif opcode == p.CMSG_WHO:
+				self.who_queries += 1
+				now = asyncio.get_running_loop().time()
+				if now - self._last_who < self.who_throttle:
+					self.who_throttled += 1
+					continue
+				self._last_who = now
+				send(p.SMSG_WHO, self._who(body[8:body.index(b"\x00", 8)].decode().lower()))
+
+	def _char_enum_entry(self, guid: int, name: str) -> bytes:
+		guild_id = self.guild_id if guid == self.guid else 0
+		entry = struct.pack('<Q', guid) + name.encode() + b"\x00" + bytes((1,))
+		return entry + bytes(8 + 4 + 4 + 12) + struct.pack('<I', guild_id) + bytes(self._handler_class.CHAR_ENUM_TAIL_LENGTH)
+
+	def _name_query(self, guid: int) -> bytes:
+		name = self.players.get(guid)
+		if self.expansion != WowExpansion.WotLK:
+			# Vanilla and TBC have no "unknown" flag: an empty name
+			return struct.pack('<Q', guid) + (name or "").encode() + b"\x00\x00" + struct.pack('<III', 1, 0, 1)
+		mask = 0
+		packed = b""
+		for i in range(8):
+			byte = (guid >> (i * 8)) & 0xFF
+			if byte:
+				mask |= 1 << i
+				packed += bytes((byte,))
+		head = bytes((mask,)) + packed
+		if name is None:
+			return head + b"\x01"
+		return head + b"\x00" + name.encode() + b"\x00\x00" + bytes((1, 0, 1))
+
+	def _who(self, name: str) -> bytes:
+		"""SMSG_WHO listing the `players` whose name contains name"""
+		found = [player for player in self.players.values() if name in player.lower()]
+		entries = []
+		for player in found:
+			entry = player.encode() + b"\x00" + b"Stand-in Guild\x00" + struct.pack('<III', 70, 1, 1)
+			if self.expansion != WowExpansion.Vanilla:
+				entry += bytes(1)
+			entries.append(entry + struct.pack('<I', 12))
+		return struct.pack('<II', len(found), len(found)) + b"".join(entries)
+
+	def guild_roster(self) -> bytes:
+		"""SMSG_GUILD_ROSTER for the members as they are now"""
+		rank = bytes(self._handler_class.GUILD_RANK_LENGTH)
+		roster = [struct.pack('<I', self.guild_members), b"Welcome!\x00", b"\x00", struct.pack('<I', 3), rank * 3]
+		for i in range(self.guild_members):
+			online = i in self.guild_online
+			member = struct.pack('<Q?', 100 + i, online) + f"Member{i}".encode() + b"\x00" + struct.pack('<IBB', 2, 60, 1)
+			if self.expansion != WowExpansion.Vanilla:
+				member += bytes(1)
+			member += struct.pack('<I', 12)
+			if not online:
+				member += struct.pack('<f', 1.5)
+			roster.append(member + b"\x00\x00")
+		return b"".join(roster)
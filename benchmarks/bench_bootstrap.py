@@ -0,0 +1,117 @@
+"""Time from TCP connect to relay live, the bootstrap after entering the world.
+
+A GameConnector logs in to the stand-in world server with a character in a
+guild and four chat channels configured. The relay is live once every
+channel join, the guild name and the roster are answered. The bootstrap
+sends all of those requests in one flush and collects the answers as they
+come; the baseline sends each request only after the previous one was
+answered. Every answer arrives LATENCY after its request, the round trip to
+a remote server, so the difference is the round trips the baseline waits
+out one by one.
+
+Run from the repository root:
+
+	python -m benchmarks.bench_bootstrap
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import types
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple
+
+from benchmarks._auth_server import StandInAuthServer
+from benchmarks._world_server import StandInWorldServer
+from benchmarks.bench_realm_framer import make_conf
+from wowchat.common.config import WowExpansion
+from wowchat.common.global_state import Global
+from wowchat.common.metrics import metrics
+from wowchat.common.state_store import StateStore
+from wowchat.game.connector import GameConnector
+from wowchat.game.handler import GamePacketHandler
+
+ROUNDS = 20
+# Seconds per round trip to the stand-in world server
+LATENCY = 0.01
+CHANNELS = ("General", "Trade", "LookingForGroup", "wowchat")
+GUILD_MEMBERS = 200
+
+
+def _sequential_bootstrap(self: GamePacketHandler) -> None:
+	"""The same requests, each sent once the one before was answered"""
+	p = self.packets
+	requests: List[Tuple[str, int, object]] = [
+		(name.lower(), p.CMSG_JOIN_CHANNEL, self._build_join_channel(channel_id, name.encode('utf-8')))
+		for channel_id, name in self._configured_channels()
+	]
+	if self._guild_guid:
+		requests.append(("guild query", p.CMSG_GUILD_QUERY, self._build_guild_query()))
+		requests.append(("guild roster", p.CMSG_GUILD_ROSTER, self._build_guild_roster()))
+
+	async def run() -> None:
+		loop = asyncio.get_running_loop()
+		for key, opcode, payload in requests:
+			answered = self._bootstrap_pending[key] = loop.create_future()
+			self._connector.send_packet(opcode, payload)  # type: ignore[arg-type]
+			await answered
+		self._connector.relay_live()
+
+	self._bootstrap_task = asyncio.get_running_loop().create_task(run())
+
+
+@contextmanager
+def sequential() -> Iterator[None]:
+	pipelined = GamePacketHandler._start_bootstrap
+	GamePacketHandler._start_bootstrap = _sequential_bootstrap  # type: ignore[method-assign]
+	try:
+		yield
+	finally:
+		GamePacketHandler._start_bootstrap = pipelined  # type: ignore[method-assign]
+
+
+async def relay_live(expansion: str) -> float:
+	"""Mean seconds from TCP connect to relay live"""
+	auth = StandInAuthServer(expansion, [])
+	world = StandInWorldServer(expansion, auth, latency=LATENCY, guild="Stand-in Guild", guild_members=GUILD_MEMBERS)
+	port = await world.start()
+	conf = make_conf(expansion, 0, "stand-in")
+	conf.channels = [types.SimpleNamespace(wow=types.SimpleNamespace(id=None, channel=name)) for name in CHANNELS]
+	Global.config = conf  # type: ignore[assignment]
+	Global.state = StateStore()
+	session_key = os.urandom(40)
+	auth.sessions[conf.wow.account] = session_key
+	metrics.reset()
+	try:
+		for i in range(ROUNDS):
+			connector = GameConnector("127.0.0.1", port, "Stand-in", 1, session_key)
+			session = asyncio.get_running_loop().create_task(connector.connect())
+			await asyncio.wait_for(connector.live.wait(), 5)
+			handler = connector._handler
+			assert handler.guild_info is not None and handler.guild_info.name == "Stand-in Guild"
+			assert len(handler.guild_roster) == GUILD_MEMBERS
+			world.drop()
+			await session
+		assert sorted(world.joined_channels) == sorted(CHANNELS * ROUNDS)
+		assert world.guild_queries == world.roster_requests == ROUNDS
+		timing = metrics.timing("game.relay_live")
+		assert timing is not None and timing.count == ROUNDS
+		return timing.average
+	finally:
+		await world.close()
+
+
+def main() -> None:
+	logging.disable(logging.CRITICAL)
+	for expansion in (WowExpansion.Vanilla, WowExpansion.TBC, WowExpansion.WotLK):
+		with sequential():
+			before = asyncio.run(relay_live(expansion))
+		after = asyncio.run(relay_live(expansion))
+		assert after < before, (expansion, after, before)
+		name = f"{expansion}, {len(CHANNELS)} channels + guild, {LATENCY * 1000:.0f} ms RTT"
+		print(f"{name:<44} connect to relay live {before * 1000:>7.1f} ms one by one  {after * 1000:>7.1f} ms pipelined")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,117 @@
+"""Custom emojis in WoW chat: EmojiIndex against rebuilding the map per message.
+
+The client is in guilds with EMOJIS custom emojis between them. The chat
+is LINES lines of guild chat: most with no emoji, some with a time or a
+ratio written with colons, some with one or two :emoji: in any case, and
+the short ones repeated, as "gz" and ":pepelaugh:" are. The baseline is
+resolve_emojis as it was: the name to id map built from client.emojis
+for every message, and every span between two colons tried as a name.
+Reported in messages per second:
+
+- rebuilding the map, every span between colons
+- EmojiIndex, every message resolved afresh (no cache)
+- EmojiIndex with its cache
+
+Also checked: every :name: of an emoji comes out as <:name:id> with its
+colons replaced, including one whose opening colon closes a word that
+is not an emoji, 12:30:45 and the like are left alone, and a message
+without an emoji is returned as it is.
+
+Run from the repository root:
+
+	python -m benchmarks.bench_emojis
+"""
+from __future__ import annotations
+
+import random
+import re
+from types import SimpleNamespace
+from typing import List
+
+from benchmarks._util import measure, report
+from wowchat.discord.message_resolver import EmojiIndex
+
+EMOJIS = 500
+LINES = 50_000
+
+_OLD_EMOJI = re.compile(r"(?<=:).*?(?=:)")
+
+
+def old_resolve_emojis(client: SimpleNamespace, message: str) -> str:
+	"""MessageResolver.resolve_emojis as it was"""
+	emoji_map = {e.name.lower(): e.id for e in getattr(client, 'emojis', [])}
+	seen = set()
+	def repl(m):
+		name = m.group(0).lower()
+		if name in seen:
+			return m.group(0)
+		seen.add(name)
+		if name in emoji_map:
+			return f"<:{m.group(0)}:{emoji_map[name]}>"
+		return m.group(0)
+	return _OLD_EMOJI.sub(repl, message)
+
+
+def corpus(names: List[str], seed: int = 1) -> List[str]:
+	rng = random.Random(seed)
+	plain = ["gz", "ty", "lol", "inv pls", "anyone up for heroics?", "brb", "need 2 more for kara", "nice drop!"]
+	lines = []
+	for _ in range(LINES):
+		roll = rng.random()
+		if roll < 0.6:
+			lines.append(rng.choice(plain) if rng.random() < 0.5 else f"{rng.choice(plain)} {rng.randrange(1000)}")
+		elif roll < 0.75:
+			lines.append(rng.choice([
+				f"raid at {rng.randrange(24)}:{rng.randrange(60):02}:00 server time",
+				f"{rng.randrange(24)}:{rng.randrange(60):02} invites, ratio 2:1 tanks",
+				"note: bring flasks: and food",
+			]))
+		else:
+			emoji = rng.choice(names)
+			emoji = emoji.upper() if rng.random() < 0.1 else emoji
+			lines.append(rng.choice([f":{emoji}:", f"gz :{emoji}:", f":{emoji}: :{rng.choice(names)}: what a run"]))
+	return lines
+
+
+def main() -> None:
+	rng = random.Random(2)
+	names = [f"pepe{i}" if i % 3 else f"wow_{i}_lol" for i in range(EMOJIS)]
+	client = SimpleNamespace(emojis=[SimpleNamespace(name=n, id=10_000 + i) for i, n in enumerate(names)])
+	ids = {e.name: e.id for e in client.emojis}
+	lines = corpus(names)
+	cold = EmojiIndex(client.emojis, cache_size=0)
+	cached = EmojiIndex(client.emojis)
+
+	assert cached.resolve(":pepe1: and :PEPE1:") == "<:pepe1:10001> and <:PEPE1:10001>"
+	assert cached.resolve("raid at 12:30:45, ratio 2:1") == "raid at 12:30:45, ratio 2:1"
+	assert cached.resolve(":nope: :pepe2:pepe4:") == ":nope: <:pepe2:10002>pepe4:"
+	assert cached.resolve("a:nope:pepe1:") == "a:nope<:pepe1:10001>"
+	assert cached.resolve("12:30:pepe1: :pepe1::pepe2:") == "12:30<:pepe1:10001> <:pepe1:10001><:pepe2:10002>"
+	assert EmojiIndex().resolve(":pepe1:") == ":pepe1:"
+	for line in lines:
+		resolved = cached.resolve(line)
+		assert resolved == cold.resolve(line), line
+		if ":" not in line:
+			assert resolved is line, line
+		for name in re.findall(r"<:(\w+):(\d+)>", resolved):
+			assert ids[name[0].lower()] == int(name[1]), line
+		assert re.search(r":(?:pepe\d+|wow_\d+_lol):", re.sub(r"<:\w+:\d+>", "", resolved), re.I) is None, line
+
+	def rebuilding() -> None:
+		for line in lines:
+			old_resolve_emojis(client, line)
+
+	def indexed(index: EmojiIndex) -> None:
+		resolve = index.resolve
+		for line in lines:
+			resolve(line)
+
+	before, fresh = measure(rebuilding), measure(lambda: indexed(cold))
+	report(f"{EMOJIS} emojis, map per message", LINES, before, "msgs")
+	report(f"{EMOJIS} emojis, EmojiIndex", LINES, fresh, "msgs")
+	report(f"{EMOJIS} emojis, EmojiIndex + cache", LINES, measure(lambda: indexed(cached)), "msgs")
+	assert fresh < before
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,137 @@
+"""WoW chat mirrored to several Discord channels: rendering once per group.
+
+World chat goes to MIRRORS Discord channels, for MIRRORS from 1 to 16.
+Every fourth channel shows the WoW channel name in its format, so the
+targets form two groups from four channels on, and one of the channels
+only a role can read. The global spam filters apply. The messages are
+WotLK trade chat with links, some of it tagging a member of a guild of
+MEMBERS. The baseline is the pipeline run for each target as written
+before: links, colors and emojis resolved, tags resolved, escaped,
+formatted and filtered. Reported per MIRRORS in messages per second,
+each message sent to every channel.
+
+Every channel must get the same text, filter decision and tag errors
+either way.
+
+Run from the repository root:
+
+	python -m benchmarks.bench_fanout
+"""
+from __future__ import annotations
+
+import random
+from types import SimpleNamespace
+from typing import List, Optional, Tuple
+
+from benchmarks._util import measure, report
+from benchmarks.bench_filters import PATTERNS
+from benchmarks.bench_message_resolver import corpus as trade_chat
+from benchmarks.bench_tags import Guild, Member, Role, TextChannel, name
+from wowchat.common.config import ChannelConfig, DiscordChannelConfig, FiltersConfig, GuildConfig, WowChannelConfig, WowExpansion
+from wowchat.common.format_template import DISCORD_FIELDS, FormatTemplate
+from wowchat.common.routing import ChatDirection, RoutingIndex
+from wowchat.discord.message_resolver import EmojiIndex, MessageResolver
+from wowchat.discord.relay import Delivery, deliveries, escape_markdown
+from wowchat.game.dispatch import load_expansion
+
+MIRRORS = (1, 2, 4, 8, 16)
+MEMBERS = 500
+LINES = 2_000
+
+
+class NamedChannel(TextChannel):
+	def __init__(self, name: str, id: int, guild: Guild, readers: Optional[Role] = None) -> None:
+		super().__init__(guild, readers)
+		self.name = name
+		self.id = id
+
+
+def make_routes(mirrors: int, guild: Guild) -> Tuple[RoutingIndex, int]:
+	channel_type = load_expansion(WowExpansion.WotLK)[0].packets.ChatEvents.CHAT_MSG_CHANNEL
+	readers = guild.roles[1]
+	channels = [NamedChannel(f"world-{i}", 1000 + i, guild, readers if i == 1 else None) for i in range(mirrors)]
+	conf = SimpleNamespace(
+		channels=[
+			ChannelConfig(ChatDirection.wow_to_discord,
+				WowChannelConfig(None, channel_type, "World", FormatTemplate(""), None),
+				DiscordChannelConfig(channel.name, FormatTemplate(
+					"[%target] [%user]: %message" if i % 4 == 3 else "[%user]: %message", DISCORD_FIELDS,
+				), None))
+			for i, channel in enumerate(channels)
+		],
+		filters=FiltersConfig(True, PATTERNS),
+		guildConfig=GuildConfig({}),
+		expansion=WowExpansion.WotLK,
+	)
+	return RoutingIndex.build(conf, channels), channel_type  # type: ignore[arg-type]
+
+
+def per_target(
+	resolver: MessageResolver, routes: RoutingIndex, tp: int, from_name: Optional[str], message: str,
+) -> List[Delivery]:
+	"""send_message_from_wow with every step run for each target"""
+	out = []
+	for target in routes.discord_targets(tp, "World"):
+		parsed = resolver.resolve_emojis(resolver.render(message))
+		errors: List[str] = []
+		resolved = resolver.resolve_tags(target.channel, parsed, errors.append)  # type: ignore[arg-type]
+		formatted = target.format.render(user=from_name or "", message=escape_markdown(resolved), target="World")
+		out.append(Delivery(target.channel, formatted, target.filtered(formatted), tuple(errors)))
+	return out
+
+
+def main() -> None:
+	rng = random.Random(1)
+	guild = Guild()
+	guild.roles.append(Role(500, "Raider"))
+	for i in range(MEMBERS):
+		member = Member(100_000 + i, name(rng), guild)
+		member.roles = [guild.roles[1]] if i % 3 == 0 else []
+		guild._members[member.id] = member
+	members = guild.members
+	client = SimpleNamespace(
+		user=SimpleNamespace(id=1),
+		emoji_index=EmojiIndex([SimpleNamespace(name="pepelaugh", id=77)]),
+	)
+	resolver = MessageResolver(client, WowExpansion.WotLK)  # type: ignore[arg-type]
+	lines = []
+	for line in trade_chat(WowExpansion.WotLK)[:LINES]:
+		roll = rng.random()
+		if roll < 0.1:
+			line = f"@{rng.choice(members).display_name.split()[0]} {line}"
+		elif roll < 0.15:
+			line += " :pepelaugh:"
+		lines.append((rng.choice(["Alice", "Brannor", "Cedric"]), line))
+
+	for mirrors in MIRRORS:
+		routes, tp = make_routes(mirrors, guild)
+		groups = routes.discord_groups(tp, "World")
+		assert len(groups) == (1 if mirrors < 4 else 2)
+		assert sum(len(group.channels) for group in groups) == mirrors
+
+		def key(delivery: Delivery) -> Tuple[str, str, bool, Tuple[str, ...]]:
+			return delivery.channel.name, delivery.text, delivery.filtered, delivery.errors
+
+		for from_name, line in lines:
+			old = sorted(map(key, per_target(resolver, routes, tp, from_name, line)))
+			new = sorted(map(key, deliveries(resolver, groups, from_name, line, "World")))
+			assert old == new, line
+
+		def each_target() -> None:
+			for from_name, line in lines:
+				per_target(resolver, routes, tp, from_name, line)
+
+		def once_per_group() -> None:
+			groups = routes.discord_groups(tp, "World")
+			for from_name, line in lines:
+				deliveries(resolver, groups, from_name, line, "World")
+
+		before, after = measure(each_target), measure(once_per_group)
+		report(f"{mirrors:>2} mirrored channels, per target", LINES, before, "msgs")
+		report(f"{mirrors:>2} mirrored channels, once per group", LINES, after, "msgs")
+		if mirrors >= 4:
+			assert after < before
+
+
+if __name__ == "__main__":
+	main()
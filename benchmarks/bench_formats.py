@@ -0,0 +1,125 @@
+"""Message formats: FormatTemplate against a replace per placeholder.
+
+The formats are those of the sample wowchat.conf, channel and guild
+notification formats both, rendered for LINES messages of chat. The
+baseline is the Scala way: the format string run through a replace for
+each placeholder, with %time from strftime on every message. Reported in
+messages per second:
+
+- %time alone: strftime against WallClock
+- whole formats: the replace chain against FormatTemplate.render
+
+Also checked: both give the same text, a value that holds a placeholder
+goes in as it is, WallClock formats a new second and only that, and a
+placeholder the format kind does not have fails when compiling.
+
+Run from the repository root:
+
+	python -m benchmarks.bench_formats
+"""
+from __future__ import annotations
+
+import datetime as _dt
+import random
+from typing import List, Tuple
+
+from benchmarks._util import measure, report
+from wowchat.common.format_template import (
+	DISCORD_FIELDS, GUILD_FIELDS, WOW_FIELDS, FormatTemplate, WallClock, clock,
+)
+
+LINES = 200_000
+
+FORMATS = [
+	("[%user]: %message", DISCORD_FIELDS),
+	("[%target] [%user]: %message", DISCORD_FIELDS),
+	("%user %message", DISCORD_FIELDS),
+	("[SYSTEM]: %message", DISCORD_FIELDS),
+	("[%time] [%user]: %message", DISCORD_FIELDS),
+	("%user: %message", WOW_FIELDS),
+	("`[%user] has come online.`", GUILD_FIELDS),
+	("`[%user] has promoted [%target] to [%rank].`", GUILD_FIELDS),
+	("`Guild Message of the Day: %message`", GUILD_FIELDS),
+	("%user has earned the achievement %achievement!", GUILD_FIELDS),
+]
+
+
+def get_time() -> str:
+	"""Global.get_time as it was"""
+	return _dt.datetime.now().strftime("%H:%M:%S")
+
+
+def replace_chain(fmt: str, user: str, message: str, target: str, rank: str) -> str:
+	return (
+		fmt
+		.replace("%time", get_time())
+		.replace("%user", user)
+		.replace("%message", message)
+		.replace("%target", target)
+		.replace("%rank", rank)
+		.replace("%achievement", "")
+	)
+
+
+def corpus(seed: int = 1) -> List[Tuple[int, str, str, str, str]]:
+	rng = random.Random(seed)
+	names = ["Alice", "Brannor", "Cedric", "Dagny"]
+	texts = ["LF2M heroic, need heals", "WTS [Arcanite Bar] 20g", "gz!", "anyone up for a dungeon?"]
+	return [
+		(rng.randrange(len(FORMATS)), rng.choice(names), rng.choice(texts), rng.choice(["World", "Trade"]), "Officer")
+		for _ in range(LINES)
+	]
+
+
+def main() -> None:
+	templates = [FormatTemplate(fmt, fields) for fmt, fields in FORMATS]
+	lines = corpus()
+
+	for i, user, message, target, rank in lines[:1000]:
+		expected = replace_chain(FORMATS[i][0], user, message, target, rank)
+		assert templates[i].render(user=user, message=message, target=target, rank=rank) == expected
+	assert templates[1].render(user="Alice", message="say %target", target="World") == "[World] [Alice]: say %target"
+	assert FormatTemplate("%username, 100% off", DISCORD_FIELDS).render(user="Al") == "Alname, 100% off"
+	for fmt, fields in (("[%rank] %user", DISCORD_FIELDS), ("%target: %message", WOW_FIELDS), ("%User", GUILD_FIELDS)):
+		try:
+			FormatTemplate(fmt, fields)
+		except ValueError:
+			continue
+		raise AssertionError(fmt)
+
+	now = [100.25]
+	fake = WallClock(lambda: now[0])
+	first = fake()
+	now[0] = 100.75
+	assert fake() is first
+	now[0] = 101.0
+	assert fake() != first
+
+	def strftime_each() -> None:
+		for _ in range(LINES):
+			get_time()
+
+	def wall_clock() -> None:
+		for _ in range(LINES):
+			clock()
+
+	def chained() -> None:
+		for i, user, message, target, rank in lines:
+			replace_chain(FORMATS[i][0], user, message, target, rank)
+
+	def compiled() -> None:
+		for i, user, message, target, rank in lines:
+			templates[i].render(user=user, message=message, target=target, rank=rank)
+
+	before, after = measure(strftime_each), measure(wall_clock)
+	report("%time, strftime per message", LINES, before, "msgs")
+	report("%time, WallClock", LINES, after, "msgs")
+	assert after < before
+	before, after = measure(chained), measure(compiled)
+	report(f"{len(FORMATS)} formats, replace per placeholder", LINES, before, "msgs")
+	report(f"{len(FORMATS)} formats, FormatTemplate", LINES, after, "msgs")
+	assert after < before
+
+
+if __name__ == "__main__":
+	main()
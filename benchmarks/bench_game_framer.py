@@ -0,0 +1,156 @@
+"""Throughput of the world packet framer against the old readexactly loop.
+
+Also checked: a header whose size field is below 2 closes the connection
+with GameProtocolError, after the frames before it and none after.
+
+Run from the repository root:
+
+	python -m benchmarks.bench_game_framer
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import struct
+from typing import FrozenSet, List, Optional
+
+from benchmarks._util import measure, report
+from wowchat.game.framer import GamePacketFramer, GamePacketFramerWotLK, GameProtocolError
+from wowchat.game.header_crypt import GameHeaderCrypt
+from wowchat.game.header_crypt_wotlk import GameHeaderCryptWotLK
+
+SESSION_KEY = bytes(range(40))
+PACKETS = 100_000
+CHUNK = 64 * 1024
+
+
+def build_stream(count: int, seed: int = 1) -> bytes:
+	"""Encrypted SMSG stream with a mix of small, medium and rare >0x7FFF packets."""
+	rnd = random.Random(seed)
+	server = GameHeaderCryptWotLK()
+	server.init(SESSION_KEY)
+	out = bytearray()
+	for _ in range(count):
+		roll = rnd.random()
+		if roll < 0.70:
+			size = rnd.randint(8, 64)
+		elif roll < 0.999:
+			size = rnd.randint(64, 2048)
+		else:
+			size = rnd.randint(0x8000, 0x10000)
+		opcode = rnd.randint(0, 0x0500)
+		if size + 2 > 0x7FFF:
+			header = struct.pack(">BH", 0x80 | ((size + 2) >> 16), (size + 2) & 0xFFFF) + struct.pack("<H", opcode)
+		else:
+			header = struct.pack(">H", size + 2) + struct.pack("<H", opcode)
+		out += server.decrypt(header)
+		out += bytes(size)
+	return bytes(out)
+
+
+def _client_crypt() -> GameHeaderCryptWotLK:
+	crypt = GameHeaderCryptWotLK()
+	crypt.init(SESSION_KEY)
+	return crypt
+
+
+def run_legacy(stream: bytes, count: int) -> int:
+	"""The pre-framer GameConnector._game_loop read path, minus logging."""
+
+	async def loop() -> int:
+		reader = asyncio.StreamReader(limit=2 ** 24)
+		for i in range(0, len(stream), CHUNK):
+			reader.feed_data(stream[i:i + CHUNK])
+		reader.feed_eof()
+		crypt = _client_crypt()
+		seen = 0
+		while seen < count:
+			header = await reader.readexactly(4)
+			header = crypt.decrypt(header)
+			if (header[0] & 0x80) == 0x80:
+				extra_byte = crypt.decrypt(await reader.readexactly(1))
+				size = (((header[0] & 0x7F) << 16) | ((header[1] & 0xFF) << 8) | (header[2] & 0xFF)) - 2
+				packet_id = ((extra_byte[0] & 0xFF) << 8) | (header[3] & 0xFF)
+			else:
+				size = ((header[0] & 0xFF) << 8 | header[1] & 0xFF) - 2
+				packet_id = (header[3] & 0xFF) << 8 | header[2] & 0xFF
+			data = await reader.readexactly(size) if size > 0 else b''
+			seen += 1
+		return seen
+
+	return asyncio.run(loop())
+
+
+def run_framer(stream: bytes, count: int, interesting: Optional[FrozenSet[int]] = None) -> int:
+	"""Feed the same stream through GamePacketFramerWotLK as a transport would."""
+	seen: List[int] = [0]
+
+	def frame_received(opcode: int, payload: memoryview) -> None:
+		bytes(payload)  # what GameConnector does for every dispatched frame
+		seen[0] += 1
+
+	framer = GamePacketFramerWotLK(_client_crypt(), frame_received, interesting_opcodes=interesting)
+	view = memoryview(stream)
+	pos = 0
+	while pos < len(stream):
+		buf = framer.get_buffer(-1)
+		n = min(len(buf), CHUNK, len(stream) - pos)
+		buf[:n] = view[pos:pos + n]
+		pos += n
+		framer.buffer_updated(n)
+	assert seen[0] + framer.discarded_packets == count, (seen[0], framer.discarded_packets, count)
+	return seen[0]
+
+
+class Transport:
+	"""Closes as asyncio does: connection_lost(None) on the protocol"""
+
+	def __init__(self, framer: GamePacketFramer) -> None:
+		self.framer = framer
+		self.closed = False
+
+	def close(self) -> None:
+		if not self.closed:
+			self.closed = True
+			self.framer.connection_lost(None)
+
+
+def check_bad_size() -> None:
+	# Vanilla headers go through encrypt as the server sends them; the WotLK
+	# keys differ per direction, and RC4 decrypt is its own inverse
+	cases = ((GamePacketFramer, GameHeaderCrypt, "encrypt"), (GamePacketFramerWotLK, GameHeaderCryptWotLK, "decrypt"))
+	for framer_class, crypt_class, seal in cases:
+		for size_field in (0, 1):
+			server, client = crypt_class(), crypt_class()
+			server.init(SESSION_KEY)
+			client.init(SESSION_KEY)
+			stream = bytearray()
+			for field, body in ((5, b"abc"), (size_field, b""), (5, b"xyz")):
+				stream += getattr(server, seal)(struct.pack(">H", field) + struct.pack("<H", 0x42)) + body
+			frames: List[bytes] = []
+			lost: List[Optional[Exception]] = []
+			framer = framer_class(client, lambda opcode, payload: frames.append(bytes(payload)), lost.append)
+			transport = Transport(framer)
+			framer.transport = transport  # type: ignore[assignment]
+			buf = framer.get_buffer(-1)
+			buf[:len(stream)] = stream
+			framer.buffer_updated(len(stream))
+			assert frames == [b"abc"], (framer_class.__name__, size_field, frames)
+			assert transport.closed and len(lost) == 1 and isinstance(lost[0], GameProtocolError), lost
+
+
+def main() -> None:
+	logging.disable(logging.CRITICAL)
+	check_bad_size()
+	stream = build_stream(PACKETS)
+	print(f"{PACKETS:,} packets, {len(stream) / 1e6:.1f} MB")
+	report("legacy readexactly loop", PACKETS, measure(lambda: run_legacy(stream, PACKETS)), "packets")
+	report("GamePacketFramerWotLK", PACKETS, measure(lambda: run_framer(stream, PACKETS)), "packets")
+	# Roughly what a logged-in bot handles: a handful of opcodes out of ~0x500
+	interesting = frozenset((0x3B, 0x51, 0x55, 0x63, 0x8A, 0x92, 0x96, 0x99, 0x01EC, 0x01EE, 0x0236))
+	report("GamePacketFramerWotLK, unhandled discarded", PACKETS, measure(lambda: run_framer(stream, PACKETS, interesting)), "packets")
+
+
+if __name__ == "__main__":
+	main()
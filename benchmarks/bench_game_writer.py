@@ -0,0 +1,116 @@
+"""Outbound packet throughput: write + drain per packet vs GamePacketWriter.
+
+Each scenario pushes the same chat-sized CMSGs through a real loopback
+socket with WotLK header encryption. The clock stops when the stand-in
+server has read every byte.
+
+Run from the repository root:
+
+	python -m benchmarks.bench_game_writer
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Tuple
+
+from benchmarks._util import report
+from wowchat.game.framer import GamePacketFramerWotLK
+from wowchat.game.header_crypt_wotlk import GameHeaderCryptWotLK
+from wowchat.game.writer import GamePacketWriter
+
+SESSION_KEY = bytes(range(40))
+PACKETS = 50_000
+PRODUCERS = 50
+CMSG_MESSAGECHAT = 0x95
+PAYLOAD = bytes(4 + 4) + b"[Guild] Somebody: lorem ipsum dolor sit amet\x00"
+# 6-byte client header + body
+WIRE_SIZE = PACKETS * (6 + len(PAYLOAD))
+
+Scenario = Callable[[GamePacketFramerWotLK], Awaitable[None]]
+
+
+async def _sink(expected: int) -> Tuple[asyncio.AbstractServer, int, asyncio.Future]:
+	"""Loopback server that reads and discards until `expected` bytes arrive."""
+	done = asyncio.get_running_loop().create_future()
+
+	async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+		received = 0
+		while received < expected:
+			chunk = await reader.read(1 << 16)
+			if not chunk:
+				break
+			received += len(chunk)
+		done.set_result(received)
+		writer.close()
+
+	server = await asyncio.start_server(handle, "127.0.0.1", 0)
+	return server, server.sockets[0].getsockname()[1], done
+
+
+async def _run(scenario: Scenario) -> float:
+	server, port, done = await _sink(WIRE_SIZE)
+	crypt = GameHeaderCryptWotLK()
+	crypt.init(SESSION_KEY)
+	loop = asyncio.get_running_loop()
+	_, framer = await loop.create_connection(
+		lambda: GamePacketFramerWotLK(crypt, lambda opcode, payload: None), "127.0.0.1", port,
+	)
+	start = time.perf_counter()
+	await scenario(framer)
+	received = await done
+	elapsed = time.perf_counter() - start
+	assert received == WIRE_SIZE, (received, WIRE_SIZE)
+	framer.transport.close()
+	server.close()
+	await server.wait_closed()
+	return elapsed
+
+
+async def legacy(framer: GamePacketFramerWotLK) -> None:
+	"""What every sender did before: header + body, write, await drain."""
+	for _ in range(PACKETS):
+		framer.transport.write(framer.encode_header(CMSG_MESSAGECHAT, len(PAYLOAD)) + PAYLOAD)
+		await framer.drain()
+
+
+async def fire_and_forget(framer: GamePacketFramerWotLK) -> None:
+	writer = GamePacketWriter(framer, lambda opcode: False)
+	writer.start()
+	for i in range(PACKETS):
+		writer.send(CMSG_MESSAGECHAT, PAYLOAD)
+		if i % 1000 == 999:
+			# Give the writer task a turn, as a real event loop would
+			await asyncio.sleep(0)
+	await writer.close()
+
+
+async def awaited_producers(framer: GamePacketFramerWotLK) -> None:
+	"""PRODUCERS concurrent tasks, each awaiting delivery of every packet."""
+	writer = GamePacketWriter(framer, lambda opcode: False)
+	writer.start()
+
+	async def produce(count: int) -> None:
+		for _ in range(count):
+			await writer.send_and_wait(CMSG_MESSAGECHAT, PAYLOAD)
+
+	await asyncio.gather(*(produce(PACKETS // PRODUCERS) for _ in range(PRODUCERS)))
+	await writer.close()
+
+
+def main() -> None:
+	logging.disable(logging.CRITICAL)
+	assert PACKETS % PRODUCERS == 0
+	print(f"{PACKETS:,} packets of {len(PAYLOAD)} bytes")
+	for name, scenario in (
+		("write + drain per packet", legacy),
+		("GamePacketWriter, fire and forget", fire_and_forget),
+		(f"GamePacketWriter, {PRODUCERS} awaiting producers", awaited_producers),
+	):
+		best = min(asyncio.run(_run(scenario)) for _ in range(3))
+		report(name, PACKETS, best, "packets")
+
+
+if __name__ == "__main__":
+	main()
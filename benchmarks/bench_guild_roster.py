@@ -0,0 +1,207 @@
+"""Guild roster upkeep for a big guild over an hour of sign-ons and sign-offs.
+
+A guild of MEMBERS members has one of them sign on or off every
+EVENT_SPACING seconds, and the server pushes each as SMSG_GUILD_EVENT. The
+baseline is the Scala handler: it requests and parses the whole
+SMSG_GUILD_ROSTER every minute and again after every guild event, and
+replaces the roster with what it parsed. GuildRoster applies the pushes
+directly, polls on its adaptive interval and applies each roster as a
+diff. The hour runs on a simulated clock; the time reported is the CPU
+spent on rosters. Also checked:
+
+- with pushes keeping it current the polls find nothing new and back off
+  to MAX_POLL_INTERVAL
+- without pushes every poll emits exactly the members that changed, and
+  the interval stays at POLL_INTERVAL
+- in the world on the stand-in server, a pushed GE_SIGNED_ON shows up in
+  ?online at once, without another CMSG_GUILD_ROSTER
+
+Run from the repository root:
+
+	python -m benchmarks.bench_guild_roster
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Dict, List, Set, Tuple
+
+from benchmarks._auth_server import StandInAuthServer
+from benchmarks._world_server import StandInWorldServer
+from benchmarks.bench_realm_framer import make_conf
+from wowchat.common.config import WowExpansion
+from wowchat.common.global_state import Global
+from wowchat.common.packet import ByteReader
+from wowchat.common.state_store import StateStore
+from wowchat.game.connector import GameConnector
+from wowchat.game.dispatch import load_expansion
+from wowchat.game.guild_roster import GuildMember, GuildRoster
+from wowchat.game.handler import GamePacketHandler
+
+MEMBERS = 900
+HOUR = 3600.0
+# Seconds between sign-ons and sign-offs across the guild
+EVENT_SPACING = 30.0
+# Seconds between roster requests in the Scala handler
+SCALA_INTERVAL = 60.0
+LATENCY = 0.005
+
+
+def schedule(seed: int = 1) -> List[Tuple[float, int]]:
+	"""(time, member index) of the members that sign on or off in the hour"""
+	rng = random.Random(seed)
+	return [(t * EVENT_SPACING, rng.randrange(MEMBERS)) for t in range(1, int(HOUR / EVENT_SPACING))]
+
+
+class Guild:
+	"""The server side: who is online, and the roster packet for it"""
+
+	def __init__(self, expansion: str) -> None:
+		self.world = StandInWorldServer(expansion, StandInAuthServer(expansion, []), guild="Stand-in Guild", guild_members=MEMBERS)
+		self.online: Set[int] = self.world.guild_online
+
+	def toggle(self, index: int) -> bool:
+		"""Sign the member on or off; whether they are online now"""
+		if index in self.online:
+			self.online.discard(index)
+			return False
+		self.online.add(index)
+		return True
+
+
+def parser(expansion: str) -> GamePacketHandler:
+	handler_class, _ = load_expansion(expansion)
+	return handler_class(None, 1, "Stand-in", b"")  # type: ignore[arg-type]
+
+
+def scala_hour(expansion: str) -> Tuple[int, float]:
+	"""Roster requests and seconds spent parsing them, the Scala way"""
+	guild, handler = Guild(expansion), parser(expansion)
+	roster: Dict[int, GuildMember] = {}
+	requests, spent = 0, 0.0
+
+	def refresh() -> None:
+		nonlocal roster, requests, spent
+		packet = guild.world.guild_roster()
+		start = time.perf_counter()
+		roster = handler._parse_guild_roster(ByteReader(packet))
+		spent += time.perf_counter() - start
+		requests += 1
+
+	refresh()
+	next_poll = SCALA_INTERVAL
+	for at, index in schedule():
+		while next_poll <= at:
+			refresh()
+			next_poll += SCALA_INTERVAL
+		guild.toggle(index)
+		# handleGuildEvent ends with updateGuildRoster
+		refresh()
+	while next_poll < HOUR:
+		refresh()
+		next_poll += SCALA_INTERVAL
+	assert len(roster) == MEMBERS
+	return requests, spent
+
+
+def roster_hour(expansion: str, pushes: bool) -> Tuple[int, float, GuildRoster]:
+	"""Roster requests and seconds spent on them with GuildRoster"""
+	guild, handler = Guild(expansion), parser(expansion)
+	store = GuildRoster()
+	requests, spent = 0, 0.0
+	# Members that changed since the last poll, as the server saw them
+	changed: Dict[int, bool] = {}
+
+	def poll() -> None:
+		nonlocal requests, spent
+		packet = guild.world.guild_roster()
+		start = time.perf_counter()
+		events = store.apply(handler._parse_guild_roster(ByteReader(packet)).values())
+		spent += time.perf_counter() - start
+		requests += 1
+		if pushes:
+			assert not events, events
+		else:
+			# Members that went back to how they were show no change
+			expected = {100 + i: online for i, online in changed.items() if online != (i in before)}
+			assert {e.member.guid: e.kind == "online" for e in events} == expected
+		changed.clear()
+		before.clear()
+		before.update(guild.online)
+
+	before: Set[int] = set()
+	poll()
+	next_poll = store.poll_interval
+	for at, index in schedule():
+		while next_poll <= at:
+			poll()
+			next_poll += store.poll_interval
+		online = guild.toggle(index)
+		changed[index] = online
+		if pushes:
+			name = f"Member{index}"
+			start = time.perf_counter()
+			assert store.signed_on(name) if online else store.signed_off(name)
+			spent += time.perf_counter() - start
+	while next_poll < HOUR:
+		poll()
+		next_poll += store.poll_interval
+	assert store.online_count == len(guild.online)
+	return requests, spent, store
+
+
+async def check_online(expansion: str) -> None:
+	"""A pushed sign-on is in ?online without another roster"""
+	p = load_expansion(expansion)[0].packets
+	auth = StandInAuthServer(expansion, [])
+	world = StandInWorldServer(expansion, auth, latency=LATENCY, guild="Stand-in Guild", guild_members=MEMBERS)
+	port = await world.start()
+	conf = make_conf(expansion, 0, "stand-in")
+	Global.config = conf  # type: ignore[assignment]
+	Global.state = StateStore()
+	session_key = os.urandom(40)
+	auth.sessions[conf.wow.account] = session_key
+	connector = GameConnector("127.0.0.1", port, "Stand-in", 1, session_key)
+	session = asyncio.get_running_loop().create_task(connector.connect())
+	try:
+		await asyncio.wait_for(connector.live.wait(), 5)
+		assert Global.game is connector._handler
+		before = Global.game.handle_who(None)
+		assert "Member1 " not in before and f"{len(world.guild_online)} guildies online" in before, before
+		world.guild_online.add(1)
+		world.push(p.SMSG_GUILD_EVENT, bytes((p.GuildEvents.GE_SIGNED_ON, 1)) + b"Member1\x00")
+		world.push(p.SMSG_GUILD_EVENT, bytes((p.GuildEvents.GE_SIGNED_OFF, 1)) + b"Member0\x00")
+		for _ in range(100):
+			if "Member1 " in Global.game.handle_who(None):
+				break
+			await asyncio.sleep(LATENCY)
+		after = Global.game.handle_who(None)
+		assert "Member1 (60 Warrior in Unknown Zone)" in after and "Member0 " not in after, after
+		assert world.roster_requests == 1
+	finally:
+		world.drop()
+		await session
+		await world.close()
+	assert Global.game is None
+
+
+def main() -> None:
+	logging.disable(logging.CRITICAL)
+	for expansion in (WowExpansion.Vanilla, WowExpansion.TBC, WowExpansion.WotLK):
+		asyncio.run(check_online(expansion))
+		scala_requests, scala_spent = scala_hour(expansion)
+		requests, spent, store = roster_hour(expansion, pushes=True)
+		assert store.poll_interval == GuildRoster.MAX_POLL_INTERVAL and store.missed == 0
+		assert requests < scala_requests
+		quiet_requests, _, quiet = roster_hour(expansion, pushes=False)
+		assert quiet.poll_interval == GuildRoster.POLL_INTERVAL and quiet.missed > 0
+		name = f"{expansion}, {MEMBERS} members, 1 h"
+		print(f"{name:<28} rosters {scala_requests:>4} ({scala_spent * 1000:>6.1f} ms) every minute + per event  "
+			f"{requests:>3} ({spent * 1000:>5.1f} ms) adaptive  {quiet_requests:>3} without pushes")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,111 @@
+"""LRUMap against the OrderedDict subclass it replaced.
+
+- hits: every key present, the map at its size limit
+- updates: existing keys stored again with the map full; the old class
+  ran its eviction loop on each and left the key where it was, so an
+  entry just written could be the next one evicted
+- inserts: new keys, one eviction each
+- TTL hits: the same hits with a TTL on every entry
+
+Run from the repository root:
+
+	python -m benchmarks.bench_lru_map
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Callable, Generic, TypeVar
+
+from benchmarks._util import measure, report
+from wowchat.common.lru_map import LRUMap
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+SIZE = 10_000
+OPS = 200_000
+
+
+class OldLRUMap(OrderedDict, Generic[K, V]):
+	"""LRUMap as it was"""
+
+	def __init__(self, max_size: int = 10000):
+		super().__init__()
+		self._max_size = max_size
+
+	def __getitem__(self, key: K) -> V:
+		value = super().__getitem__(key)
+		super().__delitem__(key)
+		super().__setitem__(key, value)
+		return value
+
+	def __setitem__(self, key: K, value: V) -> None:
+		while len(self) >= self._max_size:
+			super().popitem(last=False)
+		super().__setitem__(key, value)
+
+
+def filled(factory: Callable[[], dict]) -> dict:
+	cache = factory()
+	for i in range(SIZE):
+		cache[i] = i
+	return cache
+
+
+def hits(cache: dict) -> Callable[[], None]:
+	def run() -> None:
+		for i in range(OPS):
+			cache[i % SIZE]
+	return run
+
+
+def updates(cache: dict) -> Callable[[], None]:
+	def run() -> None:
+		for i in range(OPS):
+			cache[(i * 7919) % SIZE] = i
+	return run
+
+
+def inserts(cache: dict) -> Callable[[], None]:
+	def run() -> None:
+		base = SIZE + len(cache) * OPS
+		for i in range(OPS):
+			cache[base + i] = i
+	return run
+
+
+def main() -> None:
+	old = filled(lambda: OldLRUMap(SIZE))
+	new = filled(lambda: LRUMap(SIZE))
+	timed = filled(lambda: LRUMap(SIZE, ttl=3600.0))
+
+	old_hits = measure(hits(old))
+	new_hits = measure(hits(new))
+	report("hits, OrderedDict subclass", OPS, old_hits)
+	report("hits, LRUMap", OPS, new_hits)
+	report("hits, LRUMap with TTL", OPS, measure(hits(timed)))
+	assert new_hits < old_hits
+	assert new.hits == 3 * OPS and new.misses == 0
+
+	report("updates, OrderedDict subclass", OPS, measure(updates(old)))
+	report("updates, LRUMap", OPS, measure(updates(new)))
+	assert len(new) == SIZE and new.evictions == 0
+
+	# An updated key becomes the most recently used; the old class evicted
+	# the oldest key for the update and then the updated one
+	old, new = filled(lambda: OldLRUMap(SIZE)), filled(lambda: LRUMap(SIZE))
+	for cache in (old, new):
+		cache[1] = -1
+		cache[SIZE] = SIZE
+		cache[SIZE + 1] = SIZE + 1
+	assert 1 in new and 0 not in new and 2 not in new
+	assert 1 not in old
+
+	old, new = filled(lambda: OldLRUMap(SIZE)), filled(lambda: LRUMap(SIZE))
+	report("inserts, OrderedDict subclass", OPS, measure(inserts(old)))
+	report("inserts, LRUMap", OPS, measure(inserts(new)))
+	assert len(new) == SIZE and new.evictions == 3 * OPS
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,156 @@
+"""Links and colors in trade chat: the token pass against the chained regexes.
+
+The corpus is LINES lines of trade chat, most of them carrying item,
+spell, enchant, quest, achievement or profession links, some colored text
+and plain chatter in between. The baseline is MessageResolver as it was:
+resolve_links runs the link regexes one after another, and
+strip_color_coding compiles its two regexes on every call and runs them
+in turn. Reported per expansion, in messages per second, for
+strip_color_coding(resolve_links(message)).
+
+The output must be byte for byte the same. That is checked on the corpus
+and on FUZZ random strings of markup pieces. The random strings include
+colored text before links, links out of pass order, broken links, stray
+pipes and newlines, where the resolver has to fall back to the regexes.
+
+Run from the repository root:
+
+	python -m benchmarks.bench_message_resolver
+"""
+from __future__ import annotations
+
+import random
+import re
+from typing import List, Sequence, Tuple
+
+from benchmarks._util import measure, report
+from wowchat.common.config import WowExpansion
+from wowchat.discord.message_resolver import MessageResolver
+
+LINES = 20_000
+FUZZ = 20_000
+
+
+class OldMessageResolver:
+	"""MessageResolver.resolve_links and strip_color_coding as they were"""
+
+	def __init__(self, expansion: str) -> None:
+		resolver = MessageResolver(None, expansion)  # type: ignore[arg-type]
+		self._link_site = resolver._link_site
+		pairs: List[Tuple[str, str]] = [
+			("item", r"\|.+?\|Hitem:(\d+):.+?\|h\[(.+?)]\|h\|r"),
+			("spell", r"\|.+?\|(?:Hspell|Henchant)?:(\d+).*?\|h\[(.+?)]\|h\|r"),
+			("quest", r"\|.+?\|Hquest:(\d+):.+?\|h\[(.+?)]\|h\|r"),
+		]
+		if expansion in (WowExpansion.WotLK, WowExpansion.Cataclysm, WowExpansion.MoP):
+			pairs.append(("achievement", r"\|.+?\|Hachievement:(\d+):.+?\|h\[(.+?)]\|h\|r"))
+		if expansion == WowExpansion.WotLK:
+			pairs.append(("spell", r"\|Htrade:(\d+):.+?\|h\[(.+?)]\|h"))
+		if expansion == WowExpansion.MoP:
+			pairs.append(("spell", r"\|Htrade:.+?:(\d+):.+?\|h\[(.+?)]\|h"))
+		self._regexes = [(k, re.compile(p)) for (k, p) in pairs]
+
+	def resolve_links(self, message: str) -> str:
+		for key, pattern in self._regexes:
+			message = pattern.sub(lambda m: f"[[{m.group(2)}]]({self._link_site}?{key}={m.group(1)})", message)
+		return message
+
+	def strip_color_coding(self, message: str) -> str:
+		hex_pat = re.compile(r"\|c[0-9a-fA-F]{8}")
+		pass1 = re.compile(r"\|c[0-9a-fA-F]{8}(.*?)\|r")
+		return hex_pat.sub("", pass1.sub(lambda m: m.group(1), message))
+
+
+ITEMS = [(2772, "Arcanite Bar"), (19019, "Thunderfury, Blessed Blade of the Windseeker"), (14047, "Runecloth"), (13468, "Black Lotus")]
+SPELLS = [(20034, "Enchant Weapon - Crusader"), (11993, "Power Word: Fortitude")]
+QUESTS = [(4641, "Your Place In The World"), (5081, "Maxwell's Mission")]
+ACHIEVEMENTS = [(2136, "Glory of the Hero"), (45, "Explore Northrend")]
+
+
+def links(expansion: str, rng: random.Random) -> List[str]:
+	item_id, item = rng.choice(ITEMS)
+	spell_id, spell = rng.choice(SPELLS)
+	quest_id, quest = rng.choice(QUESTS)
+	achievement_id, achievement = rng.choice(ACHIEVEMENTS)
+	pieces = [
+		f"|cffa335ee|Hitem:{item_id}:0:0:0:0:0:0:0|h[{item}]|h|r",
+		f"|cff71d5ff|Hspell:{spell_id}|h[{spell}]|h|r",
+		f"|cffffd000|Henchant:{spell_id}|h[{spell}]|h|r",
+		f"|cffffff00|Hquest:{quest_id}:60|h[{quest}]|h|r",
+	]
+	if expansion in (WowExpansion.WotLK, WowExpansion.Cataclysm, WowExpansion.MoP):
+		pieces.append(f"|cffffff00|Hachievement:{achievement_id}:0700000000000001:1:12:24:8:0:0:0:0|h[{achievement}]|h|r")
+	if expansion == WowExpansion.WotLK:
+		pieces.append(f"|cffffd000|Htrade:45361:450:450:0:AAAA|h[Jewelcrafting]|h|r")
+	if expansion == WowExpansion.MoP:
+		pieces.append(f"|cffffd000|Htrade:0000000000000001:25229:755|h[Jewelcrafting]|h|r")
+	return pieces
+
+
+def corpus(expansion: str, seed: int = 1) -> List[str]:
+	"""Trade chat, links in the order people paste them"""
+	rng = random.Random(seed)
+	lines = []
+	for _ in range(LINES):
+		roll = rng.random()
+		if roll < 0.2:
+			lines.append(rng.choice(["LF enchanter, tips", "anyone selling bags?", "WTB mats pst", "lol"]))
+			continue
+		pieces = links(expansion, rng)
+		if roll < 0.8:
+			# Items only, the bulk of trade chat
+			lines.append("WTS " + " ".join(pieces[0] for _ in range(rng.randrange(1, 4))) + f" {rng.randrange(1, 99)}g each")
+		else:
+			chosen = sorted(rng.sample(range(len(pieces)), rng.randrange(1, 3)))
+			lines.append("LF " + " and ".join(pieces[i] for i in chosen) + ", pst")
+	return lines
+
+
+def fuzz(expansion: str, seed: int = 2) -> List[str]:
+	"""Markup pieces in any order, broken ones included"""
+	rng = random.Random(seed)
+	extra = [
+		"|cffff0000", "|r", "|", "|:", "|Hitem:", "|Hitem:5|h[Broken]|h|r", "|Hitem:1:2|h[Bare]|h|r",
+		"|cff00ff00red|r", "\n", "|TInterface\\Icons\\INV_Misc_Coin_01:16|t", "|Hplayer:Alice|h[Alice]|h",
+		"|Hitem:1:|h[]|h|r", "ff00ff00", "|c", "text", " ", "]|h|r", "|h[", "1234abcd",
+	]
+	strings = []
+	for _ in range(FUZZ):
+		pieces = links(expansion, rng) + extra
+		strings.append("".join(rng.choice(pieces) for _ in range(rng.randrange(1, 7))))
+	return strings
+
+
+def main() -> None:
+	for expansion in (WowExpansion.Vanilla, WowExpansion.TBC, WowExpansion.WotLK, WowExpansion.Cataclysm, WowExpansion.MoP):
+		old = OldMessageResolver(expansion)
+		new = MessageResolver(None, expansion)  # type: ignore[arg-type]
+		lines = corpus(expansion)
+
+		def check(messages: Sequence[str]) -> None:
+			for message in messages:
+				assert new.render(message) == old.strip_color_coding(old.resolve_links(message)), message
+				assert new.resolve_links(message) == old.resolve_links(message), message
+				assert new.strip_color_coding(message) == old.strip_color_coding(message), message
+
+		check(lines)
+		check(fuzz(expansion))
+		assert new.render(lines[-1]) != lines[-1] or "|" not in lines[-1]
+
+		def chained() -> None:
+			for message in lines:
+				old.strip_color_coding(old.resolve_links(message))
+
+		def one_pass() -> None:
+			render = new.render
+			for message in lines:
+				render(message)
+
+		before, after = measure(chained), measure(one_pass)
+		report(f"{expansion}, chained regexes", LINES, before, "msgs")
+		report(f"{expansion}, token pass", LINES, after, "msgs")
+		assert after < before
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,210 @@
+"""Name queries behind a burst of chat from players the bot has not seen.
+
+The stand-in world server pushes SENDERS x MESSAGES chat lines, interleaved,
+to a GameConnector in the world; every line names its sender by GUID only.
+A line is relayed once its sender's name is known. With PlayerNames each
+unknown GUID costs one CMSG_NAME_QUERY however many lines wait on it; the
+baseline is the same cache without that, which queries once per line that
+misses. After a restart with the snapshot from the state file the burst
+needs no queries at all. Every name query is answered after LATENCY. Also
+checked:
+
+- lines from one sender are relayed in order, under the right name
+- SMSG_INVALIDATE_PLAYER makes the next line query the name again
+- a GUID the server does not know is relayed as UNKNOWN and not cached
+- a lost reply is asked for again; when that reply is lost too, the
+  lines waiting on it are relayed as UNKNOWN and the next line asks again
+
+Run from the repository root:
+
+	python -m benchmarks.bench_names
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import struct
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import List, Optional, Tuple
+
+from benchmarks._auth_server import StandInAuthServer
+from benchmarks._world_server import StandInWorldServer
+from benchmarks.bench_realm_framer import make_conf
+from wowchat.common.config import ChannelConfig, DiscordChannelConfig, GuildConfig, WowChannelConfig, WowExpansion
+from wowchat.common.format_template import FormatTemplate
+from wowchat.common.global_state import Global
+from wowchat.common.player_names import NameCallback, PlayerNames
+from wowchat.common.routing import ChatDirection, RoutingIndex
+from wowchat.common.state_store import StateStore
+from wowchat.game.connector import GameConnector
+from wowchat.game.dispatch import load_expansion
+
+SENDERS = 50
+MESSAGES = 10
+# Seconds per round trip to the stand-in world server
+LATENCY = 0.005
+FIRST_GUID = 1000
+
+
+class NoDedupNames(PlayerNames):
+	"""The cache without in-flight deduplication: every miss sends a query"""
+
+	def lookup(self, guid: int, callback: NameCallback) -> None:
+		if self.get(guid) is not None:
+			super().lookup(guid, callback)
+			return
+		self._waiting.setdefault(guid, []).append(callback)
+		self._query(guid)
+
+
+class Recorder:
+	"""Stands in for the Discord client"""
+
+	def __init__(self) -> None:
+		self.lines: List[Tuple[Optional[str], str]] = []
+		self.changed = asyncio.Event()
+
+	def send_message_from_wow(self, from_name: Optional[str], message: str, wow_type: int, wow_channel: Optional[str]) -> None:
+		self.lines.append((from_name, message))
+		self.changed.set()
+
+	async def wait_for(self, count: int) -> None:
+		while len(self.lines) < count:
+			self.changed.clear()
+			await asyncio.wait_for(self.changed.wait(), 5)
+
+
+def guild_chat_routes(expansion: str) -> RoutingIndex:
+	"""Guild chat to the one Discord channel the recorder stands in for"""
+	guild_chat = load_expansion(expansion)[0].packets.ChatEvents.CHAT_MSG_GUILD
+	conf = SimpleNamespace(
+		channels=[ChannelConfig(ChatDirection.both,
+			WowChannelConfig(None, guild_chat, None, FormatTemplate(""), None),
+			DiscordChannelConfig("guild-chat", FormatTemplate("%message"), None))],
+		filters=None,
+		guildConfig=GuildConfig({}),
+		expansion=expansion,
+	)
+	return RoutingIndex.build(conf, [SimpleNamespace(name="guild-chat", id=1)])  # type: ignore[arg-type]
+
+
+def chat_packet(expansion: str, guid: int, text: str) -> bytes:
+	events = load_expansion(expansion)[0].packets.ChatEvents
+	body = text.encode() + b"\x00"
+	if expansion == WowExpansion.Vanilla:
+		return struct.pack('<BiQI', events.CHAT_MSG_GUILD, 0, guid, len(body)) + body + b"\x00"
+	return struct.pack('<BiQ4x8xI', events.CHAT_MSG_GUILD, 0, guid, len(body)) + body + b"\x00"
+
+
+class Session:
+	"""A character in the world on the stand-in world server"""
+
+	def __init__(self, expansion: str) -> None:
+		self.expansion = expansion
+		self.auth = StandInAuthServer(expansion, [])
+		self.world = StandInWorldServer(expansion, self.auth, latency=LATENCY)
+		self.world.players = {FIRST_GUID + i: f"Player{i}" for i in range(SENDERS)}
+
+	async def __aenter__(self) -> StandInWorldServer:
+		port = await self.world.start()
+		conf = make_conf(self.expansion, 0, "stand-in")
+		Global.config = conf  # type: ignore[assignment]
+		Global.routes = guild_chat_routes(self.expansion)
+		session_key = os.urandom(40)
+		self.auth.sessions[conf.wow.account] = session_key
+		self.connector = GameConnector("127.0.0.1", port, "Stand-in", 1, session_key)
+		self.task = asyncio.get_running_loop().create_task(self.connector.connect())
+		await asyncio.wait_for(self.connector.live.wait(), 5)
+		return self.world
+
+	async def __aexit__(self, *exc: object) -> None:
+		await self.world.close()
+		await self.task
+
+
+async def burst(expansion: str, names: PlayerNames) -> Tuple[float, int]:
+	"""Seconds until every line is relayed, and name queries sent"""
+	Global.names = names
+	recorder = Global.discord = Recorder()  # type: ignore[assignment]
+	async with Session(expansion) as world:
+		start = time.perf_counter()
+		for n in range(MESSAGES):
+			for i in range(SENDERS):
+				world.push(load_expansion(expansion)[0].packets.SMSG_MESSAGECHAT, chat_packet(expansion, FIRST_GUID + i, f"{i}:{n}"))
+		await recorder.wait_for(SENDERS * MESSAGES)
+		elapsed = time.perf_counter() - start
+		for i in range(SENDERS):
+			lines = [message for name, message in recorder.lines if name == f"Player{i}"]
+			assert lines == [f"{i}:{n}" for n in range(MESSAGES)], lines
+		return elapsed, world.name_queries
+
+
+async def check_invalidation(expansion: str) -> None:
+	Global.names = PlayerNames()
+	recorder = Global.discord = Recorder()  # type: ignore[assignment]
+	p = load_expansion(expansion)[0].packets
+	async with Session(expansion) as world:
+		world.push(p.SMSG_MESSAGECHAT, chat_packet(expansion, FIRST_GUID, "before"))
+		await recorder.wait_for(1)
+		world.players[FIRST_GUID] = "Renamed"
+		world.push(p.SMSG_INVALIDATE_PLAYER, struct.pack('<Q', FIRST_GUID))
+		world.push(p.SMSG_MESSAGECHAT, chat_packet(expansion, FIRST_GUID, "after"))
+		await recorder.wait_for(2)
+		assert recorder.lines == [("Player0", "before"), ("Renamed", "after")], recorder.lines
+		assert world.name_queries == 2
+
+		if expansion == WowExpansion.WotLK:
+			# Only WotLK can say it does not know the GUID
+			world.push(p.SMSG_MESSAGECHAT, chat_packet(expansion, 1, "who?"))
+			await recorder.wait_for(3)
+			assert recorder.lines[-1] == ("UNKNOWN", "who?")
+			assert Global.names.get(1) is None
+
+
+async def check_lost_replies(expansion: str) -> None:
+	Global.names = PlayerNames(reply_timeout=0.05)
+	recorder = Global.discord = Recorder()  # type: ignore[assignment]
+	p = load_expansion(expansion)[0].packets
+	async with Session(expansion) as world:
+		world.drop_name_queries = 1
+		world.push(p.SMSG_MESSAGECHAT, chat_packet(expansion, FIRST_GUID, "retried"))
+		await recorder.wait_for(1)
+		assert recorder.lines == [("Player0", "retried")], recorder.lines
+		assert world.name_queries == 2
+
+		world.drop_name_queries = 2
+		world.push(p.SMSG_MESSAGECHAT, chat_packet(expansion, FIRST_GUID + 1, "lost"))
+		world.push(p.SMSG_MESSAGECHAT, chat_packet(expansion, FIRST_GUID + 1, "lost too"))
+		await recorder.wait_for(3)
+		assert recorder.lines[1:] == [("UNKNOWN", "lost"), ("UNKNOWN", "lost too")], recorder.lines
+		assert Global.names.waiting == 0
+		world.push(p.SMSG_MESSAGECHAT, chat_packet(expansion, FIRST_GUID + 1, "found"))
+		await recorder.wait_for(4)
+		assert recorder.lines[-1] == ("Player1", "found")
+		assert world.name_queries == 5
+
+
+def main() -> None:
+	logging.disable(logging.CRITICAL)
+	for expansion in (WowExpansion.Vanilla, WowExpansion.TBC, WowExpansion.WotLK):
+		asyncio.run(check_invalidation(expansion))
+		asyncio.run(check_lost_replies(expansion))
+		_, naive_queries = asyncio.run(burst(expansion, NoDedupNames()))
+		with tempfile.TemporaryDirectory() as tmp:
+			path = os.path.join(tmp, "state.json")
+			deduped, queries = asyncio.run(burst(expansion, PlayerNames(StateStore(path))))
+			assert queries == SENDERS, queries
+			# The session end snapshotted the names; a restart loads them back
+			restarted, restart_queries = asyncio.run(burst(expansion, PlayerNames(StateStore(path))))
+			assert restart_queries == 0, restart_queries
+		assert naive_queries > queries
+		name = f"{expansion}, {SENDERS} senders x {MESSAGES} lines"
+		print(f"{name:<32} name queries {naive_queries:>4} one per miss  {queries:>3} deduplicated ({deduped * 1000:.1f} ms)  "
+			f"{restart_queries} after a restart ({restarted * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+	main()
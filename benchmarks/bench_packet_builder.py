@@ -0,0 +1,126 @@
+"""Cost of building CMSG payloads: struct.pack chains against ByteWriter.
+
+The packet is the WotLK CMSG_AUTH_CHALLENGE, reported in packets per
+second from the payload to what goes to writelines:
+
+- the struct.pack chain the handlers used before, header concatenated
+- ByteWriter, one call per field, header framed in front of the payload
+- ByteWriter with the fixed field runs packed by precompiled Structs
+- the precompiled Structs joined into bytes, as the handlers build
+  every CMSG without bit fields; the header goes to writelines on its own
+
+The joined build must be byte for byte the same and faster than the
+chain.
+
+Run from the repository root:
+
+	python -m benchmarks.bench_packet_builder
+"""
+from __future__ import annotations
+
+import struct
+
+from benchmarks._util import measure, report
+from wowchat.common.packet import ByteWriter
+
+PACKETS = 200_000
+ACCOUNT = b"ACCOUNT"
+DIGEST = bytes(range(20))
+ADDON_INFO = bytes(0x9E)
+HEADER = b"\x00" * 6
+
+_HEAD = struct.Struct('<HII')
+_SEEDS = struct.Struct('>II')
+_TAIL = struct.Struct('<IIIQ')
+
+
+def legacy_auth_challenge() -> bytes:
+	"""WotLK CMSG_AUTH_CHALLENGE as the handler used to build it."""
+	out = bytearray()
+	out += struct.pack('<H', 0)
+	out += struct.pack('<II', 12340, 0)
+	out += ACCOUNT + b'\x00'
+	out += struct.pack('>I', 0)
+	out += struct.pack('>I', 0x12345678)
+	out += struct.pack('<III', 0, 0, 1)
+	out += struct.pack('<Q', 3)
+	out += DIGEST
+	out += ADDON_INFO
+	return bytes(out)
+
+
+def writer_auth_challenge() -> ByteWriter:
+	out = ByteWriter(80 + len(ACCOUNT) + len(ADDON_INFO), reserve=len(HEADER))
+	out.write_u16le(0)
+	out.write_u32le(12340)
+	out.write_u32le(0)
+	out.write_cstring(ACCOUNT)
+	out.write_u32be(0)
+	out.write_u32be(0x12345678)
+	out.write_u32le(0)
+	out.write_u32le(0)
+	out.write_u32le(1)
+	out.write_u64le(3)
+	out.write_bytes(DIGEST)
+	out.write_bytes(ADDON_INFO)
+	return out
+
+
+def compiled_auth_challenge() -> ByteWriter:
+	"""Same packet with adjacent fixed fields packed by one precompiled Struct."""
+	out = ByteWriter(80 + len(ACCOUNT) + len(ADDON_INFO), reserve=len(HEADER))
+	out.write_struct(_HEAD, 0, 12340, 0)
+	out.write_cstring(ACCOUNT)
+	out.write_struct(_SEEDS, 0, 0x12345678)
+	out.write_struct(_TAIL, 0, 0, 1, 3)
+	out.write_bytes(DIGEST)
+	out.write_bytes(ADDON_INFO)
+	return out
+
+
+def joined_auth_challenge() -> bytes:
+	"""GamePacketHandlerWotLK._build_auth_challenge"""
+	return b''.join((
+		_HEAD.pack(0, 12340, 0),
+		ACCOUNT, b'\x00',
+		_SEEDS.pack(0, 0x12345678),
+		_TAIL.pack(0, 0, 1, 3),
+		DIGEST,
+		ADDON_INFO,
+	))
+
+
+def run_legacy(count: int) -> None:
+	"""Payload plus a separately concatenated header, as sent before."""
+	for _ in range(count):
+		payload = legacy_auth_challenge()
+		HEADER + payload
+
+
+def run_writer(count: int, build=writer_auth_challenge) -> None:
+	for _ in range(count):
+		build().frame(HEADER)
+
+
+def run_joined(count: int) -> None:
+	"""Header and payload as the two frames GamePacketWriter passes on."""
+	for _ in range(count):
+		[HEADER, joined_auth_challenge()]
+
+
+def main() -> None:
+	framed = writer_auth_challenge().frame(HEADER)
+	assert bytes(framed) == HEADER + legacy_auth_challenge()
+	assert bytes(compiled_auth_challenge().frame(HEADER)) == bytes(framed)
+	assert HEADER + joined_auth_challenge() == bytes(framed)
+	before = measure(lambda: run_legacy(PACKETS))
+	report("struct.pack chain + header concat", PACKETS, before, "packets")
+	report("ByteWriter, one call per field", PACKETS, measure(lambda: run_writer(PACKETS)), "packets")
+	report("ByteWriter, precompiled Structs", PACKETS, measure(lambda: run_writer(PACKETS, compiled_auth_challenge)), "packets")
+	after = measure(lambda: run_joined(PACKETS))
+	report("precompiled Structs, joined", PACKETS, after, "packets")
+	assert after < before
+
+
+if __name__ == "__main__":
+	main()
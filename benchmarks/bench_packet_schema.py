@@ -0,0 +1,253 @@
+"""Decoding SMSG_CHAR_ENUM, realm list, SMSG_MESSAGECHAT and SMSG_GUILD_ROSTER:
+hand-written per-field ByteReader loops against the compiled schemas.
+
+Run from the repository root:
+
+	python -m benchmarks.bench_packet_schema
+"""
+from __future__ import annotations
+
+import logging
+import struct
+import types
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks._util import measure, report
+from wowchat.common.global_state import Global
+from wowchat.common.packet import ByteReader
+from wowchat.game.handler_wotlk import GamePacketHandlerWotLK
+from wowchat.game.packets_wotlk import ChatEvents
+from wowchat.realm.connector import REALM_LIST_ENTRY
+
+CHARACTERS = 10
+REALMS = 20
+CHAT_PACKETS = 20_000
+GUILD_MEMBERS = 900
+TARGET = "Character9"
+
+
+class LegacyByteReader:
+	"""ByteReader as it was: one struct.unpack_from per field, cstrings scanned byte by byte."""
+
+	def __init__(self, data: bytes) -> None:
+		self._data = memoryview(data)
+		self._pos = 0
+
+	def read_u8(self) -> int:
+		b = self._data[self._pos]
+		self._pos += 1
+		return int(b)
+
+	def read_i32le(self) -> int:
+		v = struct.unpack_from('<i', self._data, self._pos)[0]
+		self._pos += 4
+		return v
+
+	def read_u32le(self) -> int:
+		v = struct.unpack_from('<I', self._data, self._pos)[0]
+		self._pos += 4
+		return v
+
+	def read_u64le(self) -> int:
+		v = struct.unpack_from('<Q', self._data, self._pos)[0]
+		self._pos += 8
+		return v
+
+	def read_f32le(self) -> float:
+		v = struct.unpack_from('<f', self._data, self._pos)[0]
+		self._pos += 4
+		return v
+
+	def read_cstring(self) -> str:
+		start = self._pos
+		while self._pos < len(self._data) and self._data[self._pos] != 0:
+			self._pos += 1
+		val = bytes(self._data[start:self._pos]).decode('utf-8', errors='ignore')
+		if self._pos < len(self._data) and self._data[self._pos] == 0:
+			self._pos += 1
+		return val
+
+	def read_bytes(self, n: int) -> bytes:
+		b = bytes(self._data[self._pos:self._pos + n])
+		self._pos += n
+		return b
+
+	def skip(self, n: int) -> None:
+		self._pos += n
+
+
+# --- packet builders ---
+
+def build_char_enum() -> bytes:
+	out = bytearray((CHARACTERS,))
+	for i in range(CHARACTERS):
+		out += struct.pack('<Q', 100 + i) + f"Character{i}".encode() + b'\x00'
+		out += bytes((1,)) + bytes(8 + 4 + 4 + 12) + struct.pack('<I', 7)
+		out += bytes(GamePacketHandlerWotLK.CHAR_ENUM_TAIL_LENGTH)
+	return bytes(out)
+
+
+def build_realm_list() -> bytes:
+	out = bytearray(4) + bytes((REALMS,))
+	for i in range(REALMS):
+		out += bytes(3) + bytes((0,)) + f"Realm {i}".encode() + b'\x00' + f"10.0.0.{i}:8085".encode() + b'\x00'
+		out += struct.pack('<f', 1.0) + bytes((0, 1, i))
+	return bytes(out)
+
+
+def build_chat(i: int) -> bytes:
+	tp = ChatEvents.CHAT_MSG_CHANNEL if i % 2 else ChatEvents.CHAT_MSG_GUILD
+	text = f"WTS [Linen Cloth] x{i} cheap, pst".encode()
+	out = struct.pack('<BiQI', tp, 7, 1000 + i, 0)
+	if tp == ChatEvents.CHAT_MSG_CHANNEL:
+		out += b"Trade - City\x00"
+	out += struct.pack('<QI', 0, len(text) + 1) + text + b'\x00' + b'\x00'
+	return out
+
+
+def build_guild_roster() -> bytes:
+	out = bytearray(struct.pack('<I', GUILD_MEMBERS)) + b"Welcome to the guild\x00" + b"Guild info\x00"
+	out += struct.pack('<I', 5) + bytes(5 * GamePacketHandlerWotLK.GUILD_RANK_LENGTH)
+	for i in range(GUILD_MEMBERS):
+		online = i % 4 == 0
+		out += struct.pack('<QB', 5000 + i, online) + f"Member{i}".encode() + b'\x00'
+		out += struct.pack('<IBBBI', 1, 80, 1 + i % 11, 0, 1519)
+		if not online:
+			out += struct.pack('<f', 1.5)
+		out += b"public note\x00" + b"\x00"
+	return bytes(out)
+
+
+# --- the hand-written decoders ---
+
+def legacy_char_enum(data: bytes) -> Optional[Tuple[int, str, int, int]]:
+	reader = LegacyByteReader(data)
+	target_name = TARGET.lower()
+	count = reader.read_u8()
+	for _ in range(count):
+		guid = reader.read_u64le()
+		name = reader.read_cstring()
+		race = reader.read_u8()
+		reader.skip(8)
+		reader.skip(4)
+		reader.skip(4)
+		reader.skip(12)
+		guild_guid = reader.read_u32le()
+		if name.lower() == target_name:
+			return guid, name, race, guild_guid
+		reader.skip(GamePacketHandlerWotLK.CHAR_ENUM_TAIL_LENGTH)
+	return None
+
+
+def legacy_realm_list(data: bytes) -> List[Tuple[int, str, str, int]]:
+	buf = LegacyByteReader(data)
+	buf.read_u32le()
+	realms = []
+	for _ in range(buf.read_u8()):
+		buf.skip(3)
+		realm_flags = buf.read_u8()
+		realm_name = buf.read_cstring()
+		addr = buf.read_cstring()
+		buf.skip(4)
+		buf.skip(1)
+		buf.skip(1)
+		realm_id = buf.read_u8()
+		realms.append((realm_flags, realm_name, addr, realm_id))
+	return realms
+
+
+def legacy_chat(data: bytes) -> Optional[Tuple[int, int, str, Optional[str]]]:
+	"""GamePacketHandlerWotLK.parseChatMessage, field by field."""
+	msg = LegacyByteReader(data)
+	tp = msg.read_u8()
+	lang = msg.read_i32le()
+	if lang == -1:
+		return None
+	guid = msg.read_u64le()
+	msg.skip(4)
+	channel = msg.read_cstring() if tp == ChatEvents.CHAT_MSG_CHANNEL else None
+	msg.skip(8)
+	text_length = msg.read_u32le()
+	text = msg.read_bytes(text_length - 1).decode('utf-8', errors='ignore')
+	msg.skip(1)
+	msg.skip(1)
+	return guid, tp, text, channel
+
+
+def legacy_guild_roster(data: bytes) -> Dict[int, Tuple[str, bool, int, int, int, float]]:
+	"""GamePacketHandlerTBC.parseGuildRoster, field by field."""
+	msg = LegacyByteReader(data)
+	count = msg.read_u32le()
+	msg.read_cstring()
+	msg.read_cstring()
+	ranks_count = msg.read_u32le()
+	for _ in range(ranks_count):
+		msg.skip(8 + 48)
+	roster = {}
+	for _ in range(count):
+		guid = msg.read_u64le()
+		is_online = msg.read_u8() != 0
+		name = msg.read_cstring()
+		msg.skip(4)
+		level = msg.read_u8()
+		char_class = msg.read_u8()
+		msg.skip(1)
+		zone_id = msg.read_u32le()
+		last_logoff = msg.read_f32le() if not is_online else 0.0
+		msg.read_cstring()
+		msg.read_cstring()
+		roster[guid] = (name, is_online, char_class, level, zone_id, last_logoff)
+	return roster
+
+
+# --- the schema-based decoders, through the real handler ---
+
+def make_handler() -> GamePacketHandlerWotLK:
+	Global.config = types.SimpleNamespace(wow=types.SimpleNamespace(character=TARGET))  # type: ignore[assignment]
+	handler = GamePacketHandlerWotLK(None, 1, "Realm", bytes(40))  # type: ignore[arg-type]
+	handler._character_guid = 1
+	return handler
+
+
+def schema_realm_list(data: bytes) -> list:
+	buf = ByteReader(data)
+	buf.read_u32le()
+	return list(buf.iter_records(REALM_LIST_ENTRY, buf.read_u8()))
+
+
+def check_identical(handler: GamePacketHandlerWotLK, char_enum: bytes, realms: bytes, chats: List[bytes], roster: bytes) -> None:
+	c = handler._parse_char_enum(ByteReader(char_enum))
+	assert (c.guid, c.name, c.race, c.guild_guid) == legacy_char_enum(char_enum)
+	assert [(r.flags, r.name, r.address, r.realm_id) for r in schema_realm_list(realms)] == legacy_realm_list(realms)
+	for data in chats[:100]:
+		m = handler._parse_chat_message(ByteReader(data))
+		assert (m.guid, m.tp, m.message, m.channel) == legacy_chat(data)
+	members = handler._parse_guild_roster(ByteReader(roster))
+	expected = legacy_guild_roster(roster)
+	assert {g: (m.name, m.is_online, m.char_class, m.level, m.zone_id, m.last_logoff) for g, m in members.items()} == expected
+
+
+def main() -> None:
+	logging.disable(logging.CRITICAL)
+	handler = make_handler()
+	char_enum = build_char_enum()
+	realms = build_realm_list()
+	chats = [build_chat(i) for i in range(CHAT_PACKETS)]
+	roster = build_guild_roster()
+	check_identical(handler, char_enum, realms, chats, roster)
+
+	n = 20_000
+	report("SMSG_CHAR_ENUM, hand-written", n, measure(lambda: [legacy_char_enum(char_enum) for _ in range(n)]), "packets")
+	report("SMSG_CHAR_ENUM, schema", n, measure(lambda: [handler._parse_char_enum(ByteReader(char_enum)) for _ in range(n)]), "packets")
+	n = 5_000
+	report("realm list, hand-written", n, measure(lambda: [legacy_realm_list(realms) for _ in range(n)]), "packets")
+	report("realm list, schema", n, measure(lambda: [schema_realm_list(realms) for _ in range(n)]), "packets")
+	report("SMSG_MESSAGECHAT, hand-written", CHAT_PACKETS, measure(lambda: [legacy_chat(d) for d in chats]), "packets")
+	report("SMSG_MESSAGECHAT, Struct runs", CHAT_PACKETS, measure(lambda: [handler._parse_chat_message(ByteReader(d)) for d in chats]), "packets")
+	n = 50
+	report(f"SMSG_GUILD_ROSTER ({GUILD_MEMBERS}), hand-written", n, measure(lambda: [legacy_guild_roster(roster) for _ in range(n)]), "packets")
+	report(f"SMSG_GUILD_ROSTER ({GUILD_MEMBERS}), schema", n, measure(lambda: [handler._parse_guild_roster(ByteReader(roster)) for _ in range(n)]), "packets")
+
+
+if __name__ == "__main__":
+	main()
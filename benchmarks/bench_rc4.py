@@ -0,0 +1,98 @@
+"""RC4 header crypt throughput: legacy per-byte loop vs the block keystream engine.
+
+Run from the repository root:
+
+	python -m benchmarks.bench_rc4
+"""
+from __future__ import annotations
+
+import random
+from typing import Callable, List
+
+from benchmarks._util import measure, report
+from wowchat.game.header_crypt_wotlk import ARC4, RC4
+
+KEY = bytes(range(20))
+HEADERS = 200_000
+BULK = 4 * 1024 * 1024
+
+
+class LegacyRC4:
+	"""RC4.crypt_to_byte_array as it was before the keystream engine."""
+
+	def __init__(self, key: bytes) -> None:
+		self.sbox = list(range(256))
+		j = 0
+		for i in range(256):
+			j = (j + self.sbox[i] + key[i % len(key)]) % 256
+			self.sbox[i], self.sbox[j] = self.sbox[j], self.sbox[i]
+		self.i = 0
+		self.j = 0
+
+	def crypt_to_byte_array(self, data: bytes) -> bytes:
+		result = bytearray()
+		for byte in data:
+			self.i = (self.i + 1) % 256
+			self.j = (self.j + self.sbox[self.i]) % 256
+			self.sbox[self.i], self.sbox[self.j] = self.sbox[self.j], self.sbox[self.i]
+			rand = self.sbox[(self.sbox[self.i] + self.sbox[self.j]) % 256]
+			result.append(rand ^ byte)
+		return bytes(result)
+
+
+def _headers(count: int) -> List[bytes]:
+	"""Header-sized inputs as the framer sees them: mostly 4 bytes, sometimes 5."""
+	rnd = random.Random(1)
+	return [bytes(rnd.randrange(256) for _ in range(4 if rnd.random() < 0.99 else 5)) for _ in range(count)]
+
+
+def run_headers(factory: Callable[[bytes], object], headers: List[bytes]) -> int:
+	crypt = factory(KEY)
+	crypt.crypt_to_byte_array(bytes(1024))
+	total = 0
+	for header in headers:
+		total += len(crypt.crypt_to_byte_array(header))
+	return total
+
+
+def run_bulk(factory: Callable[[bytes], object], size: int, chunk: int = 4096) -> int:
+	crypt = factory(KEY)
+	data = bytes(chunk)
+	for _ in range(size // chunk):
+		crypt.crypt_to_byte_array(data)
+	return size
+
+
+def check_identical(headers: List[bytes]) -> None:
+	"""Every available engine must produce the legacy output byte for byte."""
+	engines = [lambda key: RC4(key, RC4.BACKEND_PYTHON)]
+	if ARC4 is not None:
+		engines.append(lambda key: RC4(key, RC4.BACKEND_OPENSSL))
+	legacy = LegacyRC4(KEY)
+	expected = [legacy.crypt_to_byte_array(h) for h in headers]
+	for factory in engines:
+		crypt = factory(KEY)
+		assert [crypt.crypt_to_byte_array(h) for h in headers] == expected
+
+
+def main() -> None:
+	headers = _headers(HEADERS)
+	check_identical(headers[:20_000])
+	header_bytes = sum(len(h) for h in headers)
+	engines = [
+		("legacy", LegacyRC4),
+		("python", lambda key: RC4(key, RC4.BACKEND_PYTHON)),
+	]
+	if ARC4 is not None:
+		engines.append(("openssl", lambda key: RC4(key, RC4.BACKEND_OPENSSL)))
+	else:
+		print("cryptography is not installed, skipping the OpenSSL backend")
+	for name, factory in engines:
+		report(f"{name}: {HEADERS:,} headers", header_bytes, measure(lambda: run_headers(factory, headers)), "bytes")
+	for name, factory in engines:
+		size = BULK // 8 if name == "legacy" else BULK
+		report(f"{name}: bulk 4 KiB chunks", size, measure(lambda: run_bulk(factory, size)), "bytes")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,164 @@
+"""Realm (auth) protocol framing, byte by byte and over a fragmenting socket.
+
+First every frame variant is fed to RealmPacketFramer one byte at a time and
+must come out exactly at its last byte. Then a RealmConnector logs in against
+the stand-in auth server while it splits every packet into 1-byte writes.
+
+Run from the repository root:
+
+	python -m benchmarks.bench_realm_framer
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import types
+from typing import List, Tuple
+
+from benchmarks._auth_server import (
+	StandInAuthServer, build_logon_challenge, build_logon_proof, build_realm_list,
+)
+from benchmarks._util import measure, report
+from wowchat.common.config import Platform, WowExpansion
+from wowchat.realm.connector import RealmAuthError, RealmConnector, RealmSession
+from wowchat.realm.framer import RealmPacketFramer, security_length
+from wowchat.realm.packets import RealmPackets
+
+REALMS = [("Realm One", "127.0.0.1:8085", 1), ("Stand-in", "127.0.0.1:8086", 2)]
+FEEDS = 2_000
+LOGINS = 20
+
+Failure = RealmPackets.AuthResult.WOW_FAIL_INCORRECT_PASSWORD
+
+
+def variants(expansion: str) -> List[Tuple[str, bytes]]:
+	out = [
+		("challenge", build_logon_challenge()),
+		("challenge, failed", build_logon_challenge(Failure)),
+		("proof", build_logon_proof(expansion)),
+		("proof, survey", build_logon_proof(expansion, RealmPackets.AuthResult.WOW_SUCCESS_SURVEY)),
+		("proof, failed", build_logon_proof(expansion, Failure)),
+		("realm list", build_realm_list(REALMS)),
+		("reconnect challenge", bytes((RealmPackets.CMD_AUTH_RECONNECT_CHALLENGE, 0)) + bytes(range(32))),
+		("reconnect challenge, failed", bytes((RealmPackets.CMD_AUTH_RECONNECT_CHALLENGE, Failure))),
+		("reconnect proof", bytes((RealmPackets.CMD_AUTH_RECONNECT_PROOF, 0)) + bytes(0 if expansion == WowExpansion.Vanilla else 2)),
+	]
+	for flags in (0x01, 0x02, 0x04, 0x07):
+		out.append((f"challenge, security {flags:#x}", build_logon_challenge(security_flags=flags, security=bytes(range(security_length(flags))))))
+	return out
+
+
+def expected_frame(packet: bytes) -> Tuple[int, bytes]:
+	start = 3 if packet[0] == RealmPackets.CMD_REALM_LIST else 1
+	return packet[0], packet[start:]
+
+
+def feed_bytewise(framer: RealmPacketFramer, packet: bytes) -> List[Tuple[int, bytes]]:
+	frames = []
+	for i in range(len(packet)):
+		got = framer.feed(packet[i:i + 1])
+		# Nothing may come out before the last byte, and nothing may be left after it
+		assert not got or i == len(packet) - 1, (i, len(packet))
+		frames += got
+	return frames
+
+
+def check_framer(expansion: str) -> None:
+	stream = b""
+	for name, packet in variants(expansion):
+		framer = RealmPacketFramer(expansion)
+		assert feed_bytewise(framer, packet) == [expected_frame(packet)], name
+		assert framer.pending == 0, name
+		stream += packet
+	# The same packets coalesced into one read
+	framer = RealmPacketFramer(expansion)
+	assert framer.feed(stream) == [expected_frame(packet) for _, packet in variants(expansion)]
+	assert framer.pending == 0
+
+	# A bare result byte after a failed proof only ends at EOF
+	framer = RealmPacketFramer(expansion)
+	short = build_logon_proof(expansion, Failure, short_failure=True)
+	frames = feed_bytewise(framer, short) + framer.feed_eof()
+	assert frames == [(RealmPackets.CMD_AUTH_LOGON_PROOF, bytes((Failure,)))]
+
+
+def make_conf(expansion: str, port: int, realm: str, character: str = "Bob") -> types.SimpleNamespace:
+	version = "1.12.1" if expansion == WowExpansion.Vanilla else "3.3.5"
+	return types.SimpleNamespace(
+		version=version,
+		expansion=expansion,
+		wow=types.SimpleNamespace(
+			locale="enUS", platform=Platform.Windows, realmBuild=None,
+			realmlist=types.SimpleNamespace(name=realm, host="127.0.0.1", port=port),
+			account=b"ACCOUNT", password="password", character=character, gameBuild=None,
+		),
+		channels=[],
+	)
+
+
+class RecordingRealmConnector(RealmConnector):
+	"""Stops at the realm list instead of connecting to the game server"""
+
+	selected: Tuple[str, int, str, int]
+
+	async def _connect_to_game_server(self, session: RealmSession) -> types.SimpleNamespace:  # type: ignore[override]
+		self.selected = (session.host, session.port, session.realm_name, session.realm_id)
+		return types.SimpleNamespace(authenticated=True, in_world=True)
+
+
+async def login(expansion: str, chunk_size: int, count: int = 1) -> Tuple[float, StandInAuthServer]:
+	server = StandInAuthServer(expansion, REALMS, chunk_size)
+	port = await server.start()
+	try:
+		start = time.perf_counter()
+		for _ in range(count):
+			connector = RecordingRealmConnector(asyncio.get_running_loop())
+			await connector.connect(make_conf(expansion, port, "stand-in"))  # type: ignore[arg-type]
+			assert connector.selected == ("127.0.0.1", 8086, "stand-in", 2)
+		return time.perf_counter() - start, server
+	finally:
+		await server.close()
+
+
+async def failed_login(expansion: str) -> None:
+	"""A short proof failure must end the login with an error, not a hang"""
+	server = StandInAuthServer(expansion, REALMS, 1, proof_result=Failure, short_proof_failure=True)
+	port = await server.start()
+	try:
+		connector = RecordingRealmConnector(asyncio.get_running_loop())
+		try:
+			await asyncio.wait_for(connector.connect(make_conf(expansion, port, "stand-in")), 5)  # type: ignore[arg-type]
+		except RealmAuthError:
+			pass
+		else:
+			raise AssertionError("login after a failed proof should not succeed")
+	finally:
+		await server.close()
+
+
+async def run_sockets() -> None:
+	for expansion in (WowExpansion.Vanilla, WowExpansion.WotLK):
+		_, server = await login(expansion, 1)
+		expected = [RealmPackets.CMD_AUTH_LOGON_CHALLENGE, RealmPackets.CMD_AUTH_LOGON_PROOF, RealmPackets.CMD_REALM_LIST]
+		assert server.received == expected, server.received
+		await failed_login(expansion)
+		seconds, server = await login(expansion, 0, LOGINS)
+		report(f"{expansion} login, whole packets", LOGINS, seconds, "logins")
+		seconds, server = await login(expansion, 1, LOGINS)
+		report(f"{expansion} login, 1-byte writes ({server.writes // LOGINS}/login)", LOGINS, seconds, "logins")
+
+
+def main() -> None:
+	logging.disable(logging.CRITICAL)
+	for expansion in (WowExpansion.Vanilla, WowExpansion.WotLK):
+		check_framer(expansion)
+	packets = [packet for _, packet in variants(WowExpansion.WotLK)]
+	framer = RealmPacketFramer(WowExpansion.WotLK)
+	report("framer, whole packets", FEEDS * len(packets), measure(lambda: [framer.feed(p) for _ in range(FEEDS) for p in packets]), "frames")
+	report("framer, one byte per feed", FEEDS * len(packets), measure(lambda: [feed_bytewise(framer, p) for _ in range(FEEDS) for p in packets]), "frames")
+	asyncio.run(run_sockets())
+
+
+if __name__ == "__main__":
+	main()
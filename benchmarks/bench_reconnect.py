@@ -0,0 +1,124 @@
+"""Time back in the world after the world server drops the connection.
+
+A RealmConnector logs in through the stand-in auth and world servers, the
+world server cuts it off, and the clock runs until the character is in the
+world again. Each reconnect path is forced in turn:
+
+- session key still valid: straight back to the world server
+- world server rejects the key once: realm reconnect proof, then the world
+- world server does not answer the key once: the same, after AUTH_TIMEOUT
+- world server does not answer twice: realm reconnect, then full SRP logon
+- auth server forgot the session: full SRP logon
+- no session kept: full SRP logon, the only path before
+
+Before, the full logon also waited ReconnectDelay's fixed 10 seconds first.
+
+Run from the repository root:
+
+	python -m benchmarks.bench_reconnect
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Tuple
+
+from benchmarks._auth_server import StandInAuthServer
+from benchmarks._world_server import StandInWorldServer
+from benchmarks.bench_realm_framer import make_conf
+from wowchat.common.config import WowExpansion
+from wowchat.common.global_state import Global
+from wowchat.game.connector import GameConnector
+from wowchat.realm.connector import RealmConnector
+
+ROUNDS = 20
+
+Prepare = Callable[[RealmConnector, StandInAuthServer, StandInWorldServer], None]
+
+
+def key_valid(realm: RealmConnector, auth: StandInAuthServer, world: StandInWorldServer) -> None:
+	pass
+
+
+def world_rejects_once(realm: RealmConnector, auth: StandInAuthServer, world: StandInWorldServer) -> None:
+	world.reject_next = 1
+
+
+def world_silent_once(realm: RealmConnector, auth: StandInAuthServer, world: StandInWorldServer) -> None:
+	world.silent_next = 1
+
+
+def world_silent_twice(realm: RealmConnector, auth: StandInAuthServer, world: StandInWorldServer) -> None:
+	world.silent_next = 2
+
+
+def auth_forgot(realm: RealmConnector, auth: StandInAuthServer, world: StandInWorldServer) -> None:
+	auth.forget_sessions()
+
+
+def no_session(realm: RealmConnector, auth: StandInAuthServer, world: StandInWorldServer) -> None:
+	realm.session = None
+
+
+async def wait_in_world(world: StandInWorldServer, count: int) -> None:
+	while world.in_world < count:
+		await world.entered.wait()
+		world.entered.clear()
+
+
+async def run(expansion: str, prepare: Prepare) -> Tuple[float, int, int, int]:
+	"""Mean seconds to get back in the world, and realm logons, realm reconnects
+	and rejected world sessions per round"""
+	auth = StandInAuthServer(expansion, [])
+	world = StandInWorldServer(expansion, auth)
+	world_port = await world.start()
+	auth.set_realms([("Stand-in", f"127.0.0.1:{world_port}", 1)])
+	auth_port = await auth.start()
+	conf = make_conf(expansion, auth_port, "stand-in")
+	Global.config = conf  # type: ignore[assignment]
+	realm = RealmConnector(asyncio.get_running_loop())
+	session = asyncio.get_running_loop().create_task(realm.connect(conf))  # type: ignore[arg-type]
+	await wait_in_world(world, 1)
+	logins, reconnects, rejected = auth.logins, auth.reconnects, world.rejected
+	total = 0.0
+	try:
+		for i in range(ROUNDS):
+			prepare(realm, auth, world)
+			start = time.perf_counter()
+			world.drop()
+			# The session ends with the connection; it had got into the world
+			assert await session
+			session = asyncio.get_running_loop().create_task(realm.reconnect(conf))  # type: ignore[arg-type]
+			await wait_in_world(world, i + 2)
+			total += time.perf_counter() - start
+		return (total / ROUNDS, (auth.logins - logins) // ROUNDS, (auth.reconnects - reconnects) // ROUNDS,
+			(world.rejected - rejected) // ROUNDS)
+	finally:
+		await world.close()
+		await session
+		await auth.close()
+
+
+def main() -> None:
+	logging.disable(logging.CRITICAL)
+	# Long enough for the stand-in to answer, short enough for ROUNDS rounds
+	GameConnector.AUTH_TIMEOUT = 0.2
+	scenarios = (
+		("key valid, world server directly", key_valid, (0, 0, 0)),
+		("world rejects key, realm reconnect", world_rejects_once, (0, 1, 1)),
+		("world silent, realm reconnect", world_silent_once, (0, 1, 0)),
+		("world silent twice, full logon", world_silent_twice, (1, 1, 0)),
+		("auth forgot session, full logon", auth_forgot, (1, 0, 1)),
+		("no session kept, full logon", no_session, (1, 0, 0)),
+	)
+	for expansion in (WowExpansion.Vanilla, WowExpansion.WotLK):
+		for name, prepare, expected in scenarios:
+			seconds, logins, reconnects, rejected = asyncio.run(run(expansion, prepare))
+			assert (logins, reconnects, rejected) == expected, (name, logins, reconnects, rejected)
+			print(f"{expansion + ', ' + name:<48} {seconds * 1000:>8.2f} ms back in world  "
+				f"(SRP logons {logins}, realm reconnects {reconnects}, world rejections {rejected})")
+
+
+if __name__ == "__main__":
+	main()
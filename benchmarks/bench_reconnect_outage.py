@@ -0,0 +1,186 @@
+"""Recovery from server outages under the reconnect scheduler.
+
+A ConnectionSupervisor keeps a character in the world on the stand-in auth
+and world servers while they go down and come back on the same ports. Each
+outage runs with the scheduler from before (10 seconds after any failure,
+no probes) and with ReconnectDelay's backoff plus TCP probes. Time is
+scaled by SCALE so a five-minute outage takes a second and a half; results
+are in simulated seconds, the real cost of the handshakes scaled up with it.
+
+- world server restart: the realm server keeps the session key
+- full outage: both servers restart, the auth server forgot the key
+- world server down after an auth restart: every try is a full SRP logon
+- realm rejects one logon: e.g. the realm still holds the last session
+- realm rejects logons: a logon that fails after SRP, e.g. a busy realm
+
+Mean time to recovery is measured from the servers coming back to the
+character being in the world again. Handshakes count SRP logon proofs,
+realm reconnect challenges and world sessions the servers had to answer.
+
+Run from the repository root:
+
+	python -m benchmarks.bench_reconnect_outage
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, List, Tuple
+
+from benchmarks._auth_server import StandInAuthServer
+from benchmarks._world_server import StandInWorldServer
+from benchmarks.bench_realm_framer import make_conf
+from wowchat.common.config import WowExpansion
+from wowchat.common.global_state import Global
+from wowchat.common.metrics import metrics
+from wowchat.common.reconnect_delay import FailureClass, ReconnectDelay
+from wowchat.realm.packets import RealmPackets
+from wowchat.realm.supervisor import ConnectionSupervisor
+
+# Real seconds per simulated second
+SCALE = 0.005
+ROUNDS = 3
+
+
+class FixedDelay(ReconnectDelay):
+	"""The scheduler before: 10 seconds after any failure, none after a session"""
+
+	def session_ended(self) -> float:
+		return 0.0
+
+	def get_next(self, failure_class: str = FailureClass.NETWORK) -> float:
+		super().get_next(failure_class)
+		return 10 * SCALE
+
+
+def scaled_delay() -> ReconnectDelay:
+	policies = {name: (first * SCALE, cap * SCALE) for name, (first, cap) in ReconnectDelay.POLICIES.items()}
+	return ReconnectDelay(policies, ReconnectDelay.STABLE_SESSION * SCALE)
+
+
+class Servers:
+	def __init__(self, expansion: str) -> None:
+		self.auth = StandInAuthServer(expansion, [])
+		self.world = StandInWorldServer(expansion, self.auth)
+		self.auth_port = 0
+		self.world_port = 0
+
+	async def start(self) -> None:
+		self.world_port = await self.world.start(port=self.world_port)
+		self.auth.set_realms([("Stand-in", f"127.0.0.1:{self.world_port}", 1)])
+		self.auth_port = await self.auth.start(port=self.auth_port)
+
+	def handshakes(self) -> int:
+		reconnects = self.auth.received.count(RealmPackets.CMD_AUTH_RECONNECT_CHALLENGE)
+		return self.auth.proofs + reconnects + self.world.auth_sessions
+
+
+# Takes the servers down, returns once they are back: simulated seconds of
+# each phase are slept scaled
+Outage = Callable[[Servers], Awaitable[None]]
+
+
+async def world_restart(servers: Servers) -> None:
+	await servers.world.close()
+	await asyncio.sleep(60 * SCALE)
+	await servers.world.start(port=servers.world_port)
+
+
+async def full_outage(servers: Servers) -> None:
+	await servers.world.close()
+	await servers.auth.close()
+	servers.auth.forget_sessions()
+	await asyncio.sleep(180 * SCALE)
+	await servers.start()
+
+
+async def world_down_after_auth_restart(servers: Servers) -> None:
+	servers.auth.forget_sessions()
+	await servers.world.close()
+	await asyncio.sleep(120 * SCALE)
+	await servers.world.start(port=servers.world_port)
+
+
+async def realm_rejects_one_logon(servers: Servers) -> None:
+	servers.auth.forget_sessions()
+	servers.auth.proof_result = RealmPackets.AuthResult.WOW_FAIL_ALREADY_ONLINE
+	proofs = servers.auth.proofs
+	servers.world.drop()
+	while servers.auth.proofs == proofs:
+		await asyncio.sleep(SCALE)
+	servers.auth.proof_result = RealmPackets.AuthResult.WOW_SUCCESS
+
+
+async def realm_rejects_logons(servers: Servers) -> None:
+	servers.auth.forget_sessions()
+	servers.auth.proof_result = RealmPackets.AuthResult.WOW_FAIL_ALREADY_ONLINE
+	servers.world.drop()
+	await asyncio.sleep(120 * SCALE)
+	servers.auth.proof_result = RealmPackets.AuthResult.WOW_SUCCESS
+
+
+async def wait_in_world(world: StandInWorldServer, count: int) -> None:
+	while world.in_world < count:
+		await world.entered.wait()
+		world.entered.clear()
+
+
+async def run(expansion: str, outage: Outage, adaptive: bool) -> Tuple[float, float]:
+	"""Mean simulated seconds to recover and handshakes per outage"""
+	servers = Servers(expansion)
+	await servers.start()
+	conf = make_conf(expansion, servers.auth_port, "stand-in")
+	Global.config = conf  # type: ignore[assignment]
+	if adaptive:
+		supervisor = ConnectionSupervisor(conf, reconnect_delay=scaled_delay(),  # type: ignore[arg-type]
+			probe_interval=ConnectionSupervisor.PROBE_INTERVAL * SCALE)
+	else:
+		supervisor = ConnectionSupervisor(conf, reconnect_delay=FixedDelay(), probe_interval=0)  # type: ignore[arg-type]
+	task = asyncio.get_running_loop().create_task(supervisor.run())
+	recovery: List[float] = []
+	handshakes = 0
+	try:
+		await wait_in_world(servers.world, 1)
+		for i in range(ROUNDS):
+			# Long enough in the world for the session to count as stable
+			await asyncio.sleep(ReconnectDelay.STABLE_SESSION * SCALE * 1.2)
+			before = servers.handshakes()
+			await outage(servers)
+			back = time.perf_counter()
+			await asyncio.wait_for(wait_in_world(servers.world, i + 2), 1000 * SCALE)
+			recovery.append((time.perf_counter() - back) / SCALE)
+			handshakes += servers.handshakes() - before
+		return sum(recovery) / ROUNDS, handshakes / ROUNDS
+	finally:
+		task.cancel()
+		await servers.world.close()
+		await servers.auth.close()
+
+
+def main() -> None:
+	logging.disable(logging.CRITICAL)
+	scenarios = (
+		# name, outage, whether the adaptive scheduler must also recover faster
+		("world server restart, 60 s", world_restart, True),
+		("full outage, 180 s", full_outage, True),
+		("world down after auth restart, 120 s", world_down_after_auth_restart, True),
+		("realm rejects one logon", realm_rejects_one_logon, True),
+		# Retries 7.5 to 15 seconds apart against the old 10: fewer SRP
+		# logons, and about the same recovery time, too close to assert
+		("realm rejects logons, 120 s", realm_rejects_logons, False),
+	)
+	for expansion in (WowExpansion.Vanilla, WowExpansion.WotLK):
+		for name, outage, faster in scenarios:
+			fixed_mttr, fixed_handshakes = asyncio.run(run(expansion, outage, False))
+			metrics.reset()
+			mttr, handshakes = asyncio.run(run(expansion, outage, True))
+			assert handshakes <= fixed_handshakes, (name, handshakes, fixed_handshakes)
+			assert not faster or mttr < fixed_mttr, (name, mttr, fixed_mttr)
+			print(f"{expansion + ', ' + name:<48} MTTR {fixed_mttr:>6.1f} s -> {mttr:>5.1f} s  "
+				f"handshakes {fixed_handshakes:>5.1f} -> {handshakes:>4.1f} per outage  "
+				f"({metrics.counter('reconnect.probes')} probes)")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,172 @@
+"""Relogin with the character GUID kept from the last session.
+
+A RealmConnector reconnects to the stand-in world server with a valid
+session key, over and over. With the GUID in the state store it sends
+CMSG_PLAYER_LOGIN right after SMSG_AUTH_RESPONSE; without it, it asks for
+SMSG_CHAR_ENUM (ten characters here) and picks its own first, as every
+relogin did before. Every client packet is answered after LATENCY, so the
+saved round trip shows as it would against a remote server. The fallbacks
+are checked too:
+
+- stale GUID: SMSG_CHARACTER_LOGIN_FAILED, then the character list
+- a server that once ends the session before the world: still the GUID
+- a server that kicks a login without the list: DIRECT_FAILURES times,
+  then the list until DIRECT_RETRY is up, then the GUID again
+- the GUID survives a restart in the state file
+
+Run from the repository root:
+
+	python -m benchmarks.bench_relogin
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from typing import Tuple
+
+from benchmarks._auth_server import StandInAuthServer
+from benchmarks._world_server import StandInWorldServer
+from benchmarks.bench_realm_framer import make_conf
+from benchmarks.bench_reconnect import wait_in_world
+from wowchat.common.config import WowExpansion
+from wowchat.common.global_state import Global
+from wowchat.common.state_store import StateStore
+from wowchat.game.handler import GamePacketHandler
+from wowchat.realm.connector import RealmConnector
+
+ROUNDS = 50
+ALTS = 9
+# Seconds per round trip to the stand-in world server
+LATENCY = 0.002
+
+
+class Servers:
+	def __init__(self, expansion: str, **world_options: object) -> None:
+		self.auth = StandInAuthServer(expansion, [])
+		self.world = StandInWorldServer(expansion, self.auth, other_characters=ALTS, **world_options)  # type: ignore[arg-type]
+
+	async def __aenter__(self) -> Tuple[RealmConnector, StandInWorldServer]:
+		world_port = await self.world.start()
+		self.auth.set_realms([("Stand-in", f"127.0.0.1:{world_port}", 1)])
+		self.conf = make_conf(self.world.expansion, await self.auth.start(), "stand-in")
+		Global.config = self.conf  # type: ignore[assignment]
+		self.realm = RealmConnector(asyncio.get_running_loop())
+		return self.realm, self.world
+
+	async def __aexit__(self, *exc: object) -> None:
+		await self.world.close()
+		await self.auth.close()
+
+	async def session(self, count: int) -> bool:
+		"""Reconnect, wait for the world, then drop; whether it got in"""
+		realm = self.realm
+		task = asyncio.get_running_loop().create_task(
+			realm.reconnect(self.conf) if realm.session else realm.connect(self.conf))  # type: ignore[arg-type]
+		entered = asyncio.get_running_loop().create_task(wait_in_world(self.world, count))
+		await asyncio.wait((task, entered), return_when=asyncio.FIRST_COMPLETED)
+		self.world.drop()
+		in_world = await task
+		entered.cancel()
+		return in_world
+
+
+async def relogins(expansion: str, cached: bool) -> Tuple[float, int]:
+	"""Mean seconds per relogin and character lists asked for"""
+	Global.state = StateStore()
+	servers = Servers(expansion, latency=LATENCY)
+	async with servers as (realm, world):
+		assert await servers.session(1)
+		enums = world.char_enums
+		start = time.perf_counter()
+		for i in range(ROUNDS):
+			if not cached:
+				Global.state.section(GamePacketHandler.CHARACTER_CACHE).clear()
+			assert await servers.session(i + 2)
+		return (time.perf_counter() - start) / ROUNDS, world.char_enums - enums
+
+
+async def check_fallbacks(expansion: str) -> None:
+	cache = lambda: Global.state.section(GamePacketHandler.CHARACTER_CACHE)  # noqa: E731
+
+	# Character deleted and recreated: the cached GUID is refused
+	Global.state = StateStore()
+	servers = Servers(expansion)
+	async with servers as (realm, world):
+		assert await servers.session(1)
+		world.guid = 42
+		assert await servers.session(2)
+		assert (world.login_failures, world.char_enums) == (1, 2)
+		assert [entry['guid'] for entry in cache().values()] == [42]
+		assert await servers.session(3)
+		assert world.char_enums == 2
+
+	# A server that once ends the session before the world, as on a restart
+	Global.state = StateStore()
+	servers = Servers(expansion)
+	async with servers as (realm, world):
+		assert await servers.session(1)
+		world.require_char_enum = True
+		assert not await servers.session(2)
+		world.require_char_enum = False
+		assert await servers.session(2)
+		assert (world.login_failures, world.char_enums) == (1, 1)
+		assert [(entry['direct'], entry['failures']) for entry in cache().values()] == [(True, 0)]
+
+	# Server that only lets characters from its list in
+	Global.state = StateStore()
+	servers = Servers(expansion, require_char_enum=True)
+	failures = GamePacketHandler.DIRECT_FAILURES
+	async with servers as (realm, world):
+		assert await servers.session(1)
+		for _ in range(failures):
+			assert not await servers.session(2)
+		assert await servers.session(2)
+		assert await servers.session(3)
+		assert (world.login_failures, world.char_enums) == (failures, 3)
+		assert [entry['direct'] for entry in cache().values()] == [False]
+		# Once DIRECT_RETRY is up the cached GUID is tried again; a refusal
+		# then goes straight back to the list
+		for entry in cache().values():
+			entry['retry_at'] = 0.0
+		assert not await servers.session(4)
+		assert await servers.session(4)
+		assert (world.login_failures, world.char_enums) == (failures + 1, 4)
+		assert [entry['direct'] for entry in cache().values()] == [False]
+		# The server lets it in without the list after all
+		for entry in cache().values():
+			entry['retry_at'] = 0.0
+		world.require_char_enum = False
+		assert await servers.session(5)
+		assert world.char_enums == 4
+		assert [(entry['direct'], entry['failures']) for entry in cache().values()] == [(True, 0)]
+
+	# The GUID outlives the process
+	with tempfile.TemporaryDirectory() as tmp:
+		path = os.path.join(tmp, "state.json")
+		Global.state = StateStore(path)
+		servers = Servers(expansion)
+		async with servers as (realm, world):
+			assert await servers.session(1)
+			Global.state = StateStore(path)
+			realm.session = None
+			assert await servers.session(2)
+			assert world.char_enums == 1
+
+
+def main() -> None:
+	logging.disable(logging.CRITICAL)
+	for expansion in (WowExpansion.Vanilla, WowExpansion.TBC, WowExpansion.WotLK):
+		asyncio.run(check_fallbacks(expansion))
+		listed, enums = asyncio.run(relogins(expansion, False))
+		assert enums == ROUNDS
+		cached, enums = asyncio.run(relogins(expansion, True))
+		assert enums == 0
+		name = f"{expansion} relogin, {ALTS + 1} characters, {LATENCY * 1000:.0f} ms RTT"
+		print(f"{name:<48} {listed * 1000:>7.2f} ms with SMSG_CHAR_ENUM  {cached * 1000:>7.2f} ms with the cached GUID")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,240 @@
+"""Routing SMSG_MESSAGECHAT to Discord through RoutingIndex.
+
+A config mirrors guild and officer chat and CUSTOM custom channels to
+Discord, some channels to more than one Discord channel, with global spam
+filters. The chat stream mixes those channels with unrouted ones. The
+baseline is the Scala way: a map to (channel, channel config) pairs
+keyed like the index, with the format and filters resolved from the
+config for every target of every message and each pattern matched by its
+source text. Reported per message:
+
+- lookup: finding the targets with their format and filters
+- lookup + filter: the same plus the filter decision on the message
+
+Also checked: both give the same targets; a recompiled index replaces the
+old one whole and neither can be changed in place; chat type names in the
+config parse to each expansion's numbers. The other way, a long Discord
+message is split at spaces into lines WoW chat takes, each filtered on
+its own, a .command goes as it is when the config allows it, and the
+lines reach the stand-in world server as CMSG_MESSAGECHAT.
+
+Run from the repository root:
+
+	python -m benchmarks.bench_routing
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import re
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks._util import measure, report
+from benchmarks.bench_names import Session
+from wowchat.common.config import (
+	ChannelConfig, DiscordChannelConfig, FiltersConfig, GuildConfig, GuildNotificationConfig, WowChannelConfig,
+	WowExpansion, _parse_chat_type,
+)
+from wowchat.common.format_template import WOW_FIELDS, FormatTemplate
+from wowchat.common.global_state import Global
+from wowchat.common.message_filter import NO_FILTER
+from wowchat.common.routing import ChatDirection, RoutingIndex, ToWow
+from wowchat.discord.relay import MAX_WOW_MESSAGE, send_directly, wow_deliveries, wow_lines
+from wowchat.game.dispatch import load_expansion
+from wowchat.game.packets import ChatEvents, Races
+
+CUSTOM = 38
+MESSAGES = 200_000
+PATTERNS = [
+	r".*(?:gold|g0ld).*(?:www|\.com).*", r".*\bWTS\b.*boost.*", r".*discord\.gg/.*",
+	r".*cheap.*(?:gold|items).*", r".*\[Guild Recruit].*", r".*(?:selling|buying) accounts?.*",
+]
+CUSTOM_NAMES = ["World", "LookingForGroup", "Trade", "General"] + [f"Custom{i}" for i in range(CUSTOM - 4)]
+
+
+def make_config(filters_enabled: bool = True) -> SimpleNamespace:
+	channels = [
+		ChannelConfig(ChatDirection.both,
+			WowChannelConfig(None, ChatEvents.CHAT_MSG_GUILD, None, FormatTemplate("[%user]: %message"), None),
+			DiscordChannelConfig("guild-chat", FormatTemplate("[%user]: %message"), None)),
+		ChannelConfig(ChatDirection.wow_to_discord,
+			WowChannelConfig(None, ChatEvents.CHAT_MSG_OFFICER, None, FormatTemplate(""), None),
+			DiscordChannelConfig("officers", FormatTemplate("[%user]: %message"), FiltersConfig(False, []))),
+	]
+	for i, name in enumerate(CUSTOM_NAMES):
+		# Every third channel also goes to a shared feed
+		for discord in (f"wow-{name.lower()}",) + (("all-channels",) if i % 3 == 0 else ()):
+			channels.append(ChannelConfig(ChatDirection.wow_to_discord,
+				WowChannelConfig(None, ChatEvents.CHAT_MSG_CHANNEL, name, FormatTemplate(""), None),
+				DiscordChannelConfig(discord, FormatTemplate("[%target] [%user]: %message"), None)))
+	return SimpleNamespace(
+		channels=channels,
+		filters=FiltersConfig(filters_enabled, PATTERNS),
+		guildConfig=GuildConfig({"online": GuildNotificationConfig(True, FormatTemplate(""), "guild-log")}),
+		expansion=WowExpansion.Vanilla,
+	)
+
+
+def text_channels(conf: SimpleNamespace) -> List[SimpleNamespace]:
+	names = {channel.discord.channel for channel in conf.channels} | {"guild-log", "off-topic"}
+	return [SimpleNamespace(name=name, id=1000 + i) for i, name in enumerate(sorted(names))]
+
+
+class ScalaMaps:
+	"""Global.wowToDiscord as Discord.scala fills it"""
+
+	def __init__(self, conf: SimpleNamespace, channels: List[SimpleNamespace]) -> None:
+		self.conf = conf
+		self.wow_to_discord: Dict[Tuple[int, Optional[str]], List[Tuple[SimpleNamespace, DiscordChannelConfig]]] = {}
+		for channel in channels:
+			for channel_config in conf.channels:
+				if channel_config.discord.channel.lower() != channel.name.lower():
+					continue
+				if channel_config.chatDirection in (ChatDirection.both, ChatDirection.wow_to_discord):
+					wow = channel_config.wow
+					key = (wow.tp, wow.channel.lower() if wow.channel is not None else None)
+					self.wow_to_discord.setdefault(key, []).append((channel, channel_config.discord))
+
+	def targets(self, tp: int, channel: Optional[str]) -> List[Tuple[object, str, List[str]]]:
+		bindings = self.wow_to_discord.get((tp, channel.lower() if channel is not None else None))
+		if not bindings:
+			return []
+		resolved = []
+		for discord_channel, discord_config in bindings:
+			filters = discord_config.filters if discord_config.filters is not None else self.conf.filters
+			patterns = filters.patterns if filters is not None and filters.enabled else []
+			resolved.append((discord_channel, discord_config.format.text, patterns))
+		return resolved
+
+
+def stream(seed: int = 1) -> List[Tuple[int, Optional[str], str]]:
+	"""(chat type, channel, text) as the server sends them"""
+	rng = random.Random(seed)
+	unrouted = ["LocalDefense", "WorldDefense", "GuildRecruitment"]
+	kinds = [(ChatEvents.CHAT_MSG_CHANNEL, name) for name in CUSTOM_NAMES[:4] * 6 + CUSTOM_NAMES + unrouted]
+	kinds += [(ChatEvents.CHAT_MSG_GUILD, None)] * 8 + [(ChatEvents.CHAT_MSG_SAY, None)] * 4
+	texts = ["LF2M heroic, need heals", "WTS [Arcanite Bar] 20g", "anyone up for a dungeon?", "cheap gold www.example.com"]
+	return [kinds[rng.randrange(len(kinds))] + (texts[rng.randrange(len(texts))],) for _ in range(MESSAGES)]
+
+
+def check_to_wow(routes: RoutingIndex, channels: List[SimpleNamespace]) -> None:
+	guild_chat = next(c for c in channels if c.name == "guild-chat")
+	targets = routes.wow_targets("Guild-Chat", guild_chat.id)
+	assert [(t.tp, t.channel) for t in targets] == [(ChatEvents.CHAT_MSG_GUILD, None)]
+	assert routes.wow_targets("officers", 0) == ()
+
+	rng = random.Random(2)
+	words = ["heals", "tank", "Arcanite", "tonight", "anyone", "dungeon", "x" * 300]
+	message = " ".join(rng.choice(words) for _ in range(200))
+	fmt = FormatTemplate("%user: %message", WOW_FIELDS)
+	lines = wow_lines(fmt, "Alice", message)
+	assert len(lines) > 1 and all(len(line) <= MAX_WOW_MESSAGE for line in lines)
+	assert all(line.startswith("Alice: ") for line in lines)
+	parts = [line[len("Alice: "):] for line in lines]
+	assert "".join(parts).replace(" ", "") == message.replace(" ", "")
+	assert all(" " not in part or len(part) < MAX_WOW_MESSAGE - len("Alice: ") for part in parts)
+	assert wow_lines(fmt, "Alice", "hi") == ["Alice: hi"]
+
+	spam = wow_deliveries(targets, "Alice", "cheap gold and items", False)
+	assert [(d.text, d.filtered) for d in spam] == [("[Alice]: cheap gold and items", True)]
+	assert not wow_deliveries(targets, "Alice", "gz!", False)[0].filtered
+
+	assert send_directly(".who Alice", True, set()) and not send_directly(".who", False, set())
+	assert not send_directly("who", True, set())
+	whitelist = {"who", "guild*"}
+	assert send_directly(".who", True, whitelist) and send_directly(".Guild info", True, whitelist)
+	assert not send_directly(".gm on", True, whitelist)
+	direct = wow_deliveries(targets, "Alice", ".who", True)
+	assert [d.text for d in direct] == [".who"]
+
+	for expansion in (WowExpansion.Vanilla, WowExpansion.TBC, WowExpansion.WotLK):
+		asyncio.run(check_world_chat(expansion))
+
+
+async def check_world_chat(expansion: str) -> None:
+	chat = load_expansion(expansion)[0].packets.ChatEvents
+	sent = [
+		(chat.CHAT_MSG_GUILD, "[Alice]: hello", None),
+		(chat.CHAT_MSG_CHANNEL, "[Alice]: LF2M", "World"),
+		(chat.CHAT_MSG_WHISPER, "psst", "Brannor"),
+	]
+	async with Session(expansion) as world:
+		for tp, text, target in sent:
+			delivery = wow_deliveries([ToWow(tp, target, FormatTemplate("%message", WOW_FIELDS), NO_FILTER)], "Alice", text, False)[0]
+			Global.game.send_message_to_wow(tp, delivery.text, target)  # type: ignore[union-attr]
+		for _ in range(500):
+			if len(world.chat) == len(sent):
+				break
+			await asyncio.sleep(0.01)
+		language = Races.language(Global.game._race)  # type: ignore[union-attr]
+		assert world.chat == [(tp, language, target, text) for tp, text, target in sent], world.chat
+
+
+def main() -> None:
+	conf = make_config()
+	channels = text_channels(conf)
+	scala = ScalaMaps(conf, channels)
+	routes = RoutingIndex.build(conf, channels)  # type: ignore[arg-type]
+	chat = stream()
+
+	for tp, channel, _ in set((tp, channel, "") for tp, channel, _ in chat):
+		old = sorted((c.name, f, list(p)) for c, f, p in scala.targets(tp, channel))
+		new = sorted((t.channel.name, t.format.text, list(t.filters.patterns)) for t in routes.discord_targets(tp, channel))
+		assert old == new, (tp, channel, old, new)
+		assert routes.routed(tp, channel) == bool(new)
+	assert [bool(t.filters) for t in routes.discord_targets(ChatEvents.CHAT_MSG_OFFICER, None)] == [False]
+	assert [c.name for c in routes.guild_event_channels("online")] == ["guild-log"]
+	assert [c.name for c in routes.guild_event_channels("joined")] == ["guild-chat"]
+	check_to_wow(routes, channels)
+
+	def scala_lookup() -> None:
+		for tp, channel, _ in chat:
+			scala.targets(tp, channel)
+
+	def index_lookup() -> None:
+		targets = routes.discord_targets
+		for tp, channel, _ in chat:
+			targets(tp, channel)
+
+	def scala_filter() -> None:
+		for tp, channel, text in chat:
+			for _, _, patterns in scala.targets(tp, channel):
+				any(re.fullmatch(pattern, text) for pattern in patterns)
+
+	def index_filter() -> None:
+		targets = routes.discord_targets
+		for tp, channel, text in chat:
+			for target in targets(tp, channel):
+				target.filtered(text)
+
+	old_lookup, new_lookup = measure(scala_lookup), measure(index_lookup)
+	report("lookup, map of pairs + config", MESSAGES, old_lookup, "msgs")
+	report("lookup, RoutingIndex", MESSAGES, new_lookup, "msgs")
+	report("lookup + filter, map of pairs + config", MESSAGES, measure(scala_filter), "msgs")
+	report("lookup + filter, RoutingIndex", MESSAGES, measure(index_filter), "msgs")
+	report("compile RoutingIndex", 100, measure(lambda: [RoutingIndex.build(conf, channels) for _ in range(100)]), "builds")  # type: ignore[arg-type]
+	assert new_lookup < old_lookup
+
+	# A reload compiles a new index; the old one is left as it was
+	reloaded = RoutingIndex.build(make_config(filters_enabled=False), channels)  # type: ignore[arg-type]
+	world = (ChatEvents.CHAT_MSG_CHANNEL, "World")
+	assert all(t.filters for t in routes.discord_targets(*world))
+	assert not any(t.filters for t in reloaded.discord_targets(*world))
+	for mapping in (routes.to_discord, routes.to_wow):
+		try:
+			mapping[world] = ()  # type: ignore[index]
+		except TypeError:
+			pass
+		else:
+			raise AssertionError("routes changed in place")
+
+	import wowchat.game.packets_tbc as tbc
+	assert _parse_chat_type("Guild", WowExpansion.Vanilla) == ChatEvents.CHAT_MSG_GUILD == 0x03
+	assert _parse_chat_type("guild", WowExpansion.TBC) == tbc.ChatEvents.CHAT_MSG_GUILD == 0x04
+	assert _parse_chat_type("custom", WowExpansion.WotLK) == tbc.ChatEvents.CHAT_MSG_CHANNEL
+	assert _parse_chat_type("14", WowExpansion.Vanilla) == 14 and _parse_chat_type("bogus", WowExpansion.Vanilla) == -1
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,238 @@
+"""SRP6 logon: BigNumber wrappers against native ints with a cached verifier.
+
+Test vectors are checked first: pinned values for fixed inputs, agreement
+with the server-side equations of the stand-in auth server, and with the
+old BigNumber implementation wherever that one was right. A RealmConnector
+keeps x and the verifier per account and salt for its next logons, never
+the password, and drops them when the server turns a proof down.
+
+Run from the repository root:
+
+	python -m benchmarks.bench_srp
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Tuple
+
+from benchmarks._auth_server import G, N, SRPServerSession, StandInAuthServer
+from benchmarks._util import measure, report
+from benchmarks.bench_realm_framer import REALMS, RecordingRealmConnector, make_conf
+from wowchat.common.config import WowExpansion
+from wowchat.realm.connector import RealmAuthError
+from wowchat.realm.packets import RealmPackets
+from wowchat.realm.srp_client import SRPClient, password_verifier
+
+ACCOUNT = b"ACCOUNT"
+PASSWORD = "password"
+SALT = bytes(range(32))
+CLIENT_A = 0x1234567890ABCDEF1234567890ABCDEF123456
+SERVER_B = 0xFEDCBA0987654321FEDCBA0987654321FEDCBA
+HANDSHAKES = 300
+LOGINS = 50
+
+# Computed for the inputs above and checked against SRPServerSession
+VECTOR_A = "ae5d1a3ed9b7629ae729dc12b6e6eadae1dc0fe2574d8df4bf44578a65f5072e"
+VECTOR_K = "081a7c927d394996e8c23c5a1d762c221d78116f3b6819b343852c0c39659decef9322ac74290a2e"
+VECTOR_M1 = "3a091742bdcdbc6ee72d214bd1468aa2d1e5a877"
+
+
+@dataclass
+class BigNumber:
+	"""wowchat.realm.big_number.BigNumber as it was"""
+	value: int
+
+	@staticmethod
+	def from_bytes(b: bytes, reverse: bool = False) -> "BigNumber":
+		arr = bytearray(b)
+		if reverse:
+			arr.reverse()
+		if arr and arr[0] & 0x80:
+			arr = bytearray((0,)) + arr
+		return BigNumber(int.from_bytes(arr, byteorder="big", signed=False))
+
+	def mul(self, other: "BigNumber") -> "BigNumber":
+		return BigNumber(self.value * abs(other.value))
+
+	def sub(self, other: "BigNumber") -> "BigNumber":
+		return BigNumber(self.value - abs(other.value))
+
+	def add(self, other: "BigNumber") -> "BigNumber":
+		return BigNumber(self.value + abs(other.value))
+
+	def mod_pow(self, v1: "BigNumber", v2: "BigNumber") -> "BigNumber":
+		return BigNumber(pow(self.value, abs(v1.value), abs(v2.value)))
+
+	def as_byte_array(self, req_size: int = 0, reverse: bool = True) -> bytes:
+		arr = self.value.to_bytes((self.value.bit_length() + 7) // 8 or 1, "big")
+		if arr and arr[0] == 0:
+			arr = arr[1:]
+		if reverse:
+			arr = arr[::-1]
+		if req_size > len(arr):
+			arr = arr + bytes(req_size - len(arr))
+		return arr
+
+
+def legacy_step1(account: bytes, password: str, a: int, B: int, g: int, N_: int, salt: bytes) -> Tuple[bytes, bytes, bytes]:
+	"""SRPClient.step1 as it was; returns (A, M1, K) as the connector sent them"""
+	k = BigNumber(3)
+	a_ = BigNumber(a)
+	B_, g_, N_b = BigNumber(B), BigNumber(g), BigNumber(N_)
+	s = BigNumber.from_bytes(salt, reverse=True)
+	A = g_.mod_pow(a_, N_b)
+	md = hashlib.sha1()
+	md.update(A.as_byte_array(32))
+	md.update(B_.as_byte_array(32))
+	u = BigNumber.from_bytes(bytearray(md.digest()), reverse=True)
+	md = hashlib.sha1()
+	md.update(account + b":" + password.upper().encode("utf-8"))
+	p = md.digest()
+	md = hashlib.sha1()
+	md.update(s.as_byte_array(32))
+	md.update(p)
+	x = BigNumber.from_bytes(bytearray(md.digest()), reverse=True)
+	S = B_.sub(g_.mod_pow(x, N_b).mul(k)).mod_pow(a_.add(u.mul(x)), N_b)
+	t = S.as_byte_array(32)
+	vK = bytearray(40)
+	md = hashlib.sha1()
+	md.update(bytes(t[0::2]))
+	digest = md.digest()
+	for i in range(20):
+		vK[i * 2] = digest[i]
+	md = hashlib.sha1()
+	md.update(bytes(t[1::2]))
+	digest = md.digest()
+	for i in range(20):
+		vK[i * 2 + 1] = digest[i]
+	md = hashlib.sha1()
+	md.update(N_b.as_byte_array(32))
+	hashN = bytearray(md.digest())
+	md = hashlib.sha1()
+	md.update(g_.as_byte_array(1))
+	digest = md.digest()
+	for i in range(20):
+		hashN[i] = hashN[i] ^ digest[i]
+	md = hashlib.sha1()
+	md.update(account)
+	t4 = md.digest()
+	K = BigNumber.from_bytes(vK, reverse=True)
+	t3 = BigNumber.from_bytes(hashN, reverse=True)
+	t4_correct = BigNumber.from_bytes(bytearray(t4), reverse=True)
+	md = hashlib.sha1()
+	md.update(t3.as_byte_array(20))
+	md.update(t4_correct.as_byte_array(20))
+	md.update(s.as_byte_array(32))
+	md.update(A.as_byte_array(32))
+	md.update(B_.as_byte_array(32))
+	md.update(K.as_byte_array(40))
+	M = BigNumber.from_bytes(bytearray(md.digest()))
+	return A.as_byte_array(32), M.as_byte_array(20, reverse=False), K.as_byte_array(40)
+
+
+def handshake(account: bytes, salt: bytes, a: int, b: int) -> Tuple[SRPClient, SRPServerSession]:
+	server = SRPServerSession(account, PASSWORD, salt, b)
+	client = SRPClient(a)
+	client.step1(account, password_verifier(account, PASSWORD, salt, G, N), int.from_bytes(server.B, "little"), G, N, salt)
+	return client, server
+
+
+def check_vectors() -> None:
+	client, server = handshake(ACCOUNT, SALT, CLIENT_A, SERVER_B)
+	assert client.A.hex() == VECTOR_A, client.A.hex()
+	assert client.K.hex() == VECTOR_K, client.K.hex()
+	assert client.M1.hex() == VECTOR_M1, client.M1.hex()
+	assert server.verify(client.A, client.M1) == (client.generate_hash_logon_proof(), client.K)
+	assert not client.verify_server_proof(bytes(20))
+
+	rnd = random.Random(10)
+	legacy_m1_wrong = 0
+	for i in range(300):
+		account = f"ACCOUNT{i % 7}".encode()
+		salt = rnd.randbytes(32)
+		client, server = handshake(account, salt, rnd.getrandbits(152), rnd.getrandbits(152))
+		verified = server.verify(client.A, client.M1)
+		assert verified is not None and client.verify_server_proof(verified[0]) and verified[1] == client.K
+		A, M1, K = legacy_step1(account, PASSWORD, client._fixed_a, int.from_bytes(server.B, "little"), G, N, salt)  # type: ignore[arg-type]
+		assert (A, K) == (client.A, client.K)
+		if client.M1[0] == 0:
+			# The old M1 round trip dropped a leading zero byte and padded at the end
+			assert M1 != client.M1
+			legacy_m1_wrong += 1
+		else:
+			assert M1 == client.M1
+	print(f"{300 - legacy_m1_wrong} of 300 random handshakes matched the old code; "
+		f"{legacy_m1_wrong} had an M1 starting with 0, which it sent mangled")
+	# Wrong password: the server must reject the proof
+	server = SRPServerSession(ACCOUNT, "other", SALT, SERVER_B)
+	client = SRPClient(CLIENT_A)
+	client.step1(ACCOUNT, password_verifier(ACCOUNT, PASSWORD, SALT, G, N), int.from_bytes(server.B, "little"), G, N, SALT)
+	assert server.verify(client.A, client.M1) is None
+
+
+async def check_verifier_cache() -> None:
+	server = StandInAuthServer(WowExpansion.WotLK, REALMS)
+	port = await server.start()
+	conf = make_conf(WowExpansion.WotLK, port, "stand-in")
+	try:
+		connector = RecordingRealmConnector(asyncio.get_running_loop())
+		for _ in range(3):
+			await connector.connect(conf)  # type: ignore[arg-type]
+			assert connector._session_key == server.session_keys[-1]
+		assert list(connector._verifiers) == [(ACCOUNT, server.salt, G, N)]
+		assert PASSWORD not in repr(connector._verifiers)
+		assert not hasattr(password_verifier, "cache_info")
+
+		server.proof_result = RealmPackets.AuthResult.WOW_FAIL_INCORRECT_PASSWORD
+		try:
+			await connector.connect(conf)  # type: ignore[arg-type]
+		except RealmAuthError:
+			pass
+		else:
+			raise AssertionError("logon not turned down")
+		assert not connector._verifiers
+	finally:
+		await server.close()
+
+
+async def logins(count: int) -> float:
+	server = StandInAuthServer(WowExpansion.WotLK, REALMS)
+	port = await server.start()
+	try:
+		start = time.perf_counter()
+		for _ in range(count):
+			connector = RecordingRealmConnector(asyncio.get_running_loop())
+			await connector.connect(make_conf(WowExpansion.WotLK, port, "stand-in"))  # type: ignore[arg-type]
+			assert connector._session_key == server.session_keys[-1]
+		assert server.logins == count
+		return time.perf_counter() - start
+	finally:
+		await server.close()
+
+
+def main() -> None:
+	logging.disable(logging.CRITICAL)
+	check_vectors()
+	asyncio.run(check_verifier_cache())
+	server = SRPServerSession(ACCOUNT, PASSWORD, SALT)
+	B = int.from_bytes(server.B, "little")
+	client = SRPClient()
+	verifier = password_verifier(ACCOUNT, PASSWORD, SALT, G, N)
+
+	def fresh_accounts() -> None:
+		for _ in range(HANDSHAKES):
+			client.step1(ACCOUNT, password_verifier(ACCOUNT, PASSWORD, SALT, G, N), B, G, N, SALT)
+
+	report("BigNumber step1", HANDSHAKES, measure(lambda: [legacy_step1(ACCOUNT, PASSWORD, CLIENT_A, B, G, N, SALT) for _ in range(HANDSHAKES)]), "handshakes")
+	report("int step1, first logon (x computed)", HANDSHAKES, measure(fresh_accounts), "handshakes")
+	report("int step1, reconnect (x cached)", HANDSHAKES, measure(lambda: [client.step1(ACCOUNT, verifier, B, G, N, SALT) for _ in range(HANDSHAKES)]), "handshakes")
+	report("RealmConnector logins, stand-in server", LOGINS, asyncio.run(logins(LOGINS)), "logins")
+
+
+if __name__ == "__main__":
+	main()
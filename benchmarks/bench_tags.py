@@ -0,0 +1,257 @@
+"""@tags from WoW against a guild of MEMBERS members: NameIndex against scanning.
+
+The guild has MEMBERS members with generated names, some sharing a first
+name or a word, a nickname on some of them, and ROLES roles. Messages
+from WoW tag members in the ways people do: a whole name, the start of
+one, a word shared by many, a quoted name with a space, a role, @here,
+or nobody at all. The baseline is resolve_tags as it was: the names of
+every member of the channel and every role listed, lowercased and split
+for every message, and scanned for every tag. Reported in messages per
+second, for a channel everyone can read and for one that only a role
+can read.
+
+The replies and the error notices must be the same. That is checked
+before and after a stream of joins, nickname and username changes,
+leaves and role changes, applied to the guild and through the events to
+the index.
+
+Run from the repository root:
+
+	python -m benchmarks.bench_tags
+"""
+from __future__ import annotations
+
+import random
+import re
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks._util import measure, report
+from wowchat.common.config import WowExpansion
+from wowchat.discord.message_resolver import MessageResolver
+
+MEMBERS = 10_000
+ROLES = 40
+MESSAGES = 300
+CHANGES = 2_000
+
+_TAG_REGEXES = (re.compile(r'"@(.+?)"'), re.compile(r"@([\w]+)"))
+_WORDS = re.compile(r"\W+")
+
+SYLLABLES = ["ar", "bel", "cor", "dan", "el", "fin", "gor", "hal", "is", "jor", "kel", "lin", "mor", "nar", "or", "pel"]
+WORDS = ["Frost", "Shadow", "Storm", "Iron", "Stone", "Bob", "the Bold", "Healer", "Tank"]
+
+
+class Permissions:
+	def __init__(self, read_messages: bool) -> None:
+		self.read_messages = read_messages
+
+
+class Role:
+	def __init__(self, id: int, name: str, read: bool = False) -> None:
+		self.id = id
+		self.name = name
+		self.permissions = Permissions(read)
+
+
+class Member:
+	def __init__(self, id: int, name: str, guild: "Guild") -> None:
+		self.id = id
+		self.name = name
+		self.discriminator = str(id % 10_000).zfill(4)
+		self.nick: Optional[str] = None
+		self.roles: List[Role] = []
+		self.guild = guild
+
+	@property
+	def display_name(self) -> str:
+		return self.nick or self.name
+
+
+class Guild:
+	def __init__(self) -> None:
+		self.id = 1
+		self.default_role = Role(1, "@everyone", True)
+		self._members: Dict[int, Member] = {}
+		self.roles: List[Role] = [self.default_role]
+
+	@property
+	def members(self) -> List[Member]:
+		return list(self._members.values())
+
+	def get_member(self, id: int) -> Optional[Member]:
+		return self._members.get(id)
+
+
+class TextChannel:
+	"""discord.TextChannel.members and permissions_for, for read_messages"""
+
+	def __init__(self, guild: Guild, readers: Optional[Role] = None) -> None:
+		self.guild = guild
+		self._readers = readers
+		self.overwrites = {guild.default_role: False, readers: True} if readers is not None else {}
+
+	@property
+	def members(self) -> List[Member]:
+		return [m for m in self.guild.members if self.permissions_for(m).read_messages]
+
+	def permissions_for(self, member: Member) -> Permissions:
+		return Permissions(self._readers is None or self._readers in member.roles)
+
+
+class OldMessageResolver:
+	"""MessageResolver.resolve_tags as it was"""
+
+	def __init__(self, client: SimpleNamespace) -> None:
+		self._client = client
+
+	def resolve_tags(self, channel: TextChannel, message: str, on_error: Callable[[str], None]) -> str:
+		members = [m for m in channel.members if m.id != self._client.user.id]
+		effective = [(m.display_name, m.id) for m in members]
+		usernames = [(f"{m.name}#{m.discriminator}", m.id) for m in members]
+		roles = [(r.name, r.id) for r in channel.guild.roles if r.name != "@everyone"]
+
+		def resolve_group(names: List[Tuple[str, int]], tag: str, is_role: bool) -> List[Tuple[str, str]]:
+			l = tag.lower()
+			if l == "here":
+				return []
+			matches = [(n, str(i) if not is_role else f"&{i}") for (n, i) in names if l in n.lower()]
+			if len(matches) > 1 and " " not in l:
+				exact = [m for m in matches if m[0].lower() == l]
+				if exact:
+					return exact
+				words = [m for m in matches if l in _WORDS.split(m[0].lower())]
+				return words or matches
+			return matches
+
+		for rx in _TAG_REGEXES:
+			def replace(m):
+				tag = m.group(1)
+				matches: List[Tuple[str, str]] = []
+				for group, is_role in ((effective, False), (usernames, False), (roles, True)):
+					if matches:
+						resolved = resolve_group(group, tag, is_role)
+						if len(matches) == 1:
+							break
+						matches.extend(resolved)
+					else:
+						matches = resolve_group(group, tag, is_role)
+				if len(matches) == 1:
+					return f"<@{matches[0][1]}>"
+				if 1 < len(matches) < 5:
+					on_error(f"Your tag @{tag} matches multiple channel members: {', '.join(n for n,_ in matches)}. Be more specific in your tag!")
+					return m.group(0)
+				if len(matches) >= 5:
+					on_error(f"Your tag @{tag} matches too many channel members. Be more specific in your tag!")
+					return m.group(0)
+				return m.group(0)
+			message = rx.sub(replace, message)
+		return message
+
+
+def name(rng: random.Random) -> str:
+	base = "".join(rng.choice(SYLLABLES) for _ in range(rng.randrange(2, 4))).capitalize()
+	if rng.random() < 0.2:
+		base += " " + rng.choice(WORDS)
+	return base
+
+
+def make_guild(rng: random.Random) -> Tuple[Guild, Role]:
+	guild = Guild()
+	for i in range(ROLES):
+		guild.roles.append(Role(1000 + i, rng.choice(["Officer", "Raider", "Member", "Alt", "Social"]) + f" {i}"))
+	readers = guild.roles[1]
+	for i in range(MEMBERS):
+		member = Member(100_000 + i, name(rng), guild)
+		if rng.random() < 0.3:
+			member.nick = name(rng)
+		member.roles = [readers] if rng.random() < 0.3 else []
+		guild._members[member.id] = member
+	return guild, readers
+
+
+def messages(guild: Guild, rng: random.Random, count: int) -> List[str]:
+	members = guild.members
+	out = []
+	for _ in range(count):
+		member = rng.choice(members)
+		display = member.display_name
+		tag = rng.choice([
+			f"@{display.split()[0]}",
+			f"@{display[:rng.randrange(3, len(display) + 1)].split()[0]}",
+			f'"@{display}"',
+			f"@{rng.choice(WORDS).split()[-1]}",
+			f"@{rng.choice(SYLLABLES)}",
+			f"@{member.name}",
+			"@Officer", "@here", "@nobodyatall",
+		])
+		out.append(rng.choice([f"{tag} inv pls", f"hey {tag}, {tag} are you on?", "no tags here", f"lf tank {tag}"]))
+	return out
+
+
+def change(guild: Guild, resolver: MessageResolver, rng: random.Random, next_id: List[int]) -> None:
+	members = guild.members
+	roll = rng.random()
+	if roll < 0.25:
+		member = Member(next_id[0], name(rng), guild)
+		next_id[0] += 1
+		guild._members[member.id] = member
+		resolver.names.member_joined(member)
+	elif roll < 0.5:
+		member = rng.choice(members)
+		member.nick = name(rng) if rng.random() < 0.7 else None
+		resolver.names.member_updated(member)
+	elif roll < 0.6:
+		member = rng.choice(members)
+		member.name = name(rng)
+		resolver.names.user_updated(SimpleNamespace(id=member.id), [guild])
+	elif roll < 0.85:
+		member = rng.choice(members)
+		del guild._members[member.id]
+		resolver.names.member_left(member)
+	elif roll < 0.95:
+		rng.choice(guild.roles[1:]).name = rng.choice(["Officer", "Raider", "Bob"]) + f" {rng.randrange(100)}"
+		resolver.names.roles_changed(guild)
+	else:
+		guild.roles.append(Role(5000 + next_id[0], "Officer " + name(rng)))
+		next_id[0] += 1
+		resolver.names.roles_changed(guild)
+
+
+def main() -> None:
+	rng = random.Random(1)
+	guild, readers = make_guild(rng)
+	client = SimpleNamespace(user=SimpleNamespace(id=guild.members[7].id), emojis=[])
+	old = OldMessageResolver(client)
+	new = MessageResolver(client, WowExpansion.WotLK)  # type: ignore[arg-type]
+	channels = {"public": TextChannel(guild), "members only": TextChannel(guild, readers)}
+
+	def check(lines: List[str]) -> None:
+		for channel in channels.values():
+			for line in lines:
+				before: List[str] = []
+				after: List[str] = []
+				assert new.resolve_tags(channel, line, after.append) == old.resolve_tags(channel, line, before.append), line
+				assert after == before, line
+
+	lines = messages(guild, rng, MESSAGES)
+	check(lines)
+	assert any("<@" in new.resolve_tags(channels["public"], line, lambda _: None) for line in lines)
+	next_id = [200_000]
+	for _ in range(CHANGES):
+		change(guild, new, rng, next_id)
+	check(messages(guild, rng, MESSAGES))
+
+	for label, channel in channels.items():
+		def resolve(resolver) -> None:
+			for line in lines:
+				resolver.resolve_tags(channel, line, lambda _: None)
+
+		before, after = measure(lambda: resolve(old), repeat=1), measure(lambda: resolve(new))
+		report(f"{MEMBERS} members, {label}, scanning", MESSAGES, before, "msgs")
+		report(f"{MEMBERS} members, {label}, NameIndex", MESSAGES, after, "msgs")
+		assert after < before
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,166 @@
+"""?who from many Discord channels at once, against a server that throttles /who.
+
+USERS channels each ask ?who for one of NAMES players, all in the same
+moment. The stand-in world server drops any CMSG_WHO that arrives within
+THROTTLE seconds of the last one it answered, as real servers do. The
+baseline is the handler as it was: every ?who sends its own CMSG_WHO at
+once, and a single who_request slot, overwritten by each ?who, decides
+who gets the answer. WhoQueries sends one CMSG_WHO per name, spaced past
+the throttle, and answers every channel that asked. Asking again within
+the cache TTL costs no query at all. The channels answer through
+CommandHandler, with a send that is a coroutine as Discord's is.
+
+Also checked: a SMSG_WHO that comes after its query timed out, with
+players or without, is not taken for the answer to the next query.
+
+Run from the repository root:
+
+	python -m benchmarks.bench_who
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Callable, List, Optional, Tuple
+
+from benchmarks._auth_server import StandInAuthServer
+from benchmarks._world_server import StandInWorldServer
+from benchmarks.bench_realm_framer import make_conf
+from wowchat.commands.handler import CommandHandler
+from wowchat.commands.who import WhoCallback, WhoQueries, WhoResponse
+from wowchat.common.config import WowExpansion
+from wowchat.common.global_state import Global
+from wowchat.common.state_store import StateStore
+from wowchat.game.connector import GameConnector
+
+USERS = 30
+NAMES = ("Alice", "Brannor", "Cedric", "Dagny", "Elowen")
+LATENCY = 0.005
+THROTTLE = 0.05
+
+
+class SlotWho(WhoQueries):
+	"""The old way: a CMSG_WHO per ?who, answers to whoever asked last"""
+
+	def __init__(self) -> None:
+		super().__init__()
+		self._slot: Optional[WhoCallback] = None
+
+	def attach(self, send_query: Callable[[str], None]) -> None:
+		self._send_query = send_query
+
+	def request(self, name: str, callback: WhoCallback) -> None:
+		self._slot = callback
+		self._send_query(name)  # type: ignore[misc]
+
+	def received(self, results: List[WhoResponse]) -> None:
+		if self._slot is not None:
+			self._slot(results)
+
+
+class Channel:
+	"""Stands in for a Discord channel"""
+
+	def __init__(self, asked: str) -> None:
+		self.asked = asked
+		self.lines: List[str] = []
+		self.answered_at = 0.0
+
+	async def send(self, line: str) -> None:
+		self.lines.append(line)
+		self.answered_at = time.perf_counter()
+
+	@property
+	def correct(self) -> bool:
+		return bool(self.lines) and all(line.startswith(self.asked + " ") for line in self.lines)
+
+
+async def ask(expansion: str, who: WhoQueries, rounds: int = 1) -> Tuple[List[Channel], List[float], StandInWorldServer]:
+	"""Channels of every round of asking, each round's mean seconds to a correct answer, and the server"""
+	Global.who = who
+	auth = StandInAuthServer(expansion, [])
+	world = StandInWorldServer(expansion, auth, latency=LATENCY)
+	world.players = {1000 + i: name for i, name in enumerate(NAMES)}
+	world.who_throttle = THROTTLE
+	port = await world.start()
+	conf = make_conf(expansion, 0, "stand-in")
+	Global.config = conf  # type: ignore[assignment]
+	Global.state = StateStore()
+	session_key = os.urandom(40)
+	auth.sessions[conf.wow.account] = session_key
+	connector = GameConnector("127.0.0.1", port, "Stand-in", 1, session_key)
+	session = asyncio.get_running_loop().create_task(connector.connect())
+	channels: List[Channel] = []
+	latencies: List[float] = []
+	try:
+		await asyncio.wait_for(connector.live.wait(), 5)
+		for _ in range(rounds):
+			batch = [Channel(NAMES[i % len(NAMES)]) for i in range(USERS)]
+			start = time.perf_counter()
+			for channel in batch:
+				assert CommandHandler.handle(channel, f"?who {channel.asked}")  # type: ignore[arg-type]
+			# Long enough for every name to get a query past the throttle
+			deadline = start + len(NAMES) * (who._min_interval + 4 * LATENCY) + 0.5
+			while not all(channel.lines for channel in batch) and time.perf_counter() < deadline:
+				await asyncio.sleep(LATENCY)
+			channels += batch
+			correct = [channel.answered_at - start for channel in batch if channel.correct]
+			latencies.append(sum(correct) / len(correct) if correct else float("inf"))
+		return channels, latencies, world
+	finally:
+		world.drop()
+		await session
+		await world.close()
+
+
+def result(name: str) -> WhoResponse:
+	return WhoResponse(name, "", 60, "Mage", "Human", None, "Orgrimmar")
+
+
+async def check_late_replies() -> None:
+	who = WhoQueries(min_interval=0.0, reply_timeout=0.02)
+	sent: List[str] = []
+	who.attach(sent.append)
+	for first, second, late in (("alice", "bob", [result("Alice")]), ("cedric", "dagny", [])):
+		answers: List[Optional[List[WhoResponse]]] = []
+		who.request(first, answers.append)
+		await asyncio.sleep(0.05)
+		assert answers == [None] and sent[-1] == first
+		who.request(second, answers.append)
+		await asyncio.sleep(0)
+		assert sent[-1] == second
+		# The answer to the first query, after it timed out
+		who.received(late)
+		assert len(answers) == 1
+		who.received([result(second.title())])
+		assert answers[1] == [result(second.title())], answers
+		cached: List[Optional[List[WhoResponse]]] = []
+		who.request(second, cached.append)
+		assert cached == [[result(second.title())]] and sent[-1] == second
+	who.detach()
+
+
+def main() -> None:
+	logging.disable(logging.CRITICAL)
+	asyncio.run(check_late_replies())
+	for expansion in (WowExpansion.Vanilla, WowExpansion.TBC, WowExpansion.WotLK):
+		old_channels, _, old_world = asyncio.run(ask(expansion, SlotWho()))
+		old_correct = sum(channel.correct for channel in old_channels)
+
+		who = WhoQueries(min_interval=THROTTLE + 0.01, cache_ttl=60.0)
+		channels, (first, again), world = asyncio.run(ask(expansion, who, rounds=2))
+		assert all(channel.correct for channel in channels), [c.lines for c in channels if not c.correct]
+		assert world.who_queries == len(NAMES) and world.who_throttled == 0, (world.who_queries, world.who_throttled)
+		assert old_world.who_queries == USERS and old_world.who_throttled > 0
+		assert old_correct < USERS
+
+		name = f"{expansion}, {USERS} x ?who for {len(NAMES)} names"
+		print(f"{name:<36} one per ?who: {old_world.who_queries} CMSG_WHO, {old_world.who_throttled} throttled, "
+			f"{old_correct}/{USERS} answered  coalesced: {world.who_queries} CMSG_WHO, 0 throttled, "
+			f"{USERS}/{USERS} answered in {first * 1000:.0f} ms, asked again: 0 more in {again * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+	main()
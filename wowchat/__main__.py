@@ -2,12 +2,15 @@ import argparse
 import asyncio
 import logging
 import os
+import signal
 import sys
 
 from wowchat.common.config import load_config
 from wowchat.common.global_state import Global
+from wowchat.common.player_names import PlayerNames
+from wowchat.common.state_store import StateStore
 from wowchat.game.resources import GameResources
-from wowchat.realm.connector import RealmConnector
+from wowchat.realm.supervisor import ConnectionSupervisor
 from wowchat.game.connector import GameConnector
 
 
@@ -18,22 +21,25 @@ def parse_args() -> argparse.Namespace:
 
 
 async def start_game_connection() -> None:
-	"""Запустити підключення до гри без Discord"""
+	"""Запустити підключення до гри без Discord і перепідключатися після розривів"""
+	# Після першого входу RealmConnector пам'ятає ключ сесії і realm, тож
+	# повторне підключення спершу йде одразу на game сервер; паузи між
+	# спробами задає ReconnectDelay за класом останньої помилки
+	await ConnectionSupervisor(Global.config).run()
+
+
+def reload_config(conf_path: str) -> None:
+	"""SIGHUP: read the config again and recompile the channel routes from it"""
 	logger = logging.getLogger("wowchat")
-	
 	try:
-		# Створюємо RealmConnector для підключення до realm сервера
-		realm_connector = RealmConnector(asyncio.get_event_loop())
-		
-		# Підключаємося до realm сервера
-		await realm_connector.connect(Global.config)
-		
-		# Після успішного підключення до realm, підключаємося до game сервера
-		# (це буде реалізовано в RealmConnector._handle_realm_list)
-		
+		conf = load_config(conf_path)
 	except Exception as e:
-		logger.error("Failed to start game connection: %s", e)
-		raise
+		logger.error("Config reload failed, keeping the current one: %s", e)
+		return
+	Global.config = conf
+	if Global.discord is not None:
+		Global.discord.rebuild_routes()
+	logger.info("Reloaded %s", conf_path)
 
 
 async def main_async() -> None:
@@ -44,6 +50,8 @@ async def main_async() -> None:
 		print("Trying with default wowchat.conf in current directory.", file=sys.stderr)
 
 	Global.config = load_config(conf_path)
+	Global.state = StateStore(Global.config.wow.stateFile)
+	Global.names = PlayerNames(Global.state)
 
 	logging.basicConfig(
 		level=logging.DEBUG,  # Змінено на DEBUG для діагностики
@@ -55,6 +63,9 @@ async def main_async() -> None:
 	# Load static game resources first
 	GameResources.load(Global.config.expansion)
 
+	if hasattr(signal, "SIGHUP"):
+		asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload_config, conf_path)
+
 	# Start Discord only if a token is configured
 	token = (getattr(Global.config.discord, "token", "") or "").strip()
 	if not token:
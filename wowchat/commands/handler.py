@@ -1,36 +1,23 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-from dataclasses import dataclass
-from typing import Iterable, List, Optional, TYPE_CHECKING
+from typing import Callable, Iterable, List, Optional, TYPE_CHECKING
 
+from wowchat.commands.who import WhoResponse
 from wowchat.common.global_state import Global
+from wowchat.game.packets import Classes
+from wowchat.game.resources import GameResources
 
 if TYPE_CHECKING:  # Only for type hints; avoids importing discord at runtime
     import discord  # type: ignore
-
-
-@dataclass
-class WhoRequest:
-	message_channel: discord.abc.Messageable
-	player_name: str
-
-
-@dataclass
-class WhoResponse:
-	player_name: str
-	guild_name: str
-	lvl: int
-	cls: str
-	race: str
-	gender: Optional[str]
-	zone: str
+    from wowchat.game.guild_roster import GuildMember, GuildRoster
+    from wowchat.game.handler import GuildInfo
 
 
 class CommandHandler:
 	_logger = logging.getLogger(__name__)
 	_trigger = "?"
-	who_request: Optional[WhoRequest] = None
 
 	@staticmethod
 	def handle(from_channel: discord.abc.Messageable, message: str) -> bool:
@@ -40,25 +27,87 @@ class CommandHandler:
 		cmd = parts[0].lower() if parts else ""
 		arg = parts[1] if len(parts) > 1 and len(parts[1]) <= 16 else None
 
+		reply = CommandHandler._reply(from_channel)
 		try:
 			if cmd in ("who", "online"):
 				if Global.game is None:
-					from_channel.send("Bot is not online.")  # type: ignore[attr-defined]
+					reply("Bot is not online.")
 					return True
-				res = Global.game.handle_who(arg)  # type: ignore[union-attr]
-				if arg:
-					CommandHandler.who_request = WhoRequest(from_channel, arg)
+				# With a name the answer comes later, through Global.who
+				res = Global.game.handle_who(arg, reply)  # type: ignore[union-attr]
+				if res:
+					# ?online is answered from the roster in memory
+					reply(res)
 				return True
 			elif cmd == "gmotd":
 				if Global.game is None:
-					from_channel.send("Bot is not online.")  # type: ignore[attr-defined]
+					reply("Bot is not online.")
 					return True
 				resp = Global.game.handle_gmotd()  # type: ignore[union-attr]
 				if resp:
-					from_channel.send(resp)  # type: ignore[attr-defined]
+					reply(resp)
 				return True
 			else:
 				return False
 		except Exception:
 			# Unrecognized; let it fall through to normal chat
-			return False
\ No newline at end of file
+			return False
+
+	@staticmethod
+	def _reply(channel: discord.abc.Messageable) -> Callable[[str], object]:
+		"""channel.send for one line; send is a coroutine, so it is scheduled
+		on the loop, also when the line comes later from Global.who"""
+		return lambda line: asyncio.ensure_future(channel.send(line))  # type: ignore[attr-defined]
+
+	@staticmethod
+	def who_lines(
+		name: str,
+		results: Optional[List[WhoResponse]],
+		guild_info: Optional[GuildInfo],
+		guild_roster: GuildRoster,
+	) -> List[str]:
+		"""Reply to ?who <name>: the exact match, else guild members offline,
+		else up to 3 approximate matches"""
+		if results is None:
+			return [f"No answer from the server for {name}."]
+		lowered = name.lower()
+		exact = next((r for r in results if r.player_name.lower() == lowered), None)
+		lines = CommandHandler.handle_who_response(exact, guild_info, guild_roster, lambda m: m.name.lower() == lowered)
+		if lines:
+			return lines
+		if results:
+			return [CommandHandler.handle_who_response(r, guild_info, guild_roster, lambda m: False)[0] for r in results[:3]]
+		approximate = CommandHandler.handle_who_response(None, guild_info, guild_roster, lambda m: lowered in m.name.lower())
+		if approximate:
+			return approximate[:3]
+		return [f"No player named {name} is currently playing."]
+
+	@staticmethod
+	def handle_who_response(
+		who_response: Optional[WhoResponse],
+		guild_info: Optional[GuildInfo],
+		guild_roster: Iterable[GuildMember],
+		matches: Callable[[GuildMember], bool],
+	) -> List[str]:
+		if who_response is not None:
+			r = who_response
+			guild = f"<{r.guild_name}> " if r.guild_name else ""
+			gender = f" {r.gender} " if r.gender is not None else " "
+			return [f"{r.player_name} {guild}is a level {r.lvl}{gender}{r.race} {r.cls} currently in {r.zone}."]
+		lines = []
+		for member in guild_roster:
+			if not matches(member):
+				continue
+			days = int(member.last_logoff)
+			hours = int((member.last_logoff * 24) % 24)
+			minutes = int((member.last_logoff * 24 * 60) % 60)
+			minutes_str = f" {minutes} minute{'s' if minutes != 1 else ''}"
+			hours_str = f" {hours} hour{'s' if hours != 1 else ''}," if hours > 0 else ""
+			days_str = f" {days} day{'s' if days != 1 else ''}," if days > 0 else ""
+			# Some servers leave the guild out of the character list, so the name may be unknown
+			guild_name = f" <{guild_info.name}>" if guild_info is not None else ""
+			lines.append(
+				f"{member.name}{guild_name} is a level {member.level} {Classes.value_of(member.char_class)} currently offline. "
+				f"Last seen{days_str}{hours_str}{minutes_str} ago in {GameResources.AREA.get(member.zone_id, 'Unknown Zone')}."
+			)
+		return lines
@@ -0,0 +1,161 @@
+"""?who lookups through CMSG_WHO, one query per name however many ask.
+
+SMSG_WHO carries no request id, so only one CMSG_WHO is in flight at a
+time and its reply belongs to it. A reply that comes after its query
+timed out would be taken for the answer to the next one, so a reply with
+players whose names do not contain the name in flight is dropped, and so
+is an empty reply that comes first after a timeout. Requests for a name
+that is already queued or in flight join that query; the answer goes to
+every channel that asked. Queries leave at most one per MIN_INTERVAL, the
+window in which servers throttle /who and drop the extra ones unanswered.
+Answers are cached for CACHE_TTL seconds, so a name asked again shortly
+after is answered without the server.
+
+The game handler attaches a sender while it is in the world, like
+PlayerNames; queries still waiting when a session ends go out once the
+next one attaches.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from wowchat.common.lru_map import LRUMap
+from wowchat.common.metrics import metrics
+
+
+@dataclass
+class WhoResponse:
+	player_name: str
+	guild_name: str
+	lvl: int
+	cls: str
+	race: str
+	gender: Optional[str]
+	zone: str
+
+
+# Called with the SMSG_WHO results, or None if the server never answered
+WhoCallback = Callable[[Optional[List[WhoResponse]]], None]
+
+
+class WhoQueries:
+	MIN_INTERVAL = 5.0
+	CACHE_TTL = 30.0
+	# How long to wait for SMSG_WHO before giving up on the query
+	REPLY_TIMEOUT = 10.0
+
+	def __init__(
+		self,
+		min_interval: float = MIN_INTERVAL,
+		cache_ttl: float = CACHE_TTL,
+		reply_timeout: float = REPLY_TIMEOUT,
+		clock: Callable[[], float] = time.monotonic,
+	) -> None:
+		self._logger = logging.getLogger(__name__)
+		self._min_interval = min_interval
+		self._reply_timeout = reply_timeout
+		self._clock = clock
+		self._cache: LRUMap[str, List[WhoResponse]] = LRUMap(1000, ttl=cache_ttl, clock=clock)
+		metrics.add_source("who.cache", self._cache.stats)
+		# Lowercased name -> callbacks, in the order the names were asked;
+		# the one in flight is first
+		self._waiting: OrderedDict[str, List[WhoCallback]] = OrderedDict()
+		self._in_flight: Optional[str] = None
+		# A query timed out and no reply has come since
+		self._timed_out = False
+		self._send_query: Optional[Callable[[str], None]] = None
+		self._last_sent = float("-inf")
+		self._task: Optional[asyncio.Task] = None
+		self._wakeup = asyncio.Event()
+		self._answered = asyncio.Event()
+
+	@property
+	def waiting(self) -> int:
+		"""Names queued or in flight"""
+		return len(self._waiting)
+
+	def attach(self, send_query: Callable[[str], None]) -> None:
+		"""Send CMSG_WHO through send_query, starting with the names still waiting"""
+		self._send_query = send_query
+		if self._task is None:
+			self._task = asyncio.get_running_loop().create_task(self._run())
+
+	def detach(self) -> None:
+		self._send_query = None
+		# The query in flight goes out again with the next session
+		self._in_flight = None
+		self._timed_out = False
+		if self._task is not None:
+			self._task.cancel()
+			self._task = None
+
+	def request(self, name: str, callback: WhoCallback) -> None:
+		"""Call back with the players matching name, right away if it was asked recently"""
+		key = name.lower()
+		cached = self._cache.get(key)
+		if cached is not None:
+			callback(cached)
+			return
+		waiting = self._waiting.get(key)
+		if waiting is not None:
+			metrics.incr("who.joined")
+			waiting.append(callback)
+			return
+		self._waiting[key] = [callback]
+		self._wakeup.set()
+
+	def received(self, results: List[WhoResponse]) -> None:
+		"""SMSG_WHO: the answer to the query in flight"""
+		key = self._in_flight
+		late = self._timed_out
+		self._timed_out = False
+		if key is None:
+			# Nothing asked, or the query already timed out
+			return
+		# The server matches the name anywhere in a player's name
+		if any(key not in result.player_name.lower() for result in results) or (late and not results):
+			self._logger.debug("Dropped a late SMSG_WHO while waiting for %s", key)
+			return
+		self._in_flight = None
+		self._cache[key] = results
+		self._answered.set()
+		self._release(key, results)
+
+	async def _run(self) -> None:
+		while True:
+			if not self._waiting:
+				self._wakeup.clear()
+				await self._wakeup.wait()
+				continue
+			delay = self._last_sent + self._min_interval - self._clock()
+			if delay > 0:
+				await asyncio.sleep(delay)
+			send_query = self._send_query
+			if send_query is None:
+				return
+			key = next(iter(self._waiting))
+			self._in_flight = key
+			self._answered.clear()
+			self._last_sent = self._clock()
+			metrics.incr("who.queries")
+			send_query(key)
+			try:
+				await asyncio.wait_for(self._answered.wait(), self._reply_timeout)
+			except asyncio.TimeoutError:
+				if self._in_flight == key:
+					self._logger.warning("No SMSG_WHO for %s", key)
+					self._in_flight = None
+					self._timed_out = True
+					self._release(key, None)
+
+	def _release(self, key: str, results: Optional[List[WhoResponse]]) -> None:
+		for callback in self._waiting.pop(key, ()):
+			try:
+				callback(results)
+			except Exception as e:
+				self._logger.error("Error in who callback for %s: %s", key, e)
@@ -1,52 +1,38 @@
 from __future__ import annotations
 
+import struct
 from typing import Iterable
 
+_U16BE = struct.Struct(">H")
+_U16LE = struct.Struct("<H")
+_U32BE = struct.Struct(">I")
+_U32LE = struct.Struct("<I")
+_U64BE = struct.Struct(">Q")
+_U64LE = struct.Struct("<Q")
+
 
 def short_to_bytes(value: int) -> bytes:
-	return bytes(((value >> 8) & 0xFF, value & 0xFF))
+	return _U16BE.pack(value & 0xFFFF)
 
 
 def short_to_bytes_le(value: int) -> bytes:
-	return bytes((value & 0xFF, (value >> 8) & 0xFF))
+	return _U16LE.pack(value & 0xFFFF)
 
 
 def int_to_bytes(value: int) -> bytes:
-	return bytes(((value >> 24) & 0xFF, (value >> 16) & 0xFF, (value >> 8) & 0xFF, value & 0xFF))
+	return _U32BE.pack(value & 0xFFFFFFFF)
 
 
 def int_to_bytes_le(value: int) -> bytes:
-	return bytes((value & 0xFF, (value >> 8) & 0xFF, (value >> 16) & 0xFF, (value >> 24) & 0xFF))
+	return _U32LE.pack(value & 0xFFFFFFFF)
 
 
 def long_to_bytes(value: int) -> bytes:
-	return bytes(
-		(
-			(value >> 56) & 0xFF,
-			(value >> 48) & 0xFF,
-			(value >> 40) & 0xFF,
-			(value >> 32) & 0xFF,
-			(value >> 24) & 0xFF,
-			(value >> 16) & 0xFF,
-			(value >> 8) & 0xFF,
-			value & 0xFF,
-		)
-	)
+	return _U64BE.pack(value & 0xFFFFFFFFFFFFFFFF)
 
 
 def long_to_bytes_le(value: int) -> bytes:
-	return bytes(
-		(
-			value & 0xFF,
-			(value >> 8) & 0xFF,
-			(value >> 16) & 0xFF,
-			(value >> 24) & 0xFF,
-			(value >> 32) & 0xFF,
-			(value >> 40) & 0xFF,
-			(value >> 48) & 0xFF,
-			(value >> 56) & 0xFF,
-		)
-	)
+	return _U64LE.pack(value & 0xFFFFFFFFFFFFFFFF)
 
 
 def string_to_int(s: str) -> int:
@@ -54,17 +40,11 @@ def string_to_int(s: str) -> int:
 
 
 def bytes_to_long(b: bytes) -> int:
-	result = 0
-	for i, byte in enumerate(reversed(b)):
-		result |= (byte & 0xFF) << (i * 8)
-	return result
+	return int.from_bytes(b, "big")
 
 
 def bytes_to_long_le(b: bytes) -> int:
-	result = 0
-	for i, byte in enumerate(b):
-		result |= (byte & 0xFF) << (i * 8)
-	return result
+	return int.from_bytes(b, "little")
 
 
 def to_hex_string(b: bytes, add_spaces: bool = False, resolve_plain_text: bool = True) -> str:
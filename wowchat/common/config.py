@@ -13,6 +13,8 @@ try:
 except Exception:  # pragma: no cover
 	yaml = None  # type: ignore
 
+from wowchat.common.format_template import DISCORD_FIELDS, GUILD_FIELDS, WOW_FIELDS, FormatTemplate
+
 
 @dataclass
 class FiltersConfig:
@@ -23,7 +25,7 @@ class FiltersConfig:
 @dataclass
 class DiscordChannelConfig:
 	channel: str
-	format: str
+	format: FormatTemplate
 	filters: Optional[FiltersConfig]
 
 
@@ -32,7 +34,7 @@ class WowChannelConfig:
 	id: Optional[int]
 	tp: int
 	channel: Optional[str]
-	format: str
+	format: FormatTemplate
 	filters: Optional[FiltersConfig]
 
 
@@ -46,7 +48,7 @@ class ChannelConfig:
 @dataclass
 class GuildNotificationConfig:
 	enabled: bool
-	format: str
+	format: FormatTemplate
 	channel: Optional[str]
 
 
@@ -116,6 +118,8 @@ class Wow:
 	password: str
 	character: str
 	enableServerMotd: bool
+	# JSON file for what is kept between runs, e.g. the character GUID
+	stateFile: Optional[str] = "wowchat_state.json"
 
 
 @dataclass
@@ -186,7 +190,16 @@ def _parse_filters(cfg_opt) -> Optional[FiltersConfig]:
 	)
 
 
-def _parse_channels(channels_cfg) -> Sequence[ChannelConfig]:
+def _parse_chat_type(tp: str, expansion: str) -> int:
+	if tp.isdigit():
+		return int(tp)
+	# The chat type numbers differ between expansions; imported here because
+	# the game packages import this module
+	from wowchat.game.dispatch import load_expansion
+	return load_expansion(expansion)[0].packets.ChatEvents.parse(tp)
+
+
+def _parse_channels(channels_cfg, expansion: str) -> Sequence[ChannelConfig]:
 	channels_list = channels_cfg.get_list("channels")
 	result: List[ChannelConfig] = []
 	for ch in channels_list:
@@ -196,14 +209,14 @@ def _parse_channels(channels_cfg) -> Sequence[ChannelConfig]:
 				chatDirection=ch.get_string("direction"),
 				wow=WowChannelConfig(
 					id=_get_optional(ch, "wow.id"),
-					tp=int(ch.get_string("wow.type") if ch.get_string("wow.type").isdigit() else 0),
+					tp=_parse_chat_type(ch.get_string("wow.type"), expansion),
 					channel=wow_channel_name,
-					format=_get_optional(ch, "wow.format", ""),
+					format=FormatTemplate(_get_optional(ch, "wow.format", ""), WOW_FIELDS),
 					filters=_parse_filters(_get_optional(ch, "wow.filters")),
 				),
 				discord=DiscordChannelConfig(
 					channel=ch.get_string("discord.channel"),
-					format=ch.get_string("discord.format"),
+					format=FormatTemplate(ch.get_string("discord.format"), DISCORD_FIELDS),
 					filters=_parse_filters(_get_optional(ch, "discord.filters")),
 				),
 			)
@@ -246,6 +259,7 @@ def _parse_yaml_config(doc: Dict[str, Any]) -> WowChatConfig:
 			password=password,
 			character=character,
 			enableServerMotd=True,
+			stateFile=doc.get("state_file", "wowchat_state.json") or None,
 		),
 		guildConfig=_parse_guild_config(None),
 		channels=[],
@@ -270,12 +284,12 @@ def _parse_guild_config(guild_cfg_opt) -> GuildConfig:
 	configs: Dict[str, GuildNotificationConfig] = {}
 	for key, (enabled, fmt) in defaults.items():
 		if guild_cfg_opt is None or not guild_cfg_opt.has_path(key):
-			configs[key] = GuildNotificationConfig(enabled, fmt, None)
+			configs[key] = GuildNotificationConfig(enabled, FormatTemplate(fmt, GUILD_FIELDS), None)
 		else:
 			conf = guild_cfg_opt.get_config(key)
 			configs[key] = GuildNotificationConfig(
 				enabled=bool(_get_optional(conf, "enabled", enabled)),
-				format=_get_optional(conf, "format", fmt),
+				format=FormatTemplate(_get_optional(conf, "format", fmt), GUILD_FIELDS),
 				channel=_get_optional(conf, "channel"),
 			)
 	return GuildConfig(configs)
@@ -328,9 +342,10 @@ def load_config(conf_file: str) -> WowChatConfig:
 			password=wow_cfg.get_string("password"),
 			character=wow_cfg.get_string("character"),
 			enableServerMotd=bool(_get_optional(wow_cfg, "enable_server_motd", True)),
+			stateFile=_get_optional(wow_cfg, "state_file", "wowchat_state.json") or None,
 		),
 		guildConfig=_parse_guild_config(guild_cfg_opt),
-		channels=_parse_channels(channels_cfg),
+		channels=_parse_channels(channels_cfg, expansion),
 		filters=_parse_filters(filters_cfg_opt),
 		version=version,
 		expansion=expansion,
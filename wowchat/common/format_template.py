@@ -0,0 +1,94 @@
+"""Message formats from the config, compiled once.
+
+A format such as "[%target] [%user]: %message" is split when the config
+is loaded into literal text and fields, so a message is rendered with one
+join instead of a replace per placeholder, and the values go in as they
+are: a message that says %target stays that way. A placeholder the format
+kind does not have is an error at load time. A known placeholder followed
+by more letters is that placeholder and text, as replace left it
+(%username is the user, then "name").
+
+%time is the wall clock as %H:%M:%S, formatted once per second.
+"""
+from __future__ import annotations
+
+import re
+import time
+from typing import Callable, FrozenSet, List, Sequence, Tuple
+
+FIELDS = ("time", "user", "message", "target", "rank", "achievement")
+# WoW chat to Discord
+DISCORD_FIELDS = ("time", "user", "message", "target")
+# Discord to WoW chat
+WOW_FIELDS = ("time", "user", "message")
+GUILD_FIELDS = FIELDS
+
+_PLACEHOLDER = re.compile(r"%([A-Za-z]+)")
+
+
+class WallClock:
+	"""The time of day as %H:%M:%S, formatted when the second changes"""
+
+	def __init__(self, now: Callable[[], float] = time.time) -> None:
+		self._now = now
+		self._second = -1
+		self._text = ""
+
+	def __call__(self) -> str:
+		second = int(self._now())
+		if second != self._second:
+			self._text = time.strftime("%H:%M:%S", time.localtime(second))
+			self._second = second
+		return self._text
+
+
+clock = WallClock()
+
+
+class FormatTemplate:
+	__slots__ = ("text", "fields", "_parts", "_slots")
+
+	def __init__(self, text: str, fields: Sequence[str] = FIELDS) -> None:
+		self.text = text
+		# Longest first, so that a name which starts another is tried last
+		known = sorted(fields, key=len, reverse=True)
+		parts: List[str] = []
+		slots: List[Tuple[int, str]] = []
+		pos = 0
+		for m in _PLACEHOLDER.finditer(text):
+			word = m.group(1)
+			field = next((f for f in known if word.startswith(f)), None)
+			if field is None:
+				raise ValueError(
+					f"Unknown placeholder %{word} in format {text!r}; "
+					f"expected one of {', '.join('%' + f for f in fields)}"
+				)
+			parts.append(text[pos:m.start()])
+			slots.append((len(parts), field))
+			parts.append("")
+			pos = m.start() + 1 + len(field)
+		parts.append(text[pos:])
+		self.fields: FrozenSet[str] = frozenset(field for _, field in slots)
+		self._parts = parts
+		self._slots = tuple(slots)
+
+	def __eq__(self, other: object) -> bool:
+		return isinstance(other, FormatTemplate) and other.text == self.text
+
+	def __hash__(self) -> int:
+		return hash(self.text)
+
+	def __repr__(self) -> str:
+		return f"FormatTemplate({self.text!r})"
+
+	def __str__(self) -> str:
+		return self.text
+
+	def render(self, **values: str) -> str:
+		"""The format with every field filled in; a field not given is empty"""
+		if not self._slots:
+			return self.text
+		parts = self._parts.copy()
+		for i, field in self._slots:
+			parts[i] = clock() if field == "time" else values.get(field, "")
+		return "".join(parts)
@@ -1,21 +1,28 @@
 from __future__ import annotations
 
-import datetime as _dt
-from typing import Dict, Optional, Set, Tuple
-
+from wowchat.commands.who import WhoQueries
 from wowchat.common.config import WowChatConfig
+from wowchat.common.format_template import clock
+from wowchat.common.player_names import PlayerNames
+from wowchat.common.routing import RoutingIndex
+from wowchat.common.state_store import StateStore
 
 
 class Global:
 	config: WowChatConfig = None  # type: ignore
 	discord = None
 	game = None
+	# Replaced by the file-backed store from the config at startup
+	state: StateStore = StateStore()
+	# Names behind the GUIDs in chat; snapshotted into state at startup
+	names: PlayerNames = PlayerNames()
+	# ?who lookups, shared by every Discord channel that asks
+	who: WhoQueries = WhoQueries()
 
-	# Maps for channel routing
-	discord_to_wow: Dict[str, Set[object]] = {}
-	wow_to_discord: Dict[Tuple[int, Optional[str]], Set[Tuple[object, object]]] = {}
-	guild_events_to_discord: Dict[str, Set[object]] = {}
+	# Channel routing, compiled from the config when Discord connects and
+	# replaced whole on reconnect or config reload
+	routes: RoutingIndex = RoutingIndex()
 
 	@staticmethod
 	def get_time() -> str:
-		return _dt.datetime.now().strftime("%H:%M:%S")
\ No newline at end of file
+		return clock()
\ No newline at end of file
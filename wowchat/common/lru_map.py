@@ -1,24 +1,188 @@
+"""Least-recently-used map with an optional TTL and size budget.
+
+A hit moves the entry to the end of an OrderedDict, so hits, updates and
+evictions are all O(1). The budget is a number of entries, approximate
+bytes (from sizeof), or both; the least recently used entries go first.
+Entries past their TTL count as missing and are dropped when touched, or
+all at once by purge(); len() includes any not touched since they expired.
+
+hits, misses, evictions and expirations are plain counters; stats() hands
+them to Metrics.add_source.
+"""
 from __future__ import annotations
 
+import sys
+import time
 from collections import OrderedDict
-from typing import Generic, Iterable, Iterator, MutableMapping, Optional, Tuple, TypeVar
+from typing import Callable, Dict, Iterator, List, MutableMapping, Optional, Tuple, TypeVar
 
 K = TypeVar("K")
 V = TypeVar("V")
 
+_MISSING = object()
+
+
+def approximate_size(key: object, value: object) -> int:
+	"""Shallow size of key and value; nested objects are not followed"""
+	return sys.getsizeof(key) + sys.getsizeof(value)
+
+
+# value, expiry time or None, approximate size; a tuple is cheaper to
+# build on every insert than an object
+_Entry = Tuple[V, Optional[float], int]
+_VALUE, _EXPIRES, _SIZE = 0, 1, 2
 
-class LRUMap(OrderedDict, Generic[K, V]):
-	def __init__(self, max_size: int = 10000):
-		super().__init__()
+
+class LRUMap(MutableMapping[K, V]):
+	def __init__(
+		self,
+		max_size: Optional[int] = 10000,
+		ttl: Optional[float] = None,
+		max_bytes: Optional[int] = None,
+		sizeof: Callable[[K, V], int] = approximate_size,
+		clock: Callable[[], float] = time.monotonic,
+	) -> None:
+		self._data: OrderedDict[K, _Entry] = OrderedDict()
 		self._max_size = max_size
+		self._ttl = ttl
+		self._max_bytes = max_bytes
+		self._sizeof = sizeof
+		self._clock = clock
+		self._bytes = 0
+		# Some entry was stored with a TTL, so iteration has to check expiry
+		self._timed = ttl is not None
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self.expirations = 0
+
+	@property
+	def bytes(self) -> int:
+		"""Approximate size of the entries; 0 unless max_bytes is set"""
+		return self._bytes
+
+	def stats(self) -> Dict[str, int]:
+		return {
+			"hits": self.hits,
+			"misses": self.misses,
+			"evictions": self.evictions,
+			"expirations": self.expirations,
+			"size": len(self._data),
+		}
+
+	def __len__(self) -> int:
+		return len(self._data)
+
+	def __contains__(self, key: object) -> bool:
+		"""Membership, without counting a hit or refreshing the entry"""
+		entry = self._data.get(key)  # type: ignore[call-overload]
+		return entry is not None and not self._expired(key, entry)  # type: ignore[arg-type]
+
+	def __iter__(self) -> Iterator[K]:
+		"""Keys from least to most recently used"""
+		if not self._timed:
+			return iter(self._data)
+		now = self._clock()
+		return iter([key for key, entry in self._data.items() if entry[_EXPIRES] is None or entry[_EXPIRES] > now])
 
 	def __getitem__(self, key: K) -> V:
-		value = super().__getitem__(key)
-		super().__delitem__(key)
-		super().__setitem__(key, value)
-		return value
-
-	def __setitem__(self, key: K, value: V) -> None:
-		while len(self) >= self._max_size:
-			super().popitem(last=False)
-		super().__setitem__(key, value)
\ No newline at end of file
+		value = self.get(key, _MISSING)
+		if value is _MISSING:
+			raise KeyError(key)
+		return value  # type: ignore[return-value]
+
+	def get(self, key: K, default: Optional[V] = None) -> Optional[V]:  # type: ignore[override]
+		entry = self._data.get(key)
+		if entry is None or (entry[_EXPIRES] is not None and self._expired(key, entry)):
+			self.misses += 1
+			return default
+		self._data.move_to_end(key)
+		self.hits += 1
+		return entry[_VALUE]
+
+	def peek(self, key: K, default: Optional[V] = None) -> Optional[V]:
+		"""The value without counting a hit or refreshing the entry"""
+		entry = self._data.get(key)
+		if entry is None or self._expired(key, entry):
+			return default
+		return entry[_VALUE]
+
+	def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+		"""Store value, expiring after ttl seconds or the map's default TTL"""
+		ttl = self._ttl if ttl is None else ttl
+		expires = None
+		if ttl is not None:
+			expires = self._clock() + ttl
+			self._timed = True
+		size = self._sizeof(key, value) if self._max_bytes is not None else 0
+		data = self._data
+		entry = data.get(key)
+		data[key] = (value, expires, size)
+		if entry is not None:
+			# An update keeps the entry count; only the byte size can grow
+			self._bytes += size - entry[_SIZE]
+			data.move_to_end(key)
+		else:
+			self._bytes += size
+		max_size = self._max_size
+		max_bytes = self._max_bytes
+		# The entry just stored stays even when it alone is over budget
+		while len(data) > 1 and ((max_size is not None and len(data) > max_size) or (max_bytes is not None and self._bytes > max_bytes)):
+			_, evicted = data.popitem(last=False)
+			self._bytes -= evicted[_SIZE]
+			self.evictions += 1
+
+	__setitem__ = set
+
+	def __delitem__(self, key: K) -> None:
+		entry = self._data.pop(key)
+		self._bytes -= entry[_SIZE]
+
+	def pop(self, key: K, default: object = _MISSING) -> V:  # type: ignore[override]
+		entry = self._data.pop(key, None)
+		if entry is not None:
+			self._bytes -= entry[_SIZE]
+			if entry[_EXPIRES] is None or entry[_EXPIRES] > self._clock():
+				return entry[_VALUE]
+			self.expirations += 1
+		if default is _MISSING:
+			raise KeyError(key)
+		return default  # type: ignore[return-value]
+
+	def popitem(self, last: bool = True) -> Tuple[K, V]:  # type: ignore[override]
+		key, entry = self._data.popitem(last=last)
+		self._bytes -= entry[_SIZE]
+		return key, entry[_VALUE]
+
+	def clear(self) -> None:
+		self._data.clear()
+		self._bytes = 0
+
+	def items(self) -> List[Tuple[K, V]]:  # type: ignore[override]
+		"""(key, value) from least to most recently used, without refreshing any"""
+		now = self._clock() if self._timed else None
+		return [
+			(key, entry[_VALUE]) for key, entry in self._data.items()
+			if now is None or entry[_EXPIRES] is None or entry[_EXPIRES] > now
+		]
+
+	def values(self) -> List[V]:  # type: ignore[override]
+		return [value for _, value in self.items()]
+
+	def purge(self) -> int:
+		"""Drop every expired entry; how many went"""
+		now = self._clock()
+		expired = [key for key, entry in self._data.items() if entry[_EXPIRES] is not None and entry[_EXPIRES] <= now]
+		for key in expired:
+			self._bytes -= self._data.pop(key)[_SIZE]
+		self.expirations += len(expired)
+		return len(expired)
+
+	def _expired(self, key: K, entry: _Entry) -> bool:
+		"""Whether the entry is past its TTL; an expired entry is dropped"""
+		if entry[_EXPIRES] is None or entry[_EXPIRES] > self._clock():
+			return False
+		del self._data[key]
+		self._bytes -= entry[_SIZE]
+		self.expirations += 1
+		return True
@@ -0,0 +1,244 @@
+"""FiltersConfig patterns compiled into one decision per message.
+
+A message is filtered when one of the patterns matches all of it, as
+String.matches does in the Scala version. MessageFilter does not try the
+patterns one at a time. It sorts them once by shape:
+
+- plain words: equality with a set
+- .*word.* (optionally (?i)): a substring test, the commonest spam pattern
+- .*(?=.*A)(?=.*B).*: a search for each of A and B, where the pattern
+  as written would try its lookaheads from every position
+- .*anything.*: the middle of every such pattern joined into one
+  alternation, searched once
+- the rest: joined into one alternation, matched in full once
+
+Patterns with backreferences or named groups cannot share an alternation
+and are tried on their own. The .* shapes only hold for a single line,
+so a message with a newline goes to the full patterns.
+
+The patterns are Java regexes, where an inline flag such as (?i) may sit
+anywhere and covers the rest of its group; Python only takes it at the
+start, so those become scoped (?i:...) groups. Decisions are cached per
+message, as spam tends to repeat word for word.
+"""
+from __future__ import annotations
+
+import re
+from typing import FrozenSet, List, Optional, Sequence, Tuple
+
+from wowchat.common.lru_map import LRUMap
+
+# Java flags Python has; d, u and U have no counterpart and are dropped
+_PY_FLAGS = frozenset("imsx")
+_FLAG_GROUP = re.compile(r"\(\?([a-zA-Z]*)(?:-([a-zA-Z]*))?\)")
+_META = frozenset(".^$*+?{}[]()|\\")
+# Group references that would point elsewhere inside a shared alternation
+_REFERENCES = re.compile(r"\\[1-9]|\(\?P[<=]|\(\?<[A-Za-z]|\\k<")
+
+
+def _class_end(pattern: str, i: int) -> int:
+	"""Index just past the character class that starts at i"""
+	j = i + 1
+	if j < len(pattern) and pattern[j] == "^":
+		j += 1
+	if j < len(pattern) and pattern[j] == "]":
+		j += 1
+	while j < len(pattern) and pattern[j] != "]":
+		j += 2 if pattern[j] == "\\" else 1
+	return j + 1
+
+
+def translate(pattern: str) -> Tuple[str, bool, FrozenSet[str]]:
+	"""The pattern in Python syntax, whether it has a top level |, and its inline flags"""
+	out: List[str] = []
+	# Flag groups opened in each enclosing group, to close and reopen around |
+	frames: List[List[str]] = [[]]
+	flags = set()
+	alternation = False
+	i, n = 0, len(pattern)
+	while i < n:
+		c = pattern[i]
+		if c == "\\":
+			out.append(pattern[i:i + 2])
+			i += 2
+		elif c == "[":
+			j = _class_end(pattern, i)
+			out.append(pattern[i:j])
+			i = j
+		elif c == "(":
+			m = _FLAG_GROUP.match(pattern, i)
+			if m is not None:
+				on = "".join(f for f in m.group(1) if f in _PY_FLAGS)
+				off = "".join(f for f in (m.group(2) or "") if f in _PY_FLAGS)
+				flags.update(on)
+				if on or off:
+					opened = f"(?{on}-{off}:" if off else f"(?{on}:"
+					frames[-1].append(opened)
+					out.append(opened)
+				i = m.end()
+			else:
+				frames.append([])
+				out.append(c)
+				i += 1
+		elif c == ")":
+			# An unbalanced ) is left for re.compile to report
+			if len(frames) > 1:
+				out.append(")" * len(frames.pop()))
+			out.append(c)
+			i += 1
+		elif c == "|":
+			opened = frames[-1]
+			out.append(")" * len(opened) + "|" + "".join(opened))
+			alternation = alternation or len(frames) == 1
+			i += 1
+		else:
+			out.append(c)
+			i += 1
+	out.append(")" * len(frames[0]))
+	return "".join(out), alternation, frozenset(flags)
+
+
+def _unanchored(pattern: str) -> Optional[str]:
+	"""For .*X.* or .*X.*$ the X, when matching it anywhere in a line is the same thing"""
+	if not pattern.startswith(".*"):
+		return None
+	for tail in (".*$", ".*"):
+		if pattern.endswith(tail) and len(pattern) >= 2 + len(tail):
+			middle = pattern[2:-len(tail)]
+			# .*?X is lazy, not .* followed by X
+			if middle[:1] in ("?", "+", "*", "{"):
+				return None
+			# The tail must not be escaped
+			backslashes = len(middle) - len(middle.rstrip("\\"))
+			if backslashes % 2 == 0:
+				return middle
+	return None
+
+
+def _lookaheads(middle: str) -> Optional[List[str]]:
+	"""For (?i)(?=.*A)(?=.*B) the searches for A and B, flags included"""
+	flags = ""
+	m = _FLAG_GROUP.match(middle)
+	if m is not None:
+		flags, middle = m.group(0), middle[m.end():]
+	parts = []
+	i = 0
+	while i < len(middle):
+		if not middle.startswith("(?=.*", i):
+			return None
+		depth, j = 0, i
+		while j < len(middle):
+			c = middle[j]
+			if c == "\\":
+				j += 2
+				continue
+			if c == "[":
+				j = _class_end(middle, j)
+				continue
+			if c == "(":
+				depth += 1
+			elif c == ")":
+				depth -= 1
+				if depth == 0:
+					break
+			j += 1
+		body = middle[i + 5:j]
+		if j >= len(middle) or not body or translate(body)[1]:
+			return None
+		parts.append(translate(flags + body)[0])
+		i = j + 1
+	return parts or None
+
+
+def _literal(pattern: str) -> bool:
+	return bool(pattern) and not any(c in _META for c in pattern)
+
+
+class MessageFilter:
+	CACHE_SIZE = 4096
+
+	def __init__(self, patterns: Sequence[str], cache_size: int = CACHE_SIZE) -> None:
+		self.patterns: Tuple[str, ...] = tuple(patterns)
+		exact = set()
+		words: List[str] = []
+		lower_words: List[str] = []
+		anywhere: List[str] = []
+		every: List[Tuple["re.Pattern[str]", ...]] = []
+		# The patterns of the three above as written, for messages of more lines
+		lines: List[str] = []
+		whole: List[str] = []
+		alone: List["re.Pattern[str]"] = []
+		for pattern in self.patterns:
+			if _REFERENCES.search(pattern):
+				alone.append(re.compile(translate(pattern)[0]))
+				continue
+			if _literal(pattern):
+				exact.add(pattern)
+				continue
+			translated, alternation, flags = translate(pattern)
+			middle = _unanchored(pattern)
+			if middle is not None and not alternation and "s" not in flags:
+				lines.append(translated)
+				if _literal(middle):
+					words.append(middle)
+				elif middle.startswith("(?i)") and _literal(middle[4:]) and middle[4:].isascii():
+					lower_words.append(middle[4:].lower())
+				elif (parts := _lookaheads(middle)) is not None:
+					every.append(tuple(re.compile(part) for part in parts))
+				else:
+					anywhere.append(translate(middle)[0])
+			else:
+				whole.append(translated)
+		self._exact = frozenset(exact)
+		self._words = tuple(words)
+		self._lower_words = tuple(lower_words)
+		self._every = tuple(every)
+		self._anywhere = re.compile("|".join(f"(?:{p})" for p in anywhere)) if anywhere else None
+		self._lines = re.compile("|".join(f"(?:{p})" for p in lines)) if lines else None
+		self._whole = re.compile("|".join(f"(?:{p})" for p in whole)) if whole else None
+		self._alone = tuple(alone)
+		self._cache: Optional[LRUMap[str, bool]] = LRUMap(cache_size) if self.patterns and cache_size else None
+
+	def __bool__(self) -> bool:
+		return bool(self.patterns)
+
+	def __repr__(self) -> str:
+		return f"MessageFilter({list(self.patterns)!r})"
+
+	def matches(self, message: str) -> bool:
+		"""Whether one of the patterns matches the whole message"""
+		if not self.patterns:
+			return False
+		cache = self._cache
+		if cache is None:
+			return self._decide(message)
+		decision = cache.get(message)
+		if decision is None:
+			decision = cache[message] = self._decide(message)
+		return decision
+
+	def _decide(self, message: str) -> bool:
+		if message in self._exact:
+			return True
+		if "\n" not in message:
+			for word in self._words:
+				if word in message:
+					return True
+			if self._lower_words:
+				lowered = message.lower()
+				for word in self._lower_words:
+					if word in lowered:
+						return True
+			for parts in self._every:
+				if all(part.search(message) is not None for part in parts):
+					return True
+			if self._anywhere is not None and self._anywhere.search(message) is not None:
+				return True
+		elif self._lines is not None and self._lines.fullmatch(message) is not None:
+			return True
+		if self._whole is not None and self._whole.fullmatch(message) is not None:
+			return True
+		return any(pattern.fullmatch(message) for pattern in self._alone)
+
+
+NO_FILTER = MessageFilter(())
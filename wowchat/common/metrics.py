@@ -0,0 +1,95 @@
+"""In-process counters and timings.
+
+Cheap enough to update from the event loop on every attempt; summary()
+renders them for a log line. Counters kept elsewhere, such as an LRUMap's
+stats(), join in through add_source. The module-level `metrics` is the
+registry the connectors share.
+"""
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+
+class Timing:
+	__slots__ = ('count', 'total', 'min', 'max', 'last')
+
+	def __init__(self) -> None:
+		self.count = 0
+		self.total = 0.0
+		self.min = float("inf")
+		self.max = 0.0
+		self.last = 0.0
+
+	def add(self, seconds: float) -> None:
+		self.count += 1
+		self.total += seconds
+		self.last = seconds
+		if seconds < self.min:
+			self.min = seconds
+		if seconds > self.max:
+			self.max = seconds
+
+	@property
+	def average(self) -> float:
+		return self.total / self.count if self.count else 0.0
+
+
+class Metrics:
+	def __init__(self) -> None:
+		self._counters: Dict[str, int] = {}
+		self._timings: Dict[str, Timing] = {}
+		self._sources: Dict[str, Callable[[], Dict[str, int]]] = {}
+
+	def incr(self, name: str, n: int = 1) -> None:
+		self._counters[name] = self._counters.get(name, 0) + n
+
+	def observe(self, name: str, seconds: float) -> None:
+		timing = self._timings.get(name)
+		if timing is None:
+			timing = self._timings[name] = Timing()
+		timing.add(seconds)
+
+	@contextmanager
+	def time(self, name: str) -> Iterator[None]:
+		"""Observe the wall-clock time of the block, also when it raises"""
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.observe(name, time.perf_counter() - start)
+
+	def add_source(self, prefix: str, source: Callable[[], Dict[str, int]]) -> None:
+		"""Counters read from source() as prefix.name; a later source replaces one with the same prefix"""
+		self._sources[prefix] = source
+
+	def counter(self, name: str) -> int:
+		if name in self._counters:
+			return self._counters[name]
+		prefix, _, rest = name.rpartition(".")
+		source = self._sources.get(prefix)
+		return source().get(rest, 0) if source is not None else 0
+
+	def timing(self, name: str) -> Optional[Timing]:
+		return self._timings.get(name)
+
+	def reset(self) -> None:
+		"""Zero the counters and timings; sources keep their own"""
+		self._counters.clear()
+		self._timings.clear()
+
+	def summary(self, prefix: str = "") -> str:
+		"""One line with every counter and timing whose name starts with prefix"""
+		counters = dict(self._counters)
+		for source_prefix, source in self._sources.items():
+			counters.update((f"{source_prefix}.{name}", value) for name, value in source().items())
+		parts = [f"{name}={value}" for name, value in sorted(counters.items()) if name.startswith(prefix)]
+		parts += [
+			f"{name}={t.count}x avg {t.average * 1000:.1f} ms max {t.max * 1000:.1f} ms"
+			for name, t in sorted(self._timings.items()) if name.startswith(prefix)
+		]
+		return ", ".join(parts)
+
+
+metrics = Metrics()
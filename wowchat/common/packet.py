@@ -1,70 +1,316 @@
 from __future__ import annotations
 
 import struct
-from typing import Optional
+from typing import TYPE_CHECKING, Iterator, Optional, Tuple
+
+from wowchat.common.schema import read_cstring
+
+if TYPE_CHECKING:
+	from wowchat.common.schema import Schema, T
+
+_I8 = struct.Struct('<b')
+_I16LE = struct.Struct('<h')
+_U16LE = struct.Struct('<H')
+_U16BE = struct.Struct('>H')
+_U32LE = struct.Struct('<I')
+_I32LE = struct.Struct('<i')
+_U32BE = struct.Struct('>I')
+_U64LE = struct.Struct('<Q')
+_F32LE = struct.Struct('<f')
 
 
 class ByteReader:
 	def __init__(self, data: bytes) -> None:
-		self._data = memoryview(data)
+		# bytes.find needs the object itself, not a memoryview over it
+		self._raw = data if isinstance(data, (bytes, bytearray)) else bytes(data)
+		self._data = memoryview(self._raw)
 		self._pos = 0
+		# bit manipulation for cata+
+		self._bit_position = 7
+		self._bit_byte = 0
 
 	def remaining(self) -> int:
 		return len(self._data) - self._pos
 
 	def read_u8(self) -> int:
-		b = self._data[self._pos]
+		b = self._raw[self._pos]
 		self._pos += 1
-		return int(b)
+		return b
 
 	def read_i8(self) -> int:
-		v = struct.unpack_from('<b', self._data, self._pos)[0]
+		v = _I8.unpack_from(self._raw, self._pos)[0]
 		self._pos += 1
 		return v
 
 	def read_u16le(self) -> int:
-		v = struct.unpack_from('<H', self._data, self._pos)[0]
+		v = _U16LE.unpack_from(self._raw, self._pos)[0]
 		self._pos += 2
 		return v
 
 	def read_i16le(self) -> int:
-		v = struct.unpack_from('<h', self._data, self._pos)[0]
+		v = _I16LE.unpack_from(self._raw, self._pos)[0]
 		self._pos += 2
 		return v
 
 	def read_u32le(self) -> int:
-		v = struct.unpack_from('<I', self._data, self._pos)[0]
+		v = _U32LE.unpack_from(self._raw, self._pos)[0]
 		self._pos += 4
 		return v
 
 	def read_i32le(self) -> int:
-		v = struct.unpack_from('<i', self._data, self._pos)[0]
+		v = _I32LE.unpack_from(self._raw, self._pos)[0]
+		self._pos += 4
+		return v
+
+	def read_u32be(self) -> int:
+		v = _U32BE.unpack_from(self._raw, self._pos)[0]
 		self._pos += 4
 		return v
 
 	def read_u64le(self) -> int:
-		v = struct.unpack_from('<Q', self._data, self._pos)[0]
+		v = _U64LE.unpack_from(self._raw, self._pos)[0]
 		self._pos += 8
 		return v
 
+	def read_packed_guid(self) -> int:
+		"""GUID as a mask byte followed by its non-zero bytes"""
+		mask = self.read_u8()
+		guid = 0
+		for i in range(8):
+			if mask & (1 << i):
+				guid |= self.read_u8() << (i * 8)
+		return guid
+
 	def read_f32le(self) -> float:
-		v = struct.unpack_from('<f', self._data, self._pos)[0]
+		v = _F32LE.unpack_from(self._raw, self._pos)[0]
 		self._pos += 4
 		return v
 
 	def read_cstring(self) -> str:
-		start = self._pos
-		while self._pos < len(self._data) and self._data[self._pos] != 0:
-			self._pos += 1
-		val = bytes(self._data[start:self._pos]).decode('utf-8', errors='ignore')
-		if self._pos < len(self._data) and self._data[self._pos] == 0:
-			self._pos += 1
+		val, self._pos = read_cstring(self._raw, self._pos)
 		return val
 
+	def skip_cstring(self) -> None:
+		end = self._raw.find(b'\x00', self._pos)
+		self._pos = len(self._raw) if end < 0 else end + 1
+
+	def read_struct(self, st: struct.Struct) -> Tuple:
+		"""Unpack a precompiled run of fields"""
+		values = st.unpack_from(self._raw, self._pos)
+		self._pos += st.size
+		return values
+
+	def read_record(self, schema: Schema[T]) -> T:
+		record, self._pos = schema.unpack_from(self._raw, self._pos)
+		return record
+
+	def iter_records(self, schema: Schema[T], count: int) -> Iterator[T]:
+		"""Decode count records lazily, so a caller can stop at the one it needs"""
+		for _ in range(count):
+			record, self._pos = schema.unpack_from(self._raw, self._pos)
+			yield record
+
 	def read_bytes(self, n: int) -> bytes:
 		b = bytes(self._data[self._pos:self._pos + n])
 		self._pos += n
 		return b
 
 	def skip(self, n: int) -> None:
-		self._pos += n
\ No newline at end of file
+		self._pos += n
+
+	def reset_bit_reader(self) -> None:
+		self._bit_position = 7
+		self._bit_byte = 0
+
+	def read_bit(self) -> int:
+		self._bit_position += 1
+		if self._bit_position > 7:
+			self._bit_position = 0
+			self._bit_byte = self.read_u8()
+		return (self._bit_byte >> (7 - self._bit_position)) & 1
+
+	def read_bits(self, length: int) -> int:
+		result = 0
+		for i in range(length - 1, -1, -1):
+			result |= self.read_bit() << i
+		return result
+
+	def read_bit_seq(self, mask: bytearray, *indices: int) -> None:
+		for i in indices:
+			mask[i] = self.read_bit()
+
+	def read_xor_byte_seq(self, mask: bytearray, *indices: int) -> None:
+		for i in indices:
+			if mask[i]:
+				mask[i] ^= self.read_u8()
+
+
+class ByteWriter:
+	"""Packet builder over a growable bytearray.
+
+	`reserve` bytes are kept free in front of the payload so a header can be
+	filled in once the payload size is known (see frame()). Views handed out
+	by getbuffer()/frame() stay valid: the writer switches to a fresh buffer
+	instead of resizing or reusing one that has been exported.
+	"""
+
+	__slots__ = ('_buf', '_reserve', '_pos', '_exported', '_bit_position', '_bit_byte')
+
+	def __init__(self, capacity: int = 64, reserve: int = 0) -> None:
+		self._buf = bytearray(reserve + capacity)
+		self._reserve = reserve
+		self._pos = reserve
+		self._exported = False
+		# bit manipulation for cata+
+		self._bit_position = 8
+		self._bit_byte = 0
+
+	def __len__(self) -> int:
+		return self._pos - self._reserve
+
+	def _grow(self, n: int) -> None:
+		size = max(len(self._buf) * 2, self._pos + n)
+		buf = bytearray(size)
+		buf[:self._pos] = memoryview(self._buf)[:self._pos]
+		self._buf = buf
+		self._exported = False
+
+	def reset(self) -> None:
+		if self._exported:
+			self._buf = bytearray(len(self._buf))
+			self._exported = False
+		self._pos = self._reserve
+		self._bit_position = 8
+		self._bit_byte = 0
+
+	def write_u8(self, value: int) -> None:
+		pos = self._pos
+		if pos + 1 > len(self._buf):
+			self._grow(1)
+		self._buf[pos] = value & 0xFF
+		self._pos = pos + 1
+
+	def write_struct(self, st: struct.Struct, *values) -> None:
+		"""Pack several fields with one precompiled Struct"""
+		pos = self._pos
+		end = pos + st.size
+		if end > len(self._buf):
+			self._grow(st.size)
+		st.pack_into(self._buf, pos, *values)
+		self._pos = end
+
+	def write_u16le(self, value: int) -> None:
+		pos = self._pos
+		if pos + 2 > len(self._buf):
+			self._grow(2)
+		_U16LE.pack_into(self._buf, pos, value & 0xFFFF)
+		self._pos = pos + 2
+
+	def write_u16be(self, value: int) -> None:
+		pos = self._pos
+		if pos + 2 > len(self._buf):
+			self._grow(2)
+		_U16BE.pack_into(self._buf, pos, value & 0xFFFF)
+		self._pos = pos + 2
+
+	def write_u32le(self, value: int) -> None:
+		pos = self._pos
+		if pos + 4 > len(self._buf):
+			self._grow(4)
+		_U32LE.pack_into(self._buf, pos, value & 0xFFFFFFFF)
+		self._pos = pos + 4
+
+	def write_i32le(self, value: int) -> None:
+		pos = self._pos
+		if pos + 4 > len(self._buf):
+			self._grow(4)
+		_I32LE.pack_into(self._buf, pos, value)
+		self._pos = pos + 4
+
+	def write_u32be(self, value: int) -> None:
+		pos = self._pos
+		if pos + 4 > len(self._buf):
+			self._grow(4)
+		_U32BE.pack_into(self._buf, pos, value & 0xFFFFFFFF)
+		self._pos = pos + 4
+
+	def write_u64le(self, value: int) -> None:
+		pos = self._pos
+		if pos + 8 > len(self._buf):
+			self._grow(8)
+		_U64LE.pack_into(self._buf, pos, value & 0xFFFFFFFFFFFFFFFF)
+		self._pos = pos + 8
+
+	def write_f32le(self, value: float) -> None:
+		pos = self._pos
+		if pos + 4 > len(self._buf):
+			self._grow(4)
+		_F32LE.pack_into(self._buf, pos, value)
+		self._pos = pos + 4
+
+	def write_bytes(self, data: bytes) -> None:
+		n = len(data)
+		pos = self._pos
+		if pos + n > len(self._buf):
+			self._grow(n)
+		self._buf[pos:pos + n] = data
+		self._pos = pos + n
+
+	def write_zeros(self, n: int) -> None:
+		pos = self._pos
+		if pos + n > len(self._buf):
+			self._grow(n)
+		self._buf[pos:pos + n] = bytes(n)
+		self._pos = pos + n
+
+	def write_cstring(self, data: bytes) -> None:
+		self.write_bytes(data)
+		self.write_u8(0)
+
+	def set_u16le(self, offset: int, value: int) -> None:
+		"""Overwrite a placeholder at payload offset (e.g. a size field)."""
+		_U16LE.pack_into(self._buf, self._reserve + offset, value & 0xFFFF)
+
+	def getbuffer(self) -> memoryview:
+		"""Payload without the reserved area, no copy."""
+		self._exported = True
+		return memoryview(self._buf)[self._reserve:self._pos]
+
+	def frame(self, header: bytes) -> memoryview:
+		"""Put header right before the payload and return both, no copy."""
+		start = self._reserve - len(header)
+		if start < 0:
+			raise ValueError(f"Header of {len(header)} bytes does not fit in {self._reserve} reserved")
+		self._buf[start:self._reserve] = header
+		self._exported = True
+		return memoryview(self._buf)[start:self._pos]
+
+	def to_bytes(self) -> bytes:
+		return bytes(self._buf[self._reserve:self._pos])
+
+	def write_bit(self, bit: int) -> None:
+		self._bit_position -= 1
+		if bit:
+			self._bit_byte |= 1 << self._bit_position
+		if self._bit_position == 0:
+			self.flush_bits()
+
+	def write_bits(self, value: int, bit_count: int) -> None:
+		for i in range(bit_count - 1, -1, -1):
+			self.write_bit((value >> i) & 1)
+
+	def write_bit_seq(self, data: bytes, *indices: int) -> None:
+		for i in indices:
+			self.write_bit(data[i])
+
+	def write_xor_byte_seq(self, data: bytes, *indices: int) -> None:
+		for i in indices:
+			if data[i]:
+				self.write_u8(data[i] ^ 1)
+
+	def flush_bits(self) -> None:
+		if self._bit_position == 8:
+			return
+		self.write_u8(self._bit_byte)
+		self._bit_position = 8
+		self._bit_byte = 0
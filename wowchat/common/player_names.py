@@ -0,0 +1,212 @@
+"""Player names by GUID, resolved through CMSG_NAME_QUERY.
+
+Chat packets carry only the sender's GUID. lookup() answers from an LRUMap
+when it can; otherwise the callback waits for SMSG_NAME_QUERY, and lookups
+for a GUID that is already being queried join that query instead of
+sending another. Waiting callbacks run in the order they came in. The
+game handler attaches a sender for the queries while it is in the world;
+GUIDs still waiting when a session ends are queried again by the next one.
+
+A query with no reply within REPLY_TIMEOUT seconds is sent once more, as
+the reply may have been lost or throttled; if that one goes unanswered
+too, the waiters get None, as for a name the server does not know, and
+the next lookup asks again.
+
+With a StateStore the cache is snapshotted into it at most every
+SNAPSHOT_INTERVAL seconds and when a session ends, so a restart starts out
+knowing the names the bot saw recently.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+from wowchat.common.lru_map import LRUMap
+from wowchat.common.metrics import metrics
+from wowchat.common.state_store import StateStore
+
+NameCallback = Callable[[Optional["Player"]], None]
+
+
+class Player:
+	__slots__ = ('name', 'char_class', 'learned_at')
+
+	def __init__(self, name: str, char_class: int, learned_at: float = 0.0) -> None:
+		self.name = name
+		self.char_class = char_class
+		# Wall-clock time the name was learned, for the snapshot's age limit
+		self.learned_at = learned_at
+
+
+class PlayerNames:
+	# Section of the StateStore: guid -> [name, class, learned at]
+	SECTION = "player_names"
+	MAX_SIZE = 10000
+	SNAPSHOT_INTERVAL = 60.0
+	# Names older than this are not loaded back: characters get renamed
+	SNAPSHOT_MAX_AGE = 7 * 24 * 3600.0
+	# How long to wait for SMSG_NAME_QUERY before asking again or giving up
+	REPLY_TIMEOUT = 10.0
+
+	def __init__(
+		self,
+		store: Optional[StateStore] = None,
+		max_size: int = MAX_SIZE,
+		clock: Callable[[], float] = time.time,
+		reply_timeout: float = REPLY_TIMEOUT,
+	) -> None:
+		self._logger = logging.getLogger(__name__)
+		self._store = store
+		self._clock = clock
+		self._players: LRUMap[int, Player] = LRUMap(max_size)
+		metrics.add_source("names.cache", self._players.stats)
+		self._waiting: Dict[int, List[NameCallback]] = {}
+		self._send_query: Optional[Callable[[int], None]] = None
+		self._reply_timeout = reply_timeout
+		# GUID -> the reply timeout of its query in flight
+		self._timers: Dict[int, asyncio.TimerHandle] = {}
+		# GUIDs whose query has been sent again after a timeout
+		self._retried: Set[int] = set()
+		self._dirty = False
+		self._last_snapshot = clock()
+		if store is not None:
+			self._load(store.section(self.SECTION))
+
+	def __len__(self) -> int:
+		return len(self._players)
+
+	@property
+	def waiting(self) -> int:
+		"""GUIDs with a query in flight"""
+		return len(self._waiting)
+
+	def attach(self, send_query: Callable[[int], None]) -> None:
+		"""Send name queries through send_query, starting with the GUIDs still waiting"""
+		self._send_query = send_query
+		for guid in self._waiting:
+			self._query(guid)
+
+	def detach(self) -> None:
+		self._send_query = None
+		# The next session asks again, with a retry of its own
+		for timer in self._timers.values():
+			timer.cancel()
+		self._timers.clear()
+		self._retried.clear()
+
+	def get(self, guid: int) -> Optional[Player]:
+		"""The cached player, without counting a cache hit or miss"""
+		return self._players.peek(guid)
+
+	def lookup(self, guid: int, callback: NameCallback) -> None:
+		"""Call back with the player, right away when the name is known.
+
+		An unknown name gets one query however many lookups wait for it.
+		"""
+		player = self._players.get(guid)
+		if player is not None:
+			callback(player)
+			return
+		waiting = self._waiting.get(guid)
+		if waiting is not None:
+			metrics.incr("names.joined")
+			waiting.append(callback)
+			return
+		self._waiting[guid] = [callback]
+		self._query(guid)
+
+	async def resolve(self, guid: int) -> Optional[Player]:
+		"""The player with the given GUID, None if the server does not know it"""
+		future: asyncio.Future[Optional[Player]] = asyncio.get_running_loop().create_future()
+
+		def done(player: Optional[Player]) -> None:
+			if not future.done():
+				future.set_result(player)
+
+		self.lookup(guid, done)
+		return await future
+
+	def received(self, guid: int, name: str, char_class: int) -> None:
+		"""SMSG_NAME_QUERY answered: cache the name and release everything waiting on it"""
+		player = Player(name, char_class, self._clock())
+		self._players[guid] = player
+		self._dirty = True
+		self._release(guid, player)
+		if self._clock() - self._last_snapshot >= self.SNAPSHOT_INTERVAL:
+			self.snapshot()
+
+	def unknown(self, guid: int) -> None:
+		"""The server has no name for the GUID: release the waiters, cache nothing"""
+		self._release(guid, None)
+
+	def invalidate(self, guid: int) -> None:
+		"""SMSG_INVALIDATE_PLAYER: the name may have changed, ask again next time"""
+		if guid in self._players:
+			del self._players[guid]
+			self._dirty = True
+
+	def snapshot(self) -> None:
+		"""Write the cache into the StateStore and save it, if anything changed"""
+		self._last_snapshot = self._clock()
+		if self._store is None or not self._dirty:
+			return
+		section = self._store.section(self.SECTION)
+		section.clear()
+		for guid, player in self._players.items():
+			section[str(guid)] = [player.name, player.char_class, player.learned_at]
+		self._store.save()
+		self._dirty = False
+
+	def _query(self, guid: int) -> None:
+		if self._send_query is not None:
+			metrics.incr("names.queries")
+			self._send_query(guid)
+			timer = self._timers.get(guid)
+			if timer is not None:
+				timer.cancel()
+			self._timers[guid] = asyncio.get_running_loop().call_later(self._reply_timeout, self._timed_out, guid)
+
+	def _timed_out(self, guid: int) -> None:
+		del self._timers[guid]
+		if guid not in self._waiting:
+			return
+		if guid not in self._retried:
+			self._logger.warning("No SMSG_NAME_QUERY for %d, asking again", guid)
+			metrics.incr("names.retries")
+			self._retried.add(guid)
+			self._query(guid)
+			return
+		self._logger.warning("No SMSG_NAME_QUERY for %d", guid)
+		metrics.incr("names.timeouts")
+		self._release(guid, None)
+
+	def _release(self, guid: int, player: Optional[Player]) -> None:
+		timer = self._timers.pop(guid, None)
+		if timer is not None:
+			timer.cancel()
+		self._retried.discard(guid)
+		for callback in self._waiting.pop(guid, ()):
+			try:
+				callback(player)
+			except Exception as e:
+				self._logger.error("Error in name lookup callback for %d: %s", guid, e)
+
+	def _load(self, section: Dict[str, list]) -> None:
+		oldest = self._clock() - self.SNAPSHOT_MAX_AGE
+		entries = []
+		for guid, entry in section.items():
+			try:
+				name, char_class, learned_at = entry
+				entries.append((float(learned_at), int(guid), str(name), int(char_class)))
+			except (TypeError, ValueError):
+				continue
+		# Oldest first, so the LRU order carries over
+		entries.sort()
+		for learned_at, guid, name, char_class in entries:
+			if learned_at >= oldest:
+				self._players[guid] = Player(name, char_class, learned_at)
+		self._dirty = len(self._players) != len(section)
+		if self._players:
+			self._logger.info("Loaded %d player names from the state file", len(self._players))
@@ -1,17 +1,120 @@
+"""Pacing of reconnect attempts.
+
+Every failed attempt gets a failure class from where it failed. Each class
+backs off exponentially from its own first delay up to its own cap, with
+equal jitter (half the delay fixed, half random) so bots that lost the same
+server do not all come back in the same second. A session that stayed in
+the world for STABLE_SESSION seconds clears the history, and the reconnect
+after it is immediate.
+"""
 from __future__ import annotations
 
+import asyncio
 import logging
+import random
+import socket
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+
+class FailureClass:
+	DNS = "dns"  # a host name did not resolve
+	NETWORK = "network"  # refused, unreachable, reset or timed out
+	REALM_AUTH = "realm_auth"  # the realm server turned the logon down
+	WORLD_AUTH = "world_auth"  # the world server turned the session down
+	DISCONNECT = "disconnect"  # a session ended before it was stable
+	PROTOCOL = "protocol"  # anything else, e.g. a packet we could not parse
+
+
+def classify_failure(exc: BaseException) -> str:
+	"""Failure class of an exception out of a connect or reconnect"""
+	failure_class = getattr(exc, "failure_class", None)
+	if failure_class is not None:
+		return failure_class
+	if isinstance(exc, socket.gaierror):
+		return FailureClass.DNS
+	if isinstance(exc, (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError)):
+		return FailureClass.NETWORK
+	return FailureClass.PROTOCOL
+
+
+async def tcp_probe(host: str, port: int, timeout: float = 3.0) -> bool:
+	"""Whether host:port accepts a TCP connection; it is closed again at once"""
+	try:
+		_, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+	except (OSError, asyncio.TimeoutError):
+		return False
+	writer.close()
+	return True
 
 
 class ReconnectDelay:
-	def __init__(self) -> None:
+	# (first delay, cap) in seconds per failure class
+	POLICIES: Dict[str, Tuple[float, float]] = {
+		FailureClass.DISCONNECT: (1, 60),
+		FailureClass.NETWORK: (2, 120),
+		FailureClass.DNS: (5, 300),
+		FailureClass.WORLD_AUTH: (5, 300),
+		FailureClass.PROTOCOL: (10, 300),
+		# Wrong password, banned or busy account. Most rejections pass (the
+		# realm still holds the last session), so the first retry comes within
+		# the old fixed 10 seconds; the low cap keeps later ones 7.5 to 15
+		# seconds apart, no more often than the old scheduler tried
+		FailureClass.REALM_AUTH: (10, 15),
+	}
+	# Seconds in the world after which a session counts as healthy
+	STABLE_SESSION = 60.0
+
+	def __init__(
+		self,
+		policies: Optional[Dict[str, Tuple[float, float]]] = None,
+		stable_session: Optional[float] = None,
+		rng: Callable[[], float] = random.random,
+		clock: Callable[[], float] = time.monotonic,
+	) -> None:
 		self._logger = logging.getLogger(__name__)
-		self._reconnect_delay: int | None = None
+		self._policies = policies if policies is not None else self.POLICIES
+		self._stable_session = stable_session if stable_session is not None else self.STABLE_SESSION
+		self._rng = rng
+		self._clock = clock
+		# Failed attempts since the last stable session
+		self._attempts = 0
+		self._failure_class: Optional[str] = None
+		self._session_start: Optional[float] = None
+		self._reconnect_delay: float | None = None
+
+	@property
+	def attempts(self) -> int:
+		return self._attempts
+
+	@property
+	def failure_class(self) -> Optional[str]:
+		"""Class of the last failure, None after a reset"""
+		return self._failure_class
 
 	def reset(self) -> None:
+		self._attempts = 0
+		self._failure_class = None
 		self._reconnect_delay = None
 
-	def get_next(self) -> int:
-		self._reconnect_delay = 10
-		self._logger.debug("GET RECONNECT DELAY %s", self._reconnect_delay)
-		return self._reconnect_delay
\ No newline at end of file
+	def session_started(self) -> None:
+		"""The character got into the world"""
+		self._session_start = self._clock()
+
+	def session_ended(self) -> float:
+		"""Delay before reconnecting after a session in the world ended"""
+		started, self._session_start = self._session_start, None
+		if started is not None and self._clock() - started >= self._stable_session:
+			self.reset()
+			return 0.0
+		return self.get_next(FailureClass.DISCONNECT)
+
+	def get_next(self, failure_class: str = FailureClass.NETWORK) -> float:
+		"""Delay after a failure of the given class"""
+		self._attempts += 1
+		self._failure_class = failure_class
+		first, cap = self._policies[failure_class]
+		ceiling = min(cap, first * 2 ** min(self._attempts - 1, 32))
+		self._reconnect_delay = ceiling / 2 + self._rng() * ceiling / 2
+		self._logger.debug("GET RECONNECT DELAY %s (%s, attempt %d)", self._reconnect_delay, failure_class, self._attempts)
+		return self._reconnect_delay
@@ -0,0 +1,193 @@
+"""Which Discord channels get which WoW chat, and the other way round.
+
+RoutingIndex is compiled once from WowChatConfig.channels and the Discord
+text channels they name, as Discord.onStatusChange builds its maps in the
+Scala version. Everything a message needs is resolved while compiling:
+the chat type and lowercased, interned channel name of the key, the
+compiled format, and the filters, which are the channel's own or else the
+global ones, compiled into a MessageFilter shared by every target with
+the same patterns and empty when disabled. Relaying a message is then one
+dict lookup that yields a tuple of targets. The targets of a key are also
+grouped by format and filters, since a WoW channel mirrored to several
+Discord channels needs its message rendered only once per group.
+
+An index never changes once built. A reconnect to Discord or a config
+reload compiles a new one and replaces Global.routes in one assignment;
+a message being relayed keeps the index it looked up.
+"""
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Optional, Protocol, Tuple
+
+from wowchat.common.config import FiltersConfig, WowChatConfig
+from wowchat.common.format_template import FormatTemplate
+from wowchat.common.message_filter import NO_FILTER, MessageFilter
+
+
+class ChatDirection:
+	both = "both"
+	wow_to_discord = "wow_to_discord"
+	discord_to_wow = "discord_to_wow"
+
+
+class TextChannel(Protocol):
+	"""The parts of a discord.TextChannel the index needs"""
+	name: str
+	id: int
+
+
+# (chat type, lowercased WoW channel name or None)
+RouteKey = Tuple[int, Optional[str]]
+
+
+@dataclass(frozen=True, slots=True)
+class ToDiscord:
+	"""A Discord channel that WoW chat of one key goes to"""
+	channel: TextChannel
+	format: FormatTemplate
+	filters: MessageFilter
+
+	def filtered(self, message: str) -> bool:
+		return self.filters.matches(message)
+
+
+@dataclass(frozen=True, slots=True)
+class ToWow:
+	"""A WoW chat that messages from one Discord channel go to"""
+	tp: int
+	channel: Optional[str]
+	format: FormatTemplate
+	filters: MessageFilter
+
+	def filtered(self, message: str) -> bool:
+		return self.filters.matches(message)
+
+
+@dataclass(frozen=True, slots=True)
+class DiscordGroup:
+	"""The Discord channels of one key that share a format and filters,
+	so that a message is rendered and filtered once for all of them"""
+	format: FormatTemplate
+	filters: MessageFilter
+	channels: Tuple[TextChannel, ...]
+
+	def filtered(self, message: str) -> bool:
+		return self.filters.matches(message)
+
+
+def _grouped(targets: Tuple[ToDiscord, ...]) -> Tuple[DiscordGroup, ...]:
+	"""targets by format and filters, each group where its first target was"""
+	# A MessageFilter is shared by every target with its patterns, so
+	# identity is enough to tell filter sets apart
+	groups: Dict[Tuple[FormatTemplate, MessageFilter], List[TextChannel]] = {}
+	for target in targets:
+		groups.setdefault((target.format, target.filters), []).append(target.channel)
+	return tuple(DiscordGroup(fmt, filters, tuple(channels)) for (fmt, filters), channels in groups.items())
+
+
+_EMPTY: Mapping = MappingProxyType({})
+
+
+class RoutingIndex:
+	def __init__(
+		self,
+		to_discord: Mapping[RouteKey, Tuple[ToDiscord, ...]] = _EMPTY,
+		to_wow: Mapping[str, Tuple[ToWow, ...]] = _EMPTY,
+		guild_events: Mapping[str, Tuple[TextChannel, ...]] = _EMPTY,
+		guild_chat: Tuple[TextChannel, ...] = (),
+	) -> None:
+		self._to_discord = to_discord
+		self._discord_groups: Mapping[RouteKey, Tuple[DiscordGroup, ...]] = MappingProxyType(
+			{key: _grouped(targets) for key, targets in to_discord.items()}
+		)
+		self._to_wow = to_wow
+		self._guild_events = guild_events
+		self._guild_chat = guild_chat
+
+	def __bool__(self) -> bool:
+		return bool(self._to_discord or self._to_wow)
+
+	@property
+	def to_discord(self) -> Mapping[RouteKey, Tuple[ToDiscord, ...]]:
+		return self._to_discord
+
+	@property
+	def to_wow(self) -> Mapping[str, Tuple[ToWow, ...]]:
+		return self._to_wow
+
+	def discord_targets(self, tp: int, channel: Optional[str]) -> Tuple[ToDiscord, ...]:
+		"""Where a SMSG_MESSAGECHAT of this type and channel goes"""
+		return self._to_discord.get((tp, channel.lower() if channel is not None else None), ())
+
+	def discord_groups(self, tp: int, channel: Optional[str]) -> Tuple[DiscordGroup, ...]:
+		"""discord_targets grouped by format and filters"""
+		return self._discord_groups.get((tp, channel.lower() if channel is not None else None), ())
+
+	def routed(self, tp: int, channel: Optional[str]) -> bool:
+		return (tp, channel.lower() if channel is not None else None) in self._to_discord
+
+	def wow_targets(self, channel_name: str, channel_id: int) -> Tuple[ToWow, ...]:
+		"""Where a message in this Discord channel goes, by name or else by id"""
+		return self._to_wow.get(channel_name.lower()) or self._to_wow.get(str(channel_id), ())
+
+	def guild_event_channels(self, key: str) -> Tuple[TextChannel, ...]:
+		"""Channels for a guild notification: its own, or else those of guild chat"""
+		return self._guild_events.get(key, self._guild_chat)
+
+	@classmethod
+	def build(cls, config: WowChatConfig, text_channels: Iterable[TextChannel]) -> RoutingIndex:
+		text_channels = list(text_channels)
+		compiled: Dict[Tuple[str, ...], MessageFilter] = {}
+
+		def resolve(filters: Optional[FiltersConfig]) -> MessageFilter:
+			filters = filters if filters is not None else config.filters
+			if filters is None or not filters.enabled or not filters.patterns:
+				return NO_FILTER
+			patterns = tuple(filters.patterns)
+			if patterns not in compiled:
+				compiled[patterns] = MessageFilter(patterns)
+			return compiled[patterns]
+
+		def named(name: str) -> List[TextChannel]:
+			lowered = name.lower()
+			return [c for c in text_channels if c.name.lower() == lowered or str(c.id) == name]
+
+		to_discord: Dict[RouteKey, List[ToDiscord]] = {}
+		to_wow: Dict[str, List[ToWow]] = {}
+		for channel_config in config.channels:
+			wow, discord = channel_config.wow, channel_config.discord
+			direction = channel_config.chatDirection
+			matching = named(discord.channel)
+			if not matching:
+				continue
+			if direction in (ChatDirection.both, ChatDirection.discord_to_wow):
+				target = ToWow(wow.tp, wow.channel, wow.format, resolve(wow.filters))
+				to_wow.setdefault(sys.intern(discord.channel.lower()), []).append(target)
+			if direction in (ChatDirection.both, ChatDirection.wow_to_discord):
+				key = (wow.tp, sys.intern(wow.channel.lower()) if wow.channel is not None else None)
+				filters = resolve(discord.filters)
+				targets = to_discord.setdefault(key, [])
+				targets.extend(ToDiscord(channel, discord.format, filters) for channel in matching)
+
+		guild_events: Dict[str, Tuple[TextChannel, ...]] = {}
+		for key, notification in config.guildConfig.notificationConfigs.items():
+			if notification.enabled and notification.channel is not None:
+				channels = tuple(named(notification.channel))
+				if channels:
+					guild_events[sys.intern(key)] = channels
+		guild_chat = to_discord.get((cls._guild_chat_type(config), None), [])
+
+		return cls(
+			MappingProxyType({key: tuple(targets) for key, targets in to_discord.items()}),
+			MappingProxyType({key: tuple(targets) for key, targets in to_wow.items()}),
+			MappingProxyType(guild_events),
+			tuple(target.channel for target in guild_chat),
+		)
+
+	@staticmethod
+	def _guild_chat_type(config: WowChatConfig) -> int:
+		from wowchat.game.dispatch import load_expansion
+		return load_expansion(config.expansion)[0].packets.ChatEvents.CHAT_MSG_GUILD
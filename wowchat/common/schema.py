@@ -0,0 +1,91 @@
+"""Declarative packet layouts compiled to precompiled struct.Struct runs.
+
+A Schema lists the fields of a record in wire order. Consecutive fixed-size
+fields and skipped padding are merged into one struct.Struct, so decoding a
+record costs one unpack_from per run instead of one call per field.
+Null-terminated strings split runs and are located with bytes.find.
+Records are slotted dataclasses whose leading fields match the named fields
+of the schema, in order.
+"""
+from __future__ import annotations
+
+import struct
+from typing import Generic, List, Optional, Sequence, Tuple, Type, TypeVar, Union
+
+T = TypeVar("T")
+
+# Field code for a null-terminated UTF-8 string
+CSTRING = "cstring"
+
+Field = Tuple[Optional[str], str]
+Buffer = Union[bytes, bytearray]
+
+
+def skip(n: int) -> Field:
+	"""Padding or fields nobody reads"""
+	return (None, f"{n}x")
+
+
+def read_cstring(data: Buffer, offset: int) -> Tuple[str, int]:
+	"""Decode the string at offset; returns it and the offset past the terminator"""
+	end = data.find(b"\x00", offset)
+	if end < 0:
+		# Unterminated string runs to the end of the packet, like ByteReader
+		return data[offset:].decode("utf-8", errors="ignore"), len(data)
+	return data[offset:end].decode("utf-8", errors="ignore"), end + 1
+
+
+class Schema(Generic[T]):
+	def __init__(self, record_type: Type[T], fields: Sequence[Field], byte_order: str = "<") -> None:
+		self.record_type = record_type
+		# Each step is a Struct for a fixed run, or None for a cstring.
+		# The bool says whether the step's values are kept.
+		self._steps: List[Tuple[Optional[struct.Struct], bool]] = []
+		names: List[str] = []
+		run = ""
+		for name, code in fields:
+			if code == CSTRING:
+				if run:
+					self._steps.append((struct.Struct(byte_order + run), True))
+					run = ""
+				self._steps.append((None, name is not None))
+				if name is not None:
+					names.append(name)
+				continue
+			if name is None:
+				if not code.endswith("x"):
+					raise ValueError(f"Unnamed field {code!r} in {record_type.__name__} must be padding")
+			else:
+				size = struct.calcsize(byte_order + code)
+				if len(struct.unpack(byte_order + code, bytes(size))) != 1:
+					raise ValueError(f"Field {name} in {record_type.__name__} must unpack to one value")
+				names.append(name)
+			run += code
+		if run:
+			self._steps.append((struct.Struct(byte_order + run), True))
+
+		slots = getattr(record_type, "__slots__", ())
+		if tuple(names) != tuple(slots[:len(names)]):
+			raise ValueError(f"Schema fields {names} do not match {record_type.__name__} fields {list(slots)}")
+		self.names = tuple(names)
+
+		# Single fixed run: no cstrings, unpack straight into the record
+		self._struct = self._steps[0][0] if len(self._steps) == 1 else None
+		# Smallest possible encoded size, cstrings counted as the terminator
+		self.min_size = sum(st.size if st is not None else 1 for st, _ in self._steps)
+
+	def unpack_from(self, data: Buffer, offset: int = 0) -> Tuple[T, int]:
+		"""Decode one record at offset; returns it and the offset right after it"""
+		st = self._struct
+		if st is not None:
+			return self.record_type(*st.unpack_from(data, offset)), offset + st.size
+		values: list = []
+		for st, keep in self._steps:
+			if st is not None:
+				values += st.unpack_from(data, offset)
+				offset += st.size
+				continue
+			value, offset = read_cstring(data, offset)
+			if keep:
+				values.append(value)
+		return self.record_type(*values), offset
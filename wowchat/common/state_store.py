@@ -0,0 +1,47 @@
+"""What the bot learns about its server and keeps between runs.
+
+One small JSON file of named sections, each a plain dict. save() rewrites
+the whole file through a temporary one, so a crash mid-write leaves the old
+state. Without a path the store lives in memory only.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+from typing import Any, Dict, Optional
+
+
+class StateStore:
+	def __init__(self, path: Optional[str] = None) -> None:
+		self._logger = logging.getLogger(__name__)
+		self._path = path
+		self._sections: Dict[str, Dict[str, Any]] = {}
+		if path and os.path.exists(path):
+			try:
+				with open(path, "r", encoding="utf-8") as fh:
+					data = json.load(fh)
+				if isinstance(data, dict):
+					self._sections = {name: section for name, section in data.items() if isinstance(section, dict)}
+			except (OSError, ValueError) as e:
+				# A broken state file only costs what it would have saved
+				self._logger.warning("Ignoring state file %s: %s", path, e)
+
+	@property
+	def path(self) -> Optional[str]:
+		return self._path
+
+	def section(self, name: str) -> Dict[str, Any]:
+		"""The named section, created empty; changes are kept on the next save()"""
+		return self._sections.setdefault(name, {})
+
+	def save(self) -> None:
+		if not self._path:
+			return
+		tmp = self._path + ".tmp"
+		try:
+			with open(tmp, "w", encoding="utf-8") as fh:
+				json.dump(self._sections, fh, ensure_ascii=False, sort_keys=True)
+			os.replace(tmp, self._path)
+		except OSError as e:
+			self._logger.warning("Could not save state file %s: %s", self._path, e)
@@ -2,11 +2,15 @@ from __future__ import annotations
 
 import logging
 import re
-from typing import Optional
+from typing import Optional, Sequence
 
 import discord
 
+from wowchat.commands.handler import CommandHandler
 from wowchat.common.global_state import Global
+from wowchat.common.routing import RoutingIndex
+from wowchat.discord.message_resolver import EmojiIndex, MessageResolver
+from wowchat.discord.relay import deliveries, send_directly, wow_deliveries
 
 
 class DiscordClient(discord.Client):
@@ -17,13 +21,59 @@ class DiscordClient(discord.Client):
 		intents.message_content = True
 		super().__init__(intents=intents)
 		self._logger = logging.getLogger(__name__)
+		self._resolver = MessageResolver(self, Global.config.expansion)
+		# Replaced whole whenever the emojis of the guilds change
+		self.emoji_index = EmojiIndex()
 
 	async def setup_hook(self) -> None:  # type: ignore[override]
 		pass
 
 	async def on_ready(self) -> None:  # type: ignore[override]
 		self._logger.info("Discord connected as %s", self.user)
-		# TODO: Build channel maps from Global.config similar to Scala implementation
+		# Channel and member objects of the previous connection must not be used again
+		self.rebuild_routes()
+		self._resolver.names.clear()
+		self.emoji_index = EmojiIndex(self.emojis)
+		if not Global.routes:
+			self._logger.error("No discord channels configured!")
+
+	def rebuild_routes(self) -> None:
+		"""Compile the routes for the current config and text channels"""
+		text_channels = [channel for guild in self.guilds for channel in guild.text_channels]
+		Global.routes = RoutingIndex.build(Global.config, text_channels)
+
+	async def on_member_join(self, member: discord.Member) -> None:  # type: ignore[override]
+		self._resolver.names.member_joined(member)
+
+	async def on_member_update(self, before: discord.Member, after: discord.Member) -> None:  # type: ignore[override]
+		if before.display_name != after.display_name:
+			self._resolver.names.member_updated(after)
+
+	async def on_member_remove(self, member: discord.Member) -> None:  # type: ignore[override]
+		self._resolver.names.member_left(member)
+
+	async def on_user_update(self, before: discord.User, after: discord.User) -> None:  # type: ignore[override]
+		self._resolver.names.user_updated(after, self.guilds)
+
+	async def on_guild_role_create(self, role: discord.Role) -> None:  # type: ignore[override]
+		self._resolver.names.roles_changed(role.guild)
+
+	async def on_guild_role_update(self, before: discord.Role, after: discord.Role) -> None:  # type: ignore[override]
+		if before.name != after.name or before.position != after.position:
+			self._resolver.names.roles_changed(after.guild)
+
+	async def on_guild_role_delete(self, role: discord.Role) -> None:  # type: ignore[override]
+		self._resolver.names.roles_changed(role.guild)
+
+	async def on_guild_emojis_update(self, guild: discord.Guild, before: Sequence[discord.Emoji], after: Sequence[discord.Emoji]) -> None:  # type: ignore[override]
+		self.emoji_index = EmojiIndex(self.emojis)
+
+	async def on_guild_join(self, guild: discord.Guild) -> None:  # type: ignore[override]
+		self.emoji_index = EmojiIndex(self.emojis)
+
+	async def on_guild_remove(self, guild: discord.Guild) -> None:  # type: ignore[override]
+		self._resolver.names.forget(guild.id)
+		self.emoji_index = EmojiIndex(self.emojis)
 
 	async def on_message(self, message: discord.Message) -> None:  # type: ignore[override]
 		if message.author.id == self.user.id:  # type: ignore[attr-defined]
@@ -32,7 +82,7 @@ class DiscordClient(discord.Client):
 			return
 		if message.type not in (discord.MessageType.default, discord.MessageType.reply):
 			return
-		content = message.content or ""
+		content = message.clean_content or ""
 		attachments = " ".join(a.url for a in message.attachments)
 		payload = (content + " " + attachments).strip()
 		if not payload:
@@ -41,20 +91,50 @@ class DiscordClient(discord.Client):
 				message.channel.name,
 			)
 			return
-		# TODO: route to WoW once game connector is implemented
-		self._logger.info("Discord->(pending WoW) [%s] %s: %s", message.channel.name, message.author.display_name, payload)
+		discord_config = Global.config.discord
+		commands_channels = discord_config.enableCommandsChannels
+		if (not commands_channels or message.channel.name.lower() in commands_channels) and CommandHandler.handle(message.channel, payload):
+			return
+		targets = Global.routes.wow_targets(message.channel.name, message.channel.id)
+		if not targets:
+			return
+		direct = send_directly(payload, discord_config.enableDotCommands, discord_config.dotCommandsWhitelist)
+		for delivery in wow_deliveries(targets, message.author.display_name, payload, direct):
+			target = delivery.target
+			self._logger.info(
+				"%sDiscord->WoW(%s) %s", "FILTERED " if delivery.filtered else "", target.channel or target.tp, delivery.text,
+			)
+			if delivery.filtered:
+				continue
+			if Global.game is None:
+				self._logger.error("Cannot send message to WoW: not connected")
+				return
+			Global.game.send_message_to_wow(target.tp, delivery.text, target.channel)
 
 	def change_guild_status(self, text: str) -> None:
 		if self.user is None:
 			return
-		self.change_presence(activity=discord.Activity(type=discord.ActivityType.watching, name=text))
+		self.loop.create_task(self.change_presence(activity=discord.Activity(type=discord.ActivityType.watching, name=text)))
 
 	def change_realm_status(self, text: str) -> None:
 		self.change_presence(activity=discord.Activity(type=discord.ActivityType.playing, name=text))
 
 	def send_message_from_wow(self, from_name: Optional[str], message: str, wow_type: int, wow_channel: Optional[str]) -> None:
-		# TODO: Map WoW->Discord channels using Global.wow_to_discord
-		self._logger.info("WoW->Discord (pending mapping) %s", message)
+		groups = Global.routes.discord_groups(wow_type, wow_channel)
+		notify = Global.config.discord.enableTagFailedNotifications
+		for delivery in deliveries(self._resolver, groups, from_name, message, wow_channel):
+			channel = delivery.channel
+			self._logger.info("%sWoW->Discord(%s) %s", "FILTERED " if delivery.filtered else "", channel.name, delivery.text)
+			if not delivery.filtered:
+				self.loop.create_task(channel.send(delivery.text))
+			if notify:
+				for error in delivery.errors:
+					self.loop.create_task(channel.send(error))
+
+	def send_guild_notification(self, event_key: str, message: str) -> None:
+		for channel in Global.routes.guild_event_channels(event_key):
+			self._logger.info("WoW->Discord(%s) %s", channel.name, message)
+			self.loop.create_task(channel.send(message))
 
 	async def start(self, token: str) -> None:  # type: ignore[override]
 		await super().start(token)
\ No newline at end of file
@@ -1,102 +1,320 @@
+"""WoW chat markup to Discord markdown.
+
+The Scala MessageResolver rewrites a message with one regex per link
+kind, then strips colors with two more. Every such regex may start its
+match at any |, so a link can swallow whatever markup comes before it.
+The resolver keeps those regexes as the definition of the output. It
+renders in one pass over a token stream wherever that pass provably gives
+the same bytes:
+
+- a message without | has nothing to resolve
+- otherwise one regex per expansion tokenizes the markup: whole links in
+  exactly the shape their pass regex matches, |c colors, |r resets, and
+  any other |
+- a link renders in place if only earlier or same-pass links come before
+  it, so no pass regex could start its match earlier
+- colors are dropped, and so is a reset that follows one on the same
+  line, as the color regexes do
+
+Anything else runs through the regexes in sequence as before: colored
+text or stray pipes before a link, links out of pass order, or link
+markup the tokens do not cover.
+"""
 from __future__ import annotations
 
 import re
 from dataclasses import dataclass
-from typing import Iterable, List, Optional, Sequence, Tuple, TYPE_CHECKING
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
 
 if TYPE_CHECKING:  # Only for type hints; avoids importing discord at runtime
-    import discord  # type: ignore
+	import discord  # type: ignore
 
 from wowchat.common.config import WowExpansion
+from wowchat.common.lru_map import LRUMap
+from wowchat.discord.name_index import MemberNames, NameIndex
 from wowchat.game.resources import GameResources
 
 
-@dataclass
-class _RegexSpec:
+@dataclass(frozen=True)
+class _LinkPass:
+	# classicdb-style site key
 	key: str
 	pattern: re.Pattern
+	# The link as one token, with the same id and name groups as pattern
+	# wherever pattern would match exactly it; for a colored link the part
+	# after |cXXXXXXXX|H, otherwise the part after |
+	token: str
+	# The |H kinds it is for, which a stray | before must not read as a link
+	kinds: Tuple[str, ...]
+	# Whether pattern takes from any | before the link, not just the link
+	colored: bool
+
+
+_HEX = "[0-9a-fA-F]{8}"
+
+_ITEM = _LinkPass(
+	"item", re.compile(r"\|.+?\|Hitem:(\d+):.+?\|h\[(.+?)]\|h\|r"),
+	r"item:(\d+):[^|\n]+\|h\[([^|\n]+?)]\|h\|r", ("item",), True,
+)
+_SPELL = _LinkPass(
+	"spell", re.compile(r"\|.+?\|(?:Hspell|Henchant)?:(\d+).*?\|h\[(.+?)]\|h\|r"),
+	r"(?:spell|enchant):(\d+)[^|\n]*\|h\[([^|\n]+?)]\|h\|r", ("spell", "enchant", ""), True,
+)
+_QUEST = _LinkPass(
+	"quest", re.compile(r"\|.+?\|Hquest:(\d+):.+?\|h\[(.+?)]\|h\|r"),
+	r"quest:(\d+):[^|\n]+\|h\[([^|\n]+?)]\|h\|r", ("quest",), True,
+)
+_ACHIEVEMENT = _LinkPass(
+	"achievement", re.compile(r"\|.+?\|Hachievement:(\d+):.+?\|h\[(.+?)]\|h\|r"),
+	r"achievement:(\d+):[^|\n]+\|h\[([^|\n]+?)]\|h\|r", ("achievement",), True,
+)
+_TRADE_WOTLK = _LinkPass(
+	"spell", re.compile(r"\|Htrade:(\d+):.+?\|h\[(.+?)]\|h"),
+	r"Htrade:(\d+):[^|\n]+\|h\[([^|\n]+?)]\|h", ("trade",), False,
+)
+_TRADE_MOP = _LinkPass(
+	"spell", re.compile(r"\|Htrade:.+?:(\d+):.+?\|h\[(.+?)]\|h"),
+	r"Htrade:[^|\n]+?:(\d+):[^|\n]+\|h\[([^|\n]+?)]\|h", ("trade",), False,
+)
+
+# In the order the Scala resolvers apply them
+_PASSES: Dict[str, Tuple[_LinkPass, ...]] = {
+	WowExpansion.Vanilla: (_ITEM, _SPELL, _QUEST),
+	WowExpansion.TBC: (_ITEM, _SPELL, _QUEST),
+	WowExpansion.WotLK: (_ITEM, _SPELL, _QUEST, _ACHIEVEMENT, _TRADE_WOTLK),
+	WowExpansion.Cataclysm: (_ITEM, _SPELL, _QUEST, _ACHIEVEMENT),
+	WowExpansion.MoP: (_ITEM, _SPELL, _QUEST, _ACHIEVEMENT, _TRADE_MOP),
+}
+
+_SITES: Dict[str, str] = {
+	WowExpansion.Vanilla: "http://classicdb.ch",
+	WowExpansion.TBC: "http://tbc-twinhead.twinstar.cz",
+	WowExpansion.WotLK: "http://wotlk-twinhead.twinstar.cz",
+	WowExpansion.Cataclysm: "https://cata-twinhead.twinstar.cz/",
+	WowExpansion.MoP: "http://mop-shoot.tauri.hu",
+}
+
+# Token kinds after the links, whose kinds are their pass numbers
+_COLOR_TOKEN, _RESET_TOKEN, _LINKISH_TOKEN, _PIPE_TOKEN = -1, -2, -3, -4
+
+
+def _tokenizer(passes: Tuple[_LinkPass, ...]) -> Tuple[re.Pattern, Tuple[int, ...]]:
+	"""The token regex for the passes, and the token kind for each m.lastindex.
+
+	Every token starts with |, and the colored links share |cXXXXXXXX|H,
+	so the regex is written with those factored out.
+	"""
+	colored = [(i, link_pass.token) for i, link_pass in enumerate(passes) if link_pass.colored]
+	anchors = "|".join(f"H{kind}:" if kind else ":" for link_pass in passes for kind in link_pass.kinds)
+	rest = [(_COLOR_TOKEN, f"c{_HEX}"), (_RESET_TOKEN, "r")]
+	rest += [(i, link_pass.token) for i, link_pass in enumerate(passes) if not link_pass.colored]
+	rest += [(_LINKISH_TOKEN, f"(?={anchors})"), (_PIPE_TOKEN, "")]
+	by_lastindex = [0]
+	pieces = []
+	for tokens in (colored, rest):
+		alternatives = []
+		for kind, token in tokens:
+			# Each token is a group, closed after its own groups
+			by_lastindex += [kind] * (re.compile(token).groups + 1)
+			alternatives.append(f"({token})")
+		pieces.append("|".join(alternatives))
+	return re.compile(rf"\|(?:c{_HEX}\|H(?:{pieces[0]})|{pieces[1]})"), tuple(by_lastindex)
+
+
+_TOKENIZERS = {expansion: _tokenizer(passes) for expansion, passes in _PASSES.items()}
+_COLOR = re.compile(rf"\|c{_HEX}")
+_COLORED = re.compile(rf"\|c{_HEX}(.*?)\|r")
+
+_TAG_REGEXES = (re.compile(r'"@(.+?)"'), re.compile(r"@([\w]+)"))
+# :name: with a name Discord allows for a custom emoji, not all digits as
+# in 12:30:45. The closing colon is only looked at, so that it can open the
+# next name when this one is not an emoji: a:word:pepe: still finds :pepe:
+_EMOJI = re.compile(r":([A-Za-z0-9_]*[A-Za-z_][A-Za-z0-9_]*)(?=:)")
+
+
+class EmojiIndex:
+	"""Custom emoji ids by lowercased name, with the messages they resolved.
+
+	Built from client.emojis; a new one replaces it when a guild's emojis
+	change, so the memoized messages go with the old names.
+	"""
+
+	CACHE_SIZE = 4096
+	# Longer messages rarely repeat word for word
+	CACHED_LENGTH = 256
+
+	def __init__(self, emojis: Iterable[Any] = (), cache_size: int = CACHE_SIZE) -> None:
+		self._ids: Dict[str, int] = {e.name.lower(): e.id for e in emojis}
+		self._cache: LRUMap[str, str] = LRUMap(cache_size)
+
+	def __bool__(self) -> bool:
+		return bool(self._ids)
+
+	def resolve(self, message: str) -> str:
+		"""Every :name: of an emoji, in any case, as <:name:id>"""
+		if not self._ids or ":" not in message:
+			return message
+		if len(message) > self.CACHED_LENGTH:
+			return self._resolve(message)
+		resolved = self._cache.get(message)
+		if resolved is None:
+			resolved = self._cache[message] = self._resolve(message)
+		return resolved
+
+	def _resolve(self, message: str) -> str:
+		ids = self._ids
+		parts: List[str] = []
+		pos = 0
+		for m in _EMOJI.finditer(message):
+			# A name that starts on the closing colon of an emoji has no opening one
+			if m.start() < pos:
+				continue
+			emoji_id = ids.get(m.group(1).lower())
+			if emoji_id is not None:
+				parts.append(message[pos:m.start()])
+				parts.append(f"<:{m.group(1)}:{emoji_id}>")
+				pos = m.end() + 1
+		if not parts:
+			return message
+		parts.append(message[pos:])
+		return "".join(parts)
+
+
+def _reader(channel: 'discord.TextChannel') -> Callable[[Any], bool]:
+	"""Whether a member is one of channel.members, without going through all of them"""
+	if not channel.overwrites and channel.guild.default_role.permissions.read_messages:
+		# Roles only add permissions, and nothing takes this one away
+		return lambda member: True
+	return lambda member: channel.permissions_for(member).read_messages
 
 
 class MessageResolver:
-    def __init__(self, client: 'discord.Client', expansion: str) -> None:
+	def __init__(self, client: 'discord.Client', expansion: str) -> None:
 		self._client = client
+		# Kept up to date by the client's member and role events
+		self.names = MemberNames()
 		self._expansion = expansion
-		self._link_site = self._site_for_expansion(expansion)
-		self._regexes = self._regexes_for_expansion(expansion)
-
-	def _site_for_expansion(self, expansion: str) -> str:
-		if expansion == WowExpansion.Vanilla:
-			return "http://classicdb.ch"
-		if expansion == WowExpansion.TBC:
-			return "http://tbc-twinhead.twinstar.cz"
-		if expansion == WowExpansion.WotLK:
-			return "http://wotlk-twinhead.twinstar.cz"
-		if expansion == WowExpansion.Cataclysm:
-			return "https://cata-twinhead.twinstar.cz/"
-		if expansion == WowExpansion.MoP:
-			return "http://mop-shoot.tauri.hu"
-		return "http://classicdb.ch"
-
-	def _regexes_for_expansion(self, expansion: str) -> Sequence[_RegexSpec]:
-		pairs: List[Tuple[str, str]] = [
-			("item", r"\|.+?\|Hitem:(\d+):.+?\|h\[(.+?)]\|h\|r"),
-			("spell", r"\|.+?\|(?:Hspell|Henchant)?:(\d+).*?\|h\[(.+?)]\|h\|r"),
-			("quest", r"\|.+?\|Hquest:(\d+):.+?\|h\[(.+?)]\|h\|r"),
-		]
-		if expansion in (WowExpansion.WotLK, WowExpansion.Cataclysm, WowExpansion.MoP):
-			pairs.append(("achievement", r"\|.+?\|Hachievement:(\d+):.+?\|h\[(.+?)]\|h\|r"))
-		if expansion == WowExpansion.WotLK:
-			pairs.append(("spell", r"\|Htrade:(\d+):.+?\|h\[(.+?)]\|h"))
-		if expansion == WowExpansion.MoP:
-			pairs.append(("spell", r"\|Htrade:.+?:(\d+):.+?\|h\[(.+?)]\|h"))
-		return [_RegexSpec(k, re.compile(p)) for (k, p) in pairs]
+		self._link_site = _SITES.get(expansion, _SITES[WowExpansion.Vanilla])
+		self._passes = _PASSES.get(expansion, _PASSES[WowExpansion.Vanilla])
+		self._tokens, self._token_kinds = _TOKENIZERS.get(expansion, _TOKENIZERS[WowExpansion.Vanilla])
+
+	def render(self, message: str) -> str:
+		"""strip_color_coding(resolve_links(message)), in one pass where it can be"""
+		if "|" not in message:
+			return message
+		rendered = self._render(message, True)
+		if rendered is None:
+			return self.strip_color_coding(self._resolve_links_in_passes(message))
+		return rendered
 
 	def resolve_links(self, message: str) -> str:
-		for spec in self._regexes:
-			message = spec.pattern.sub(lambda m: f"[[{m.group(2)}]]({self._link_site}?{spec.key}={m.group(1)})", message)
-		return message
+		if "|" not in message:
+			return message
+		rendered = self._render(message, False)
+		return rendered if rendered is not None else self._resolve_links_in_passes(message)
 
 	def resolve_achievement_id(self, achievement_id: int) -> str:
 		name = GameResources.ACHIEVEMENT.get(achievement_id, str(achievement_id))
 		return f"[[{name}]]({self._link_site}?achievement={achievement_id})"
 
 	def strip_color_coding(self, message: str) -> str:
-		hex_pat = re.compile(r"\|c[0-9a-fA-F]{8}")
-		pass1 = re.compile(r"\|c[0-9a-fA-F]{8}(.*?)\|r")
-		return hex_pat.sub("", pass1.sub(lambda m: m.group(1), message))
-
-    def resolve_tags(self, channel: 'discord.TextChannel', message: str, on_error) -> str:
-		regexes = [re.compile(r'"@(.+?)"'), re.compile(r"@([\w]+)")]
-		members = [m for m in channel.members if m.id != self._client.user.id]  # type: ignore[union-attr]
-		effective = [(m.display_name, m.id) for m in members]
-		usernames = [(f"{m.name}#{m.discriminator}", m.id) for m in members]
-		roles = [(r.name, r.id) for r in channel.guild.roles if r.name != "@everyone"]
-
-		def resolve_group(names: List[Tuple[str, int]], tag: str, is_role: bool) -> List[Tuple[str, str]]:
+		if "|c" not in message:
+			return message
+		return _COLOR.sub("", _COLORED.sub(lambda m: m.group(1), message))
+
+	def _resolve_links_in_passes(self, message: str) -> str:
+		for link_pass in self._passes:
+			message = link_pass.pattern.sub(
+				lambda m: f"[[{m.group(2)}]]({self._link_site}?{link_pass.key}={m.group(1)})", message,
+			)
+		return message
+
+	def _render(self, message: str, strip: bool) -> Optional[str]:
+		"""The message with links resolved, and colors stripped if strip; None
+		where the link regexes in sequence might give something else"""
+		passes = self._passes
+		token_kinds = self._token_kinds
+		site = self._link_site
+		out: List[str] = []
+		pos = 0
+		# Pass of the latest markup; markup that no pass takes is after all of them
+		after_all = len(passes)
+		latest = 0
+		# A color waits for its |r, unless a newline comes first
+		open_color = False
+		for m in self._tokens.finditer(message):
+			start = m.start()
+			if pos != start:
+				text = message[pos:start]
+				out.append(text)
+				if open_color and "\n" in text:
+					open_color = False
+			pos = m.end()
+			kind = token_kinds[m.lastindex]  # type: ignore[index]
+			if kind >= 0:
+				link_pass = passes[kind]
+				if link_pass.colored:
+					if latest > kind:
+						return None
+					latest = kind
+				elif latest < kind:
+					latest = kind
+				group = m.lastindex + 1  # type: ignore[operator]
+				out.append(f"[[{m.group(group + 1)}]]({site}?{link_pass.key}={m.group(group)})")
+				continue
+			latest = after_all
+			if kind == _LINKISH_TOKEN:
+				return None
+			if strip:
+				if kind == _COLOR_TOKEN:
+					open_color = True
+					continue
+				if kind == _RESET_TOKEN and open_color:
+					open_color = False
+					continue
+			out.append(m.group())
+		out.append(message[pos:])
+		rendered = "".join(out)
+		if strip and "|c" in rendered and _COLOR.search(rendered) is not None:
+			# Stripping brought a | and eight hex digits together into a new color
+			return None
+		return rendered
+
+	def resolve_tags(self, channel: 'discord.TextChannel', message: str, on_error: Callable[[str], None]) -> str:
+		if "@" not in message:
+			return message
+		names = self.names.of(channel.guild)
+		own_id = self._client.user.id  # type: ignore[union-attr]
+		reads = _reader(channel)
+
+		def resolve_group(index: NameIndex, tag: str, is_role: bool) -> List[Tuple[str, str]]:
 			l = tag.lower()
 			if l == "here":
 				return []
-			matches = [(n, str(i) if not is_role else f"&{i}") for (n, i) in names if l in n.lower()]
+			entries = index.search(l)
+			if not is_role:
+				entries = [e for e in entries if e.id != own_id and reads(e.ref)]
+			matches = [(e.name, str(e.id) if not is_role else f"&{e.id}") for e in entries]
 			if len(matches) > 1 and " " not in l:
-				exact = [m for m in matches if m[0].lower() == l]
+				exact = [m for (m, e) in zip(matches, entries) if e.lowered == l]
 				if exact:
 					return exact
-				words = [m for m in matches if l in re.split(r"\W+", m[0].lower())]
+				words = [m for (m, e) in zip(matches, entries) if l in e.words]
 				return words or matches
 			return matches
 
-		for rx in regexes:
+		for rx in _TAG_REGEXES:
 			def replace(m):
 				tag = m.group(1)
 				matches: List[Tuple[str, str]] = []
-				for group, is_role in ((effective, False), (usernames, False), (roles, True)):
+				for index, is_role in ((names.display, False), (names.usernames, False), (names.roles, True)):
 					if matches:
-						resolved = resolve_group(group, tag, is_role)
+						resolved = resolve_group(index, tag, is_role)
 						if len(matches) == 1:
 							break
 						matches.extend(resolved)
 					else:
-						matches = resolve_group(group, tag, is_role)
+						matches = resolve_group(index, tag, is_role)
 				if len(matches) == 1:
 					return f"<@{matches[0][1]}>"
 				if 1 < len(matches) < 5:
@@ -110,15 +328,4 @@ class MessageResolver:
 		return message
 
 	def resolve_emojis(self, message: str) -> str:
-		regex = re.compile(r"(?<=:).*?(?=:)")
-		emoji_map = {e.name.lower(): e.id for e in getattr(self._client, 'emojis', [])}
-		seen = set()
-		def repl(m):
-			name = m.group(0).lower()
-			if name in seen:
-				return m.group(0)
-			seen.add(name)
-			if name in emoji_map:
-				return f"<:{m.group(0)}:{emoji_map[name]}>"
-			return m.group(0)
-		return regex.sub(repl, message)
\ No newline at end of file
+		return self._client.emoji_index.resolve(message)  # type: ignore[attr-defined]
@@ -0,0 +1,191 @@
+"""Member and role names of each Discord guild, indexed for @tags from WoW.
+
+A tag from WoW matches every name that contains it, case-insensitively,
+so resolving one by scanning means lowercasing and splitting every
+member's names for every message. A NameIndex instead keeps each name
+lowercased and split into words once, and maps every substring of up to
+GRAM characters to the names that contain it:
+
+- a tag of up to GRAM characters is one lookup
+- a longer tag takes the smallest set among its GRAM-grams and checks
+  each name in it
+
+GuildNames holds the three kinds of name a tag is tried against, as
+MessageResolver.resolve_tags tries them: display names, name#discriminator
+and roles. It is built from the guild the first time a tag needs it and
+kept up to date from the member and role events after that. Matches come
+back in guild member order, or role order for roles, as when the lists
+were scanned.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Set, TYPE_CHECKING
+
+if TYPE_CHECKING:  # Only for type hints; avoids importing discord at runtime
+	import discord  # type: ignore
+
+_WORDS = re.compile(r"\W+")
+
+
+@dataclass(frozen=True, slots=True)
+class NamedEntry:
+	id: int
+	name: str
+	lowered: str
+	# lowered split on non-word characters, for a tag that is a whole word
+	words: FrozenSet[str]
+	# Position in the guild's member or role list
+	order: Any
+	# The member or role
+	ref: Any
+
+
+class NameIndex:
+	"""Names of one kind, found by any substring"""
+
+	GRAM = 3
+
+	def __init__(self) -> None:
+		self._entries: Dict[int, NamedEntry] = {}
+		self._grams: Dict[str, Set[int]] = {}
+
+	def add(self, id: int, name: str, order: Any, ref: Any) -> None:
+		"""Index name for id, in place of what id had before"""
+		lowered = name.lower()
+		previous = self._entries.get(id)
+		if previous is not None:
+			if previous.name == name and previous.order == order:
+				self._entries[id] = NamedEntry(id, name, lowered, previous.words, order, ref)
+				return
+			self.remove(id)
+		self._entries[id] = NamedEntry(id, name, lowered, frozenset(_WORDS.split(lowered)), order, ref)
+		for gram in self._grams_of(lowered):
+			self._grams.setdefault(gram, set()).add(id)
+
+	def remove(self, id: int) -> None:
+		entry = self._entries.pop(id, None)
+		if entry is None:
+			return
+		for gram in self._grams_of(entry.lowered):
+			ids = self._grams[gram]
+			ids.discard(id)
+			if not ids:
+				del self._grams[gram]
+
+	def order_of(self, id: int) -> Any:
+		entry = self._entries.get(id)
+		return entry.order if entry is not None else None
+
+	def search(self, lowered: str) -> List[NamedEntry]:
+		"""Entries whose lowercased name contains lowered, in order"""
+		gram = self.GRAM
+		if len(lowered) <= gram:
+			ids: Iterable[int] = self._grams.get(lowered, ())
+			entries = [self._entries[i] for i in ids]
+		else:
+			smallest = None
+			for start in range(len(lowered) - gram + 1):
+				ids = self._grams.get(lowered[start:start + gram])
+				if not ids:
+					return []
+				if smallest is None or len(ids) < len(smallest):
+					smallest = ids
+			entries = [e for e in (self._entries[i] for i in smallest) if lowered in e.lowered]  # type: ignore[union-attr]
+		entries.sort(key=lambda e: e.order)
+		return entries
+
+	def _grams_of(self, lowered: str) -> Set[str]:
+		n = len(lowered)
+		return {lowered[i:i + k] for k in range(1, self.GRAM + 1) for i in range(n - k + 1)}
+
+
+class GuildNames:
+	"""Display names, usernames and roles of one guild"""
+
+	def __init__(self) -> None:
+		self.display = NameIndex()
+		self.usernames = NameIndex()
+		self.roles = NameIndex()
+		self._joined = 0
+
+	@classmethod
+	def of(cls, guild: 'discord.Guild') -> GuildNames:
+		names = cls()
+		for member in guild.members:
+			names.member_joined(member)
+		names.roles_changed(guild.roles)
+		return names
+
+	def member_joined(self, member: 'discord.Member') -> None:
+		order = self.display.order_of(member.id)
+		if order is None:
+			order = self._joined
+			self._joined += 1
+		self.display.add(member.id, member.display_name, order, member)
+		self.usernames.add(member.id, f"{member.name}#{member.discriminator}", order, member)
+
+	def member_updated(self, member: 'discord.Member') -> None:
+		"""A nickname or username change; the member keeps its place"""
+		self.member_joined(member)
+
+	def member_left(self, member_id: int) -> None:
+		self.display.remove(member_id)
+		self.usernames.remove(member_id)
+
+	def roles_changed(self, roles: Iterable['discord.Role']) -> None:
+		"""Reindex the roles, in the order given (guild.roles is by position)"""
+		self.roles = NameIndex()
+		for position, role in enumerate(roles):
+			if role.name != "@everyone":
+				self.roles.add(role.id, role.name, position, role)
+
+
+class MemberNames:
+	"""GuildNames of every guild the client is in, by guild id"""
+
+	def __init__(self) -> None:
+		self._guilds: Dict[int, GuildNames] = {}
+
+	def of(self, guild: 'discord.Guild') -> GuildNames:
+		names = self._guilds.get(guild.id)
+		if names is None:
+			names = self._guilds[guild.id] = GuildNames.of(guild)
+		return names
+
+	def clear(self) -> None:
+		"""Drop every index; a new connection brings new member objects"""
+		self._guilds.clear()
+
+	def forget(self, guild_id: int) -> None:
+		self._guilds.pop(guild_id, None)
+
+	def member_joined(self, member: 'discord.Member') -> None:
+		# A guild not indexed yet will be read whole when a tag needs it
+		names = self._guilds.get(member.guild.id)
+		if names is not None:
+			names.member_joined(member)
+
+	def member_updated(self, member: 'discord.Member') -> None:
+		names = self._guilds.get(member.guild.id)
+		if names is not None:
+			names.member_updated(member)
+
+	def member_left(self, member: 'discord.Member') -> None:
+		names = self._guilds.get(member.guild.id)
+		if names is not None:
+			names.member_left(member.id)
+
+	def user_updated(self, user: 'discord.User', guilds: Iterable['discord.Guild']) -> None:
+		"""A username change, which shows in every guild the user is a member of"""
+		for guild in guilds:
+			names = self._guilds.get(guild.id)
+			member = guild.get_member(user.id)
+			if names is not None and member is not None:
+				names.member_updated(member)
+
+	def roles_changed(self, guild: 'discord.Guild') -> None:
+		names = self._guilds.get(guild.id)
+		if names is not None:
+			names.roles_changed(guild.roles)
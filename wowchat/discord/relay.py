@@ -0,0 +1,114 @@
+"""A WoW chat message made ready for every Discord channel it goes to.
+
+Links, colors and emojis do not depend on the channel, so they are
+resolved once per message. Formatting and filtering depend only on the
+DiscordGroup, so they happen once per group. Tags are the exception: who
+a tag finds depends on who can read the channel. They are resolved per
+channel, and the channels of a group whose tags come out the same share
+the rendered text and the filter decision.
+
+The other way, a Discord message goes to each ToWow of its channel,
+formatted and split at spaces into lines that fit in WoW chat, and each
+line filtered on its own. A .command allowed by the config goes as it
+is, so the server runs it.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import AbstractSet, Dict, List, Optional, Sequence, Tuple
+
+from wowchat.common.format_template import FormatTemplate
+from wowchat.common.routing import DiscordGroup, TextChannel, ToWow
+from wowchat.discord.message_resolver import MessageResolver
+
+
+@dataclass(frozen=True, slots=True)
+class Delivery:
+	channel: TextChannel
+	text: str
+	filtered: bool
+	# What went wrong resolving tags, for the channel to be told
+	errors: Tuple[str, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class WowDelivery:
+	target: ToWow
+	text: str
+	filtered: bool
+
+
+# Longest line WoW chat takes
+MAX_WOW_MESSAGE = 255
+
+
+def escape_markdown(message: str) -> str:
+	return message.replace("`", "\\`").replace("*", "\\*").replace("_", "\\_").replace("~", "\\~")
+
+
+def deliveries(
+	resolver: MessageResolver,
+	groups: Sequence[DiscordGroup],
+	from_name: Optional[str],
+	message: str,
+	wow_channel: Optional[str],
+) -> List[Delivery]:
+	"""The message for each channel of groups, in order"""
+	if not groups:
+		return []
+	parsed = resolver.resolve_emojis(resolver.render(message))
+	user = from_name or ""
+	target = wow_channel or ""
+	out: List[Delivery] = []
+	for group in groups:
+		# Text after tags -> (formatted, filtered)
+		rendered: Dict[str, Tuple[str, bool]] = {}
+		for channel in group.channels:
+			errors: List[str] = []
+			resolved = resolver.resolve_tags(channel, parsed, errors.append) if from_name is not None else parsed  # type: ignore[arg-type]
+			done = rendered.get(resolved)
+			if done is None:
+				formatted = group.format.render(user=user, message=escape_markdown(resolved), target=target)
+				done = rendered[resolved] = (formatted, group.filtered(formatted))
+			out.append(Delivery(channel, done[0], done[1], tuple(errors)))
+	return out
+
+
+def send_directly(message: str, enabled: bool, whitelist: AbstractSet[str]) -> bool:
+	"""Whether message is a .command to pass to WoW unformatted: any one with
+	an empty whitelist, else those in it or starting an entry that ends in *"""
+	if not enabled or not message.startswith("."):
+		return False
+	command = message[1:].lower()
+	return (
+		not whitelist
+		or command in whitelist
+		or any(entry.endswith("*") and command.startswith(entry[:-1]) for entry in whitelist)
+	)
+
+
+def wow_lines(fmt: FormatTemplate, user: str, message: str) -> List[str]:
+	"""message formatted for WoW, split at spaces so that no line is longer
+	than MAX_WOW_MESSAGE; a word longer than a line is cut"""
+	room = max(MAX_WOW_MESSAGE - len(fmt.render(user=user, message="")), 1)
+	parts = []
+	while len(message) > room:
+		space = message.rfind(" ", 0, room)
+		if space < 0:
+			parts.append(message[:room])
+			message = message[room:]
+		else:
+			parts.append(message[:space])
+			message = message[space + 1:]
+	if message:
+		parts.append(message)
+	return [fmt.render(user=user, message=part) for part in parts]
+
+
+def wow_deliveries(targets: Sequence[ToWow], user: str, message: str, direct: bool) -> List[WowDelivery]:
+	"""The lines of message for each WoW chat in targets, in order"""
+	out: List[WowDelivery] = []
+	for target in targets:
+		lines = [message] if direct else wow_lines(target.format, user, message)
+		out.extend(WowDelivery(target, line, target.filtered(line)) for line in lines)
+	return out
@@ -0,0 +1,103 @@
+"""
+Таблиця обробників ігрових пакетів.
+
+Для кожного доповнення реєстр opcode -> обробник будується один раз на
+процес: модуль доповнення імпортується лише при першому запиті, тож бот
+для WotLK ніколи не завантажує таблиці Cataclysm чи MoP. Кожен виклик
+обробника рахується разом із сумарним часом, проведеним у ньому.
+"""
+from __future__ import annotations
+
+import importlib
+import time
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Tuple
+
+from wowchat.common.config import WowExpansion
+
+# Незв'язана функція обробника: (екземпляр GamePacketHandler, тіло пакета)
+OpcodeHandler = Callable[[Any, bytes], Awaitable[None]]
+
+# Модуль і клас обробника для кожного доповнення, як у GameConnector.scala
+_EXPANSION_HANDLERS: Dict[str, Tuple[str, str]] = {
+    WowExpansion.Vanilla: ('wowchat.game.handler', 'GamePacketHandler'),
+    WowExpansion.TBC: ('wowchat.game.handler_tbc', 'GamePacketHandlerTBC'),
+    WowExpansion.WotLK: ('wowchat.game.handler_wotlk', 'GamePacketHandlerWotLK'),
+    WowExpansion.Cataclysm: ('wowchat.game.handler_cataclysm', 'GamePacketHandlerCataclysm15595'),
+    WowExpansion.MoP: ('wowchat.game.handler_mop', 'GamePacketHandlerMoP18414'),
+}
+
+
+class OpcodeStats:
+    """Кількість викликів і сумарний час обробника одного opcode"""
+
+    __slots__ = ('calls', 'total_time')
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.total_time = 0.0
+
+    @property
+    def average_time(self) -> float:
+        return self.total_time / self.calls if self.calls else 0.0
+
+
+class OpcodeRegistry:
+    """Відображення opcode -> обробник з пошуком за O(1)"""
+
+    def __init__(self) -> None:
+        self._handlers: Dict[int, OpcodeHandler] = {}
+        self._stats: Dict[int, OpcodeStats] = {}
+
+    def register(self, opcode: int, handler: OpcodeHandler) -> None:
+        """Зареєструвати обробник; повторна реєстрація замінює попередній"""
+        self._handlers[opcode] = handler
+        self._stats.setdefault(opcode, OpcodeStats())
+
+    @property
+    def opcodes(self) -> FrozenSet[int]:
+        """Opcode з обробниками - решту фреймер може відкидати одразу"""
+        return frozenset(self._handlers)
+
+    def __contains__(self, opcode: int) -> bool:
+        return opcode in self._handlers
+
+    async def dispatch(self, target: Any, opcode: int, data: bytes) -> bool:
+        """Викликати обробник opcode для target; False, якщо його немає"""
+        handler = self._handlers.get(opcode)
+        if handler is None:
+            return False
+        stats = self._stats[opcode]
+        start = time.perf_counter()
+        try:
+            await handler(target, data)
+        finally:
+            stats.calls += 1
+            stats.total_time += time.perf_counter() - start
+        return True
+
+    def stats(self) -> Dict[int, OpcodeStats]:
+        return self._stats
+
+    def busiest(self, limit: int = 10) -> List[Tuple[int, OpcodeStats]]:
+        """Opcode з найбільшим сумарним часом обробки"""
+        used = [(opcode, stats) for opcode, stats in self._stats.items() if stats.calls]
+        used.sort(key=lambda item: item[1].total_time, reverse=True)
+        return used[:limit]
+
+
+_registries: Dict[str, Tuple[type, OpcodeRegistry]] = {}
+
+
+def load_expansion(expansion: str) -> Tuple[type, OpcodeRegistry]:
+    """Клас обробника і реєстр opcode для доповнення (кешуються на процес)"""
+    cached = _registries.get(expansion)
+    if cached is None:
+        try:
+            module_name, class_name = _EXPANSION_HANDLERS[expansion]
+        except KeyError:
+            raise ValueError(f"Expansion {expansion} not supported!") from None
+        handler_class = getattr(importlib.import_module(module_name), class_name)
+        registry = OpcodeRegistry()
+        handler_class.register_handlers(registry)
+        cached = _registries[expansion] = (handler_class, registry)
+    return cached
@@ -0,0 +1,346 @@
+"""
+Розбір потоку ігрових пакетів на кадри.
+
+Аналог GamePacketDecoder/GamePacketDecoderWotLK зі Scala версії, але на
+asyncio.BufferedProtocol: дані читаються одразу в багаторазовий буфер,
+заголовки розшифровуються на місці, а кожен recv віддає стільки повних
+кадрів (opcode, memoryview), скільки в ньому вмістилося.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import struct
+import zlib
+from typing import AbstractSet, Callable, Iterator, Optional, Tuple
+
+
+FrameCallback = Callable[[int, memoryview], None]
+LostCallback = Callable[[Optional[Exception]], None]
+
+
+class GameProtocolError(ConnectionError):
+    """Потік пакетів зламаний: далі кадри вже не розібрати"""
+
+
+class GamePacketFramer(asyncio.BufferedProtocol):
+    """Кадрування ігрових пакетів з 4-байтним заголовком (Vanilla/TBC)"""
+
+    HEADER_LENGTH = 4
+    # Найдовший клієнтський заголовок (розмір + 4-байтний opcode); стільки
+    # місця ByteWriter лишає перед тілом пакета під encode_header
+    CLIENT_HEADER_RESERVE = 6
+    # Стиснення з'являється лише в Cataclysm/MoP
+    HAS_COMPRESSION = False
+    DEFAULT_BUFFER_SIZE = 64 * 1024
+    # Мінімум вільного місця, яке віддаємо транспорту в get_buffer
+    MIN_RECV_SPACE = 4096
+
+    def __init__(
+        self,
+        header_crypt,
+        frame_received: FrameCallback,
+        connection_lost: Optional[LostCallback] = None,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        interesting_opcodes: Optional[AbstractSet[int]] = None,
+    ) -> None:
+        self._logger = logging.getLogger(__name__)
+        self._header_crypt = header_crypt
+        self._frame_received = frame_received
+        self._connection_lost = connection_lost
+        self._buf = bytearray(buffer_size)
+        self._view = memoryview(self._buf)
+        self._start = 0
+        self._end = 0
+        # Стан поточного кадру: -1 означає, що заголовок ще не прочитано
+        self._size = -1
+        self._opcode = 0
+        # Пакети з opcode поза цим набором пропускаються прямо в буфері,
+        # без копіювання і логування. None - віддавати все.
+        self.interesting_opcodes = interesting_opcodes
+        # Скільки байтів тіла відкинутого пакета ще не надійшло
+        self._skip = 0
+        self.discarded_packets = 0
+        self.discarded_bytes = 0
+        self.transport: Optional[asyncio.Transport] = None
+        self._paused = False
+        self._drain_waiter: Optional[asyncio.Future] = None
+        self._closed: Optional[asyncio.Future] = None
+        # Помилка протоколу, через яку ми закрили з'єднання
+        self._error: Optional[GameProtocolError] = None
+
+    # --- asyncio.BufferedProtocol ---
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore[assignment]
+        self._closed = asyncio.get_running_loop().create_future()
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        if self._start == self._end:
+            self._start = self._end = 0
+        needed = max(self.MIN_RECV_SPACE, self._missing())
+        if len(self._buf) - self._end < needed:
+            self._compact(needed)
+        return self._view[self._end:]
+
+    def buffer_updated(self, nbytes: int) -> None:
+        self._end += nbytes
+        if self._error is not None:
+            # З'єднання вже закривається; решта потоку нічого не варта
+            self._start = self._end
+            return
+        if self._skip:
+            skipped = min(self._skip, self._end - self._start)
+            self._skip -= skipped
+            self._start += skipped
+        frame_received = self._frame_received
+        for opcode, payload in self._parse_frames():
+            frame_received(opcode, payload)
+
+    def eof_received(self) -> bool:
+        return False
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.transport = None
+        if exc is None:
+            exc = self._error
+        if self._closed is not None and not self._closed.done():
+            self._closed.set_result(None)
+        waiter = self._drain_waiter
+        if waiter is not None and not waiter.done():
+            if exc is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(exc)
+        if self._connection_lost is not None:
+            self._connection_lost(exc)
+
+    def pause_writing(self) -> None:
+        self._paused = True
+
+    def resume_writing(self) -> None:
+        self._paused = False
+        waiter = self._drain_waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    # --- Публічний API ---
+
+    async def drain(self) -> None:
+        """Дочекатися, поки транспорт прийме дані (аналог StreamWriter.drain)"""
+        if self.transport is None:
+            raise ConnectionResetError("Connection lost")
+        if not self._paused:
+            return
+        self._drain_waiter = asyncio.get_running_loop().create_future()
+        try:
+            await self._drain_waiter
+        finally:
+            self._drain_waiter = None
+
+    async def wait_closed(self) -> None:
+        if self._closed is not None:
+            await self._closed
+
+    def encode_header(self, opcode: int, size: int, encrypted: bool = True) -> bytes:
+        """Заголовок CMSG для тіла довжиною size (аналог GamePacketEncoder)
+
+        Клієнтський opcode займає 4 байти; у незашифрованих пакетах старші
+        два байти пише сам обробник на початку тіла.
+        """
+        if not encrypted:
+            return struct.pack('>H', size + 2) + struct.pack('<H', opcode)
+        return self._header_crypt.encrypt(struct.pack('>H', size + 4) + struct.pack('<I', opcode))
+
+    # --- Розбір кадрів ---
+
+    def _parse_frames(self) -> Iterator[Tuple[int, memoryview]]:
+        """Віддати всі повні кадри, що вже є в буфері.
+
+        memoryview вказує прямо в буфер прийому і дійсний лише до наступного
+        get_buffer, тому отримувач має скопіювати дані, якщо зберігає їх.
+        """
+        view = self._view
+        interesting = self.interesting_opcodes
+        has_compression = self.HAS_COMPRESSION
+        while True:
+            if self._size < 0:
+                if not self._read_header():
+                    return
+                if self._size < 0:
+                    # Поле розміру менше за 2 байти самого opcode: від'ємний
+                    # розмір повів би читання назад, у вже розшифрований заголовок
+                    self._protocol_error(f"Invalid packet size field {self._size + 2} (opcode 0x{self._opcode:04X})")
+                    return
+            start = self._start
+            end = start + self._size
+            if has_compression and self._is_compressed(self._opcode):
+                # Стиснені пакети розпаковуються завжди: потік zlib спільний
+                # для всього з'єднання, тож пропуск одного зламав би наступні
+                if end > self._end:
+                    return
+                self._start = end
+                self._size = -1
+                opcode, payload = self._decompress(self._opcode, view[start:end])
+                if interesting is not None and opcode not in interesting:
+                    self.discarded_packets += 1
+                    self.discarded_bytes += len(payload)
+                    continue
+                yield opcode, payload
+                continue
+            if interesting is not None and self._opcode not in interesting:
+                self.discarded_packets += 1
+                self.discarded_bytes += self._size
+                self._size = -1
+                if end > self._end:
+                    # Решту тіла відкинемо в buffer_updated, щойно вона надійде
+                    self._skip = end - self._end
+                    self._start = self._end
+                    return
+                self._start = end
+                continue
+            if end > self._end:
+                return
+            self._start = end
+            self._size = -1
+            yield self._opcode, view[start:end]
+
+    def _read_header(self) -> bool:
+        """Прочитати заголовок за self._start; False, якщо байтів ще замало"""
+        start = self._start
+        if self._end - start < self.HEADER_LENGTH:
+            return False
+        buf = self._buf
+        if self._header_crypt.is_initialized:
+            self._header_crypt.decrypt_into(buf, start, start + self.HEADER_LENGTH)
+        # Розмір big-endian, ID little-endian
+        self._size = ((buf[start] << 8) | buf[start + 1]) - 2
+        self._opcode = (buf[start + 3] << 8) | buf[start + 2]
+        self._start = start + self.HEADER_LENGTH
+        return True
+
+    def _protocol_error(self, message: str) -> None:
+        """Закрити з'єднання; connection_lost передасть помилку далі"""
+        self._logger.error("Game packet stream broken: %s", message)
+        self._error = GameProtocolError(message)
+        self._start = self._end
+        self._size = -1
+        if self.transport is not None:
+            self.transport.close()
+
+    def _missing(self) -> int:
+        """Скільки байтів ще бракує до кінця поточного кадру"""
+        if self._size < 0:
+            return self.HEADER_LENGTH + 1
+        return self._size - (self._end - self._start)
+
+    def _compact(self, needed: int) -> None:
+        """Зсунути непрочитані байти на початок буфера або збільшити його"""
+        pending = self._end - self._start
+        if pending + needed > len(self._buf):
+            new_buf = bytearray(max(len(self._buf) * 2, pending + needed))
+            new_buf[:pending] = self._view[self._start:self._end]
+            self._buf = new_buf
+            self._view = memoryview(new_buf)
+        elif pending:
+            self._view[:pending] = self._view[self._start:self._end]
+        self._start = 0
+        self._end = pending
+
+
+class GamePacketFramerWotLK(GamePacketFramer):
+    """Кадрування для WotLK і пізніших: 5-байтний заголовок, якщо розмір > 0x7FFF"""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        # Перші 4 байти великого заголовка вже розшифровані, чекаємо п'ятий
+        self._partial_header = False
+
+    def _read_header(self) -> bool:
+        start = self._start
+        available = self._end - start
+        if available < self.HEADER_LENGTH:
+            return False
+        buf = self._buf
+        crypt = self._header_crypt
+        if not crypt.is_initialized:
+            return super()._read_header()
+
+        if not self._partial_header:
+            crypt.decrypt_into(buf, start, start + self.HEADER_LENGTH)
+        if buf[start] & 0x80:
+            if available < self.HEADER_LENGTH + 1:
+                self._partial_header = True
+                return False
+            self._partial_header = False
+            extra = start + self.HEADER_LENGTH
+            crypt.decrypt_into(buf, extra, extra + 1)
+            self._size = (((buf[start] & 0x7F) << 16) | (buf[start + 1] << 8) | buf[start + 2]) - 2
+            self._opcode = (buf[extra] << 8) | buf[start + 3]
+            self._start = extra + 1
+        else:
+            self._size = ((buf[start] << 8) | buf[start + 1]) - 2
+            self._opcode = (buf[start + 3] << 8) | buf[start + 2]
+            self._start = start + self.HEADER_LENGTH
+        return True
+
+
+class GamePacketFramerCataclysm(GamePacketFramerWotLK):
+    """Cataclysm: заголовок як у WotLK, плюс стиснені пакети (opcode | 0x8000)"""
+
+    HAS_COMPRESSION = True
+    COMPRESSED_DATA_MASK = 0x8000
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._inflater = self._create_inflater()
+
+    def _create_inflater(self):
+        return zlib.decompressobj()
+
+    def _is_compressed(self, opcode: int) -> bool:
+        return (opcode & self.COMPRESSED_DATA_MASK) == self.COMPRESSED_DATA_MASK
+
+    def _decompress(self, opcode: int, payload: memoryview) -> Tuple[int, memoryview]:
+        # Перші 4 байти - розмір розпакованих даних, він нам не потрібен
+        data = self._inflater.decompress(payload[4:])
+        return opcode ^ self.COMPRESSED_DATA_MASK, memoryview(data)
+
+
+class GamePacketFramerMoP(GamePacketFramerCataclysm):
+    """MoP: упакований 4-байтний заголовок і стиснення без заголовка zlib"""
+
+    SMSG_COMPRESSED_DATA = 0x1568
+
+    def _create_inflater(self):
+        return zlib.decompressobj(-zlib.MAX_WBITS)
+
+    def encode_header(self, opcode: int, size: int, encrypted: bool = True) -> bytes:
+        if not encrypted:
+            return struct.pack('<HH', size + 2, opcode)
+        return self._header_crypt.encrypt(struct.pack('<I', (size << 13) | (opcode & 0x1FFF)))
+
+    def _read_header(self) -> bool:
+        start = self._start
+        if self._end - start < self.HEADER_LENGTH:
+            return False
+        buf = self._buf
+        end = start + self.HEADER_LENGTH
+        if self._header_crypt.is_initialized:
+            self._header_crypt.decrypt_into(buf, start, end)
+            raw = int.from_bytes(buf[start:end], 'little')
+            self._size = raw >> 13
+            self._opcode = raw & 0x1FFF
+        else:
+            self._size = (buf[start] | (buf[start + 1] << 8)) - 2
+            self._opcode = buf[start + 2] | (buf[start + 3] << 8)
+        self._start = end
+        return True
+
+    def _is_compressed(self, opcode: int) -> bool:
+        return opcode == self.SMSG_COMPRESSED_DATA
+
+    def _decompress(self, opcode: int, payload: memoryview) -> Tuple[int, memoryview]:
+        # Розмір розпакованих даних і дві контрольні суми adler пропускаємо
+        data = memoryview(self._inflater.decompress(payload[12:]))
+        return data[0] | (data[1] << 8), data[4:]
@@ -0,0 +1,228 @@
+"""
+Ростер гільдії в пам'яті.
+
+Члени гільдії лежать стовпцями: масиви guid, рівнів, класів, зон і часу
+виходу, bytearray прапорців онлайну і список імен, а guid і ім'я ведуть до
+рядка. Кожен новий SMSG_GUILD_ROSTER застосовується як різниця з тим, що
+вже відомо: назовні йдуть події лише про змінених членів, а рядки решти
+лишаються як були. SMSG_GUILD_EVENT (входи, виходи, вступ і вихід з
+гільдії) змінюють ростер одразу, тож наступний ростер їх уже не повторює.
+
+Інтервал опитування адаптивний: якщо ростер не приніс нічого, чого не
+сказали події, інтервал подвоюється до MAX_POLL_INTERVAL; якщо приніс -
+повертається до POLL_INTERVAL.
+"""
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+
+@dataclass(slots=True)
+class GuildMember:
+    guid: int
+    is_online: bool
+    name: str
+    level: int
+    char_class: int
+    zone_id: int
+    last_logoff: float = 0.0
+
+
+@dataclass(slots=True)
+class RosterEvent:
+    # joined, left, online, offline або updated (рівень, зона чи ім'я)
+    kind: str
+    member: GuildMember
+
+
+# Події, які мали б прийти через SMSG_GUILD_EVENT
+_PUSHED_KINDS = frozenset(("joined", "left", "online", "offline"))
+
+
+class GuildRoster:
+    """Члени гільдії за guid; різниця між ростерами як події"""
+
+    POLL_INTERVAL = 60.0
+    MAX_POLL_INTERVAL = 600.0
+
+    def __init__(self) -> None:
+        self._guids = array('Q')
+        self._names: List[str] = []
+        self._online = bytearray()
+        self._levels = bytearray()
+        self._classes = bytearray()
+        self._zones = array('I')
+        self._last_logoff = array('f')
+        # guid -> рядок і ім'я в нижньому регістрі -> рядок
+        self._rows: Dict[int, int] = {}
+        self._by_name: Dict[str, int] = {}
+        self._online_count = 0
+        # Імена з GE_JOINED, чиїх guid ще немає: їхня поява в ростері не подія
+        self._announced: Set[str] = set()
+        self._loaded = False
+        self.poll_interval = self.POLL_INTERVAL
+        # Зміни, які першим приніс SMSG_GUILD_EVENT, і які лише ростер
+        self.pushed = 0
+        self.missed = 0
+
+    def __len__(self) -> int:
+        return len(self._guids)
+
+    def __contains__(self, guid: object) -> bool:
+        return guid in self._rows
+
+    def __iter__(self) -> Iterator[GuildMember]:
+        return (self._member(row) for row in range(len(self._guids)))
+
+    @property
+    def loaded(self) -> bool:
+        """Чи приходив уже хоч один ростер"""
+        return self._loaded
+
+    @property
+    def online_count(self) -> int:
+        return self._online_count
+
+    def get(self, guid: int) -> Optional[GuildMember]:
+        row = self._rows.get(guid)
+        return self._member(row) if row is not None else None
+
+    def find(self, name: str) -> Optional[GuildMember]:
+        """Член гільдії за ім'ям без урахування регістру"""
+        row = self._by_name.get(name.lower())
+        return self._member(row) if row is not None else None
+
+    def online(self) -> List[GuildMember]:
+        """Члени гільдії онлайн, за ім'ям"""
+        online = self._online
+        members = [self._member(row) for row in range(len(online)) if online[row]]
+        members.sort(key=lambda member: member.name)
+        return members
+
+    def apply(self, members: Iterable[GuildMember]) -> List[RosterEvent]:
+        """Застосувати новий ростер; події про членів, що змінилися.
+
+        Перший ростер лише заповнює сховище і подій не дає.
+        """
+        rows = self._rows
+        online = self._online
+        levels = self._levels
+        zones = self._zones
+        names = self._names
+        first = not self._loaded
+        seen = bytearray(len(self._guids))
+        events: List[RosterEvent] = []
+        for member in members:
+            row = rows.get(member.guid)
+            if row is None:
+                self._add(member)
+                lowered = member.name.lower()
+                if lowered in self._announced:
+                    self._announced.discard(lowered)
+                elif not first:
+                    events.append(RosterEvent("joined", member))
+                continue
+            seen[row] = 1
+            self._last_logoff[row] = member.last_logoff
+            if online[row] != member.is_online:
+                online[row] = member.is_online
+                self._online_count += 1 if member.is_online else -1
+                events.append(RosterEvent("online" if member.is_online else "offline", member))
+            elif levels[row] != member.level or zones[row] != member.zone_id or names[row] != member.name:
+                events.append(RosterEvent("updated", member))
+            else:
+                continue
+            levels[row] = member.level
+            zones[row] = member.zone_id
+            if names[row] != member.name:
+                self._by_name.pop(names[row].lower(), None)
+                names[row] = member.name
+                self._by_name[member.name.lower()] = row
+
+        # Знизу вгору, щоб перенесений на місце вилученого рядок уже був перевірений
+        for row in range(len(seen) - 1, -1, -1):
+            if not seen[row]:
+                events.append(RosterEvent("left", self._member(row)))
+                self._remove(row)
+
+        self._loaded = True
+        # Імена з GE_JOINED, яких немає і в цьому ростері, вже не чекаємо
+        self._announced.clear()
+        if not first:
+            missed = sum(1 for event in events if event.kind in _PUSHED_KINDS)
+            self.missed += missed
+            if missed:
+                self.poll_interval = self.POLL_INTERVAL
+            else:
+                self.poll_interval = min(self.poll_interval * 2, self.MAX_POLL_INTERVAL)
+        return events
+
+    def signed_on(self, name: str) -> bool:
+        """GE_SIGNED_ON; False, якщо члена з таким ім'ям ще немає"""
+        return self._set_online(name, True)
+
+    def signed_off(self, name: str) -> bool:
+        return self._set_online(name, False)
+
+    def joined(self, name: str) -> None:
+        """GE_JOINED: guid прийде з наступним ростером"""
+        self.pushed += 1
+        self._announced.add(name.lower())
+
+    def left(self, name: str) -> bool:
+        """GE_LEFT або GE_REMOVED"""
+        row = self._by_name.get(name.lower())
+        if row is None:
+            return False
+        self.pushed += 1
+        self._remove(row)
+        return True
+
+    def _set_online(self, name: str, is_online: bool) -> bool:
+        row = self._by_name.get(name.lower())
+        if row is None:
+            return False
+        self.pushed += 1
+        if self._online[row] != is_online:
+            self._online[row] = is_online
+            self._online_count += 1 if is_online else -1
+        return True
+
+    def _member(self, row: int) -> GuildMember:
+        return GuildMember(
+            self._guids[row], bool(self._online[row]), self._names[row],
+            self._levels[row], self._classes[row], self._zones[row], self._last_logoff[row],
+        )
+
+    def _add(self, member: GuildMember) -> None:
+        row = len(self._guids)
+        self._guids.append(member.guid)
+        self._names.append(member.name)
+        self._online.append(member.is_online)
+        self._levels.append(member.level)
+        self._classes.append(member.char_class)
+        self._zones.append(member.zone_id)
+        self._last_logoff.append(member.last_logoff)
+        self._rows[member.guid] = row
+        self._by_name[member.name.lower()] = row
+        if member.is_online:
+            self._online_count += 1
+
+    def _remove(self, row: int) -> None:
+        """Вилучити рядок, перенісши на його місце останній"""
+        if self._online[row]:
+            self._online_count -= 1
+        del self._rows[self._guids[row]]
+        self._by_name.pop(self._names[row].lower(), None)
+        last = len(self._guids) - 1
+        if row != last:
+            for column in (self._guids, self._names, self._online, self._levels,
+                           self._classes, self._zones, self._last_logoff):
+                column[row] = column[last]
+            self._rows[self._guids[row]] = row
+            self._by_name[self._names[row].lower()] = row
+        for column in (self._guids, self._names, self._online, self._levels,
+                       self._classes, self._zones, self._last_logoff):
+            del column[last]
@@ -0,0 +1,861 @@
+"""
+Обробка ігрових пакетів (Vanilla 1.12.x).
+
+Порт GamePacketHandler.scala. Обробники доповнень успадковують цей клас і
+перевизначають розбір окремих пакетів, як у Scala версії; таблицю opcode
+кожного доповнення задає атрибут класу packets.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import random
+import struct
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+import wowchat.game.packets as game_packets
+from wowchat.commands.handler import CommandHandler
+from wowchat.commands.who import WhoResponse
+from wowchat.common.config import get_game_build
+from wowchat.common.global_state import Global
+from wowchat.common.player_names import Player
+from wowchat.common.packet import ByteReader, ByteWriter
+from wowchat.common.schema import CSTRING, Schema, skip
+from wowchat.game.dispatch import OpcodeRegistry
+from wowchat.game.framer import GamePacketFramer
+from wowchat.game.guild_roster import GuildMember, GuildRoster, RosterEvent
+from wowchat.game.header_crypt import GameHeaderCrypt
+from wowchat.game.packets import AuthResponseCodes, ChatNotify, Classes, Genders, Races
+from wowchat.game.resources import GameResources
+from wowchat.game.writer import Payload
+
+if TYPE_CHECKING:
+    from wowchat.game.connector import GameConnector
+
+
+@dataclass(slots=True)
+class CharEnumMessage:
+    guid: int
+    name: str
+    race: int
+    guild_guid: int
+
+
+@dataclass(slots=True)
+class NameQueryMessage:
+    guid: int
+    # None, якщо сервер не знає гравця з таким guid
+    name: Optional[str]
+    char_class: int
+
+
+@dataclass(slots=True)
+class ChatMessage:
+    guid: int
+    tp: int
+    message: str
+    channel: Optional[str] = None
+    # Лише для CHAT_MSG_GUILD_ACHIEVEMENT (WotLK+)
+    achievement_id: Optional[int] = None
+
+
+@dataclass(slots=True)
+class GuildInfo:
+    name: str
+    # id рангу -> назва
+    ranks: Dict[int, str]
+
+
+def char_enum_schema(tail_length: int) -> Schema[CharEnumMessage]:
+    """Запис персонажа в SMSG_CHAR_ENUM до Cataclysm: все після імені - один Struct"""
+    return Schema(CharEnumMessage, (
+        ('guid', 'Q'),
+        ('name', CSTRING),
+        ('race', 'B'),  # визначає мову чату
+        skip(8),  # class, gender, skin, face, hair style, hair color, facial hair, level
+        skip(4 + 4 + 12),  # zone, map, x + y + z
+        ('guild_guid', 'I'),
+        skip(tail_length),
+    ))
+
+
+# Тип і мова SMSG_MESSAGECHAT
+_CHAT_HEAD = struct.Struct('<Bi')
+# guid відправника і довжина тексту; для SAY/YELL між ними guid цілі
+_CHAT_SENDER = struct.Struct('<QI')
+_CHAT_SENDER_TARGET = struct.Struct('<Q8xI')
+
+# Рівень, клас і раса в записі SMSG_WHO
+_WHO_LEVEL_CLASS_RACE = struct.Struct('<III')
+
+# Тип і мова CMSG_MESSAGECHAT
+_CHAT_OUT = struct.Struct('<II')
+
+# Тіла CMSG без бітових полів збираються з готових Struct одним b''.join:
+# кілька викликів на рівні C замість виклику методу на кожне поле
+
+# Розмір (0), збірка клієнта і id сервера CMSG_AUTH_CHALLENGE
+AUTH_HEAD = struct.Struct('<HII')
+# Насіння клієнта
+SEED = struct.Struct('>I')
+_GUID = struct.Struct('<Q')
+U32 = struct.Struct('<I')
+# CMSG_WHO: рівні від 0 до 100 перед іменем; після нього кінець рядка,
+# порожня гільдія, усі раси, усі класи, без зон і рядків пошуку
+_WHO_LEVELS = struct.pack('<II', 0, 100)
+_WHO_TAIL = struct.pack('<xxIIII', 0xFFFFFFFF, 0xFFFFFFFF, 0, 0)
+
+# Відмови SMSG_CHANNEL_NOTIFY на вхід у канал
+_CHANNEL_ERRORS = {
+    ChatNotify.CHAT_WRONG_PASSWORD_NOTICE: "Wrong password for %s.",
+    ChatNotify.CHAT_MUTED_NOTICE: "[%s] You do not have permission to speak.",
+    ChatNotify.CHAT_BANNED_NOTICE: "[%s] You are banned from that channel.",
+    ChatNotify.CHAT_WRONG_FACTION_NOTICE: "Wrong alliance for %s.",
+    ChatNotify.CHAT_INVALID_NAME_NOTICE: "Invalid channel name %s",
+    ChatNotify.CHAT_THROTTLED_NOTICE: "[%s] The number of messages that can be sent to this channel is limited, please wait to send another message.",
+    ChatNotify.CHAT_NOT_IN_AREA_NOTICE: "[%s] You are not in the correct area for this channel.",
+    ChatNotify.CHAT_NOT_IN_LFG_NOTICE: "[%s] You must be queued in looking for group before joining this channel.",
+}
+
+# Ключі відповідей, на які чекає bootstrap
+_BOOTSTRAP_GUILD_QUERY = "guild query"
+_BOOTSTRAP_GUILD_ROSTER = "guild roster"
+
+
+class GamePacketHandler:
+    """Обробник ігрових пакетів для Vanilla"""
+
+    packets = game_packets
+    framer_class = GamePacketFramer
+    header_crypt_class = GameHeaderCrypt
+
+    ADDON_INFO = bytes([
+        0x56, 0x01, 0x00, 0x00, 0x78, 0x9C, 0x75, 0xCC, 0xBD, 0x0E, 0xC2, 0x30, 0x0C, 0x04, 0xE0, 0xF2,
+        0x1E, 0xBC, 0x0C, 0x61, 0x40, 0x95, 0xC8, 0x42, 0xC3, 0x8C, 0x4C, 0xE2, 0x22, 0x0B, 0xC7, 0xA9,
+        0x8C, 0xCB, 0x4F, 0x9F, 0x1E, 0x16, 0x24, 0x06, 0x73, 0xEB, 0x77, 0x77, 0x81, 0x69, 0x59, 0x40,
+        0xCB, 0x69, 0x33, 0x67, 0xA3, 0x26, 0xC7, 0xBE, 0x5B, 0xD5, 0xC7, 0x7A, 0xDF, 0x7D, 0x12, 0xBE,
+        0x16, 0xC0, 0x8C, 0x71, 0x24, 0xE4, 0x12, 0x49, 0xA8, 0xC2, 0xE4, 0x95, 0x48, 0x0A, 0xC9, 0xC5,
+        0x3D, 0xD8, 0xB6, 0x7A, 0x06, 0x4B, 0xF8, 0x34, 0x0F, 0x15, 0x46, 0x73, 0x67, 0xBB, 0x38, 0xCC,
+        0x7A, 0xC7, 0x97, 0x8B, 0xBD, 0xDC, 0x26, 0xCC, 0xFE, 0x30, 0x42, 0xD6, 0xE6, 0xCA, 0x01, 0xA8,
+        0xB8, 0x90, 0x80, 0x51, 0xFC, 0xB7, 0xA4, 0x50, 0x70, 0xB8, 0x12, 0xF3, 0x3F, 0x26, 0x41, 0xFD,
+        0xB5, 0x37, 0x90, 0x19, 0x66, 0x8F
+    ])
+
+    # Скільки байтів запису персонажа в SMSG_CHAR_ENUM йде після guild guid:
+    # прапорці, first login, pet info, 19 слотів екіпіровки і перша сумка
+    CHAR_ENUM_TAIL_LENGTH = 4 + 1 + 12 + 19 * 5 + 5
+    CHAR_ENUM_ENTRY = char_enum_schema(CHAR_ENUM_TAIL_LENGTH)
+
+    # Розділ StateStore: "realm|account|character" -> guid, раса, гільдія і
+    # чи пускає сервер у світ без SMSG_CHAR_ENUM
+    CHARACTER_CACHE = "characters"
+    # Скільки сесій поспіль сервер має закрити між входом з GUID із кешу і
+    # світом, щоб далі входити через список персонажів; і через скільки
+    # секунд знову спробувати без списку
+    DIRECT_FAILURES = 3
+    DIRECT_RETRY = 24 * 3600.0
+
+    # Опис рангу в SMSG_GUILD_ROSTER: лише права
+    GUILD_RANK_LENGTH = 4
+    # Член гільдії до змінних полів (last logoff і нотатки)
+    GUILD_MEMBER = Schema(GuildMember, (
+        ('guid', 'Q'),
+        ('is_online', '?'),
+        ('name', CSTRING),
+        skip(4),  # guild rank
+        ('level', 'B'),
+        ('char_class', 'B'),
+        ('zone_id', 'I'),
+    ))
+
+    # Скільки секунд bootstrap чекає відповідей, перш ніж вважати relay
+    # робочим без них
+    BOOTSTRAP_TIMEOUT = 10.0
+    # Пауза між подією, що просить ростер (GE_JOINED), і запитом
+    ROSTER_REFRESH_DELAY = 5.0
+    # Стать у записі SMSG_WHO з'явилась у TBC
+    WHO_HAS_GENDER = False
+
+    def __init__(self, connector: GameConnector, realm_id: int, realm_name: str, session_key: bytes) -> None:
+        self._connector = connector
+        self._realm_id = realm_id
+        self._realm_name = realm_name
+        self._session_key = session_key
+        self._logger = logging.getLogger(__name__)
+        self._character_guid: Optional[int] = None
+        self._race = 0
+        self._guild_guid = 0
+        self._in_world = False
+        # Сервер прийняв ключ сесії (AUTH_OK або черга)
+        self._authenticated = False
+        self._received_char_enum = False
+        # CMSG_PLAYER_LOGIN пішов з GUID із кешу, без списку персонажів
+        self._login_from_cache = False
+        self._guild_motd: Optional[str] = None
+        self._guild_info: Optional[GuildInfo] = None
+        self._guild_roster = GuildRoster()
+        # Опитування ростера після bootstrap; _roster_wanted просить позачерговий
+        self._guild_roster_task: Optional[asyncio.Task] = None
+        self._roster_wanted = asyncio.Event()
+        # Відповіді, яких чекає bootstrap після входу у світ
+        self._bootstrap_pending: Dict[str, asyncio.Future] = {}
+        self._bootstrap_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def register_handlers(cls, registry: OpcodeRegistry) -> None:
+        """Заповнити реєстр; підкласи додають свої opcode після super()"""
+        p = cls.packets
+        registry.register(p.SMSG_AUTH_CHALLENGE, cls._handle_auth_challenge)
+        registry.register(p.SMSG_AUTH_RESPONSE, cls._handle_auth_response)
+        registry.register(p.SMSG_CHAR_ENUM, cls._handle_char_enum)
+        if p.SMSG_CHARACTER_LOGIN_FAILED is not None:
+            registry.register(p.SMSG_CHARACTER_LOGIN_FAILED, cls._handle_character_login_failed)
+        registry.register(p.SMSG_LOGIN_VERIFY_WORLD, cls._handle_login_verify_world)
+        registry.register(p.SMSG_CHANNEL_NOTIFY, cls._handle_channel_notify)
+        registry.register(p.SMSG_MESSAGECHAT, cls._handle_messagechat)
+        registry.register(p.SMSG_NAME_QUERY, cls._handle_name_query)
+        registry.register(p.SMSG_INVALIDATE_PLAYER, cls._handle_invalidate_player)
+        registry.register(p.SMSG_GUILD_QUERY, cls._handle_guild_query)
+        registry.register(p.SMSG_GUILD_ROSTER, cls._handle_guild_roster)
+        registry.register(p.SMSG_GUILD_EVENT, cls._handle_guild_event)
+        registry.register(p.SMSG_WHO, cls._handle_who)
+
+    @classmethod
+    def is_unencrypted_packet(cls, opcode: int) -> bool:
+        """CMSG, що відправляються без шифрування заголовка"""
+        return opcode == cls.packets.CMSG_AUTH_CHALLENGE
+
+    def _new_packet(self, capacity: int = 64) -> ByteWriter:
+        """Буфер для CMSG з бітовими полями, з місцем під заголовок перед тілом"""
+        return ByteWriter(capacity, reserve=self.framer_class.CLIENT_HEADER_RESERVE)
+
+    @property
+    def in_world(self) -> bool:
+        return self._in_world
+
+    @property
+    def authenticated(self) -> bool:
+        return self._authenticated
+
+    @property
+    def character_guid(self) -> Optional[int]:
+        return self._character_guid
+
+    @property
+    def guild_info(self) -> Optional[GuildInfo]:
+        return self._guild_info
+
+    @property
+    def guild_roster(self) -> GuildRoster:
+        return self._guild_roster
+
+    # --- SMSG_AUTH_CHALLENGE ---
+
+    async def _handle_auth_challenge(self, data: bytes) -> None:
+        """Обробка SMSG_AUTH_CHALLENGE"""
+        self._logger.info("Received auth challenge")
+        response = self._build_auth_challenge(ByteReader(data))
+
+        # Шифрування заголовків вмикається ПЕРЕД відправкою відповіді (як у Scala),
+        # сама відповідь іде незашифрованою
+        self._connector.header_crypt.init(self._session_key)
+        self._logger.debug("Header encryption initialized")
+
+        self._connector.send_packet(self.packets.CMSG_AUTH_CHALLENGE, response)
+
+    def _build_auth_challenge(self, reader: ByteReader) -> bytes:
+        account = Global.config.wow.account
+        server_seed = reader.read_u32be()
+        client_seed = random.randint(0, 0x7FFFFFFF)
+
+        return b''.join((
+            AUTH_HEAD.pack(0, get_game_build(Global.config), 0),
+            account, b'\x00',
+            SEED.pack(client_seed),
+            self._auth_digest(account, client_seed, server_seed),
+            self.ADDON_INFO,
+        ))
+
+    def _auth_digest(self, account: bytes, client_seed: int, server_seed: int) -> bytes:
+        md = hashlib.sha1()
+        md.update(account)
+        md.update(b'\x00\x00\x00\x00')
+        md.update(struct.pack('>I', client_seed))
+        md.update(struct.pack('>I', server_seed))
+        md.update(self._session_key)
+        return md.digest()
+
+    # --- SMSG_AUTH_RESPONSE ---
+
+    async def _handle_auth_response(self, data: bytes) -> None:
+        """Обробка SMSG_AUTH_RESPONSE"""
+        self._connector.auth_answered()
+        if not data:
+            self._logger.error("Empty auth response")
+            return
+
+        reader = ByteReader(data)
+        code = self._parse_auth_response(reader)
+        self._logger.info("Auth response code: 0x%02X", code)
+
+        if code == AuthResponseCodes.AUTH_OK:
+            self._authenticated = True
+            self._logger.info("Successfully logged in!")
+            await self._login_character()
+        elif code == AuthResponseCodes.AUTH_WAIT_QUEUE:
+            self._authenticated = True
+            if reader.remaining() >= 14:
+                reader.skip(10)
+            position = reader.read_u32le() if reader.remaining() >= 4 else 0
+            self._logger.info("Queue enabled. Position: %d", position)
+        else:
+            self._logger.error("Authentication failed: %s", AuthResponseCodes.get_message(code))
+            await self._connector.disconnect()
+
+    def _parse_auth_response(self, reader: ByteReader) -> int:
+        return reader.read_u8()
+
+    def _character_cache_key(self) -> str:
+        account = Global.config.wow.account.decode('utf-8', errors='replace')
+        return f"{self._realm_name.lower()}|{account}|{Global.config.wow.character.lower()}"
+
+    async def _login_character(self) -> None:
+        """Увійти одразу з GUID із кешу, а без нього - через список персонажів"""
+        if self._login_from_cache:
+            return
+        cached = Global.state.section(self.CHARACTER_CACHE).get(self._character_cache_key())
+        if cached is None or not self._direct_login_allowed(cached):
+            await self._send_char_enum()
+            return
+        self._logger.info("Logging in with character %s (cached GUID: %d)", Global.config.wow.character, cached['guid'])
+        self._character_guid = cached['guid']
+        self._race = cached.get('race', 0)
+        self._guild_guid = cached.get('guild_guid', 0)
+        self._login_from_cache = True
+        self._connector.send_packet(self.packets.CMSG_PLAYER_LOGIN, self._build_player_login())
+
+    @staticmethod
+    def _direct_login_allowed(cached: Dict[str, Any]) -> bool:
+        """Чи входити з GUID із кешу: сервер це пускав, або настав час спробувати знову"""
+        return cached.get('direct', True) or time.time() >= cached.get('retry_at', 0.0)
+
+    def _remember_character(self) -> None:
+        """Зберегти GUID персонажа, з яким увійшли у світ. Вхід з GUID із кешу
+        вдався - лічильник невдач скидається; вхід через список лишає як було"""
+        cache = Global.state.section(self.CHARACTER_CACHE)
+        key = self._character_cache_key()
+        previous = cache.get(key)
+        direct = self._login_from_cache or previous is None or previous.get('direct', True)
+        entry = {
+            'guid': self._character_guid,
+            'race': self._race,
+            'guild_guid': self._guild_guid,
+            'direct': direct,
+            'failures': 0 if direct else previous.get('failures', 0),
+        }
+        if not direct:
+            entry['retry_at'] = previous.get('retry_at', 0.0)
+        if entry != previous:
+            cache[key] = entry
+            Global.state.save()
+
+    def connection_closed(self, by_server: bool = False) -> None:
+        """Сесія закінчилась. Якщо сервер сам закрив її після входу з GUID із
+        кешу, не пустивши у світ (напр. TrinityCore без SMSG_CHAR_ENUM), це
+        невдача; після DIRECT_FAILURES невдач поспіль (або першої ж, коли це
+        була повторна спроба) входимо через список персонажів DIRECT_RETRY
+        секунд. Помилка мережі про сервер нічого не каже і не рахується"""
+        if self._bootstrap_task is not None:
+            self._bootstrap_task.cancel()
+        if self._guild_roster_task is not None:
+            self._guild_roster_task.cancel()
+        if Global.game is self:
+            Global.game = None
+        if self._in_world:
+            Global.names.detach()
+            Global.who.detach()
+            Global.names.snapshot()
+        if not self._login_from_cache or self._in_world or not by_server:
+            return
+        cached = Global.state.section(self.CHARACTER_CACHE).get(self._character_cache_key())
+        if cached is None:
+            return
+        failures = cached.get('failures', 0) + 1
+        cached['failures'] = failures
+        if failures >= self.DIRECT_FAILURES or not cached.get('direct', True):
+            self._logger.info(
+                "Server ended %d sessions after a login with the cached GUID; using the character list for %.0f h",
+                failures, self.DIRECT_RETRY / 3600,
+            )
+            cached['direct'] = False
+            cached['retry_at'] = time.time() + self.DIRECT_RETRY
+        Global.state.save()
+
+    # --- SMSG_CHARACTER_LOGIN_FAILED ---
+
+    async def _handle_character_login_failed(self, data: bytes) -> None:
+        """Обробка SMSG_CHARACTER_LOGIN_FAILED"""
+        code = data[0] if data else 0
+        if not self._login_from_cache:
+            self._logger.error("Character login failed (0x%02X)", code)
+            return
+        # GUID із кешу застарів (персонажа видалено або перейменовано)
+        self._logger.info("Login with the cached GUID failed (0x%02X), requesting the character list", code)
+        Global.state.section(self.CHARACTER_CACHE).pop(self._character_cache_key(), None)
+        Global.state.save()
+        self._login_from_cache = False
+        self._character_guid = None
+        await self._send_char_enum()
+
+    async def _send_char_enum(self) -> None:
+        """Відправити запит на список персонажів"""
+        # Повторно запитуємо лише якщо попередня спроба не вдалася (напр. через warden)
+        if self._received_char_enum:
+            return
+        self._connector.send_packet(self.packets.CMSG_CHAR_ENUM)
+        self._logger.info("Requested character list")
+
+    # --- SMSG_CHAR_ENUM ---
+
+    async def _handle_char_enum(self, data: bytes) -> None:
+        """Обробка SMSG_CHAR_ENUM"""
+        if self._received_char_enum:
+            if self._in_world:
+                # Після входу у світ список персонажів уже не цікавий
+                return
+            self._logger.info("Received character enum more than once. Trying to join the world again...")
+        self._received_char_enum = True
+
+        character = self._parse_char_enum(ByteReader(data))
+        if character is None:
+            self._logger.error("Character '%s' not found!", Global.config.wow.character)
+            return
+
+        self._logger.info("Logging in with character %s (GUID: %d)", character.name, character.guid)
+        self._character_guid = character.guid
+        self._race = character.race
+        self._guild_guid = character.guild_guid
+        self._connector.send_packet(self.packets.CMSG_PLAYER_LOGIN, self._build_player_login())
+
+    def _parse_char_enum(self, reader: ByteReader) -> Optional[CharEnumMessage]:
+        target_name = Global.config.wow.character.lower()
+        count = reader.read_u8()
+        self._logger.info("Found %d characters", count)
+
+        # Потрібні лише guid, ім'я, раса і гільдія
+        for character in reader.iter_records(self.CHAR_ENUM_ENTRY, count):
+            if character.name.lower() == target_name:
+                return character
+        return None
+
+    def _build_player_login(self) -> Payload:
+        return _GUID.pack(self._character_guid)
+
+    # --- SMSG_MESSAGECHAT ---
+
+    async def _handle_messagechat(self, data: bytes) -> None:
+        """Обробка SMSG_MESSAGECHAT"""
+        message = self._parse_chat_message(ByteReader(data))
+        if message is not None:
+            self._relay_chat(message)
+
+    def _relay_chat(self, message: ChatMessage) -> None:
+        """Переслати в Discord, щойно відоме ім'я відправника"""
+        if Global.discord is None:
+            return
+        # Без маршруту і ім'я відправника не потрібне
+        if not Global.routes.routed(message.tp, message.channel):
+            return
+        if message.guid == 0:
+            Global.discord.send_message_from_wow(None, message.message, message.tp, message.channel)
+            return
+
+        def send(player: Optional[Player]) -> None:
+            name = player.name if player is not None else "UNKNOWN"
+            Global.discord.send_message_from_wow(name, message.message, message.tp, message.channel)
+
+        Global.names.lookup(message.guid, send)
+
+    def _parse_chat_message(self, reader: ByteReader, gm: bool = False) -> Optional[ChatMessage]:
+        """Розбір SMSG_MESSAGECHAT; None для аддонів і власних повідомлень"""
+        events = self.packets.ChatEvents
+        tp, lang = reader.read_struct(_CHAT_HEAD)
+        # повідомлення аддонів ігноруємо
+        if lang == -1:
+            return None
+
+        channel = None
+        if tp == events.CHAT_MSG_CHANNEL:
+            channel = reader.read_cstring()
+            reader.skip(4)
+
+        # ці події мають guid цілі, який треба пропустити
+        if tp == events.CHAT_MSG_SAY or tp == events.CHAT_MSG_YELL:
+            guid, text_length = reader.read_struct(_CHAT_SENDER_TARGET)
+        else:
+            guid, text_length = reader.read_struct(_CHAT_SENDER)
+        # власні повідомлення ігноруємо, крім системних
+        if tp != events.CHAT_MSG_SYSTEM and guid == self._character_guid:
+            return None
+        text = reader.read_bytes(text_length - 1).decode('utf-8', errors='ignore')
+        return ChatMessage(guid, tp, text, channel)
+
+    # --- SMSG_NAME_QUERY ---
+
+    def _send_name_query(self, guid: int) -> None:
+        self._connector.send_packet(self.packets.CMSG_NAME_QUERY, self._build_name_query(guid))
+
+    def _build_name_query(self, guid: int) -> Payload:
+        return _GUID.pack(guid)
+
+    async def _handle_name_query(self, data: bytes) -> None:
+        """Обробка SMSG_NAME_QUERY"""
+        message = self._parse_name_query(ByteReader(data))
+        if message.name is None:
+            self._logger.error("RECV SMSG_NAME_QUERY - Name not known for guid %d", message.guid)
+            Global.names.unknown(message.guid)
+        else:
+            Global.names.received(message.guid, message.name, message.char_class)
+
+    def _parse_name_query(self, reader: ByteReader) -> NameQueryMessage:
+        guid = reader.read_u64le()
+        name = reader.read_cstring()
+        reader.skip_cstring()  # realm name для міжсерверних полів бою
+        reader.skip(4)  # race
+        reader.skip(4)  # gender
+        char_class = reader.read_u32le() & 0xFF
+        return NameQueryMessage(guid, name, char_class)
+
+    # --- SMSG_INVALIDATE_PLAYER ---
+
+    async def _handle_invalidate_player(self, data: bytes) -> None:
+        """Обробка SMSG_INVALIDATE_PLAYER: гравця перейменували або видалили"""
+        Global.names.invalidate(self._parse_invalidate_player(ByteReader(data)))
+
+    def _parse_invalidate_player(self, reader: ByteReader) -> int:
+        return reader.read_u64le()
+
+    # --- SMSG_GUILD_QUERY ---
+
+    def _build_guild_query(self) -> Payload:
+        return U32.pack(self._guild_guid & 0xFFFFFFFF)
+
+    async def _handle_guild_query(self, data: bytes) -> None:
+        """Обробка SMSG_GUILD_QUERY"""
+        self._guild_info = self._parse_guild_query(ByteReader(data))
+        self._bootstrap_done(_BOOTSTRAP_GUILD_QUERY)
+
+    def _parse_guild_query(self, reader: ByteReader) -> GuildInfo:
+        reader.skip(4)  # guild id
+        name = reader.read_cstring()
+        ranks = {}
+        for i in range(10):
+            rank = reader.read_cstring()
+            if rank:
+                ranks[i] = rank
+        return GuildInfo(name, ranks)
+
+    # --- SMSG_GUILD_ROSTER ---
+
+    def _build_guild_roster(self) -> Payload:
+        return b''
+
+    def _request_guild_roster(self) -> None:
+        self._connector.send_packet(self.packets.CMSG_GUILD_ROSTER, self._build_guild_roster())
+
+    async def _poll_guild_roster(self) -> None:
+        """Запитувати ростер раз на poll_interval ростера, а після GE_JOINED
+        чи події про невідомого члена - через ROSTER_REFRESH_DELAY"""
+        roster = self._guild_roster
+        while True:
+            try:
+                await asyncio.wait_for(self._roster_wanted.wait(), roster.poll_interval)
+                # Кілька подій поспіль обходяться одним запитом
+                await asyncio.sleep(self.ROSTER_REFRESH_DELAY)
+            except asyncio.TimeoutError:
+                pass
+            self._roster_wanted.clear()
+            self._request_guild_roster()
+
+    async def _handle_guild_roster(self, data: bytes) -> None:
+        """Обробка SMSG_GUILD_ROSTER: розбір і застосування як різниці"""
+        roster = self._guild_roster
+        first = not roster.loaded
+        online_before = roster.online_count
+        events = roster.apply(self._parse_guild_roster(ByteReader(data)).values())
+        for event in events:
+            self._roster_event(event)
+        if events:
+            self._logger.debug("Guild roster: %d changes, next poll in %.0f s", len(events), roster.poll_interval)
+        if first or roster.online_count != online_before:
+            self._update_guildies_online()
+        self._bootstrap_done(_BOOTSTRAP_GUILD_ROSTER)
+
+    def _roster_event(self, event: RosterEvent) -> None:
+        """Зміна, якої не було в SMSG_GUILD_EVENT, як сповіщення"""
+        if event.kind == "updated" or event.member.name.lower() == Global.config.wow.character.lower():
+            return
+        self._guild_notification(event.kind, event.member.name)
+
+    def _parse_guild_roster(self, reader: ByteReader) -> Dict[int, GuildMember]:
+        """Розбір SMSG_GUILD_ROSTER: guid -> член гільдії; запам'ятовує MOTD"""
+        count = reader.read_u32le()
+        self._guild_motd = reader.read_cstring()
+        reader.skip_cstring()  # guild info
+        ranks_count = reader.read_u32le()
+        reader.skip(ranks_count * self.GUILD_RANK_LENGTH)
+
+        roster: Dict[int, GuildMember] = {}
+        for _ in range(count):
+            member = reader.read_record(self.GUILD_MEMBER)
+            if not member.is_online:
+                member.last_logoff = reader.read_f32le()
+            reader.skip_cstring()  # public note
+            reader.skip_cstring()  # officer note
+            roster[member.guid] = member
+        return roster
+
+    # --- SMSG_GUILD_EVENT ---
+
+    async def _handle_guild_event(self, data: bytes) -> None:
+        """Обробка SMSG_GUILD_EVENT"""
+        reader = ByteReader(data)
+        event = reader.read_u8()
+        count = reader.read_u8()
+        self._guild_event(event, [reader.read_cstring() for _ in range(count)])
+
+    def _guild_event(self, event: int, messages: List[str]) -> None:
+        """Подія гільдії: одразу в ростер, далі сповіщення, як у Scala"""
+        # порожні повідомлення ігноруємо
+        if all(not message.strip() for message in messages):
+            return
+        events = self.packets.GuildEvents
+        # події про себе ігноруємо
+        if event != events.GE_MOTD and Global.config.wow.character.lower() == messages[0].lower():
+            return
+
+        roster = self._guild_roster
+        online_before = roster.online_count
+        if event == events.GE_SIGNED_ON or event == events.GE_SIGNED_OFF:
+            known = roster.signed_on(messages[0]) if event == events.GE_SIGNED_ON else roster.signed_off(messages[0])
+            if not known:
+                self._roster_wanted.set()
+        elif event == events.GE_JOINED:
+            roster.joined(messages[0])
+            self._roster_wanted.set()
+        elif event == events.GE_LEFT or event == events.GE_REMOVED:
+            roster.left(messages[0])
+        elif event == events.GE_MOTD:
+            self._guild_motd = messages[0]
+        if roster.online_count != online_before:
+            self._update_guildies_online()
+
+        key = events.notification_key(event)
+        if key is None:
+            return
+        if event == events.GE_PROMOTED or event == events.GE_DEMOTED:
+            self._guild_notification(key, messages[0], target=messages[1], rank=messages[2])
+        elif event == events.GE_REMOVED:
+            self._guild_notification(key, messages[1], target=messages[0])
+        else:
+            self._guild_notification(key, messages[0])
+
+    def _guild_notification(self, key: str, user: str, target: Optional[str] = None, rank: Optional[str] = None) -> None:
+        if Global.discord is None:
+            return
+        config = Global.config.guildConfig.notificationConfigs[key]
+        if not config.enabled:
+            return
+        formatted = config.format.render(user=user, message=user, target=target or "", rank=rank or "")
+        Global.discord.send_guild_notification(key, formatted)
+
+    # --- Команди з Discord ---
+
+    def handle_who(self, name: Optional[str], reply: Optional[Callable[[str], object]] = None) -> Optional[str]:
+        """?who з ім'ям: відповідь рядками в reply, коли її дасть Global.who;
+        без імені (і ?online) - список гільдійців онлайн з ростера в пам'яті"""
+        if not name:
+            return self._build_guildies_online()
+
+        def answer(results: Optional[List[WhoResponse]]) -> None:
+            if reply is not None:
+                for line in CommandHandler.who_lines(name, results, self._guild_info, self._guild_roster):
+                    reply(line)
+
+        Global.who.request(name, answer)
+        return None
+
+    def handle_gmotd(self) -> Optional[str]:
+        if self._guild_motd is None:
+            return None
+        config = Global.config.guildConfig.notificationConfigs["motd"]
+        return config.format.render(message=self._guild_motd)
+
+    def send_message_to_wow(self, tp: int, message: str, target: Optional[str]) -> None:
+        """Рядок з Discord у чат WoW; target - канал або адресат шепоту"""
+        if not self._in_world:
+            self._logger.error("Cannot send message to WoW: not in the world")
+            return
+        packet = self._build_chat_message(
+            tp, message.encode('utf-8'), target.encode('utf-8') if target is not None else None,
+        )
+        if packet is None:
+            return
+        try:
+            self._connector.send_packet(*packet)
+        except ConnectionError as e:
+            self._logger.error("Cannot send message to WoW: %s", e)
+
+    def _build_chat_message(self, tp: int, message: bytes, target: Optional[bytes]) -> Optional[Tuple[int, Payload]]:
+        """CMSG_MESSAGECHAT: тип і мова, канал або адресат, якщо є, і текст"""
+        head = _CHAT_OUT.pack(tp, Races.language(self._race))
+        if target is None:
+            return self.packets.CMSG_MESSAGECHAT, b''.join((head, message, b'\x00'))
+        return self.packets.CMSG_MESSAGECHAT, b''.join((head, target, b'\x00', message, b'\x00'))
+
+    # --- SMSG_WHO ---
+
+    def _send_who(self, name: str) -> None:
+        self._connector.send_packet(self.packets.CMSG_WHO, self._build_who(name))
+
+    async def _handle_who(self, data: bytes) -> None:
+        """Обробка SMSG_WHO: відповідь на CMSG_WHO, що чекає в Global.who"""
+        Global.who.received(self._parse_who(ByteReader(data)))
+
+    def _parse_who(self, reader: ByteReader) -> List[WhoResponse]:
+        display_count = reader.read_u32le()
+        reader.skip(4)  # match count
+        results = []
+        for _ in range(display_count):
+            player_name = reader.read_cstring()
+            guild_name = reader.read_cstring()
+            level, char_class, race = reader.read_struct(_WHO_LEVEL_CLASS_RACE)
+            gender = Genders.value_of(reader.read_u8()) if self.WHO_HAS_GENDER else None
+            zone_id = reader.read_u32le()
+            results.append(WhoResponse(
+                player_name, guild_name, level, Classes.value_of(char_class & 0xFF), Races.value_of(race & 0xFF),
+                gender, GameResources.AREA.get(zone_id, "Unknown Zone"),
+            ))
+        return results
+
+    def _build_who(self, name: str) -> Payload:
+        return b''.join((_WHO_LEVELS, name.encode('utf-8'), _WHO_TAIL))
+
+    def _guildies_online(self) -> int:
+        """Гільдійці онлайн, крім самого бота"""
+        me = self._guild_roster.find(Global.config.wow.character)
+        return self._guild_roster.online_count - (1 if me is not None and me.is_online else 0)
+
+    def guildies_online_message(self, is_status: bool) -> str:
+        size = self._guildies_online()
+        guildies = "guildie" if size == 1 else "guildies"
+        if is_status:
+            return f"{size} {guildies} online"
+        if size <= 0:
+            return "Currently no guildies online."
+        return f"Currently {size} {guildies} online:\n"
+
+    def _build_guildies_online(self) -> str:
+        character = Global.config.wow.character.lower()
+        return self.guildies_online_message(False) + ", ".join(
+            f"{member.name} ({member.level} {Classes.value_of(member.char_class)} in "
+            f"{GameResources.AREA.get(member.zone_id, 'Unknown Zone')})"
+            for member in self._guild_roster.online()
+            if member.name.lower() != character
+        )
+
+    def _update_guildies_online(self) -> None:
+        if Global.discord is not None:
+            Global.discord.change_guild_status(self.guildies_online_message(True))
+
+    async def _handle_login_verify_world(self, data: bytes) -> None:
+        """Обробка SMSG_LOGIN_VERIFY_WORLD"""
+        # Деякі сервери надсилають цей пакет більше одного разу
+        if self._in_world:
+            return
+
+        self._logger.info("Successfully joined the world!")
+        self._in_world = True
+        Global.game = self
+        self._remember_character()
+        self._connector.entered_world()
+        self._start_bootstrap()
+
+    # --- Bootstrap після входу у світ ---
+
+    def _start_bootstrap(self) -> None:
+        """Канали з конфігурації, назва і ростер гільдії: усі запити стають у
+        чергу відправки в одному такті і йдуть одним flush, а відповіді
+        збираються паралельно, а не по одній на кожен round trip. Імена, на
+        які чекали, коли обірвалась попередня сесія, запитуються тим самим
+        flush"""
+        loop = asyncio.get_running_loop()
+        pending = self._bootstrap_pending
+        p = self.packets
+        Global.names.attach(self._send_name_query)
+        Global.who.attach(self._send_who)
+        for channel_id, name in self._configured_channels():
+            self._logger.info("Joining channel %s", name)
+            self._connector.send_packet(p.CMSG_JOIN_CHANNEL, self._build_join_channel(channel_id, name.encode('utf-8')))
+            pending[name.lower()] = loop.create_future()
+        if self._guild_guid:
+            self._connector.send_packet(p.CMSG_GUILD_QUERY, self._build_guild_query())
+            self._connector.send_packet(p.CMSG_GUILD_ROSTER, self._build_guild_roster())
+            pending[_BOOTSTRAP_GUILD_QUERY] = loop.create_future()
+            pending[_BOOTSTRAP_GUILD_ROSTER] = loop.create_future()
+        self._bootstrap_task = loop.create_task(self._finish_bootstrap())
+
+    async def _finish_bootstrap(self) -> None:
+        pending = self._bootstrap_pending
+        if pending:
+            await asyncio.wait(pending.values(), timeout=self.BOOTSTRAP_TIMEOUT)
+        missing = [key for key, future in pending.items() if not future.done()]
+        if missing:
+            self._logger.warning("No answer from the server for: %s", ", ".join(missing))
+        self._connector.relay_live()
+        if self._guild_guid:
+            self._guild_roster_task = asyncio.get_running_loop().create_task(self._poll_guild_roster())
+
+    def _bootstrap_done(self, key: str) -> None:
+        future = self._bootstrap_pending.get(key)
+        if future is not None and not future.done():
+            future.set_result(None)
+
+    def _configured_channels(self) -> List[Tuple[int, str]]:
+        """(id, назва) каналів WoW з конфігурації, кожен один раз"""
+        channels: Dict[str, Tuple[int, str]] = {}
+        for channel_config in Global.config.channels:
+            name = channel_config.wow.channel
+            if name and name.lower() not in channels:
+                channel_id = channel_config.wow.id
+                if channel_id is None:
+                    channel_id = self.packets.ChatChannelIds.get_id(name)
+                channels[name.lower()] = (channel_id, name)
+        return list(channels.values())
+
+    # --- SMSG_CHANNEL_NOTIFY ---
+
+    def _build_join_channel(self, channel_id: int, name: bytes) -> Payload:
+        # Кінець імені і порожній пароль
+        return name + b'\x00\x00'
+
+    async def _handle_channel_notify(self, data: bytes) -> None:
+        """Обробка SMSG_CHANNEL_NOTIFY"""
+        reader = ByteReader(data)
+        notify = reader.read_u8()
+        channel = reader.read_cstring()
+        if notify == ChatNotify.CHAT_YOU_JOINED_NOTICE:
+            self._logger.info("Joined Channel: [%s]", channel)
+        elif notify in _CHANNEL_ERRORS:
+            self._logger.error(_CHANNEL_ERRORS[notify], channel)
+        else:
+            # інші сповіщення каналів не цікаві
+            return
+        # Сервер може дописати до назви зону: "General - Elwynn Forest"
+        lowered = channel.lower()
+        for key in self._bootstrap_pending:
+            if lowered == key or lowered.startswith(key + " - "):
+                self._bootstrap_done(key)
@@ -0,0 +1,270 @@
+"""Обробка ігрових пакетів для Cataclysm (4.3.4), порт GamePacketHandlerCataclysm15595.scala"""
+from __future__ import annotations
+
+import random
+import struct
+from typing import Dict, Optional, Tuple
+
+import wowchat.game.packets_cataclysm as game_packets_cataclysm
+from wowchat.common.config import get_game_build
+from wowchat.common.global_state import Global
+from wowchat.common.packet import ByteReader, ByteWriter
+from wowchat.game.dispatch import OpcodeRegistry
+from wowchat.game.framer import GamePacketFramerCataclysm
+from wowchat.game.handler import CharEnumMessage, GuildInfo, GuildMember
+from wowchat.game.handler_wotlk import GamePacketHandlerWotLK
+from wowchat.game.packets import AuthResponseCodes, Races
+from wowchat.game.writer import Payload
+
+
+# Клас і невідомі 4 байти запису SMSG_GUILD_ROSTER
+_ROSTER_CLASS = struct.Struct('<B4x')
+# Прапорці (онлайн), зона і загальна активність
+_ROSTER_FLAGS_ZONE = struct.Struct('<BI8x')
+_ROSTER_LEVEL = struct.Struct('<B4x')
+
+# CMSG_AUTH_CHALLENGE: розмір і невідомі байти, перемішані з байтами дайджесту,
+# збірка клієнта і id реалму
+_AUTH_HEAD = struct.Struct('<11x4B8x7BHBIx5B')
+# Насіння клієнта, байт дайджесту, нуль і ще два байти дайджесту
+_AUTH_SEED = struct.Struct('>IB4xBB')
+# Розмір addon info
+_ADDON_SIZE = struct.Struct('<I')
+# guid гільдії і персонажа CMSG_GUILD_QUERY
+_GUILD_QUERY = struct.Struct('<QQ')
+# Формально два замасковані guid CMSG_GUILD_ROSTER, але MaNGOS їх не читає
+_GUILD_ROSTER = bytes(18)
+
+# Cataclysm має окремий CMSG_MESSAGECHAT_* на кожен тип чату
+_CHAT_OPCODES = {
+    game_packets_cataclysm.ChatEvents.CHAT_MSG_SAY: game_packets_cataclysm.CMSG_MESSAGECHAT_SAY,
+    game_packets_cataclysm.ChatEvents.CHAT_MSG_GUILD: game_packets_cataclysm.CMSG_MESSAGECHAT_GUILD,
+    game_packets_cataclysm.ChatEvents.CHAT_MSG_OFFICER: game_packets_cataclysm.CMSG_MESSAGECHAT_OFFICER,
+    game_packets_cataclysm.ChatEvents.CHAT_MSG_YELL: game_packets_cataclysm.CMSG_MESSAGECHAT_YELL,
+    game_packets_cataclysm.ChatEvents.CHAT_MSG_WHISPER: game_packets_cataclysm.CMSG_MESSAGECHAT_WHISPER,
+    game_packets_cataclysm.ChatEvents.CHAT_MSG_EMOTE: game_packets_cataclysm.CMSG_MESSAGECHAT_EMOTE,
+    game_packets_cataclysm.ChatEvents.CHAT_MSG_CHANNEL: game_packets_cataclysm.CMSG_MESSAGECHAT_CHANNEL,
+}
+
+
+class GamePacketHandlerCataclysm15595(GamePacketHandlerWotLK):
+    """Обробник ігрових пакетів для Cataclysm"""
+
+    packets = game_packets_cataclysm
+    framer_class = GamePacketFramerCataclysm
+
+    @classmethod
+    def register_handlers(cls, registry: OpcodeRegistry) -> None:
+        super().register_handlers(registry)
+        registry.register(cls.packets.WOW_CONNECTION, cls._handle_wow_connection)
+
+    @classmethod
+    def is_unencrypted_packet(cls, opcode: int) -> bool:
+        return super().is_unencrypted_packet(opcode) or opcode == cls.packets.WOW_CONNECTION
+
+    async def _handle_wow_connection(self, data: bytes) -> None:
+        """Рукостискання "WORLD OF WARCRAFT CONNECTION" перед SMSG_AUTH_CHALLENGE"""
+        self._connector.send_packet(
+            self.packets.WOW_CONNECTION,
+            b'RLD OF WARCRAFT CONNECTION - CLIENT TO SERVER\x00',
+        )
+
+    def _build_auth_challenge(self, reader: ByteReader) -> bytes:
+        account = Global.config.wow.account
+        reader.skip(32)  # 32 bytes of random data?
+        server_seed = reader.read_u32be()
+        client_seed = random.randint(0, 0x7FFFFFFF)
+        d = self._auth_digest(account, client_seed, server_seed)
+
+        return b''.join((
+            _AUTH_HEAD.pack(
+                d[10], d[18], d[12], d[5],
+                d[15], d[9], d[19], d[4], d[7], d[16], d[3],
+                get_game_build(Global.config), d[8], self._realm_id,
+                d[17], d[6], d[0], d[1], d[11],
+            ),
+            _AUTH_SEED.pack(client_seed, d[2], d[14], d[13]),
+            _ADDON_SIZE.pack(len(self.ADDON_INFO)),
+            self.ADDON_INFO,
+            bytes((len(account) >> 5, (len(account) << 3) & 0xFF)),
+            account,
+        ))
+
+    def _parse_auth_response(self, reader: ByteReader) -> int:
+        if reader.remaining() >= 17:
+            reader.skip(16)
+        elif reader.remaining() >= 2:
+            reader.skip(1)
+        else:
+            return AuthResponseCodes.AUTH_FAILED
+        return super()._parse_auth_response(reader)
+
+    def _parse_char_enum(self, reader: ByteReader) -> Optional[CharEnumMessage]:
+        target_name = Global.config.wow.character.lower()
+        reader.read_bits(24)  # unkn
+        count = reader.read_bits(17)
+        self._logger.info("Found %d characters", count)
+
+        guids = [bytearray(8) for _ in range(count)]
+        guild_guids = [bytearray(8) for _ in range(count)]
+        name_lengths = [0] * count
+
+        for i in range(count):
+            guid, guild_guid = guids[i], guild_guids[i]
+            reader.read_bit_seq(guid, 3)
+            reader.read_bit_seq(guild_guid, 1, 7, 2)
+            name_lengths[i] = reader.read_bits(7)
+            reader.read_bit_seq(guid, 4, 7)
+            reader.read_bit_seq(guild_guid, 3)
+            reader.read_bit_seq(guid, 5)
+            reader.read_bit_seq(guild_guid, 6)
+            reader.read_bit_seq(guid, 1)
+            reader.read_bit_seq(guild_guid, 5, 4)
+            reader.read_bit()  # is first login
+            reader.read_bit_seq(guid, 0, 2, 6)
+            reader.read_bit_seq(guild_guid, 0)
+
+        for i in range(count):
+            guid, guild_guid = guids[i], guild_guids[i]
+            reader.skip(1)  # char class
+            reader.skip(207)  # inventory
+            reader.skip(4)
+            reader.read_xor_byte_seq(guild_guid, 2)
+            reader.skip(2)
+            reader.read_xor_byte_seq(guild_guid, 3)
+            reader.skip(9)
+            reader.read_xor_byte_seq(guid, 4)
+            reader.skip(4)  # map
+            reader.read_xor_byte_seq(guild_guid, 5)
+            reader.skip(4)
+            reader.read_xor_byte_seq(guild_guid, 6)
+            reader.skip(4)
+            reader.read_xor_byte_seq(guid, 3)
+            reader.skip(9)
+            reader.read_xor_byte_seq(guid, 7)
+            reader.skip(1)
+            name = reader.read_bytes(name_lengths[i]).decode('utf-8', errors='ignore')
+            reader.skip(1)
+            reader.read_xor_byte_seq(guid, 0, 2)
+            reader.read_xor_byte_seq(guild_guid, 1, 7)
+            reader.skip(5)
+            race = reader.read_u8()
+            reader.skip(1)  # char level
+            reader.read_xor_byte_seq(guid, 6)
+            reader.read_xor_byte_seq(guild_guid, 4, 0)
+            reader.read_xor_byte_seq(guid, 5, 1)
+
+            if name.lower() == target_name:
+                return CharEnumMessage(
+                    int.from_bytes(guid, 'little'), name, race, int.from_bytes(guild_guid, 'little')
+                )
+
+            reader.skip(4)  # zone
+        return None
+
+    def _build_join_channel(self, channel_id: int, name: bytes) -> ByteWriter:
+        out = self._new_packet(len(name) + 6)
+        out.write_u32le(channel_id)
+        out.write_bit(0)  # has voice
+        out.write_bit(0)  # zone update
+        out.write_bits(len(name), 8)
+        out.write_bits(0, 8)  # пароль
+        out.flush_bits()
+        out.write_bytes(name)
+        return out
+
+    def _build_chat_message(self, tp: int, message: bytes, target: Optional[bytes]) -> Optional[Tuple[int, Payload]]:
+        events = self.packets.ChatEvents
+        opcode = _CHAT_OPCODES.get(tp)
+        if opcode is None:
+            self._logger.error("Cannot send chat type %d to WoW", tp)
+            return None
+        out = self._new_packet(len(message) + len(target or b'') + 8)
+        # Емоція йде без мови
+        if tp != events.CHAT_MSG_EMOTE:
+            out.write_u32le(Races.language(self._race))
+        if tp == events.CHAT_MSG_WHISPER or tp == events.CHAT_MSG_CHANNEL:
+            target = target or b''
+            out.write_bits(len(target), 10)
+            out.write_bits(len(message), 9)
+            out.flush_bits()
+            # Адресат шепоту йде перед текстом, назва каналу - після
+            if tp == events.CHAT_MSG_WHISPER:
+                out.write_bytes(target)
+                out.write_bytes(message)
+            else:
+                out.write_bytes(message)
+                out.write_bytes(target)
+        else:
+            out.write_bits(len(message), 9)
+            out.flush_bits()
+            out.write_bytes(message)
+        return opcode, out
+
+    def _build_guild_query(self) -> Payload:
+        return _GUILD_QUERY.pack(self._guild_guid, self._character_guid)
+
+    def _parse_guild_query(self, reader: ByteReader) -> GuildInfo:
+        reader.skip(4)  # старша половина guid гільдії, решту розбирає Vanilla
+        return super()._parse_guild_query(reader)
+
+    def _build_guild_roster(self) -> Payload:
+        return _GUILD_ROSTER
+
+    def _parse_guild_roster(self, reader: ByteReader) -> Dict[int, GuildMember]:
+        motd_length = reader.read_bits(11)
+        count = reader.read_bits(18)
+        guids = [bytearray(8) for _ in range(count)]
+        public_note_lengths = [0] * count
+        officer_note_lengths = [0] * count
+        name_lengths = [0] * count
+
+        for i in range(count):
+            guid = guids[i]
+            reader.read_bit_seq(guid, 3, 4)
+            reader.read_bits(2)  # bnet client flags
+            public_note_lengths[i] = reader.read_bits(8)
+            officer_note_lengths[i] = reader.read_bits(8)
+            reader.read_bit_seq(guid, 0)
+            name_lengths[i] = reader.read_bits(7)
+            reader.read_bit_seq(guid, 1, 2, 6, 5, 7)
+
+        guild_info_length = reader.read_bits(12)
+
+        roster: Dict[int, GuildMember] = {}
+        for i in range(count):
+            guid = guids[i]
+            char_class, = reader.read_struct(_ROSTER_CLASS)
+            reader.read_xor_byte_seq(guid, 0)
+            reader.skip(40)  # weekly activity, achievments, professions
+            reader.read_xor_byte_seq(guid, 2)
+            flags, zone_id = reader.read_struct(_ROSTER_FLAGS_ZONE)
+            reader.read_xor_byte_seq(guid, 7)
+            reader.skip(4)  # guild rep?
+            reader.skip(public_note_lengths[i])
+            reader.read_xor_byte_seq(guid, 3)
+            level, = reader.read_struct(_ROSTER_LEVEL)
+            reader.read_xor_byte_seq(guid, 5, 4)
+            reader.skip(1)  # unkn
+            reader.read_xor_byte_seq(guid, 1)
+            last_logoff = reader.read_f32le()
+            reader.skip(officer_note_lengths[i])
+            reader.read_xor_byte_seq(guid, 6)
+            name = reader.read_bytes(name_lengths[i]).decode('utf-8', errors='ignore')
+
+            member = GuildMember(
+                int.from_bytes(guid, 'little'), bool(flags & 0x01), name, level, char_class, zone_id, last_logoff
+            )
+            roster[member.guid] = member
+
+        reader.skip(guild_info_length)
+        self._guild_motd = reader.read_bytes(motd_length).decode('utf-8', errors='ignore')
+        return roster
+
+    def _build_player_login(self) -> ByteWriter:
+        guid = self._character_guid.to_bytes(8, 'little')
+        out = self._new_packet(16)
+        out.write_bit_seq(guid, 2, 3, 0, 6, 4, 5, 1, 7)
+        out.write_xor_byte_seq(guid, 2, 7, 0, 3, 5, 6, 1, 4)
+        return out
+
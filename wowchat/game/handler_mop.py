@@ -0,0 +1,579 @@
+"""Обробка ігрових пакетів для MoP (5.4.8), порт GamePacketHandlerMoP18414.scala"""
+from __future__ import annotations
+
+import random
+import struct
+from typing import Dict, List, Optional, Tuple
+
+import wowchat.game.packets_mop as game_packets_mop
+from wowchat.commands.who import WhoResponse
+from wowchat.common.config import get_game_build
+from wowchat.common.global_state import Global
+from wowchat.common.packet import ByteReader, ByteWriter
+from wowchat.game.dispatch import OpcodeRegistry
+from wowchat.game.framer import GamePacketFramerMoP
+from wowchat.game.handler import CharEnumMessage, ChatMessage, GuildInfo, GuildMember, NameQueryMessage
+from wowchat.game.handler_cataclysm import GamePacketHandlerCataclysm15595
+from wowchat.game.header_crypt_mop import GameHeaderCryptMoP
+from wowchat.game.packets import AuthResponseCodes, Classes, Genders, Races
+from wowchat.game.resources import GameResources
+from wowchat.game.writer import Payload
+
+
+# Рівень, прапорці (онлайн), зона і reputation cap запису SMSG_GUILD_ROSTER
+_ROSTER_LEVEL_ZONE = struct.Struct('<BBI4x')
+# Last logoff, gender, ранг і realm id
+_ROSTER_LOGOFF = struct.Struct('<f9x')
+
+# CMSG_AUTH_CHALLENGE: розмір і нулі, байти дайджесту, id реалму і ще байт
+_AUTH_HEAD = struct.Struct('<10x5BIB')
+# Насіння клієнта
+_AUTH_SEED = struct.Struct('>I')
+# Решта байтів дайджесту навколо 1, нулів і збірки клієнта, потім розмір addon info
+_AUTH_TAIL = struct.Struct('<BH3B12x4BH6BI')
+# Нульовий біт і 11 бітів довжини імені акаунта, вирівняні до двох байтів
+_ACCOUNT_BITS = struct.Struct('>H')
+
+
+class GamePacketHandlerMoP18414(GamePacketHandlerCataclysm15595):
+    """Обробник ігрових пакетів для MoP"""
+
+    packets = game_packets_mop
+    framer_class = GamePacketFramerMoP
+    header_crypt_class = GameHeaderCryptMoP
+
+    ADDON_INFO = bytes([
+        0x30, 0x05, 0x00, 0x00, 0x78, 0x9C, 0x75, 0x93, 0x61, 0x6E, 0x83, 0x30, 0x0C, 0x85, 0xD9, 0x3D,
+        0x76, 0x84, 0x5D, 0xA2, 0xED, 0x56, 0xD4, 0xA9, 0x48, 0xAC, 0xD0, 0xFE, 0x9D, 0x4C, 0xE2, 0x82,
+        0x45, 0x88, 0x91, 0x09, 0x6C, 0xED, 0xE5, 0xB7, 0xA0, 0x49, 0xD3, 0x26, 0x39, 0xFC, 0xE4, 0x7B,
+        0x76, 0xE2, 0x97, 0xE7, 0xA7, 0x2C, 0xCB, 0xB6, 0x8E, 0xEE, 0x77, 0x10, 0xFB, 0xBE, 0x31, 0x1D,
+        0xE1, 0x82, 0x03, 0xFA, 0x70, 0x3E, 0x64, 0x0F, 0xC3, 0xC7, 0xE3, 0x31, 0xFB, 0xC7, 0xC5, 0x74,
+        0x80, 0xEC, 0xB8, 0xBD, 0x25, 0x38, 0x7A, 0xD0, 0xC9, 0x6C, 0x02, 0xB1, 0x57, 0xD9, 0x16, 0xA4,
+        0x41, 0x99, 0x3A, 0x1E, 0x13, 0x38, 0x04, 0x87, 0x57, 0x42, 0x67, 0x0B, 0xF2, 0x34, 0xC0, 0xA8,
+        0x89, 0xC8, 0x5B, 0xF2, 0xAD, 0xDE, 0xC0, 0x81, 0xE9, 0x0B, 0x90, 0x1E, 0xF5, 0xA9, 0x76, 0xE0,
+        0xD0, 0x5B, 0x10, 0x0D, 0x75, 0xE0, 0x22, 0x6C, 0x71, 0xD2, 0x2B, 0x1D, 0x45, 0xAB, 0x2A, 0x58,
+        0xD0, 0x5E, 0x40, 0x08, 0x1A, 0x87, 0x93, 0x26, 0xE3, 0xA1, 0x81, 0x70, 0xE4, 0x36, 0xC9, 0x6A,
+        0xFC, 0x0C, 0x3A, 0x1C, 0xC1, 0x84, 0x13, 0x90, 0xDD, 0x0B, 0x0C, 0x7A, 0xF3, 0xF3, 0xBE, 0x14,
+        0xBE, 0x92, 0x7E, 0xF4, 0x33, 0x36, 0x73, 0x5B, 0x33, 0x3B, 0x0D, 0xBE, 0x78, 0xC3, 0xB3, 0x0F,
+        0x28, 0xAF, 0x3C, 0x8B, 0x07, 0xA7, 0x48, 0x72, 0x77, 0x1B, 0x3B, 0x75, 0xF6, 0xBC, 0x88, 0xE6,
+        0xE8, 0x86, 0xE6, 0x45, 0x35, 0xCB, 0x82, 0x7A, 0x46, 0xF2, 0x99, 0x9C, 0xDD, 0x82, 0xEF, 0xD3,
+        0x74, 0xC7, 0x3E, 0x08, 0xBB, 0xB4, 0x40, 0x25, 0x07, 0x3F, 0x8D, 0x68, 0xF4, 0x1B, 0x1D, 0x02,
+        0x0E, 0x1B, 0x17, 0x27, 0x85, 0x64, 0x0A, 0x57, 0x49, 0xC5, 0x26, 0x86, 0x24, 0x95, 0xA3, 0x55,
+        0x71, 0x1E, 0x5B, 0x01, 0x8B, 0x2A, 0x3F, 0x32, 0xF7, 0xB1, 0x76, 0xCF, 0x92, 0xBE, 0x64, 0x01,
+        0x46, 0x58, 0x27, 0xBC, 0x60, 0x09, 0x56, 0x21, 0x25, 0x86, 0x9F, 0x1D, 0x50, 0xEB, 0x22, 0x4D,
+        0x3F, 0xDF, 0x9A, 0x1C, 0xB5, 0xEA, 0x84, 0x57, 0x96, 0x36, 0x35, 0x69, 0xBD, 0x6E, 0x84, 0xEE,
+        0x64, 0x4D, 0x03, 0x16, 0xE0, 0xA1, 0x45, 0x6D, 0x5F, 0x6A, 0xEE, 0x51, 0xB7, 0xB7, 0x5E, 0x6D,
+        0xAB, 0x7A, 0x72, 0xFA, 0xB3, 0x46, 0x4C, 0x1E, 0x45, 0x65, 0x17, 0x26, 0x5B, 0x05, 0x96, 0x78,
+        0xA6, 0xEE, 0xC0, 0xA5, 0x54, 0xFF, 0xBF, 0xCD, 0x38, 0x85, 0x5D, 0xC7, 0x64, 0x50, 0xA1, 0x6B,
+        0x47, 0xBD, 0xDF, 0x66, 0x0E, 0xDD, 0xEF, 0xE2, 0xFF, 0x55, 0x7C, 0xC5, 0xEF, 0x1B, 0x7A, 0xEB,
+        0x96, 0xC4
+    ])
+
+    @classmethod
+    def register_handlers(cls, registry: OpcodeRegistry) -> None:
+        super().register_handlers(registry)
+        # MoP замість SMSG_GUILD_EVENT надсилає окремі пакети
+        p = cls.packets
+        registry.register(p.SMSG_GUILD_MEMBER_LOGGED, cls._handle_guild_member_logged)
+        registry.register(p.SMSG_GUILD_INVITE_ACCEPT, cls._handle_guild_invite_accept)
+        registry.register(p.SMSG_GUILD_LEAVE, cls._handle_guild_leave)
+
+    def _build_auth_challenge(self, reader: ByteReader) -> bytes:
+        account = Global.config.wow.account
+        reader.skip(35)  # MoP - 35 bytes random data
+        server_seed = reader.read_u32be()
+        client_seed = random.randint(0, 0x7FFFFFFF)
+        d = self._auth_digest(account, client_seed, server_seed)
+
+        return b''.join((
+            _AUTH_HEAD.pack(d[18], d[14], d[3], d[4], d[0], self._realm_id, d[11]),
+            _AUTH_SEED.pack(client_seed),
+            _AUTH_TAIL.pack(
+                d[19], 1, d[2], d[9], d[12],
+                d[16], d[5], d[6], d[8],
+                get_game_build(Global.config),
+                d[17], d[7], d[13], d[15], d[1], d[10],
+                len(self.ADDON_INFO),
+            ),
+            self.ADDON_INFO,
+            _ACCOUNT_BITS.pack((len(account) & 0x7FF) << 4),
+            account,
+        ))
+
+    def _parse_auth_response(self, reader: ByteReader) -> int:
+        return AuthResponseCodes.AUTH_OK if reader.read_bit() == 1 else AuthResponseCodes.AUTH_FAILED
+
+    def _parse_char_enum(self, reader: ByteReader) -> Optional[CharEnumMessage]:
+        target_name = Global.config.wow.character.lower()
+        reader.read_bits(21)  # unkn
+        count = reader.read_bits(16)
+        self._logger.info("Found %d characters", count)
+
+        guids = [bytearray(8) for _ in range(count)]
+        guild_guids = [bytearray(8) for _ in range(count)]
+        name_lengths = [0] * count
+
+        for i in range(count):
+            guid, guild_guid = guids[i], guild_guids[i]
+            reader.read_bit_seq(guild_guid, 4)
+            reader.read_bit_seq(guid, 0)
+            reader.read_bit_seq(guild_guid, 3)
+            reader.read_bit_seq(guid, 3, 7)
+            reader.read_bits(2)
+            reader.read_bit_seq(guid, 6)
+            reader.read_bit_seq(guild_guid, 6)
+            name_lengths[i] = reader.read_bits(6)
+            reader.read_bit_seq(guid, 1)
+            reader.read_bit_seq(guild_guid, 1, 0)
+            reader.read_bit_seq(guid, 4)
+            reader.read_bit_seq(guild_guid, 7)
+            reader.read_bit_seq(guid, 2, 5)
+            reader.read_bit_seq(guild_guid, 2, 5)
+
+        reader.read_bit()  # packet success flag?
+
+        for i in range(count):
+            guid, guild_guid = guids[i], guild_guids[i]
+            reader.skip(4)  # unkn
+            reader.read_xor_byte_seq(guid, 1)
+            reader.skip(2)  # slot + hairstyle
+            reader.read_xor_byte_seq(guild_guid, 2, 0, 6)
+            name = reader.read_bytes(name_lengths[i]).decode('utf-8', errors='ignore')
+            reader.read_xor_byte_seq(guild_guid, 3)
+            reader.skip(10)  # x + unkn + face + class
+            reader.read_xor_byte_seq(guild_guid, 5)
+            reader.skip(207)  # inventory
+            reader.skip(4)  # customization flag
+            reader.read_xor_byte_seq(guid, 3, 5)
+            reader.skip(4)  # pet family
+            reader.read_xor_byte_seq(guild_guid, 4)
+            reader.skip(4)  # map
+            race = reader.read_u8()
+            reader.skip(1)  # skin
+            reader.read_xor_byte_seq(guild_guid, 1)
+            reader.skip(1)  # level
+            reader.read_xor_byte_seq(guid, 0, 2)
+            reader.skip(3)  # hair color + gender + facial hair
+            reader.skip(4)  # pet level
+            reader.read_xor_byte_seq(guid, 4, 7)
+            reader.skip(12)  # y + pet display id + unkn
+            reader.read_xor_byte_seq(guid, 6)
+            reader.skip(8)  # char flags + zone id
+            reader.read_xor_byte_seq(guild_guid, 7)
+            reader.skip(4)  # z
+
+            if name.lower() == target_name:
+                return CharEnumMessage(
+                    int.from_bytes(guid, 'little'), name, race, int.from_bytes(guild_guid, 'little')
+                )
+        return None
+
+    def _parse_chat_message(self, reader: ByteReader, gm: bool = False) -> Optional[ChatMessage]:
+        events = self.packets.ChatEvents
+        has_sender_name = reader.read_bit() == 0
+        reader.read_bit()  # hide in chat log
+        if has_sender_name:
+            reader.read_bits(11)  # sender name length
+        reader.read_bit()  # unkn
+        has_channel_name = reader.read_bit() == 0
+        reader.read_bit()  # unkn
+        reader.read_bit()  # send fake time?
+        has_chat_tag = reader.read_bit() == 0
+        has_realm_id = reader.read_bit() == 0
+
+        group_guid = bytearray(8)
+        reader.read_bit_seq(group_guid, 0, 1, 5, 4, 3, 2, 6, 7)
+        if has_chat_tag:
+            reader.read_bits(9)
+        reader.read_bit()  # unkn
+
+        receiver_guid = bytearray(8)
+        reader.read_bit_seq(receiver_guid, 7, 6, 1, 4, 0, 2, 3, 5)
+        reader.read_bit()  # unkn
+        has_language = reader.read_bit() == 0
+        has_prefix = reader.read_bit() == 0
+
+        sender_guid = bytearray(8)
+        reader.read_bit_seq(sender_guid, 0, 3, 7, 2, 1, 5, 4, 6)
+        has_achievement = reader.read_bit() == 0
+        has_message = reader.read_bit() == 0
+
+        channel_name_length = reader.read_bits(7) if has_channel_name else 0
+        message_length = reader.read_bits(12) if has_message else 0
+        if not has_message or message_length == 0:
+            return None
+
+        has_receiver = reader.read_bit() == 0
+        addon_prefix_length = reader.read_bits(5) if has_prefix else 0
+        reader.read_bit()  # realm id?
+        if has_receiver:
+            reader.read_bits(11)  # receiver name length
+        reader.read_bit()  # unkn
+
+        guild_guid = bytearray(8)
+        reader.read_bit_seq(guild_guid, 2, 5, 7, 4, 0, 1, 3, 6)
+        reader.read_xor_byte_seq(guild_guid, 4, 5, 7, 3, 2, 6, 0, 1)
+
+        channel = None
+        if has_channel_name:
+            channel = reader.read_bytes(channel_name_length).decode('utf-8', errors='ignore')
+        reader.skip(addon_prefix_length)
+
+        reader.read_xor_byte_seq(sender_guid, 4, 7, 1, 5, 0, 6, 2, 3)
+        guid = int.from_bytes(sender_guid, 'little')
+        tp = reader.read_u8()
+        # власні повідомлення ігноруємо, крім системних
+        if tp != events.CHAT_MSG_SYSTEM and guid == self._character_guid:
+            return None
+
+        achievement_id = reader.read_u32le() if has_achievement else None
+        reader.read_xor_byte_seq(group_guid, 1, 3, 4, 6, 0, 2, 5, 7)
+        reader.read_xor_byte_seq(receiver_guid, 4, 7, 1, 5, 0, 6, 2, 3)
+
+        # повідомлення аддонів ігноруємо
+        language = reader.read_i8() if has_language else 0
+        if language == -1:
+            return None
+        if has_realm_id:
+            reader.skip(4)
+
+        text = reader.read_bytes(message_length).decode('utf-8', errors='ignore')
+        return ChatMessage(guid, tp, text, channel, achievement_id)
+
+    def _build_chat_message(self, tp: int, message: bytes, target: Optional[bytes]) -> Optional[Tuple[int, Payload]]:
+        # Розкладку CMSG_MESSAGECHAT_* для MoP ще не перенесено
+        self._logger.error("Discord->WoW chat is not supported for MoP")
+        return None
+
+    # MoP передає ім'я відправника і в самому SMSG_MESSAGECHAT, але, як і
+    # Scala версія, беремо його через CMSG_NAME_QUERY
+    def _build_name_query(self, guid: int) -> ByteWriter:
+        guid_bytes = guid.to_bytes(8, 'little')
+        out = self._new_packet(10)
+        out.write_bit_seq(guid_bytes, 4)
+        out.write_bit(0)
+        out.write_bit_seq(guid_bytes, 6, 0, 7, 1)
+        out.write_bit(0)
+        out.write_bit_seq(guid_bytes, 5, 2, 3)
+        out.flush_bits()
+        out.write_xor_byte_seq(guid_bytes, 7, 5, 1, 2, 6, 3, 0, 4)
+        return out
+
+    def _parse_name_query(self, reader: ByteReader) -> NameQueryMessage:
+        guid = bytearray(8)
+        guid2 = bytearray(8)  # ??
+        guid3 = bytearray(8)  # ??
+        reader.read_bit_seq(guid, 3, 6, 7, 2, 5, 4, 0, 1)
+        reader.read_xor_byte_seq(guid, 5, 4, 7, 6, 1, 2)
+
+        has_name_data = reader.read_bit() == 0
+        char_class = 0xFF
+        if has_name_data:
+            reader.skip(8)  # realm id, account id?
+            char_class = reader.read_u8()
+            reader.skip(3)  # race, level, gender
+        reader.read_xor_byte_seq(guid, 0, 3)
+        if not has_name_data:
+            return NameQueryMessage(int.from_bytes(guid, 'little'), None, char_class)
+
+        reader.reset_bit_reader()
+        reader.read_bit_seq(guid2, 2, 7)
+        reader.read_bit_seq(guid3, 7, 2, 0)
+        reader.read_bit()  # unkn
+        reader.read_bit_seq(guid2, 4)
+        reader.read_bit_seq(guid3, 5)
+        reader.read_bit_seq(guid2, 1, 3, 0)
+        reader.read_bits(7 * 5)  # declined names
+        reader.read_bit_seq(guid3, 6, 3)
+        reader.read_bit_seq(guid2, 5)
+        reader.read_bit_seq(guid3, 1, 4)
+        name_length = reader.read_bits(6)
+        reader.read_bit_seq(guid2, 6)
+        reader.reset_bit_reader()
+        reader.read_xor_byte_seq(guid3, 6, 0)
+
+        name = reader.read_bytes(name_length).decode('utf-8', errors='ignore')
+        return NameQueryMessage(int.from_bytes(guid, 'little'), name, char_class)
+
+    def _parse_invalidate_player(self, reader: ByteReader) -> int:
+        guid = bytearray(8)
+        reader.read_bit_seq(guid, 6, 3, 1, 2, 7, 5, 0, 4)
+        reader.read_xor_byte_seq(guid, 7, 1, 2, 3, 6, 0, 4, 5)
+        return int.from_bytes(guid, 'little')
+
+    def _build_join_channel(self, channel_id: int, name: bytes) -> ByteWriter:
+        out = self._new_packet(len(name) + 6)
+        out.write_u32le(channel_id)
+        out.write_bit(0)  # unkn
+        out.write_bits(len(name), 7)
+        out.write_bits(0, 7)  # пароль
+        out.write_bit(0)  # unkn
+        out.flush_bits()
+        out.write_bytes(name)
+        return out
+
+    def _build_guild_query(self) -> ByteWriter:
+        player = self._character_guid.to_bytes(8, 'little')
+        guild = self._guild_guid.to_bytes(8, 'little')
+        out = self._new_packet(18)
+        out.write_bit_seq(player, 7, 3, 4)
+        out.write_bit_seq(guild, 3, 4)
+        out.write_bit_seq(player, 2, 6)
+        out.write_bit_seq(guild, 2, 5)
+        out.write_bit_seq(player, 1, 5)
+        out.write_bit_seq(guild, 7)
+        out.write_bit_seq(player, 0)
+        out.write_bit_seq(guild, 1, 6, 0)
+
+        out.write_xor_byte_seq(player, 7)
+        out.write_xor_byte_seq(guild, 2, 4, 7)
+        out.write_xor_byte_seq(player, 6, 0)
+        out.write_xor_byte_seq(guild, 6, 0, 3)
+        out.write_xor_byte_seq(player, 2)
+        out.write_xor_byte_seq(guild, 5)
+        out.write_xor_byte_seq(player, 3)
+        out.write_xor_byte_seq(guild, 1)
+        out.write_xor_byte_seq(player, 4, 1, 5)
+        return out
+
+    def _parse_guild_query(self, reader: ByteReader) -> GuildInfo:
+        guild = bytearray(8)
+        reader.read_bit_seq(guild, 5)
+        reader.read_bit()
+        ranks_count = reader.read_bits(21)
+        reader.read_bits(4)  # guid ще раз
+        rank_lengths = [reader.read_bits(7) for _ in range(ranks_count)]
+        reader.read_bits(4)  # guid ще раз
+        name_length = reader.read_bits(7)
+        reader.read_bit_seq(guild, 3, 7, 2, 1, 0, 4, 6)
+
+        reader.skip(8)  # emblem border + style
+        reader.read_xor_byte_seq(guild, 2, 7)
+        reader.skip(8)  # emblem color + realm id
+
+        ranks = {}
+        for length in rank_lengths:
+            reader.skip(4)  # rank index
+            rank_id = reader.read_u32le()
+            ranks[rank_id] = reader.read_bytes(length).decode('utf-8', errors='ignore')
+        name = reader.read_bytes(name_length).decode('utf-8', errors='ignore')
+        return GuildInfo(name, ranks)
+
+    def _parse_guild_roster(self, reader: ByteReader) -> Dict[int, GuildMember]:
+        count = reader.read_bits(17)
+        motd_length = reader.read_bits(10)
+        guids = [bytearray(8) for _ in range(count)]
+        public_note_lengths = [0] * count
+        officer_note_lengths = [0] * count
+        name_lengths = [0] * count
+
+        for i in range(count):
+            guid = guids[i]
+            officer_note_lengths[i] = reader.read_bits(8)
+            reader.read_bit_seq(guid, 5)
+            reader.read_bit()  # scroll of resurrect
+            public_note_lengths[i] = reader.read_bits(8)
+            reader.read_bit_seq(guid, 7, 0, 6)
+            name_lengths[i] = reader.read_bits(6)
+            reader.read_bit()  # has authenticator
+            reader.read_bit_seq(guid, 3, 4, 1, 2)
+
+        guild_info_length = reader.read_bits(11)
+
+        roster: Dict[int, GuildMember] = {}
+        for i in range(count):
+            guid = guids[i]
+            char_class = reader.read_u8()
+            reader.skip(4)  # total reputation
+            name = reader.read_bytes(name_lengths[i]).decode('utf-8', errors='ignore')
+            reader.read_xor_byte_seq(guid, 0)
+            reader.skip(24)  # professions
+            level, flags, zone_id = reader.read_struct(_ROSTER_LEVEL_ZONE)
+            reader.read_xor_byte_seq(guid, 3)
+            reader.skip(8)  # total activity
+            reader.skip(officer_note_lengths[i])
+            last_logoff, = reader.read_struct(_ROSTER_LOGOFF)
+            reader.read_xor_byte_seq(guid, 5, 7)
+            reader.skip(public_note_lengths[i])
+            reader.read_xor_byte_seq(guid, 4)
+            reader.skip(8)  # weekly activity
+            reader.skip(4)  # achievement points
+            reader.read_xor_byte_seq(guid, 6, 1, 2)
+
+            member = GuildMember(
+                int.from_bytes(guid, 'little'), bool(flags & 0x01), name, level, char_class, zone_id, last_logoff
+            )
+            roster[member.guid] = member
+
+        reader.skip(4)  # accounts number
+        reader.skip(4)  # created date
+        reader.skip(guild_info_length)
+        reader.skip(4)  # weekly rep cap
+        self._guild_motd = reader.read_bytes(motd_length).decode('utf-8', errors='ignore')
+        return roster
+
+    def _build_player_login(self) -> ByteWriter:
+        guid = self._character_guid.to_bytes(8, 'little')
+        out = self._new_packet(16)
+        out.write_u32le(0x43480000)  # unkn
+        out.write_bit_seq(guid, 1, 4, 7, 3, 2, 6, 5, 0)
+        out.write_xor_byte_seq(guid, 5, 1, 0, 6, 2, 4, 7, 3)
+        return out
+
+    def _build_who(self, name: str) -> ByteWriter:
+        encoded = name.encode('utf-8')
+        out = self._new_packet(len(encoded) + 24)
+        out.write_u32le(0xFFFFFFFF)  # усі класи
+        out.write_u32le(0xFFFFFFFF)  # усі раси
+        out.write_u32le(100)  # максимальний рівень
+        out.write_u32le(0)  # мінімальний рівень
+        out.write_bit(1)  # show enemies
+        out.write_bit(1)  # exact name
+        out.write_bit(0)  # request server info
+        out.write_bits(0, 9)  # guild realm name length
+        out.write_bit(1)  # show arena players
+        out.write_bits(len(encoded), 6)
+        out.write_bits(0, 4)  # зони
+        out.write_bits(0, 9)  # realm name length
+        out.write_bits(0, 7)  # guild name length
+        out.write_bits(0, 3)  # рядки пошуку
+        out.flush_bits()
+        out.write_bytes(encoded)
+        return out
+
+    def _parse_who(self, reader: ByteReader) -> List[WhoResponse]:
+        display_count = reader.read_bits(6)
+        account_ids = [bytearray(8) for _ in range(display_count)]
+        player_guids = [bytearray(8) for _ in range(display_count)]
+        guild_guids = [bytearray(8) for _ in range(display_count)]
+        guild_name_lengths = [0] * display_count
+        player_name_lengths = [0] * display_count
+
+        for i in range(display_count):
+            account, player, guild = account_ids[i], player_guids[i], guild_guids[i]
+            reader.read_bit_seq(account, 2)
+            reader.read_bit_seq(player, 2)
+            reader.read_bit_seq(account, 7)
+            reader.read_bit_seq(guild, 5)
+            guild_name_lengths[i] = reader.read_bits(7)
+            reader.read_bit_seq(account, 1, 5)
+            reader.read_bit_seq(guild, 7)
+            reader.read_bit_seq(player, 5)
+            reader.read_bit()  # unkn
+            reader.read_bit_seq(guild, 1)
+            reader.read_bit_seq(player, 6)
+            reader.read_bit_seq(guild, 2)
+            reader.read_bit_seq(player, 4)
+            reader.read_bit_seq(guild, 0, 3)
+            reader.read_bit_seq(account, 6)
+            reader.read_bit()  # unkn
+            reader.read_bit_seq(player, 1)
+            reader.read_bit_seq(guild, 4)
+            reader.read_bit_seq(account, 0)
+            reader.read_bits(7 * 5)  # declined names
+            reader.read_bit_seq(player, 3)
+            reader.read_bit_seq(guild, 6)
+            reader.read_bit_seq(player, 0)
+            reader.read_bit_seq(account, 4, 3)
+            reader.read_bit_seq(player, 7)
+            player_name_lengths[i] = reader.read_bits(6)
+
+        results = []
+        for i in range(display_count):
+            account, player, guild = account_ids[i], player_guids[i], guild_guids[i]
+            reader.read_xor_byte_seq(player, 1)
+            reader.skip(4)  # realm id
+            reader.read_xor_byte_seq(player, 7)
+            reader.skip(4)  # realm id
+            reader.read_xor_byte_seq(player, 4)
+            player_name = reader.read_bytes(player_name_lengths[i]).decode('utf-8', errors='ignore')
+            reader.read_xor_byte_seq(guild, 1)
+            reader.read_xor_byte_seq(player, 0)
+            reader.read_xor_byte_seq(guild, 2, 0, 4)
+            reader.read_xor_byte_seq(player, 3)
+            reader.read_xor_byte_seq(guild, 6)
+            reader.skip(4)  # account id?
+            guild_name = reader.read_bytes(guild_name_lengths[i]).decode('utf-8', errors='ignore')
+            reader.read_xor_byte_seq(guild, 3)
+            reader.read_xor_byte_seq(account, 4)
+            char_class = reader.read_u8()
+            reader.read_xor_byte_seq(account, 7)
+            reader.read_xor_byte_seq(player, 6, 2)
+            # declined names не очікуємо
+            reader.read_xor_byte_seq(account, 2, 3)
+            race = reader.read_u8()
+            reader.read_xor_byte_seq(guild, 7)
+            reader.read_xor_byte_seq(account, 1, 5, 6)
+            reader.read_xor_byte_seq(player, 5)
+            reader.read_xor_byte_seq(account, 0)
+            gender = reader.read_u8()
+            reader.read_xor_byte_seq(guild, 5)
+            level = reader.read_u8()
+            zone_id = reader.read_u32le()
+            results.append(WhoResponse(
+                player_name, guild_name, level, Classes.value_of(char_class), Races.value_of(race),
+                Genders.value_of(gender), GameResources.AREA.get(zone_id, "Unknown Zone"),
+            ))
+        return results
+
+    # --- Події гільдії ---
+
+    async def _handle_guild_member_logged(self, data: bytes) -> None:
+        """Обробка SMSG_GUILD_MEMBER_LOGGED: GE_SIGNED_ON / GE_SIGNED_OFF"""
+        reader = ByteReader(data)
+        guid = bytearray(8)
+        reader.read_bit_seq(guid, 0, 6)
+        reader.read_bit()  # unkn
+        reader.read_bit_seq(guid, 2, 5, 3)
+        name_length = reader.read_bits(6)
+        reader.read_bit_seq(guid, 1, 7, 4)
+        is_online = reader.read_bit() == 1
+        reader.read_xor_byte_seq(guid, 3, 2, 0)
+        reader.skip(4)  # unkn
+        reader.read_xor_byte_seq(guid, 6)
+        name = reader.read_bytes(name_length).decode('utf-8', errors='ignore')
+        events = self.packets.GuildEvents
+        self._guild_event(events.GE_SIGNED_ON if is_online else events.GE_SIGNED_OFF, [name])
+
+    async def _handle_guild_invite_accept(self, data: bytes) -> None:
+        """Обробка SMSG_GUILD_INVITE_ACCEPT: GE_JOINED"""
+        reader = ByteReader(data)
+        guid = bytearray(8)
+        reader.read_bit_seq(guid, 6, 1, 3)
+        name_length = reader.read_bits(6)
+        reader.read_bit_seq(guid, 7, 4, 2, 5, 0)
+        reader.read_xor_byte_seq(guid, 2, 4, 1, 6, 5)
+        reader.skip(4)  # unkn
+        reader.read_xor_byte_seq(guid, 3, 0)
+        name = reader.read_bytes(name_length).decode('utf-8', errors='ignore')
+        self._guild_event(self.packets.GuildEvents.GE_JOINED, [name])
+
+    async def _handle_guild_leave(self, data: bytes) -> None:
+        """Обробка SMSG_GUILD_LEAVE: GE_LEFT або GE_REMOVED"""
+        reader = ByteReader(data)
+        guid = bytearray(8)
+        reader.read_bit_seq(guid, 2)
+        name_length = reader.read_bits(6)
+        reader.read_bit_seq(guid, 6, 5)
+        kicked = reader.read_bit() == 1
+        kicker_name_length = 0
+        kicker_guid = bytearray(8)
+        if kicked:
+            reader.read_bits(2)  # unkn
+            kicker_name_length = reader.read_bits(6)
+            reader.read_bit_seq(kicker_guid, 1, 3, 4, 2, 5, 7, 6, 0)
+            reader.read_bit()  # unkn
+        reader.read_bit_seq(guid, 1, 0, 3, 4, 7)
+
+        kicker_name = ""
+        if kicked:
+            reader.read_xor_byte_seq(kicker_guid, 1, 3, 5, 2, 0, 4, 6, 7)
+            kicker_name = reader.read_bytes(kicker_name_length).decode('utf-8', errors='ignore')
+            reader.skip(4)  # unkn
+        name = reader.read_bytes(name_length).decode('utf-8', errors='ignore')
+
+        events = self.packets.GuildEvents
+        if kicked:
+            self._guild_event(events.GE_REMOVED, [name, kicker_name])
+        else:
+            self._guild_event(events.GE_LEFT, [name])
@@ -0,0 +1,102 @@
+"""Обробка ігрових пакетів для TBC (2.4.3), порт GamePacketHandlerTBC.scala"""
+from __future__ import annotations
+
+import struct
+import time
+from typing import Optional
+
+import wowchat.game.packets_tbc as game_packets_tbc
+from wowchat.common.packet import ByteReader
+from wowchat.common.schema import CSTRING, Schema, skip
+from wowchat.game.dispatch import OpcodeRegistry
+from wowchat.game.handler import ChatMessage, GamePacketHandler, GuildMember, char_enum_schema
+from wowchat.game.header_crypt_tbc import GameHeaderCryptTBC
+from wowchat.game.writer import Payload
+
+
+# Тип, мова, guid відправника і прапорці SMSG_MESSAGECHAT
+CHAT_HEAD = struct.Struct('<BiQ4x')
+# guid цілі і довжина тексту
+CHAT_TARGET = struct.Struct('<8xI')
+
+# Лічильник і час з'єднання CMSG_TIME_SYNC_RESP
+_TIME_SYNC = struct.Struct('<II')
+# id каналу і два прапорці CMSG_JOIN_CHANNEL перед іменем
+_JOIN_CHANNEL_HEAD = struct.Struct('<IBB')
+
+
+class GamePacketHandlerTBC(GamePacketHandler):
+    """Обробник ігрових пакетів для TBC"""
+
+    packets = game_packets_tbc
+    header_crypt_class = GameHeaderCryptTBC
+
+    ADDON_INFO = bytes([
+        0xD0, 0x01, 0x00, 0x00, 0x78, 0x9C, 0x75, 0xCF, 0x3B, 0x0E, 0xC2, 0x30, 0x0C, 0x80, 0xE1, 0x72,
+        0x0F, 0x2E, 0x43, 0x18, 0x50, 0xA5, 0x66, 0xA1, 0x65, 0x46, 0x26, 0x71, 0x2B, 0xAB, 0x89, 0x53,
+        0x19, 0x87, 0x47, 0x4F, 0x0F, 0x0B, 0x62, 0x71, 0xBD, 0x7E, 0xD6, 0x6F, 0xD9, 0x25, 0x5A, 0x57,
+        0x90, 0x78, 0x3D, 0xD4, 0xA0, 0x54, 0xF8, 0xD2, 0x36, 0xBB, 0xFC, 0xDC, 0x77, 0xCD, 0x77, 0xDC,
+        0xCF, 0x1C, 0xA8, 0x26, 0x1C, 0x09, 0x53, 0xF4, 0xC4, 0x94, 0x61, 0xB1, 0x96, 0x88, 0x23, 0xF1,
+        0x64, 0x06, 0x8E, 0x25, 0xDF, 0x40, 0xBB, 0x32, 0x6D, 0xDA, 0x80, 0x2F, 0xB5, 0x50, 0x60, 0x54,
+        0x33, 0x79, 0xF2, 0x7D, 0x95, 0x07, 0xBE, 0x6D, 0xAC, 0x94, 0xA2, 0x03, 0x9E, 0x4D, 0x6D, 0xF9,
+        0xBE, 0x60, 0xB0, 0xB3, 0xAD, 0x62, 0xEE, 0x4B, 0x98, 0x51, 0xB7, 0x7E, 0xF1, 0x10, 0xA4, 0x98,
+        0x72, 0x06, 0x8A, 0x26, 0x0C, 0x90, 0x90, 0xED, 0x7B, 0x83, 0x40, 0xC4, 0x7E, 0xA6, 0x94, 0xB6,
+        0x98, 0x18, 0xC5, 0x36, 0xCA, 0xE8, 0x81, 0x61, 0x42, 0xF9, 0xEB, 0x07, 0x63, 0xAB, 0x8B, 0xEC
+    ])
+
+    # У TBC екіпіровка і сумки описані 9 байтами на слот
+    CHAR_ENUM_TAIL_LENGTH = 4 + 1 + 12 + 19 * 9 + 9
+    CHAR_ENUM_ENTRY = char_enum_schema(CHAR_ENUM_TAIL_LENGTH)
+
+    # Права рангу, ліміт золота і 6 вкладок гільдбанку
+    GUILD_RANK_LENGTH = 8 + 48
+    GUILD_MEMBER = Schema(GuildMember, (
+        ('guid', 'Q'),
+        ('is_online', '?'),
+        ('name', CSTRING),
+        skip(4),  # guild rank
+        ('level', 'B'),
+        ('char_class', 'B'),
+        skip(1),  # tbc unkn
+        ('zone_id', 'I'),
+    ))
+
+    WHO_HAS_GENDER = True
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._connect_time = time.monotonic()
+
+    @classmethod
+    def register_handlers(cls, registry: OpcodeRegistry) -> None:
+        super().register_handlers(registry)
+        registry.register(cls.packets.SMSG_TIME_SYNC_REQ, cls._handle_time_sync_req)
+
+    async def _handle_time_sync_req(self, data: bytes) -> None:
+        """Обробка SMSG_TIME_SYNC_REQ: відповідаємо лічильником і часом з'єднання"""
+        counter = struct.unpack_from('<I', data)[0]
+        uptime = int((time.monotonic() - self._connect_time) * 1000) & 0xFFFFFFFF
+        self._connector.send_packet(self.packets.CMSG_TIME_SYNC_RESP, self._build_time_sync_resp(counter, uptime))
+
+    def _build_time_sync_resp(self, counter: int, uptime: int) -> bytes:
+        return _TIME_SYNC.pack(counter, uptime)
+
+    def _parse_chat_message(self, reader: ByteReader, gm: bool = False) -> Optional[ChatMessage]:
+        events = self.packets.ChatEvents
+        tp, lang, guid = reader.read_struct(CHAT_HEAD)
+        # повідомлення аддонів ігноруємо
+        if lang == -1:
+            return None
+        # власні повідомлення ігноруємо, крім системних
+        if tp != events.CHAT_MSG_SYSTEM and guid == self._character_guid:
+            return None
+
+        channel = reader.read_cstring() if tp == events.CHAT_MSG_CHANNEL else None
+        text_length, = reader.read_struct(CHAT_TARGET)
+        text = reader.read_bytes(text_length - 1).decode('utf-8', errors='ignore')
+        reader.skip(1)  # null terminator
+        return ChatMessage(guid, tp, text, channel)
+
+    def _build_join_channel(self, channel_id: int, name: bytes) -> Payload:
+        # Після імені - його кінець і порожній пароль
+        return b''.join((_JOIN_CHANNEL_HEAD.pack(channel_id, 0, 1), name, b'\x00\x00'))
@@ -18,6 +18,9 @@ class GameHeaderCrypt:
         self._recv_i = 0
         self._recv_j = 0
         self._key: Optional[bytes] = None
+        # Ключ, повторений кілька разів: індекс у ньому не треба брати за
+        # модулем на кожному байті, лише раз наприкінці виклику
+        self._key_table = b''
     
     def decrypt(self, data: bytes) -> bytes:
         """Розшифрувати заголовок пакета"""
@@ -25,17 +28,7 @@ class GameHeaderCrypt:
             return data
         
         result = bytearray(data)
-        for i in range(len(result)):
-            self._recv_i %= len(self._key)
-            # Зберігаємо оригінальний байт для наступної ітерації
-            original_byte = result[i]
-            # Виконуємо розшифровку
-            x = ((result[i] - self._recv_j) ^ self._key[self._recv_i]) & 0xFF
-            self._recv_i += 1
-            # Оновлюємо _recv_j ПІСЛЯ розшифровки
-            self._recv_j = original_byte
-            result[i] = x
-        
+        self.decrypt_into(result, 0, len(result))
         return bytes(result)
     
     def encrypt(self, data: bytes) -> bytes:
@@ -44,24 +37,62 @@ class GameHeaderCrypt:
             return data
         
         result = bytearray(data)
-        for i in range(len(result)):
-            self._send_i %= len(self._key)
-            x = ((result[i] ^ self._key[self._send_i]) + self._send_j) & 0xFF
-            self._send_i += 1
-            result[i] = x
-            self._send_j = x
-        
+        self.encrypt_into(result, 0, len(result))
         return bytes(result)
     
+    def decrypt_into(self, buf: bytearray, start: int, end: int) -> None:
+        """Розшифрувати buf[start:end] на місці (buf - bytearray або memoryview)"""
+        if not self._initialized:
+            return
+        
+        i = self._recv_i
+        key = self._table_for(i + end - start)
+        j = self._recv_j
+        for pos in range(start, end):
+            encrypted = buf[pos]
+            buf[pos] = ((encrypted - j) & 0xFF) ^ key[i]
+            i += 1
+            # Наступний байт залежить від зашифрованого, а не розшифрованого
+            j = encrypted
+        self._recv_i = i % len(self._key)
+        self._recv_j = j
+    
+    def encrypt_into(self, buf: bytearray, start: int, end: int) -> None:
+        """Зашифрувати buf[start:end] на місці"""
+        if not self._initialized:
+            return
+        
+        i = self._send_i
+        key = self._table_for(i + end - start)
+        j = self._send_j
+        for pos in range(start, end):
+            j = ((buf[pos] ^ key[i]) + j) & 0xFF
+            buf[pos] = j
+            i += 1
+        self._send_i = i % len(self._key)
+        self._send_j = j
+    
+    def _table_for(self, length: int) -> bytes:
+        """Таблиця ключа щонайменше довжини length"""
+        if length > len(self._key_table):
+            repeats = length // len(self._key) + 1
+            self._key_table = self._key * repeats
+        return self._key_table
+    
     def init(self, key: bytes) -> None:
         """Ініціалізувати шифрування з session key"""
-        self._key = key
+        self._set_key(key)
         self._send_i = 0
         self._send_j = 0
         self._recv_i = 0
         self._recv_j = 0
         self._initialized = True
     
+    def _set_key(self, key: bytes) -> None:
+        self._key = bytes(key)
+        # Вистачає на будь-який заголовок (до 5 байтів) з будь-якої позиції
+        self._key_table = self._key * 2
+    
     @property
     def is_initialized(self) -> bool:
         """Чи ініціалізовано шифрування"""
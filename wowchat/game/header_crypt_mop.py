@@ -0,0 +1,22 @@
+"""
+Шифрування заголовків ігрових пакетів для MoP.
+
+RC4 як у WotLK, але з іншими HMAC seed.
+"""
+from __future__ import annotations
+
+from wowchat.game.header_crypt_wotlk import GameHeaderCryptWotLK
+
+
+class GameHeaderCryptMoP(GameHeaderCryptWotLK):
+    """Шифрування заголовків для MoP"""
+    
+    SERVER_HMAC_SEED = bytes([
+        0x08, 0xF1, 0x95, 0x9F, 0x47, 0xE5, 0xD2, 0xDB,
+        0xA1, 0x3D, 0x77, 0x8F, 0x3F, 0x3E, 0xE7, 0x00
+    ])
+    
+    CLIENT_HMAC_SEED = bytes([
+        0x40, 0xAA, 0xD3, 0x92, 0x26, 0x71, 0x43, 0x47,
+        0x3A, 0x31, 0x08, 0xA6, 0xE7, 0xDC, 0x98, 0x2A
+    ])
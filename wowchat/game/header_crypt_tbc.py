@@ -0,0 +1,23 @@
+"""
+Шифрування заголовків ігрових пакетів для TBC.
+
+Алгоритм як у Vanilla, але ключ - HMAC-SHA1 від session key.
+"""
+from __future__ import annotations
+
+import hashlib
+import hmac
+
+from wowchat.game.header_crypt import GameHeaderCrypt
+
+
+class GameHeaderCryptTBC(GameHeaderCrypt):
+    """Шифрування заголовків для TBC"""
+    
+    HMAC_SEED = bytes([
+        0x38, 0xA7, 0x83, 0x15, 0xF8, 0x92, 0x25, 0x30,
+        0x71, 0x98, 0x67, 0xB1, 0x8C, 0x04, 0xE2, 0xAA
+    ])
+    
+    def _set_key(self, key: bytes) -> None:
+        super()._set_key(hmac.new(self.HMAC_SEED, key, hashlib.sha1).digest())
@@ -7,44 +7,139 @@ from __future__ import annotations
 
 import hashlib
 import hmac
-from typing import Optional
+from typing import Callable, Optional
+
+from wowchat.game.header_crypt import GameHeaderCrypt
+
+# OpenSSL ARC4 через cryptography, якщо встановлено (у нових версіях
+# шифр перенесено в модуль decrepit)
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher
+    try:
+        from cryptography.hazmat.decrepit.ciphers.algorithms import ARC4
+    except ImportError:
+        from cryptography.hazmat.primitives.ciphers.algorithms import ARC4  # type: ignore
+except Exception:  # pragma: no cover
+    Cipher = None  # type: ignore
+    ARC4 = None  # type: ignore
+
+
+def _openssl_keystream(key: bytes) -> Callable[[bytearray], None]:
+    """Генератор блоків keystream на OpenSSL: шифруємо нулі"""
+    encryptor = Cipher(ARC4(key), mode=None).encryptor()
+    zeros = bytes(RC4.BLOCK_SIZE)
+
+    def fill(block: bytearray) -> None:
+        block[:] = encryptor.update(zeros)
+
+    return fill
+
+
+def _python_keystream(key: bytes) -> Callable[[bytearray], None]:
+    """Генератор блоків keystream на чистому Python"""
+    sbox = list(range(256))
+    key_length = len(key)
+    j = 0
+    for i in range(256):
+        j = (j + sbox[i] + key[i % key_length]) & 0xFF
+        sbox[i], sbox[j] = sbox[j], sbox[i]
+    # Блок кратний 256, тож i пробігає ту саму послідовність індексів,
+    # лише зсунуту на поточне значення - беремо її з таблиці
+    indices = (list(range(1, 256)) + [0]) * (RC4.BLOCK_SIZE // 256)
+    state = [0, 0]
+
+    def fill(block: bytearray) -> None:
+        s = sbox
+        i, j = state
+        out: list[int] = []
+        append = out.append
+        for i in indices[i:] + indices[:i]:
+            si = s[i]
+            j = (j + si) & 0xFF
+            sj = s[j]
+            s[i] = sj
+            s[j] = si
+            append(s[(si + sj) & 0xFF])
+        block[:] = bytes(out)
+        state[0] = i
+        state[1] = j
+
+    return fill
 
 
 class RC4:
-    """RC4 шифр"""
-    
-    def __init__(self, key: bytes) -> None:
-        self.sbox_length = 256
-        self.sbox = self._init_sbox(key)
-        self.i = 0
-        self.j = 0
-    
-    def _init_sbox(self, key: bytes) -> list[int]:
-        """Ініціалізувати S-box"""
-        sbox = list(range(self.sbox_length))
-        j = 0
-        
-        for i in range(self.sbox_length):
-            j = (j + sbox[i] + key[i % len(key)]) % self.sbox_length
-            sbox[i], sbox[j] = sbox[j], sbox[i]
-        
-        return sbox
-    
+    """RC4 шифр
+
+    Keystream генерується блоками у заздалегідь виділений буфер, а кожен
+    виклик лише XOR-ить дані з наступним шматком блоку одним проходом.
+    """
+
+    BLOCK_SIZE = 4096
+    BACKEND_OPENSSL = "openssl"
+    BACKEND_PYTHON = "python"
+
+    def __init__(self, key: bytes, backend: Optional[str] = None) -> None:
+        if backend is None:
+            backend = self.BACKEND_OPENSSL if ARC4 is not None else self.BACKEND_PYTHON
+        if backend == self.BACKEND_OPENSSL:
+            if ARC4 is None:
+                raise RuntimeError("OpenSSL ARC4 is not available, install cryptography")
+            self._fill = _openssl_keystream(key)
+        elif backend == self.BACKEND_PYTHON:
+            self._fill = _python_keystream(key)
+        else:
+            raise ValueError(f"Unknown RC4 backend {backend}")
+        self.backend = backend
+        self._block = bytearray(self.BLOCK_SIZE)
+        self._pos = self.BLOCK_SIZE
+
+    def _keystream(self, n: int) -> bytes:
+        """Наступні n байтів keystream"""
+        pos = self._pos
+        end = pos + n
+        if end <= self.BLOCK_SIZE:
+            self._pos = end
+            return self._block[pos:end]
+        # Хвіст поточного блоку плюс стільки нових блоків, скільки треба
+        out = bytearray(self._block[pos:])
+        while len(out) < n:
+            self._fill(self._block)
+            take = min(self.BLOCK_SIZE, n - len(out))
+            out += self._block[:take]
+            self._pos = take
+        return out
+
+    def skip(self, n: int) -> None:
+        """Відкинути n байтів keystream (RC4-drop)"""
+        self._keystream(n)
+
     def crypt_to_byte_array(self, data: bytes) -> bytes:
         """Зашифрувати/розшифрувати дані"""
-        result = bytearray()
-        
-        for byte in data:
-            self.i = (self.i + 1) % self.sbox_length
-            self.j = (self.j + self.sbox[self.i]) % self.sbox_length
-            self.sbox[self.i], self.sbox[self.j] = self.sbox[self.j], self.sbox[self.i]
-            rand = self.sbox[(self.sbox[self.i] + self.sbox[self.j]) % self.sbox_length]
-            result.append(rand ^ byte)
-        
-        return bytes(result)
+        n = len(data)
+        pos = self._pos
+        if pos + n <= self.BLOCK_SIZE:
+            # Звичайний випадок для заголовків: keystream уже є в блоці
+            self._pos = pos + n
+            stream = self._block[pos:pos + n]
+        else:
+            stream = self._keystream(n)
+        x = int.from_bytes(data, 'little') ^ int.from_bytes(stream, 'little')
+        return x.to_bytes(n, 'little')
 
+    def crypt_into(self, buf: bytearray, start: int, end: int) -> None:
+        """Зашифрувати/розшифрувати buf[start:end] на місці"""
+        n = end - start
+        pos = self._pos
+        if pos + n <= self.BLOCK_SIZE:
+            self._pos = pos + n
+            stream = self._block[pos:pos + n]
+        else:
+            stream = self._keystream(n)
+        x = int.from_bytes(buf[start:end], 'little') ^ int.from_bytes(stream, 'little')
+        buf[start:end] = x.to_bytes(n, 'little')
 
-class GameHeaderCryptWotLK:
+
+class GameHeaderCryptWotLK(GameHeaderCrypt):
     """Шифрування заголовків для WotLK"""
     
     # Константи з Scala версії
@@ -77,6 +172,16 @@ class GameHeaderCryptWotLK:
         
         return self._client_crypt.crypt_to_byte_array(data)
     
+    def decrypt_into(self, buf: bytearray, start: int, end: int) -> None:
+        """Розшифрувати buf[start:end] на місці"""
+        if self._initialized:
+            self._server_crypt.crypt_into(buf, start, end)
+    
+    def encrypt_into(self, buf: bytearray, start: int, end: int) -> None:
+        """Зашифрувати buf[start:end] на місці"""
+        if self._initialized:
+            self._client_crypt.crypt_into(buf, start, end)
+    
     def init(self, key: bytes) -> None:
         """Ініціалізувати шифрування з session key"""
         # Генеруємо ключі для сервера та клієнта
@@ -88,8 +193,8 @@ class GameHeaderCryptWotLK:
         self._client_crypt = RC4(client_key)
         
         # Ініціалізуємо шифри (пропускаємо перші 1024 байти)
-        self._server_crypt.crypt_to_byte_array(bytes(1024))
-        self._client_crypt.crypt_to_byte_array(bytes(1024))
+        self._server_crypt.skip(1024)
+        self._client_crypt.skip(1024)
         
         self._initialized = True
     
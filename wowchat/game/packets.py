@@ -1,9 +1,11 @@
 """Game packets and constants for WoW protocol"""
+from typing import Optional
 
 # Game packet IDs
 CMSG_CHAR_ENUM = 0x37
 SMSG_CHAR_ENUM = 0x3B
 CMSG_PLAYER_LOGIN = 0x3D
+SMSG_CHARACTER_LOGIN_FAILED = 0x41
 CMSG_LOGOUT_REQUEST = 0x4B
 CMSG_NAME_QUERY = 0x50
 SMSG_NAME_QUERY = 0x51
@@ -37,6 +39,221 @@ SMSG_TIME_SYNC_REQ = 0x0390
 CMSG_TIME_SYNC_RESP = 0x0391
 
 
+class ChatEvents:
+    """Типи повідомлень SMSG_MESSAGECHAT (Vanilla), як ChatEvents у GamePackets.scala"""
+    CHAT_MSG_SAY = 0x00
+    CHAT_MSG_GUILD = 0x03
+    CHAT_MSG_OFFICER = 0x04
+    CHAT_MSG_YELL = 0x05
+    CHAT_MSG_WHISPER = 0x06
+    CHAT_MSG_EMOTE = 0x08
+    CHAT_MSG_TEXT_EMOTE = 0x09
+    CHAT_MSG_SYSTEM = 0x0A
+    CHAT_MSG_CHANNEL = 0x0E
+    CHAT_MSG_CHANNEL_JOIN = 0x0F
+    CHAT_MSG_CHANNEL_LEAVE = 0x10
+    CHAT_MSG_CHANNEL_LIST = 0x11
+    CHAT_MSG_CHANNEL_NOTICE = 0x12
+    CHAT_MSG_CHANNEL_NOTICE_USER = 0x13
+
+    CHAT_MSG_ACHIEVEMENT = 0x30
+    CHAT_MSG_GUILD_ACHIEVEMENT = 0x31
+
+    @classmethod
+    def parse(cls, tp: str) -> int:
+        """Тип із конфігурації (say, guild, channel...) або -1"""
+        return {
+            "system": cls.CHAT_MSG_SYSTEM,
+            "say": cls.CHAT_MSG_SAY,
+            "guild": cls.CHAT_MSG_GUILD,
+            "officer": cls.CHAT_MSG_OFFICER,
+            "yell": cls.CHAT_MSG_YELL,
+            "emote": cls.CHAT_MSG_EMOTE,
+            "whisper": cls.CHAT_MSG_WHISPER,
+            "channel": cls.CHAT_MSG_CHANNEL,
+            "custom": cls.CHAT_MSG_CHANNEL,
+        }.get(tp.lower(), -1)
+
+    @classmethod
+    def value_of(cls, tp: int) -> str:
+        return {
+            cls.CHAT_MSG_SAY: "Say",
+            cls.CHAT_MSG_GUILD: "Guild",
+            cls.CHAT_MSG_OFFICER: "Officer",
+            cls.CHAT_MSG_YELL: "Yell",
+            cls.CHAT_MSG_WHISPER: "Whisper",
+            cls.CHAT_MSG_EMOTE: "Emote",
+            cls.CHAT_MSG_TEXT_EMOTE: "Emote",
+            cls.CHAT_MSG_CHANNEL: "Channel",
+            cls.CHAT_MSG_SYSTEM: "System",
+        }.get(tp, "Unknown")
+
+
+
+class ChatNotify:
+    """Коди SMSG_CHANNEL_NOTIFY, що стосуються входу в канал"""
+    CHAT_YOU_JOINED_NOTICE = 0x02
+    CHAT_WRONG_PASSWORD_NOTICE = 0x04
+    CHAT_MUTED_NOTICE = 0x11
+    CHAT_BANNED_NOTICE = 0x13
+    CHAT_WRONG_FACTION_NOTICE = 0x1A
+    CHAT_INVALID_NAME_NOTICE = 0x1B
+    CHAT_THROTTLED_NOTICE = 0x1F
+    CHAT_NOT_IN_AREA_NOTICE = 0x20
+    CHAT_NOT_IN_LFG_NOTICE = 0x21
+
+
+class ChatChannelIds:
+    """Id вбудованих каналів для CMSG_JOIN_CHANNEL, як ChatChannelIds у GamePackets.scala"""
+    GENERAL = 0x01
+    TRADE = 0x02
+    LOCAL_DEFENSE = 0x16
+    WORLD_DEFENSE = 0x17
+    GUILD_RECRUITMENT = 0x00
+    LOOKING_FOR_GROUP = 0x1A
+
+    @classmethod
+    def get_id(cls, channel: str) -> int:
+        """Id каналу за першим словом назви; 0 для власних каналів"""
+        return {
+            "general": cls.GENERAL,
+            "trade": cls.TRADE,
+            "localdefense": cls.LOCAL_DEFENSE,
+            "worlddefense": cls.WORLD_DEFENSE,
+            "guildrecruitment": cls.GUILD_RECRUITMENT,
+            "lookingforgroup": cls.LOOKING_FOR_GROUP,
+        }.get(channel.split(' ', 1)[0].lower(), 0x00)
+
+
+class GuildEvents:
+    """Коди SMSG_GUILD_EVENT; Cataclysm зсуває їх"""
+    GE_PROMOTED = 0x00
+    GE_DEMOTED = 0x01
+    GE_MOTD = 0x02
+    GE_JOINED = 0x03
+    GE_LEFT = 0x04
+    GE_REMOVED = 0x05
+    GE_SIGNED_ON = 0x0C
+    GE_SIGNED_OFF = 0x0D
+
+    @classmethod
+    def notification_key(cls, event: int) -> Optional[str]:
+        """Ключ налаштувань guild notifications; None для решти подій"""
+        return {
+            cls.GE_PROMOTED: "promoted",
+            cls.GE_DEMOTED: "demoted",
+            cls.GE_MOTD: "motd",
+            cls.GE_JOINED: "joined",
+            cls.GE_LEFT: "left",
+            cls.GE_REMOVED: "removed",
+            cls.GE_SIGNED_ON: "online",
+            cls.GE_SIGNED_OFF: "offline",
+        }.get(event)
+
+
+class Races:
+    RACE_HUMAN = 0x01
+    RACE_ORC = 0x02
+    RACE_DWARF = 0x03
+    RACE_NIGHTELF = 0x04
+    RACE_UNDEAD = 0x05
+    RACE_TAUREN = 0x06
+    RACE_GNOME = 0x07
+    RACE_TROLL = 0x08
+    RACE_GOBLIN = 0x09
+    RACE_BLOODELF = 0x0A
+    RACE_DRAENEI = 0x0B
+    RACE_WORGEN = 0x16
+    RACE_PANDAREN_NEUTRAL = 0x18
+    RACE_PANDAREN_ALLIANCE = 0x19
+    RACE_PANDAREN_HORDE = 0x1A
+
+    _NAMES = {
+        RACE_HUMAN: "Human",
+        RACE_ORC: "Orc",
+        RACE_DWARF: "Dwarf",
+        RACE_NIGHTELF: "Night Elf",
+        RACE_UNDEAD: "Undead",
+        RACE_TAUREN: "Tauren",
+        RACE_GNOME: "Gnome",
+        RACE_TROLL: "Troll",
+        RACE_GOBLIN: "Goblin",
+        RACE_BLOODELF: "Blood Elf",
+        RACE_DRAENEI: "Draenei",
+        RACE_WORGEN: "Worgen",
+        RACE_PANDAREN_NEUTRAL: "Pandaren",
+        RACE_PANDAREN_ALLIANCE: "Alliance Pandaren",
+        RACE_PANDAREN_HORDE: "Horde Pandaren",
+    }
+
+    # Мови чату: раси Орди пишуть орочою, нейтральні пандарени - своєю, решта - загальною
+    LANG_ORCISH = 1
+    LANG_COMMON = 7
+    LANG_PANDAREN_NEUTRAL = 42
+
+    @classmethod
+    def value_of(cls, race: int) -> str:
+        return cls._NAMES.get(race, "Unknown")
+
+    @classmethod
+    def language(cls, race: int) -> int:
+        """Мова, якою персонаж цієї раси пише в чат"""
+        if race in (
+            cls.RACE_ORC, cls.RACE_UNDEAD, cls.RACE_TAUREN, cls.RACE_TROLL,
+            cls.RACE_BLOODELF, cls.RACE_GOBLIN, cls.RACE_PANDAREN_HORDE,
+        ):
+            return cls.LANG_ORCISH
+        if race == cls.RACE_PANDAREN_NEUTRAL:
+            return cls.LANG_PANDAREN_NEUTRAL
+        return cls.LANG_COMMON
+
+
+class Genders:
+    GENDER_MALE = 0
+    GENDER_FEMALE = 1
+    GENDER_NONE = 2
+
+    @classmethod
+    def value_of(cls, gender: int) -> str:
+        if gender == cls.GENDER_MALE:
+            return "Male"
+        if gender == cls.GENDER_FEMALE:
+            return "Female"
+        return "Unknown"
+
+
+class Classes:
+    CLASS_WARRIOR = 0x01
+    CLASS_PALADIN = 0x02
+    CLASS_HUNTER = 0x03
+    CLASS_ROGUE = 0x04
+    CLASS_PRIEST = 0x05
+    CLASS_DEATH_KNIGHT = 0x06
+    CLASS_SHAMAN = 0x07
+    CLASS_MAGE = 0x08
+    CLASS_WARLOCK = 0x09
+    CLASS_MONK = 0x0A
+    CLASS_DRUID = 0x0B
+
+    _NAMES = {
+        CLASS_WARRIOR: "Warrior",
+        CLASS_PALADIN: "Paladin",
+        CLASS_HUNTER: "Hunter",
+        CLASS_ROGUE: "Rogue",
+        CLASS_PRIEST: "Priest",
+        CLASS_DEATH_KNIGHT: "Death Knight",
+        CLASS_SHAMAN: "Shaman",
+        CLASS_MAGE: "Mage",
+        CLASS_WARLOCK: "Warlock",
+        CLASS_MONK: "Monk",
+        CLASS_DRUID: "Druid",
+    }
+
+    @classmethod
+    def value_of(cls, char_class: int) -> str:
+        return cls._NAMES.get(char_class, "Unknown")
+
+
 class AuthResponseCodes:
     AUTH_OK = 0x0C
     AUTH_FAILED = 0x0D
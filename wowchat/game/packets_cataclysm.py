@@ -0,0 +1,74 @@
+"""Game packets and constants for Cataclysm (4.3.4 build 15595)"""
+
+from wowchat.game.packets_wotlk import *  # noqa: F401,F403
+
+CMSG_CHAR_ENUM = 0x0502
+SMSG_CHAR_ENUM = 0x10B0
+CMSG_PLAYER_LOGIN = 0x05B1
+# Not mapped for 4.x/5.x; a wrong GUID ends the session instead
+SMSG_CHARACTER_LOGIN_FAILED = None
+CMSG_LOGOUT_REQUEST = 0x0A25
+CMSG_NAME_QUERY = 0x2224
+SMSG_NAME_QUERY = 0x6E04
+CMSG_WHO = 0x6C15
+SMSG_WHO = 0x6907
+CMSG_GUILD_QUERY = 0x4426
+SMSG_GUILD_QUERY = 0x0E06
+CMSG_GUILD_ROSTER = 0x1226
+SMSG_GUILD_ROSTER = 0x3DA3
+SMSG_GUILD_EVENT = 0x0705
+SMSG_MESSAGECHAT = 0x2026
+SMSG_GM_MESSAGECHAT = 0x6434
+CMSG_JOIN_CHANNEL = 0x0156
+SMSG_CHANNEL_NOTIFY = 0x0825
+
+SMSG_NOTIFICATION = 0x14A0
+CMSG_PING = 0x444D
+SMSG_AUTH_CHALLENGE = 0x4542
+CMSG_AUTH_CHALLENGE = 0x0449
+SMSG_AUTH_RESPONSE = 0x5DB6
+SMSG_LOGIN_VERIFY_WORLD = 0x2005
+SMSG_SERVER_MESSAGE = 0x6C04
+
+SMSG_WARDEN_DATA = 0x12E7
+CMSG_WARDEN_DATA = 0x12E8
+
+SMSG_INVALIDATE_PLAYER = 0x6325
+CMSG_KEEP_ALIVE = 0x0015
+
+SMSG_TIME_SYNC_REQ = 0x3CA4
+CMSG_TIME_SYNC_RESP = 0x3B0C
+
+WOW_CONNECTION = 0x4F57  # same hack as in mangos
+
+CMSG_MESSAGECHAT_AFK = 0x0D44
+CMSG_MESSAGECHAT_BATTLEGROUND = 0x2156
+CMSG_MESSAGECHAT_CHANNEL = 0x1D44
+CMSG_MESSAGECHAT_DND = 0x2946
+CMSG_MESSAGECHAT_EMOTE = 0x1156
+CMSG_MESSAGECHAT_GUILD = 0x3956
+CMSG_MESSAGECHAT_OFFICER = 0x1946
+CMSG_MESSAGECHAT_PARTY = 0x1D46
+CMSG_MESSAGECHAT_SAY = 0x1154
+CMSG_MESSAGECHAT_WHISPER = 0x0D56
+CMSG_MESSAGECHAT_YELL = 0x3544
+
+SMSG_MOTD = 0x0A35
+
+COMPRESSED_DATA_MASK = 0x8000
+
+
+class ChatChannelIds(ChatChannelIds):  # noqa: F405
+    # Id 0x19 знову не закріплений за GuildRecruitment
+    GUILD_RECRUITMENT = 0x00
+
+
+class GuildEvents(GuildEvents):  # noqa: F405
+    GE_PROMOTED = 0x01
+    GE_DEMOTED = 0x02
+    GE_MOTD = 0x03
+    GE_JOINED = 0x04
+    GE_LEFT = 0x05
+    GE_REMOVED = 0x06
+    GE_SIGNED_ON = 0x10
+    GE_SIGNED_OFF = 0x11
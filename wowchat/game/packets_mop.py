@@ -0,0 +1,64 @@
+"""Game packets and constants for MoP (5.4.8 build 18414)"""
+
+from wowchat.game.packets_cataclysm import *  # noqa: F401,F403
+
+CMSG_MESSAGECHAT_AFK = 0x0EAB
+CMSG_MESSAGECHAT_CHANNEL = 0x00BB
+CMSG_MESSAGECHAT_DND = 0x002E
+CMSG_MESSAGECHAT_EMOTE = 0x103E
+CMSG_MESSAGECHAT_GUILD = 0x0CAE
+CMSG_MESSAGECHAT_OFFICER = 0x0ABF
+CMSG_MESSAGECHAT_PARTY = 0x109A
+CMSG_MESSAGECHAT_SAY = 0x0A9A
+CMSG_MESSAGECHAT_WHISPER = 0x123E
+CMSG_MESSAGECHAT_YELL = 0x04AA
+
+CMSG_CHAR_ENUM = 0x00E0
+SMSG_CHAR_ENUM = 0x11C3
+CMSG_PLAYER_LOGIN = 0x158F
+CMSG_LOGOUT_REQUEST = 0x1349
+CMSG_NAME_QUERY = 0x0328
+SMSG_NAME_QUERY = 0x169B
+CMSG_GUILD_QUERY = 0x1AB6
+SMSG_GUILD_QUERY = 0x1B79
+CMSG_WHO = 0x18A3
+SMSG_WHO = 0x161B
+CMSG_GUILD_ROSTER = 0x1459
+SMSG_GUILD_ROSTER = 0x0BE0
+SMSG_MESSAGECHAT = 0x1A9A
+CMSG_JOIN_CHANNEL = 0x148E
+SMSG_CHANNEL_NOTIFY = 0x0F06
+
+SMSG_NOTIFICATION = 0x0C2A
+CMSG_PING = 0x0012
+SMSG_AUTH_CHALLENGE = 0x0949
+CMSG_AUTH_CHALLENGE = 0x00B2
+SMSG_AUTH_RESPONSE = 0x0ABA
+SMSG_LOGIN_VERIFY_WORLD = 0x1C0F
+SMSG_SERVER_MESSAGE = 0x0302
+
+SMSG_WARDEN_DATA = 0x0C0A
+CMSG_WARDEN_DATA = 0x1816
+
+# No open source implementation of this packet for MoP is known,
+# so the plain 8 byte guid format from previous versions is assumed.
+SMSG_INVALIDATE_PLAYER = 0x102E
+CMSG_KEEP_ALIVE = 0x1A87
+
+SMSG_TIME_SYNC_REQ = 0x1A8F
+CMSG_TIME_SYNC_RESP = 0x01DB
+
+SMSG_GUILD_MOTD = 0x0B68
+SMSG_GUILD_RANKS_UPDATE = 0x0A60
+SMSG_GUILD_INVITE_ACCEPT = 0x0B69
+SMSG_GUILD_MEMBER_LOGGED = 0x0B70
+SMSG_GUILD_LEAVE = 0x0BF8
+
+SMSG_MOTD = 0x183B
+
+SMSG_COMPRESSED_DATA = 0x1568
+
+
+class ChatEvents(ChatEvents):  # noqa: F405
+    CHAT_MSG_ACHIEVEMENT = 0x2E
+    CHAT_MSG_GUILD_ACHIEVEMENT = 0x2F
@@ -0,0 +1,29 @@
+"""Game packets and constants for TBC (2.4.3)"""
+
+from wowchat.game.packets import *  # noqa: F401,F403
+
+SMSG_GM_MESSAGECHAT = 0x03B2
+SMSG_MOTD = 0x033D
+CMSG_KEEP_ALIVE = 0x0406
+
+
+class ChatEvents(ChatEvents):  # noqa: F405
+    """З TBC типи зсунулися: CHAT_MSG_SYSTEM став нульовим"""
+    CHAT_MSG_SAY = 0x01
+    CHAT_MSG_GUILD = 0x04
+    CHAT_MSG_OFFICER = 0x05
+    CHAT_MSG_YELL = 0x06
+    CHAT_MSG_WHISPER = 0x07
+    CHAT_MSG_EMOTE = 0x0A
+    CHAT_MSG_TEXT_EMOTE = 0x0B
+    CHAT_MSG_SYSTEM = 0x00
+    CHAT_MSG_CHANNEL = 0x11
+    CHAT_MSG_CHANNEL_JOIN = 0x12
+    CHAT_MSG_CHANNEL_LEAVE = 0x13
+    CHAT_MSG_CHANNEL_LIST = 0x14
+    CHAT_MSG_CHANNEL_NOTICE = 0x15
+    CHAT_MSG_CHANNEL_NOTICE_USER = 0x16
+
+
+class ChatChannelIds(ChatChannelIds):  # noqa: F405
+    GUILD_RECRUITMENT = 0x19
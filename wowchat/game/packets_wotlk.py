@@ -0,0 +1,6 @@
+"""Game packets and constants for WotLK (3.3.5)"""
+
+from wowchat.game.packets_tbc import *  # noqa: F401,F403
+
+SMSG_GM_MESSAGECHAT = 0x03B3
+CMSG_KEEP_ALIVE = 0x0407
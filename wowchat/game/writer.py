@@ -0,0 +1,162 @@
+"""
+Черга вихідних ігрових пакетів.
+
+Усі CMSG проходять через одну задачу: вона шифрує заголовки строго в
+порядку відправки, збирає все, що накопичилося в черзі, в один виклик
+transport.writelines і чекає drain лише тоді, коли транспорт попросив
+зупинитися (pause_writing).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from typing import Callable, Deque, List, Optional, Tuple, Union
+
+from wowchat.common.packet import ByteWriter
+from wowchat.game.framer import GamePacketFramer
+
+Payload = Union[bytes, ByteWriter]
+_Outgoing = Tuple[int, Payload, Optional[asyncio.Future]]
+
+
+class GamePacketWriter:
+    """Об'єднує вихідні пакети в пачки з одним drain на пачку"""
+
+    # Скільки пакетів максимум іде в один writelines
+    MAX_BATCH = 512
+
+    def __init__(
+        self,
+        framer: GamePacketFramer,
+        is_unencrypted: Callable[[int], bool],
+        max_batch: int = MAX_BATCH,
+    ) -> None:
+        self._logger = logging.getLogger(__name__)
+        self._framer = framer
+        self._is_unencrypted = is_unencrypted
+        self._max_batch = max_batch
+        self._queue: Deque[_Outgoing] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.sent_packets = 0
+        self.flushes = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def send(self, opcode: int, payload: Payload = b'') -> None:
+        """Поставити пакет у чергу і не чекати (fire and forget)"""
+        if self._closing:
+            raise ConnectionResetError("Game connection is closing")
+        self._queue.append((opcode, payload, None))
+        self._wakeup.set()
+
+    async def send_and_wait(self, opcode: int, payload: Payload = b'') -> None:
+        """Поставити пакет у чергу і дочекатися, поки транспорт його прийме"""
+        if self._closing:
+            raise ConnectionResetError("Game connection is closing")
+        waiter = asyncio.get_running_loop().create_future()
+        self._queue.append((opcode, payload, waiter))
+        self._wakeup.set()
+        await waiter
+
+    async def flush(self) -> None:
+        """Дочекатися відправки всього, що вже стоїть у черзі"""
+        if not self._queue:
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        # Порожній маркер: задача завершить його після попередніх пакетів
+        self._queue.append((-1, b'', waiter))
+        self._wakeup.set()
+        await waiter
+
+    async def close(self) -> None:
+        """Відправити залишок черги і зупинити задачу"""
+        if self._task is None:
+            return
+        self._closing = True
+        self._wakeup.set()
+        try:
+            await self._task
+        finally:
+            self._task = None
+
+    async def _run(self) -> None:
+        queue = self._queue
+        try:
+            while True:
+                if not queue:
+                    if self._closing:
+                        return
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                waiters = self._write_batch()
+                try:
+                    # drain повертається одразу, якщо транспорт не на паузі
+                    await self._framer.drain()
+                except Exception as e:
+                    self._fail(waiters, e)
+                    raise
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_result(None)
+        except Exception as e:
+            self._closing = True
+            self._fail_pending(e)
+            if not isinstance(e, ConnectionError):
+                self._logger.error("Game packet writer failed: %s", e)
+        except asyncio.CancelledError:
+            self._closing = True
+            self._fail_pending(ConnectionResetError("Game packet writer cancelled"))
+            raise
+
+    def _write_batch(self) -> List[asyncio.Future]:
+        """Закодувати до max_batch пакетів з черги і записати їх одним викликом"""
+        transport = self._framer.transport
+        if transport is None or transport.is_closing():
+            raise ConnectionResetError("Not connected to game server")
+        queue = self._queue
+        framer = self._framer
+        is_unencrypted = self._is_unencrypted
+        debug = self._logger.isEnabledFor(logging.DEBUG)
+        frames: List[Union[bytes, memoryview]] = []
+        waiters: List[asyncio.Future] = []
+        for _ in range(min(len(queue), self._max_batch)):
+            opcode, payload, waiter = queue.popleft()
+            if waiter is not None:
+                waiters.append(waiter)
+            if opcode < 0:
+                continue
+            # Заголовки шифруються тут і лише тут, тож порядок потоку RC4
+            # завжди збігається з порядком пакетів у сокеті
+            header = framer.encode_header(opcode, len(payload), not is_unencrypted(opcode))
+            if isinstance(payload, ByteWriter):
+                # Заголовок лягає в зарезервоване місце перед тілом: один
+                # memoryview на пакет без копіювання тіла
+                frames.append(payload.frame(header))
+            else:
+                frames.append(header)
+                if payload:
+                    frames.append(payload)
+            if debug:
+                self._logger.debug("Sending packet 0x%04X, size: %d", opcode, len(payload))
+            self.sent_packets += 1
+        if frames:
+            transport.writelines(frames)
+            self.flushes += 1
+        return waiters
+
+    def _fail_pending(self, exc: BaseException) -> None:
+        waiters = [waiter for _, _, waiter in self._queue if waiter is not None]
+        self._queue.clear()
+        self._fail(waiters, exc)
+
+    @staticmethod
+    def _fail(waiters: List[asyncio.Future], exc: BaseException) -> None:
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_exception(exc)
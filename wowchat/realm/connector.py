@@ -4,32 +4,86 @@ import asyncio
 import hashlib
 import logging
 from dataclasses import dataclass
-from typing import Optional
+from secrets import token_bytes
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Tuple
 
-from wowchat.common.byte_utils import int_to_bytes
 from wowchat.common.config import Platform, WowChatConfig, WowExpansion, get_realm_build
 from wowchat.common.global_state import Global
-from wowchat.common.packet import ByteReader
+from wowchat.common.metrics import metrics
+from wowchat.common.packet import ByteReader, ByteWriter
+from wowchat.common.reconnect_delay import FailureClass
+from wowchat.common.schema import CSTRING, Schema, skip
+from wowchat.realm.framer import RealmPacketFramer
 from wowchat.realm.packets import RealmPackets
-from wowchat.realm.srp_client import SRPClient
-from wowchat.realm.big_number import BigNumber
+from wowchat.realm.srp_client import SRPClient, password_verifier, reconnect_proof
 
+if TYPE_CHECKING:
+	from wowchat.game.connector import GameConnector
 
-@dataclass
+
+class RealmAuthError(Exception):
+	"""The realm server turned the logon or reconnect down"""
+	failure_class = FailureClass.REALM_AUTH
+
+
+class WorldAuthError(Exception):
+	"""The world server turned down the session key the realm server just issued"""
+	failure_class = FailureClass.WORLD_AUTH
+
+
+@dataclass(slots=True)
 class RealmList:
+	flags: int
 	name: str
 	address: str
 	realm_id: int
 
 
+# One realm entry of CMD_REALM_LIST, aligned with Scala
+REALM_LIST_ENTRY = Schema(RealmList, (
+	# Some servers (e.g., AzerothCore) appear to have a 3-byte realm type block here
+	skip(3),
+	('flags', 'B'),
+	('name', CSTRING),
+	('address', CSTRING),
+	skip(4),  # population
+	skip(1),  # num characters
+	skip(1),  # timezone
+	('realm_id', 'B'),  # Byte як у Scala
+))
+
+
+@dataclass(slots=True)
+class RealmSession:
+	"""What a successful logon leaves behind for reconnects"""
+	session_key: bytes
+	realm_name: str
+	host: str
+	port: int
+	realm_id: int
+
+
 class RealmConnector:
+	# Realm packets are small; one read usually holds a whole frame
+	READ_SIZE = 4096
+
 	def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
 		self._loop = loop
 		self._logger = logging.getLogger(__name__)
 		self._reader: asyncio.StreamReader | None = None
 		self._writer: asyncio.StreamWriter | None = None
 		self._srp = SRPClient()
+		# (x, verifier) by (account, salt, g, N), so that a logon after the
+		# first skips the hashing and g^x; the password itself is not kept
+		self._verifiers: Dict[Tuple[bytes, bytes, int, int], Tuple[int, int]] = {}
+		self._verifier_key: Optional[Tuple[bytes, bytes, int, int]] = None
 		self._session_key: Optional[bytes] = None
+		# Session key and realm of the last logon, kept across disconnects
+		self.session: Optional[RealmSession] = None
+		# Called once the character is in the world, for the reconnect scheduler
+		self.on_in_world: Optional[Callable[[], None]] = None
+		# Host and port of the last connection, the one to probe after it failed
+		self.last_address: Optional[Tuple[str, int]] = None
 
 		# CRC hashes per Scala implementation (subset sufficient for WotLK 3.3.5)
 		# Keyed by (build, platform)
@@ -43,143 +97,219 @@ class RealmConnector:
 			]),
 		}
 
-	async def connect(self, conf: WowChatConfig) -> None:
+	async def connect(self, conf: WowChatConfig) -> bool:
+		"""Full logon: SRP, realm list, then the world server.
+
+		Returns whether the world session got into the world before it ended.
+		"""
+		await self._realm_handshake(conf, RealmPackets.CMD_AUTH_LOGON_CHALLENGE)
+		game_connector = await self._connect_to_game_server(self.session)
+		if not game_connector.authenticated:
+			raise WorldAuthError("World server rejected the session key of a fresh logon")
+		return game_connector.in_world
+
+	async def reconnect(self, conf: WowChatConfig) -> bool:
+		"""Reconnect with the session key of the last logon.
+
+		The world server checks CMSG_AUTH_SESSION against the key the realm
+		server stored at logon, so after a world server blip it is tried
+		straight away. If it rejects the key or does not answer, the realm
+		reconnect handshake proves the key to the realm server and fetches a
+		fresh realm list. A full logon runs only when a server turns the key
+		down or a world server that just got a key does not answer it; when
+		the realm server or the new world address cannot be reached, the
+		error is raised for the reconnect scheduler.
+		"""
+		session = self.session
+		if session is None:
+			return await self.connect(conf)
+		try:
+			game_connector = await self._connect_to_game_server(session)
+			if game_connector.authenticated:
+				return game_connector.in_world
+			self._logger.info("World server rejected the session key, reconnecting through the realm server")
+		except WorldAuthError as e:
+			self._logger.info("%s, reconnecting through the realm server", e)
+		except OSError as e:
+			self._logger.info("World server unreachable (%s), reconnecting through the realm server", e)
+
+		self._session_key = session.session_key
+		try:
+			await self._realm_handshake(conf, RealmPackets.CMD_AUTH_RECONNECT_CHALLENGE)
+		except RealmAuthError as e:
+			self._logger.info("Realm server refused the session key (%s), logging in again", e)
+			self.session = None
+			return await self.connect(conf)
+		try:
+			game_connector = await self._connect_to_game_server(self.session)
+			if game_connector.authenticated:
+				return game_connector.in_world
+			self._logger.info("World server rejected a key the realm server accepted, logging in again")
+		except WorldAuthError as e:
+			self._logger.info("%s, logging in again", e)
+		self.session = None
+		return await self.connect(conf)
+
+	async def _realm_handshake(self, conf: WowChatConfig, cmd: int) -> None:
+		"""Logon or reconnect against the realm server, up to the realm list"""
 		host = conf.wow.realmlist.host
 		port = conf.wow.realmlist.port
 		self._logger.info("Connecting to realm server %s:%s", host, port)
+		metrics.incr("realm.connects")
+		self.last_address = (host, port)
 		self._reader, self._writer = await asyncio.open_connection(host, port)
-		await self._send_auth_logon_challenge(conf)
-		await self._read_loop(conf)
+		try:
+			await self._send_auth_logon_challenge(conf, cmd)
+			await self._read_loop(conf)
+		finally:
+			self._writer.close()
 
-	async def _send_auth_logon_challenge(self, conf: WowChatConfig) -> None:
+	async def _send_auth_logon_challenge(self, conf: WowChatConfig, cmd: int = RealmPackets.CMD_AUTH_LOGON_CHALLENGE) -> None:
+		"""CMD_AUTH_LOGON_CHALLENGE, or CMD_AUTH_RECONNECT_CHALLENGE with the same body"""
 		version = list(map(int, conf.version.split('.')))
 		platform_str = "Win" if conf.wow.platform == Platform.Windows else "OSX"
 		locale_str = conf.wow.locale
 		account = conf.wow.account
-		size = 30 + len(account)
-		payload = bytearray()
-		payload.append(3 if conf.expansion == WowExpansion.Vanilla else 8)
-		payload += size.to_bytes(2, 'little', signed=False)
-		payload += int_to_bytes(int.from_bytes(b"WoW", 'big'))
-		payload += bytes((version[0], version[1], version[2]))
-		payload += get_realm_build(conf).to_bytes(2, 'little')
-		payload += int_to_bytes(int.from_bytes(b"x86", 'big'))
-		payload += int_to_bytes(int.from_bytes(platform_str.encode('ascii'), 'big'))
-		payload += int_to_bytes(int.from_bytes(locale_str.encode('ascii'), 'big'))
-		payload += (0).to_bytes(4, 'little')
-		payload += bytes((127, 0, 0, 1))
-		payload.append(len(account))
-		payload += account
-		self._writer.write(bytes((RealmPackets.CMD_AUTH_LOGON_CHALLENGE,)) + payload)
+		out = ByteWriter(34 + len(account))
+		out.write_u8(cmd)
+		out.write_u8(3 if conf.expansion == WowExpansion.Vanilla else 8)
+		out.write_u16le(0)  # size, filled in below
+		out.write_u32be(int.from_bytes(b"WoW", 'big'))
+		out.write_bytes(bytes((version[0], version[1], version[2])))
+		out.write_u16le(get_realm_build(conf))
+		out.write_u32be(int.from_bytes(b"x86", 'big'))
+		out.write_u32be(int.from_bytes(platform_str.encode('ascii'), 'big'))
+		out.write_u32be(int.from_bytes(locale_str.encode('ascii'), 'big'))
+		out.write_u32le(0)
+		out.write_bytes(bytes((127, 0, 0, 1)))
+		out.write_u8(len(account))
+		out.write_bytes(account)
+		out.set_u16le(2, len(out) - 4)
+		self._writer.write(out.getbuffer())
 		await self._writer.drain()
 
-	async def _read_exact(self, n: int) -> bytes:
-		assert self._reader is not None
-		return await self._reader.readexactly(n)
-
 	async def _read_loop(self, conf: WowChatConfig) -> None:
 		assert self._reader and self._writer
+		framer = RealmPacketFramer(conf.expansion)
 		try:
 			while True:
-				id_b = await self._read_exact(1)
-				pkt_id = id_b[0]
-				if pkt_id == RealmPackets.CMD_AUTH_LOGON_CHALLENGE:
-					await self._handle_logon_challenge(conf)
-				elif pkt_id == RealmPackets.CMD_AUTH_LOGON_PROOF:
-					await self._handle_logon_proof()
-				elif pkt_id == RealmPackets.CMD_REALM_LIST:
-					await self._handle_realm_list(conf)
-					# Після обробки realm list, виходимо з циклу
-					break
-				else:
-					self._logger.debug("Unknown realm packet %02X", pkt_id)
+				data = await self._reader.read(self.READ_SIZE)
+				frames = framer.feed(data) if data else framer.feed_eof()
+				for pkt_id, payload in frames:
+					if pkt_id == RealmPackets.CMD_AUTH_LOGON_CHALLENGE:
+						await self._handle_logon_challenge(conf, payload)
+					elif pkt_id == RealmPackets.CMD_AUTH_LOGON_PROOF:
+						await self._handle_logon_proof(payload)
+					elif pkt_id == RealmPackets.CMD_AUTH_RECONNECT_CHALLENGE:
+						await self._handle_reconnect_challenge(conf, payload)
+					elif pkt_id == RealmPackets.CMD_AUTH_RECONNECT_PROOF:
+						await self._handle_reconnect_proof(payload)
+					elif pkt_id == RealmPackets.CMD_REALM_LIST:
+						await self._handle_realm_list(conf, payload)
+						# Після обробки realm list, виходимо з циклу
+						return
+				if not data:
+					raise ConnectionResetError(f"Realm server closed the connection ({framer.pending} bytes unframed)")
 		except Exception as e:
 			self._logger.error("Error in realm read loop: %s", e)
 			raise
 
-	async def _handle_logon_challenge(self, conf: WowChatConfig) -> None:
-		# We already read id; now parse the rest according to Scala logic
-		# read header length + result-dependent size in a simple way: read 2 then rest of available bytes from transport buffer isn't trivial; for now, read a reasonable chunk
-		rest = await self._read_exact(2)
-		# Peek result by reading minimal fields
-		# For simplicity in this scaffold: read the rest in a fixed buffer (server dependent); robust framing can be added later
-		remaining = await self._reader.read(2048)
-		buf = ByteReader(rest + remaining)
+	async def _handle_logon_challenge(self, conf: WowChatConfig, payload: bytes) -> None:
+		buf = ByteReader(payload)
 		error = buf.read_u8()
 		result = buf.read_u8()
 		if not RealmPackets.AuthResult.is_success(result):
-			self._logger.error(RealmPackets.AuthResult.get_message(result))
-			self._writer.close()
-			return
-		B = bytes(reversed(buf.read_bytes(32)))
+			raise RealmAuthError(RealmPackets.AuthResult.get_message(result))
+		# SRP numbers are little-endian on the wire
+		B = int.from_bytes(buf.read_bytes(32), 'little')
 		g_len = buf.read_u8()
-		g = bytes(reversed(buf.read_bytes(g_len)))
+		g = int.from_bytes(buf.read_bytes(g_len), 'little')
 		n_len = buf.read_u8()
-		N = bytes(reversed(buf.read_bytes(n_len)))
-		salt = bytes(reversed(buf.read_bytes(32)))
+		N = int.from_bytes(buf.read_bytes(n_len), 'little')
+		salt = buf.read_bytes(32)
 		buf.skip(16)
 		security_flag = buf.read_u8()
 		token: Optional[str] = None
 		if security_flag == 0x04:
 			# Not supported in non-interactive scaffold
-			self._logger.error("Token two factor auth enabled; not supported in this port.")
-			self._writer.close()
-			return
+			raise RealmAuthError("Token two factor auth enabled; not supported in this port.")
 		elif security_flag != 0x00:
-			self._logger.error("Two factor auth type %s not supported.", security_flag)
-			self._writer.close()
-			return
+			raise RealmAuthError(f"Two factor auth type {security_flag} not supported.")
 
-		self._srp.step1(conf.wow.account, conf.wow.password, BigNumber.from_bytes(bytearray(B)), BigNumber.from_bytes(bytearray(g)), BigNumber.from_bytes(bytearray(N)), BigNumber.from_bytes(bytearray(salt)))  # type: ignore[name-defined]
-		self._session_key = self._srp.K.as_byte_array(40)  # type: ignore[union-attr]
-		A_arr = self._srp.A.as_byte_array(32)  # type: ignore[union-attr]
-		m_arr = self._srp.M.as_byte_array(20, reverse=False)  # type: ignore[union-attr]
+		metrics.incr("realm.srp_logons")
+		key = self._verifier_key = (conf.wow.account, salt, g, N)
+		verifier = self._verifiers.get(key)
+		if verifier is None:
+			verifier = self._verifiers[key] = password_verifier(conf.wow.account, conf.wow.password, salt, g, N)
+		self._srp.step1(conf.wow.account, verifier, B, g, N, salt)
+		self._session_key = self._srp.K
+		A_arr = self._srp.A
+		m_arr = self._srp.M1
 		md = hashlib.sha1()
 		md.update(A_arr)
 		# Build CRC based on build and platform (align with Scala)
 		crc_bytes = self._build_crc_hashes.get((get_realm_build(conf), conf.wow.platform), bytes(20))
 		md.update(crc_bytes)
 		crc_hash = md.digest()
-		out = bytearray()
-		out += A_arr
-		out += m_arr
-		out += crc_hash
-		out += bytes((0,))
-		out += bytes((security_flag,))
-		self._writer.write(bytes((RealmPackets.CMD_AUTH_LOGON_PROOF,)) + out)
+		out = ByteWriter(75)
+		out.write_u8(RealmPackets.CMD_AUTH_LOGON_PROOF)
+		out.write_bytes(A_arr)
+		out.write_bytes(m_arr)
+		out.write_bytes(crc_hash)
+		out.write_u8(0)
+		out.write_u8(security_flag)
+		self._writer.write(out.getbuffer())
 		await self._writer.drain()
 
-	async def _handle_logon_proof(self) -> None:
-		# Read variable size; read a chunk sufficient to include server proof
-		data = await self._reader.read(128)
-		buf = ByteReader(data)
+	async def _handle_logon_proof(self, payload: bytes) -> None:
+		buf = ByteReader(payload)
 		result = buf.read_u8()
 		if not RealmPackets.AuthResult.is_success(result):
-			self._logger.error(RealmPackets.AuthResult.get_message(result))
-			self._writer.close()
-			return
+			# The password may have changed since x was derived
+			self._verifiers.pop(self._verifier_key, None)  # type: ignore[arg-type]
+			raise RealmAuthError(RealmPackets.AuthResult.get_message(result))
 		# Compare server proof to locally generated to ensure SRP session key matches
 		server_proof = buf.read_bytes(20)
-		try:
-			assert self._srp is not None and self._srp.A and self._srp.M and self._srp.K
+		if not self._srp.verify_server_proof(server_proof):
 			expected = self._srp.generate_hash_logon_proof()
-			if server_proof != expected:
-				self._logger.error("SRP server proof mismatch! Expected %s got %s", expected.hex(), server_proof.hex())
-				# Continue anyway; some servers may not send proof consistently
-			else:
-				self._logger.info("SRP server proof OK")
-		except Exception as e:
-			self._logger.debug("SRP proof check skipped: %s", e)
-		# request realm list
-		out = (0).to_bytes(4, 'little')
-		self._writer.write(bytes((RealmPackets.CMD_REALM_LIST,)) + out)
+			self._logger.error("SRP server proof mismatch! Expected %s got %s", expected.hex(), server_proof.hex())
+			# Continue anyway; some servers may not send proof consistently
+		else:
+			self._logger.info("SRP server proof OK")
+		await self._send_realm_list_request()
+
+	async def _handle_reconnect_challenge(self, conf: WowChatConfig, payload: bytes) -> None:
+		result = payload[0]
+		if not RealmPackets.AuthResult.is_success(result):
+			raise RealmAuthError(RealmPackets.AuthResult.get_message(result))
+		metrics.incr("realm.reconnect_proofs")
+		server_data = payload[1:17]
+		client_data = token_bytes(16)
+		out = ByteWriter(58)
+		out.write_u8(RealmPackets.CMD_AUTH_RECONNECT_PROOF)
+		out.write_bytes(client_data)
+		out.write_bytes(reconnect_proof(conf.wow.account, client_data, server_data, self._session_key))
+		# R3 is not checked by servers
+		out.write_bytes(hashlib.sha1(client_data + bytes(20)).digest())
+		out.write_u8(0)  # number of keys
+		self._writer.write(out.getbuffer())
+		await self._writer.drain()
+
+	async def _handle_reconnect_proof(self, payload: bytes) -> None:
+		result = payload[0]
+		if not RealmPackets.AuthResult.is_success(result):
+			raise RealmAuthError(RealmPackets.AuthResult.get_message(result))
+		self._logger.info("Realm server accepted the session key")
+		await self._send_realm_list_request()
+
+	async def _send_realm_list_request(self) -> None:
+		out = ByteWriter(5)
+		out.write_u8(RealmPackets.CMD_REALM_LIST)
+		out.write_u32le(0)
+		self._writer.write(out.getbuffer())
 		await self._writer.drain()
 
-	async def _handle_realm_list(self, conf: WowChatConfig) -> None:
-		# size prefixed LE short
-		size_b = await self._read_exact(2)
-		size = int.from_bytes(size_b, 'little')
-		payload = await self._read_exact(size)
+	async def _handle_realm_list(self, conf: WowChatConfig, payload: bytes) -> None:
 		self._logger.debug("Realm list payload: %s", payload.hex())
 		buf = ByteReader(payload)
 		buf.read_u32le()
@@ -188,42 +318,41 @@ class RealmConnector:
 		match_id = 0
 		# Align with Scala: number of realms is a single byte and fixed field skips
 		num_realms = buf.read_u8()
-		for i in range(num_realms):
-			# Some servers (e.g., AzerothCore) appear to have a 3-byte realm type block here
-			buf.skip(3)
-			realm_flags = buf.read_u8()
-			realm_name = buf.read_cstring()
-			addr = buf.read_cstring()
-			buf.skip(4)  # population
-			buf.skip(1)  # num characters
-			buf.skip(1)  # timezone
-			realm_id = buf.read_u8()  # Byte як у Scala
-			self._logger.debug("Realm[%d]: flags=%02x name=%s addr=%s id=%d", i, realm_flags, realm_name, addr, realm_id)
-			if realm_name.lower() == name.lower():
-				match_addr = addr
-				match_id = realm_id
+		for i, realm in enumerate(buf.iter_records(REALM_LIST_ENTRY, num_realms)):
+			self._logger.debug("Realm[%d]: flags=%02x name=%s addr=%s id=%d", i, realm.flags, realm.name, realm.address, realm.realm_id)
+			if realm.name.lower() == name.lower():
+				match_addr = realm.address
+				match_id = realm.realm_id
 		if not match_addr:
-			self._logger.error("Realm %s not found in list", name)
-			self._writer.close()
-			return
+			raise RealmAuthError(f"Realm {name} not found in list")
 		h, p = match_addr.split(":")
 		port = int(p) & 0xFFFF
 		self._logger.info("Selected realm %s at %s:%s (id=%s)", name, h, port, match_id)
-		
+		self.session = RealmSession(self._session_key, name, h, port, match_id)
+
 		# Закриваємо realm з'єднання
 		self._writer.close()
-		
-		# Підключаємося до game сервера
-		await self._connect_to_game_server(h, port, name, match_id)
 
-	async def _connect_to_game_server(self, host: str, port: int, realm_name: str, realm_id: int) -> None:
-		"""Підключитися до ігрового сервера"""
+	async def _connect_to_game_server(self, session: RealmSession) -> GameConnector:
+		"""Підключитися до ігрового сервера; повертається, коли сесія закінчилась.
+
+		Сервер, що не відповів на TCP connect або на CMSG_AUTH_SESSION
+		вчасно, - це WorldAuthError, як і відмова в ключі.
+		"""
 		try:
 			from wowchat.game.connector import GameConnector
-			
-			game_connector = GameConnector(host, port, realm_name, realm_id, self._session_key)
+
+			game_connector = GameConnector(
+				session.host, session.port, session.realm_name, session.realm_id, session.session_key,
+				on_in_world=self.on_in_world,
+			)
+			metrics.incr("world.connects")
+			self.last_address = (session.host, session.port)
 			await game_connector.connect()
-			
+			return game_connector
+
+		except asyncio.TimeoutError as e:
+			raise WorldAuthError(f"World server {session.host}:{session.port} did not answer in time") from e
 		except Exception as e:
 			self._logger.error("Failed to connect to game server: %s", e)
 			raise
\ No newline at end of file
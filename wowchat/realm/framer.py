@@ -0,0 +1,131 @@
+"""Exact-length framing of the realm (auth) protocol.
+
+Counterpart of RealmPacketDecoder.scala. The size of every frame is worked
+out from the bytes that carry it (the g and N lengths and the security flags
+of a logon challenge, the result of a logon or reconnect proof, the size
+prefix of a realm list), so a frame is cut at its last byte whether the
+server's packets arrive whole, coalesced or one byte at a time. The framer
+does no I/O: the connector feeds it whatever the socket returned.
+"""
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+
+from wowchat.common.config import WowExpansion
+from wowchat.realm.packets import RealmPackets
+
+# (command, payload without the command byte); realm list payloads also
+# exclude their size prefix
+RealmFrame = Tuple[int, bytes]
+
+_is_success = RealmPackets.AuthResult.is_success
+_PROOFS = (RealmPackets.CMD_AUTH_LOGON_PROOF, RealmPackets.CMD_AUTH_RECONNECT_PROOF)
+
+# Logon challenge: cmd, error, result, B[32], g_len, g, N_len, N, salt[32],
+# CRC salt[16], security flags, then one block per flag set
+_CHALLENGE_HEAD = 3
+_CHALLENGE_G_LEN = _CHALLENGE_HEAD + 32
+_SALTS_LENGTH = 32 + 16
+_SECURITY_LENGTHS = (
+	(0x01, 4 + 16),  # PIN: grid seed, salt
+	(0x02, 1 + 1 + 1 + 1 + 8),  # matrix: width, height, digit count, challenge count, seed
+	(0x04, 1),  # token required
+)
+
+
+def security_length(flags: int) -> int:
+	"""Bytes following the security flags of a logon challenge"""
+	return sum(length for flag, length in _SECURITY_LENGTHS if flags & flag)
+
+
+class RealmPacketFramer:
+	# Logon proof sizes after the command byte, as in RealmPacketDecoder.scala
+	PROOF_SUCCESS_LENGTH_VANILLA = 25  # result, M2[20], survey id
+	PROOF_SUCCESS_LENGTH = 31  # + account flags, survey id, login flags
+	PROOF_FAILURE_LENGTH_VANILLA = 1
+	PROOF_FAILURE_LENGTH = 3  # result, two bytes of padding
+	# Reconnect challenge: result, reconnect proof data[16], version challenge[16]
+	RECONNECT_CHALLENGE_LENGTH = 1 + 16 + 16
+	# Reconnect proof: result, then login flags after Vanilla. Failures are
+	# the same size or a bare result byte before the server hangs up.
+	RECONNECT_PROOF_LENGTH_VANILLA = 1
+	RECONNECT_PROOF_LENGTH = 3
+
+	def __init__(self, expansion: str) -> None:
+		vanilla = expansion == WowExpansion.Vanilla
+		self._proof_success = 1 + (self.PROOF_SUCCESS_LENGTH_VANILLA if vanilla else self.PROOF_SUCCESS_LENGTH)
+		self._proof_failure = 1 + (self.PROOF_FAILURE_LENGTH_VANILLA if vanilla else self.PROOF_FAILURE_LENGTH)
+		self._reconnect_proof = 1 + (self.RECONNECT_PROOF_LENGTH_VANILLA if vanilla else self.RECONNECT_PROOF_LENGTH)
+		self._buf = bytearray()
+
+	@property
+	def pending(self) -> int:
+		"""Bytes received that are not part of a complete frame yet"""
+		return len(self._buf)
+
+	def feed(self, data: bytes) -> List[RealmFrame]:
+		"""Append data and return every frame it completed"""
+		self._buf += data
+		frames: List[RealmFrame] = []
+		while True:
+			size = self._frame_size()
+			if size is None or size > len(self._buf):
+				return frames
+			frames.append(self._take(size))
+
+	def feed_eof(self) -> List[RealmFrame]:
+		"""The server closed the connection; return what can still be framed.
+
+		Some servers answer a failed logon or reconnect proof with the result
+		byte alone, even after Vanilla, and hang up. That short frame only
+		ends at EOF.
+		"""
+		buf = self._buf
+		if len(buf) >= 2 and buf[0] in _PROOFS and not _is_success(buf[1]):
+			return [self._take(len(buf))]
+		return []
+
+	def _take(self, size: int) -> RealmFrame:
+		buf = self._buf
+		cmd = buf[0]
+		start = 3 if cmd == RealmPackets.CMD_REALM_LIST else 1
+		frame = (cmd, bytes(buf[start:size]))
+		del buf[:size]
+		return frame
+
+	def _frame_size(self) -> Optional[int]:
+		"""Size of the frame at the head of the buffer, or None until it is known"""
+		buf = self._buf
+		available = len(buf)
+		if not available:
+			return None
+		cmd = buf[0]
+		if cmd == RealmPackets.CMD_AUTH_LOGON_CHALLENGE:
+			if available < _CHALLENGE_HEAD:
+				return None
+			if not _is_success(buf[2]):
+				return _CHALLENGE_HEAD
+			if available <= _CHALLENGE_G_LEN:
+				return None
+			n_len_at = _CHALLENGE_G_LEN + 1 + buf[_CHALLENGE_G_LEN]
+			if available <= n_len_at:
+				return None
+			flags_at = n_len_at + 1 + buf[n_len_at] + _SALTS_LENGTH
+			if available <= flags_at:
+				return None
+			return flags_at + 1 + security_length(buf[flags_at])
+		if cmd == RealmPackets.CMD_AUTH_LOGON_PROOF:
+			if available < 2:
+				return None
+			return self._proof_success if _is_success(buf[1]) else self._proof_failure
+		if cmd == RealmPackets.CMD_REALM_LIST:
+			if available < 3:
+				return None
+			return 3 + (buf[1] | (buf[2] << 8))
+		if cmd == RealmPackets.CMD_AUTH_RECONNECT_CHALLENGE:
+			if available < 2:
+				return None
+			return 1 + (self.RECONNECT_CHALLENGE_LENGTH if _is_success(buf[1]) else 1)
+		if cmd == RealmPackets.CMD_AUTH_RECONNECT_PROOF:
+			return self._reconnect_proof if available >= 2 else None
+		raise ValueError(f"Unknown realm packet 0x{cmd:02X}")
@@ -4,6 +4,8 @@ from __future__ import annotations
 class RealmPackets:
 	CMD_AUTH_LOGON_CHALLENGE = 0x00
 	CMD_AUTH_LOGON_PROOF = 0x01
+	CMD_AUTH_RECONNECT_CHALLENGE = 0x02
+	CMD_AUTH_RECONNECT_PROOF = 0x03
 	CMD_REALM_LIST = 0x10
 
 	class AuthResult:
@@ -1,90 +1,101 @@
+"""Client side of the SRP6 variant used by the WoW auth protocol.
+
+Numbers travel little-endian in fixed 32-byte fields, hashes are SHA-1 and
+the multiplier k is 3. All arithmetic is on native ints with three-argument
+pow. The password-derived x and verifier g^x mod N only depend on the
+credentials, the salt and the group; step1 takes them ready made, so the
+RealmConnector derives them once per account and salt and keeps them, not
+the password, for the logons after.
+"""
 from __future__ import annotations
 
 import hashlib
-from dataclasses import dataclass, field
+from functools import lru_cache
+from secrets import randbits
+from typing import Optional, Tuple
 
-from wowchat.realm.big_number import BigNumber
+_sha1 = hashlib.sha1
+
+# Width of A, B, N, S and the salt on the wire
+NUMBER_LENGTH = 32
+SESSION_KEY_LENGTH = 40
+K_MULTIPLIER = 3
+
+
+def _to_bytes(n: int, length: int = NUMBER_LENGTH) -> bytes:
+	return n.to_bytes(length, "little")
+
+
+def _from_hash(digest: bytes) -> int:
+	return int.from_bytes(digest, "little")
+
+
+def password_verifier(account: bytes, password: str, salt: bytes, g: int, N: int) -> Tuple[int, int]:
+	"""x = H(salt | H(ACCOUNT:PASSWORD)) and the verifier g^x mod N"""
+	inner = _sha1(account + b":" + password.upper().encode("utf-8")).digest()
+	x = _from_hash(_sha1(salt + inner).digest())
+	return x, pow(g, x, N)
+
+
+@lru_cache(maxsize=8)
+def _group_hash(g: int, N: int) -> bytes:
+	"""H(N) xor H(g), the first term of M1"""
+	hash_n = _sha1(_to_bytes(N)).digest()
+	hash_g = _sha1(_to_bytes(g, 1)).digest()
+	return bytes(a ^ b for a, b in zip(hash_n, hash_g))
+
+
+def interleave_session_key(S: int) -> bytes:
+	"""40-byte session key: SHA-1 of the even and odd bytes of S, interleaved"""
+	t = _to_bytes(S)
+	key = bytearray(SESSION_KEY_LENGTH)
+	key[0::2] = _sha1(t[0::2]).digest()
+	key[1::2] = _sha1(t[1::2]).digest()
+	return bytes(key)
+
+
+def reconnect_proof(account: bytes, client_data: bytes, server_data: bytes, session_key: bytes) -> bytes:
+	"""R2 of CMD_AUTH_RECONNECT_PROOF: shows the client still holds the session key"""
+	return _sha1(account + client_data + server_data + session_key).digest()
 
 
-@dataclass
 class SRPClient:
-	k: BigNumber = field(default_factory=lambda: BigNumber(3))
-	a: BigNumber = field(default_factory=lambda: BigNumber.rand(19))
-	A: BigNumber | None = None
-	x: BigNumber | None = None
-	M: BigNumber | None = None
-	S: BigNumber | None = None
-	K: BigNumber | None = None
+	# Bits of the client's private ephemeral a, as in the Scala client
+	PRIVATE_BITS = 19 * 8
+
+	def __init__(self, a: Optional[int] = None) -> None:
+		# Fixed a is only for test vectors; a fresh one is drawn per step1 otherwise
+		self._fixed_a = a
+		self.A = b""
+		self.M1 = b""
+		self.K = b""
+		self._expected_m2 = b""
+
+	def step1(self, account: bytes, verifier: Tuple[int, int], B: int, g: int, N: int, salt: bytes) -> None:
+		"""Derive A, the session key K and the proof M1 from the server's challenge;
+		verifier is (x, v) from password_verifier for this account and salt"""
+		if B % N == 0:
+			raise ValueError("Invalid SRP challenge: B mod N is zero")
+		x, v = verifier
+		a = self._fixed_a if self._fixed_a is not None else randbits(self.PRIVATE_BITS)
+		A = _to_bytes(pow(g, a, N))
+		B_bytes = _to_bytes(B)
+		u = _from_hash(_sha1(A + B_bytes).digest())
+		if u == 0:
+			raise ValueError("Invalid SRP challenge: scrambler is zero")
+
+		S = pow((B - K_MULTIPLIER * v) % N, a + u * x, N)
+		K = interleave_session_key(S)
+		M1 = _sha1(_group_hash(g, N) + _sha1(account).digest() + salt + A + B_bytes + K).digest()
+
+		self.A = A
+		self.K = K
+		self.M1 = M1
+		self._expected_m2 = _sha1(A + M1 + K).digest()
 
 	def generate_hash_logon_proof(self) -> bytes:
-		assert self.A and self.M and self.K
-		md = hashlib.sha1()
-		md.update(self.A.as_byte_array(32))
-		md.update(self.M.as_byte_array(20, reverse=False))
-		md.update(self.K.as_byte_array(40))
-		return md.digest()
-
-	def step1(self, account: bytes, password: str, B: BigNumber, g: BigNumber, N: BigNumber, s: BigNumber) -> None:
-		password_upper = password.upper()
-		self.A = g.mod_pow(self.a, N)
-
-		md = hashlib.sha1()
-		md.update(self.A.as_byte_array(32))
-		md.update(B.as_byte_array(32))
-		u = BigNumber.from_bytes(bytearray(md.digest()), reverse=True)
-
-		user = account + b":" + password_upper.encode("utf-8")
-		md = hashlib.sha1()
-		md.update(user)
-		p = md.digest()
-
-		md = hashlib.sha1()
-		md.update(s.as_byte_array(32))
-		md.update(p)
-		x = BigNumber.from_bytes(bytearray(md.digest()), reverse=True)
-
-		self.S = B.sub(g.mod_pow(x, N).mul(self.k)).mod_pow(self.a.add(u.mul(x)), N)  # type: ignore[union-attr]
-
-		t = self.S.as_byte_array(32)
-		t1 = bytes(t[0::2])
-		t2 = bytes(t[1::2])
-		vK = bytearray(40)
-
-		md = hashlib.sha1()
-		md.update(t1)
-		digest = md.digest()
-		for i in range(20):
-			vK[i * 2] = digest[i]
-
-		md = hashlib.sha1()
-		md.update(t2)
-		digest = md.digest()
-		for i in range(20):
-			vK[i * 2 + 1] = digest[i]
-
-		md = hashlib.sha1()
-		md.update(N.as_byte_array(32))
-		hashN = bytearray(md.digest())
-
-		md = hashlib.sha1()
-		md.update(g.as_byte_array(1))
-		digest = md.digest()
-		for i in range(20):
-			hashN[i] = hashN[i] ^ digest[i]
-
-		md = hashlib.sha1()
-		md.update(account)
-		t4 = md.digest()
-
-		self.K = BigNumber.from_bytes(vK, reverse=True)
-		t3 = BigNumber.from_bytes(hashN, reverse=True)
-		t4_correct = BigNumber.from_bytes(bytearray(t4), reverse=True)
-
-		md = hashlib.sha1()
-		md.update(t3.as_byte_array(20))
-		md.update(t4_correct.as_byte_array(20))
-		md.update(s.as_byte_array(32))
-		md.update(self.A.as_byte_array(32))
-		md.update(B.as_byte_array(32))
-		md.update(self.K.as_byte_array(40))
-		self.M = BigNumber.from_bytes(bytearray(md.digest()))
\ No newline at end of file
+		"""M2 the server must answer with: H(A | M1 | K)"""
+		return self._expected_m2
+
+	def verify_server_proof(self, m2: bytes) -> bool:
+		return bool(self._expected_m2) and m2 == self._expected_m2
@@ -0,0 +1,160 @@
+"""Keeps the bot in the world: logs in, reconnects after every disconnect
+and paces the attempts with ReconnectDelay.
+
+After a network failure the host that failed is probed with a bare TCP
+connect. The next attempt, and with it any SRP logon, only runs once that
+host and, for a full logon, the realmlist host answer; while the backoff
+runs the probe is repeated, and the attempt goes ahead as soon as the host
+is back instead of sleeping out the whole delay. Attempt times, downtime
+and failures by class go to metrics.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional, Tuple
+
+from wowchat.common.config import WowChatConfig
+from wowchat.common.metrics import metrics
+from wowchat.common.reconnect_delay import FailureClass, ReconnectDelay, classify_failure, tcp_probe
+from wowchat.realm.connector import RealmConnector
+
+Probe = Callable[[str, int], Awaitable[bool]]
+
+_NETWORK_FAILURES = (FailureClass.NETWORK, FailureClass.DNS)
+
+
+def _unreachable(exc: BaseException) -> bool:
+	"""Whether the connection itself failed, rather than a connection that was up"""
+	if isinstance(exc, (ConnectionRefusedError, asyncio.TimeoutError)):
+		return True
+	return isinstance(exc, OSError) and not isinstance(exc, ConnectionError)
+
+
+class ConnectionSupervisor:
+	# Seconds between probes while waiting out a network failure
+	PROBE_INTERVAL = 2.0
+	PROBE_TIMEOUT = 3.0
+
+	def __init__(
+		self,
+		conf: WowChatConfig,
+		realm_connector: Optional[RealmConnector] = None,
+		reconnect_delay: Optional[ReconnectDelay] = None,
+		probe_interval: Optional[float] = None,
+		probe: Optional[Probe] = None,
+	) -> None:
+		self._conf = conf
+		self._logger = logging.getLogger(__name__)
+		self.realm = realm_connector or RealmConnector(asyncio.get_event_loop())
+		self.realm.on_in_world = self._entered_world
+		self.reconnect_delay = reconnect_delay or ReconnectDelay()
+		# 0 turns probing off: plain backoff sleeps and no gate before a logon
+		self._probe_interval = self.PROBE_INTERVAL if probe_interval is None else probe_interval
+		self._probe = probe or (lambda host, port: tcp_probe(host, port, self.PROBE_TIMEOUT))
+		# The last failure was a host not taking the connection
+		self._host_down = False
+		self._attempt_start = 0.0
+		# When the last session ended or the first attempt began, for downtime
+		self._down_since = time.perf_counter()
+
+	async def run(self) -> None:
+		while True:
+			delay, failure = await self.attempt()
+			if failure is None and not delay:
+				self._logger.info("Disconnected from server! Reconnecting...")
+				continue
+			self._logger.info("Disconnected from server! Reconnecting in %.1f seconds...", delay)
+			await self._wait(delay, failure)
+
+	async def attempt(self) -> Tuple[float, Optional[str]]:
+		"""One connect or reconnect, until its session ends.
+
+		Returns the delay before the next attempt and the failure class, None
+		when the session got into the world.
+		"""
+		realm = self.realm
+		conf = self._conf
+		if self.reconnect_delay.failure_class in _NETWORK_FAILURES and self._probe_interval:
+			for host, port in self._gate_addresses():
+				if not await self._probe_host(host, port):
+					self._logger.info("%s:%s does not answer yet, not reconnecting", host, port)
+					self._host_down = True
+					return self._failed(FailureClass.NETWORK), FailureClass.NETWORK
+
+		metrics.incr("reconnect.attempts")
+		self._attempt_start = time.perf_counter()
+		in_world = False
+		self._host_down = False
+		try:
+			if realm.session is None:
+				in_world = await realm.connect(conf)
+			else:
+				in_world = await realm.reconnect(conf)
+		except Exception as e:
+			failure = classify_failure(e)
+			self._host_down = _unreachable(e)
+			self._logger.error("Failed to start game connection (%s): %s", failure, e)
+		else:
+			failure = None if in_world else FailureClass.DISCONNECT
+
+		if in_world:
+			self._down_since = time.perf_counter()
+			return self.reconnect_delay.session_ended(), None
+		metrics.observe(f"reconnect.failed.{failure}", time.perf_counter() - self._attempt_start)
+		return self._failed(failure), failure
+
+	def _gate_addresses(self) -> Tuple[Tuple[str, int], ...]:
+		"""Hosts that must answer before the next attempt: the one that failed,
+		and the realmlist host when the attempt will be an SRP logon"""
+		addresses = []
+		if self.realm.last_address is not None:
+			addresses.append(self.realm.last_address)
+		realmlist = (self._conf.wow.realmlist.host, self._conf.wow.realmlist.port)
+		if self.realm.session is None and realmlist not in addresses:
+			addresses.append(realmlist)
+		return tuple(addresses)
+
+	def _failed(self, failure: str) -> float:
+		metrics.incr(f"reconnect.failures.{failure}")
+		return self.reconnect_delay.get_next(failure)
+
+	def _entered_world(self) -> None:
+		now = time.perf_counter()
+		metrics.observe("reconnect.attempt", now - self._attempt_start)
+		metrics.observe("reconnect.downtime", now - self._down_since)
+		self.reconnect_delay.session_started()
+		self._logger.info("In the world after %.1f s down; %s", now - self._down_since, metrics.summary("reconnect."))
+
+	async def _wait(self, delay: float, failure: Optional[str]) -> None:
+		"""Sleep out the delay, or less once the host that went away answers again"""
+		address = self.realm.last_address
+		if failure not in _NETWORK_FAILURES or not self._probe_interval or address is None:
+			await asyncio.sleep(delay)
+			return
+		host, port = address
+		loop = asyncio.get_running_loop()
+		deadline = loop.time() + delay
+		# Only a host seen down and then up cuts the wait short: a server that
+		# takes connections and then drops them must not turn the backoff
+		# into a loop at the probe interval
+		seen_down = self._host_down
+		while True:
+			remaining = deadline - loop.time()
+			if remaining <= 0:
+				return
+			await asyncio.sleep(min(self._probe_interval, remaining))
+			if await self._probe_host(host, port):
+				if seen_down:
+					self._logger.info("%s:%s answers again, reconnecting now", host, port)
+					return
+			else:
+				seen_down = True
+
+	async def _probe_host(self, host: str, port: int) -> bool:
+		metrics.incr("reconnect.probes")
+		up = await self._probe(host, port)
+		if not up:
+			metrics.incr("reconnect.probes_down")
+		return up